@@ -66,7 +66,7 @@ def reloadSettings(self: Self, event: LeoKeyEvent = None) -> None:
         if c2.isChanged() and c2.mFileName:
             c2.save()
     # Read leoSettings.leo and myLeoSettings.leo, using a null gui.
-    lm.readGlobalSettingsFiles()
+    lm.readGlobalSettingsFiles(use_cache=True)
     for c in g.app.commanders():
         # Read the local file, using a null gui.
         previousSettings = lm.getPreviousSettings(fn=c.mFileName)
@@ -5,13 +5,16 @@
 #@+node:ekr.20220827065126.1: ** << gotoCommands imports & annotations >>
 from __future__ import annotations
 import re
+from collections.abc import Iterator
 from typing import Optional, TYPE_CHECKING
 from leo.core import leoGlobals as g
 
 if TYPE_CHECKING:  # pragma: no cover
     from leo.core.leoCommands import Commands as Cmdr
     from leo.core.leoGui import LeoKeyEvent
-    from leo.core.leoNodes import Position
+    from leo.core.leoNodes import Position, VNode
+    # (gnx, h, offset): the node and the offset within the node of a line.
+    Row = tuple[Optional[str], Optional[str], int]
 #@-<< gotoCommands imports & annotations >>
 
 #@+others
@@ -22,6 +25,9 @@ class GoToCommands:
     def __init__(self, c: Cmdr) -> None:
         """Ctor for GoToCommands class."""
         self.c = c
+        # Keys are the vnodes of @<file> nodes.
+        # Values are (tree_hash, line_map), where tree_hash is at.treeHash(root).
+        self.line_maps: dict[VNode, tuple[str, LineMap]] = {}
 
     #@+others
     #@+node:ekr.20100216141722.5622: *3* goto.find_file_line & helper
@@ -71,18 +77,18 @@ class GoToCommands:
         # Step 1: Get the lines of external files *with* sentinels,
         #         even if the actual external file actually contains no sentinels.
         sentinels = root.isAtFileNode()
-        s = self.get_external_file_with_sentinels(root)
+        line_map = self.get_line_map(root)
         # Special case empty files.
-        if not s.strip():
+        if line_map.is_empty:
             return p, 0
-        lines = g.splitLines(s)
-        # Step 2: scan the lines for line n.
+        lines = line_map.lines
+        # Step 2: find line n.
         if sentinels:
             # All sentinels count as real lines.
-            gnx, h, offset = self.scan_sentinel_lines(lines, n, root)
+            gnx, h, offset = line_map.find_sentinel_line(n, root)
         else:
             # Not all sentinels count as real lines.
-            gnx, h, offset = self.scan_nonsentinel_lines(lines, n, root)
+            gnx, h, offset = line_map.find_nonsentinel_line(n, root)
         if gnx:
             p = self.find_gnx2(gnx)
             if p:
@@ -108,8 +114,7 @@ class GoToCommands:
         remove_sentinels = not root.isAtFileNode()  # Same as in self.find_file_line_helper.
 
         # Get the file with sentinels.
-        contents_s = self.get_external_file_with_sentinels(root) if s is None else s
-        contents = g.splitLines(contents_s)
+        contents = self.get_line_map(root).lines if s is None else g.splitLines(s)
 
         # if not g.unitTesting: g.printObj(contents)
 
@@ -171,26 +176,34 @@ class GoToCommands:
                 return p, offset
         self.fail(lines, n, root)
         return None, -1
-    #@+node:ekr.20181003080042.1: *3* goto.node_offset_to_file_line
+    #@+node:ekr.20181003080042.1: *3* goto.node_offset_to_file_line & helper
     def node_offset_to_file_line(self, target_offset: int, target_p: Position, root: Position) -> int:
         """
         Given a zero-based target_offset within target_p.b, return the line
         number of the corresponding line within root's file.
         """
+        n = self.get_line_map(root).find_node_offset(target_p.gnx, target_offset, root)
+        if n is None:
+            g.trace('\nNot found', target_offset, target_p.gnx)
+        return n
+
+    def node_offset_rows(self, lines: list[str], root: Position) -> Iterator[tuple[str, int, int]]:
+        """
+        Yield (gnx, node_offset, n) for each line that starts the given
+        (zero-based) offset within the node with the given gnx. n is the
+        zero-based line number within lines.
+        """
         delim1, delim2 = self.get_delims(root)
-        file_s = self.get_external_file_with_sentinels(root)
-        gnx, h, n, node_offset, target_gnx = None, None, -1, None, target_p.gnx
+        gnx, h, n, node_offset = None, None, -1, None
         stack: list[tuple[str, str, int]] = []
-        for s in g.splitLines(file_s):
+        for s in lines:
             n += 1  # All lines contribute to the file's line count.
             if self.is_sentinel(delim1, delim2, s):
                 s2 = s.strip()[len(delim1) :]  # Works for blackened sentinels.
                 # Common code for the visible sentinels.
-                if s2.startswith(('@+others', '@+<<', '@@'),):
-                    if target_offset == node_offset and gnx == target_gnx:
-                        return n
-                    if node_offset is not None:
-                        node_offset += 1
+                if s2.startswith(('@+others', '@+<<', '@@'),) and node_offset is not None:
+                    yield gnx, node_offset, n
+                    node_offset += 1
                 # These sentinels change nodes...
                 if s2.startswith('@+node'):
                     gnx, h = self.get_script_node_info(s, delim2)
@@ -204,14 +217,11 @@ class GoToCommands:
                     gnx, h, node_offset = stack.pop()
             else:
                 # All non-sentinel lines are visible.
-                if target_offset == node_offset and gnx == target_gnx:
-                    return n
                 if node_offset is not None:
+                    yield gnx, node_offset, n
                     node_offset += 1
-        g.trace('\nNot found', target_offset, target_gnx)
-        return None
-    #@+node:ekr.20150624085605.1: *3* goto.scan_nonsentinel_lines
-    def scan_nonsentinel_lines(self, lines: list[str], n: int, root: Position) -> tuple[str, str, int]:
+    #@+node:ekr.20150624085605.1: *3* goto.scan_nonsentinel_lines & helper
+    def scan_nonsentinel_lines(self, lines: list[str], n: int, root: Position) -> Row:
         """
         Scan a list of lines containing sentinels, looking for the node and
         offset within the node of the n'th (one-based) line.
@@ -224,6 +234,17 @@ class GoToCommands:
         h:      the headline of the #@+node
         offset: the offset of line n within the node.
         """
+        for count, gnx, h, offset in self.nonsentinel_rows(lines, root):
+            if count == n:
+                # Count is the real, one-based count.
+                return gnx, h, offset
+        return None, None, -1
+
+    def nonsentinel_rows(self, lines: list[str], root: Position) -> Iterator[tuple[int, str, str, int]]:
+        """
+        Yield (count, gnx, h, offset) for each line of lines, where count is
+        the number of non-sentinel lines so far.
+        """
         delim1, delim2 = self.get_delims(root)
         count, gnx, h, offset = 0, root.gnx, root.h, 0
         stack = [(gnx, h, offset),]
@@ -259,14 +280,9 @@ class GoToCommands:
                 # Non-sentinel lines are visible both in the outline and the file.
                 count += 1
                 offset += 1
-            if count == n:
-                # Count is the real, one-based count.
-                break
-        else:
-            gnx, h, offset = None, None, -1
-        return gnx, h, offset
-    #@+node:ekr.20150623175314.1: *3* goto.scan_sentinel_lines
-    def scan_sentinel_lines(self, lines: list[str], n: int, root: Position) -> tuple[str, str, int]:
+            yield count, gnx, h, offset
+    #@+node:ekr.20150623175314.1: *3* goto.scan_sentinel_lines & helper
+    def scan_sentinel_lines(self, lines: list[str], n: int, root: Position) -> Row:
         """
         Scan a list of lines containing sentinels, looking for the node and
         offset within the node of the n'th (one-based) line.
@@ -276,10 +292,17 @@ class GoToCommands:
         h:      the headline of the #@+node
         offset: the offset of line n within the node.
         """
+        for i, row in enumerate(self.sentinel_rows(lines, root)):
+            if i + 1 == n:  # Bug fix 2017/04/01: n is one based.
+                return row
+        return None, None, -1
+
+    def sentinel_rows(self, lines: list[str], root: Position) -> Iterator[Row]:
+        """Yield (gnx, h, offset) for each line of lines."""
         delim1, delim2 = self.get_delims(root)
         gnx, h, offset = root.gnx, root.h, 0
         stack = [(gnx, h, offset),]
-        for i, s in enumerate(lines):
+        for s in lines:
             if self.is_sentinel(delim1, delim2, s):
                 # Handle blackened sentinels.
                 s2 = s.strip()[len(delim1) :]
@@ -298,11 +321,7 @@ class GoToCommands:
                     offset += 1
             else:
                 offset += 1
-            if i + 1 == n:  # Bug fix 2017/04/01: n is one based.
-                break
-        else:
-            gnx, h, offset = None, None, -1
-        return gnx, h, offset
+            yield gnx, h, offset
     #@+node:ekr.20150624142449.1: *3* goto.Utils
     #@+node:ekr.20150625133523.1: *4* goto.fail
     def fail(self, lines: list[str], n: int, root: Position) -> None:
@@ -348,9 +367,14 @@ class GoToCommands:
         if c.p.gnx == gnx:
             return c.p.copy()
 
+        # The position index finds uncloned nodes quickly.
+        backwards = c.config.getBool('search-links-backwards', default=True)
+        p = c.positionIndex.find(gnx, unique=backwards)
+        if p:
+            return p
+
         # Search the entire outline.
         positions: list[Position]
-        backwards = c.config.getBool('search-links-backwards', default=True)
         if backwards:
             positions = list(reversed(list(c.all_positions())))
         else:
@@ -425,6 +449,32 @@ class GoToCommands:
             forcePythonSentinels=False,
             useSentinels=True,
         )
+    #@+node:ekr.20261018165530.1: *4* goto.get_line_map & update_line_map
+    def get_line_map(self, root: Position) -> LineMap:
+        """
+        Return the line map of root's external file, written with sentinels.
+
+        Line maps of @<file> nodes are cached until root's tree changes.
+        """
+        c = self.c
+        if not root.isAnyAtFileNode():
+            return LineMap(self, self.get_external_file_with_sentinels(root))
+        tree_hash = c.atFileCommands.treeHash(root)
+        data = self.line_maps.get(root.v)
+        if data and data[0] == tree_hash:
+            return data[1]
+        line_map = LineMap(self, self.get_external_file_with_sentinels(root))
+        self.line_maps[root.v] = tree_hash, line_map
+        return line_map
+
+    def update_line_map(self, root: Position, tree_hash: str, s: str) -> None:
+        """
+        Called when writing root's external file, with sentinels, to s.
+
+        Update root's line map if it exists.
+        """
+        if root.v in self.line_maps:
+            self.line_maps[root.v] = tree_hash, LineMap(self, s)
     #@+node:ekr.20150623175738.1: *4* goto.get_script_node_info
     def get_script_node_info(self, s: str, delim2: str) -> tuple[str, str]:
         """Return the gnx and headline of a #@+node."""
@@ -482,6 +532,55 @@ class GoToCommands:
         c.bodyWantsFocus()
         w.seeInsertPoint()
     #@-others
+#@+node:ekr.20261018165530.2: ** class LineMap
+class LineMap:
+    """
+    A map from the lines of an external file, written with sentinels, to the
+    nodes and offsets producing them.
+
+    The map scans the file at most once for each kind of lookup. Lookups
+    take the root position because the root's position may change even
+    when its tree does not.
+    """
+
+    def __init__(self, goto: GoToCommands, s: str) -> None:
+        self.goto = goto
+        self.is_empty = not s.strip()
+        self.lines = g.splitLines(s)
+        # Created when first needed.
+        self.sentinel_rows: list[Row] = None
+        self.nonsentinel_rows: dict[int, Row] = None
+        self.node_offsets: dict[tuple[str, int], int] = None
+
+    #@+others
+    #@+node:ekr.20261018165530.3: *3* LineMap.find_sentinel_line
+    def find_sentinel_line(self, n: int, root: Position) -> Row:
+        """Equivalent to goto.scan_sentinel_lines(self.lines, n, root)."""
+        if self.sentinel_rows is None:
+            self.sentinel_rows = list(self.goto.sentinel_rows(self.lines, root))
+        if 0 < n <= len(self.sentinel_rows):
+            return self.sentinel_rows[n - 1]
+        return None, None, -1
+    #@+node:ekr.20261018165530.4: *3* LineMap.find_nonsentinel_line
+    def find_nonsentinel_line(self, n: int, root: Position) -> Row:
+        """Equivalent to goto.scan_nonsentinel_lines(self.lines, n, root)."""
+        if self.nonsentinel_rows is None:
+            self.nonsentinel_rows = {}
+            for count, gnx, h, offset in self.goto.nonsentinel_rows(self.lines, root):
+                self.nonsentinel_rows.setdefault(count, (gnx, h, offset))
+        return self.nonsentinel_rows.get(n, (None, None, -1))
+    #@+node:ekr.20261018165530.5: *3* LineMap.find_node_offset
+    def find_node_offset(self, gnx: str, offset: int, root: Position) -> Optional[int]:
+        """
+        Return the zero-based line number of the line at the given
+        zero-based offset of the node with the given gnx, or None.
+        """
+        if self.node_offsets is None:
+            self.node_offsets = {}
+            for gnx2, offset2, n in self.goto.node_offset_rows(self.lines, root):
+                self.node_offsets.setdefault((gnx2, offset2), n)
+        return self.node_offsets.get((gnx, offset))
+    #@-others
 #@+node:ekr.20180517041303.1: ** show-file-line
 @g.command('show-file-line')
 def show_file_line(event: LeoKeyEvent) -> None:
@@ -501,7 +600,7 @@ def show_file_line(event: LeoKeyEvent) -> None:
     if not w:
         return
     # n0 is the 1-based line number of the first line of p.b.
-    n0 = GoToCommands(c).find_node_start(p=c.p)  # 1-based.
+    n0 = c.gotoCommands.find_node_start(p=c.p)  # 1-based.
     if n0 is None:
         g.es_print('Line not found')
         return
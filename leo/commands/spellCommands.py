@@ -4,8 +4,9 @@
 #@+<< spellCommands imports & annotations >>
 #@+node:ekr.20150514050530.1: ** << spellCommands imports & annotations >>
 from __future__ import annotations
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 import re
+import zlib
 from typing import Any, Optional, TYPE_CHECKING
 # Third-party annotations
 try:
@@ -18,7 +19,7 @@ from leo.core import leoGlobals as g
 if TYPE_CHECKING:  # pragma: no cover
     from leo.core.leoCommands import Commands as Cmdr
     from leo.core.leoGui import LeoKeyEvent
-    from leo.core.leoNodes import Position
+    from leo.core.leoNodes import Position, VNode
     SpellDict = dict[str, list[str]]
     KWargs = Any
 #@-<< spellCommands imports & annotations >>
@@ -90,6 +91,46 @@ class BaseSpellWrapper:
     def ignore(self, word: str) -> None:
 
         self.d.add_to_session(word)
+    #@+node:ekr.20150514063305.517: *3* BaseSpellWrapper.process_word & check_word
+    def process_word(self, word: str) -> list[str]:
+        """
+        Check the word. Return None if the word is properly spelled.
+        Otherwise, return a list of alternatives.
+        """
+        word2 = self.check_word(word)
+        if word2 is None:
+            return None
+        return self.d.suggest(word2)
+
+    def check_word(self, word: str) -> Optional[str]:
+        """
+        Return None if the word is properly spelled. Otherwise, return the
+        word for which to suggest alternatives.
+        """
+        d = self.d
+        if not d:
+            return None
+        if d.check(word):
+            return None
+        # Speed doesn't matter here. The more we find, the more convenient.
+        # Remove all digits.
+        word = ''.join([i for i in word if not i.isdigit()])
+        if d.check(word) or d.check(word.lower()):
+            return None
+        if word.find('_') > -1:
+            # Snake case.
+            words = word.split('_')
+            for word2 in words:
+                if not d.check(word2) and not d.check(word2.lower()):
+                    return word
+            return None
+        words = g.unCamel(word)
+        if words:
+            for word2 in words:
+                if not d.check(word2) and not d.check(word2.lower()):
+                    return word
+            return None
+        return word
     #@+node:ekr.20180209142310.1: *3* BaseSpellWrapper.show_info
     def show_info(self) -> None:
 
@@ -106,10 +147,14 @@ class BaseSpellWrapper:
 class DefaultDict:
     """A class with the same interface as the enchant dict class."""
 
+    # The characters that edits insert or replace.
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+
     def __init__(self, words: list[str] = None) -> None:
         self.added_words: set[str] = set()
         self.ignored_words: set[str] = set()
         self.words: set[str] = set() if words is None else set(words)
+        self.index: Optional[SuggestionIndex] = None  # Created by suggestion_index.
 
     #@+others
     #@+node:ekr.20180207075740.1: *3* DefaultDict.add
@@ -117,6 +162,8 @@ class DefaultDict:
         """Add a word to the dictionary."""
         self.words.add(word)
         self.added_words.add(word)
+        if self.index:
+            self.index.add(word)
     #@+node:ekr.20180207075751.1: *3* DefaultDict.add_to_session
     def add_to_session(self, word: str) -> None:
 
@@ -127,6 +174,7 @@ class DefaultDict:
         for word in words or []:
             self.words.add(word)
             self.words.add(word.lower())
+        self.index = None
     #@+node:ekr.20180207080007.1: *3* DefaultDict.check
     def check(self, word: str) -> bool:
         """Return True if the word is in the dict."""
@@ -139,7 +187,7 @@ class DefaultDict:
 
     def edits1(self, word: str) -> list[str]:
         "All edits that are one edit away from `word`."
-        letters    = 'abcdefghijklmnopqrstuvwxyz'
+        letters    = self.letters
         splits     = [(word[:i], word[i:])    for i in range(len(word) + 1)]
         deletes    = [L + R[1:]               for L, R in splits if R]
         transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R) > 1]
@@ -152,18 +200,119 @@ class DefaultDict:
         return [e2 for e1 in self.edits1(word) for e2 in self.edits1(e1)]
     #@+node:ekr.20180207081634.1: *3* DefaultDict.suggest & helpers
     def suggest(self, word: str) -> list[str]:
+        """
+        Return the sorted list of the dictionary's words one edit away from
+        word or, if there are none, two edits away from word.
+        """
+        assert word not in self.words, repr(word)
+        edits1 = self.edits1(word)
+        suggestions = {z for z in edits1 if z in self.words}
+        if not suggestions:
+            # Don't generate all of edits2: there may be hundreds of thousands.
+            index = self.suggestion_index()
+            for edit in edits1:
+                suggestions.update(index.neighbors(edit, self.words, self.letters))
+            suggestions.discard(word)
+        return sorted(suggestions)
+    #@+node:ekr.20261018163010.1: *3* DefaultDict.suggestion_index
+    db_key = 'spell-suggestion-index'
+    db_version = 1
 
-        def known(words: list[str]) -> list[str]:
-            """Return the words that are in the dictionary."""
-            return [z for z in list(set(words)) if z in self.words]
+    def suggestion_index(self) -> SuggestionIndex:
+        """
+        Return the suggestion index of all the dictionary's words, creating it
+        if necessary.
 
-        assert not known([word]), repr(word)
-        suggestions = (
-            known(self.edits1(word)) or
-            known(self.edits2(word))
-            # [word] # Fall back to the unknown word itself.
-        )
-        return suggestions
+        Leo caches the index in g.app.db. A checksum of the words detects
+        changes to the dictionary files.
+        """
+        if self.index is None:
+            words = sorted(self.words)
+            key = len(words), zlib.crc32('\n'.join(words).encode('utf-8', 'surrogatepass'))
+            db = g.app.db
+            data = db.get(self.db_key) if db is not None else None
+            if isinstance(data, dict) and data.get('version') == self.db_version and data.get('key') == key:
+                self.index = SuggestionIndex(deletes=data['deletes'])
+            else:
+                self.index = SuggestionIndex(words)
+                if db is not None:
+                    db[self.db_key] = {'version': self.db_version, 'key': key, 'deletes': self.index.deletes}
+        return self.index
+    #@-others
+#@+node:ekr.20261018163010.2: ** class SuggestionIndex
+class SuggestionIndex:
+    """
+    A symmetric-delete index of a DefaultDict's words.
+
+    The keys of self.deletes are the strings made by deleting one character
+    from a word. The values are the newline-separated words yielding the key.
+    Two strings of the same length are one replacement or transposition apart
+    only if deleting one character from each yields the same string.
+    """
+
+    def __init__(self, words: list[str] = None, deletes: dict[str, str] = None) -> None:
+        self.deletes: dict[str, str] = {} if deletes is None else deletes
+        for word in words or []:
+            self.add(word)
+
+    #@+others
+    #@+node:ekr.20261018163010.3: *3* SuggestionIndex.add
+    def add(self, word: str) -> None:
+        """Add the deletes of word to the index."""
+        deletes = self.deletes
+        for delete in {word[:i] + word[i + 1 :] for i in range(len(word))}:
+            value = deletes.get(delete)
+            if value is None:
+                deletes[delete] = word
+            elif word not in value.split('\n'):
+                deletes[delete] = f"{value}\n{word}"
+    #@+node:ekr.20261018163010.4: *3* SuggestionIndex.neighbors & one_edit
+    def neighbors(self, s: str, words: set[str], letters: str) -> set[str]:
+        """
+        Return the set of all words one edit (or no edit) away from s.
+
+        Like DefaultDict.edits1, insertions and replacements may add only
+        the given letters.
+        """
+        deletes, result = self.deletes, set()
+        if s in words:
+            result.add(s)
+        # Insertions: s is a delete of the word.
+        if value := deletes.get(s):
+            result.update(z for z in value.split('\n') if self.first_difference(s, z) in letters)
+        for i in range(len(s)):
+            delete = s[:i] + s[i + 1 :]
+            # Deletions.
+            if delete in words:
+                result.add(delete)
+            # Replacements and transpositions.
+            if value := deletes.get(delete):
+                result.update(z for z in value.split('\n') if self.one_edit(s, z, letters))
+        return result
+
+    def first_difference(self, s1: str, s2: str) -> str:
+        """Return the first character of s2 that differs from s1, or ''."""
+        i = 0
+        while i < len(s1) and i < len(s2) and s1[i] == s2[i]:
+            i += 1
+        return s2[i : i + 1]
+
+    def one_edit(self, s1: str, s2: str, letters: str) -> bool:
+        """
+        Return True if two strings of the same length differ by at most one
+        replacement of a character of s1 by one of the given letters or one
+        transposition of adjacent characters.
+        """
+        if len(s1) != len(s2):
+            return False
+        i = 0
+        while i < len(s1) and s1[i] == s2[i]:
+            i += 1
+        if s1[i + 1 :] == s2[i + 1 :]:
+            return s2[i : i + 1] in letters
+        if i + 1 < len(s1) and s1[i] == s2[i + 1] and s1[i + 1] == s2[i]:
+            return s1[i + 2 :] == s2[i + 2 :]
+        return False
     #@-others
 #@+node:ekr.20180207071114.1: ** class DefaultWrapper (BaseSpellWrapper)
 class DefaultWrapper(BaseSpellWrapper):
@@ -379,36 +528,6 @@ class EnchantWrapper(BaseSpellWrapper):
             g.es_print('Error opening dictionary')
             g.es_print('pip install pyenchant, NOT enchant')
         return d
-    #@+node:ekr.20150514063305.517: *3* enchant.process_word
-    def process_word(self, word: str) -> list[str]:
-        """
-        Check the word. Return None if the word is properly spelled.
-        Otherwise, return a list of alternatives.
-        """
-        d = self.d
-        if not d:
-            return None
-        if d.check(word):
-            return None
-        # Speed doesn't matter here. The more we find, the more convenient.
-        # Remove all digits.
-        word = ''.join([i for i in word if not i.isdigit()])
-        if d.check(word) or d.check(word.lower()):
-            return None
-        if word.find('_') > -1:
-            # Snake case.
-            words = word.split('_')
-            for word2 in words:
-                if not d.check(word2) and not d.check(word2.lower()):
-                    return d.suggest(word)
-            return None
-        words = g.unCamel(word)
-        if words:
-            for word2 in words:
-                if not d.check(word2) and not d.check(word2.lower()):
-                    return d.suggest(word)
-            return None
-        return d.suggest(word)
     #@-others
 #@+node:ekr.20150514063305.481: ** class SpellCommandsClass
 class SpellCommandsClass(BaseEditCommandsClass):
@@ -452,6 +571,28 @@ class SpellCommandsClass(BaseEditCommandsClass):
         self.word: str = None
         self.spell_as_you_type = False
         self.wrap_as_you_type = False
+    #@+node:ekr.20261018163010.6: *3* checkSubtree
+    @cmd('spell-check-subtree')
+    def checkSubtree(self, event: LeoKeyEvent = None) -> None:
+        """
+        Report all misspelled words in the selected subtree in the log pane,
+        with links to the nodes containing them.
+        """
+        c = self.c
+        if not self.handler:
+            self.openSpellTab()
+        if not self.handler or not self.handler.loaded:
+            g.es_print('spell checking is not available')
+            return
+        result = self.handler.check_subtree(c.p)
+        if not result:
+            g.es('no misspellings')
+            return
+        for word in sorted(result, key=str.lower):
+            for p in result[word]:
+                g.es(f"{word}: {p.h}", nodeLink=p.get_UNL())
+        n = len({p.v for positions in result.values() for p in positions})
+        g.es(f"{len(result)} misspelled word{g.plural(len(result))} in {n} node{g.plural(n)}")
     #@+node:ekr.20150514063305.492: *3* as_you_type_* commands
     #@+node:ekr.20150514063305.493: *4* as_you_type_toggle
     @cmd('spell-as-you-type-toggle')
@@ -609,6 +750,44 @@ class SpellTabHandler:
             # g.es_print('No main dictionary')
             self.tab = None
     #@+node:ekr.20150514063305.502: *3* Commands
+    #@+node:ekr.20261018163010.7: *4* SpellTabHandler.check_subtree
+    def check_subtree(self, p: Position) -> dict[str, list[Position]]:
+        """
+        Check all the words in p's subtree, checking each distinct word only once.
+
+        Return a dict whose keys are misspelled words and whose values are the
+        positions of the nodes containing them, in outline order.
+        """
+        if not self.loaded:
+            return {}
+        sc = self.spellController
+        # Keys are (word, alt_word) tuples, values are lists of positions.
+        occurrences: dict[tuple[str, Optional[str]], list[Position]] = {}
+        # Keys are vnodes, values are their outline order.
+        order: dict[VNode, int] = {}
+        for p2 in p.self_and_subtree():
+            if p2.v not in order:
+                order[p2.v] = len(order)
+                for key in {(word, alt_word) for start, word, alt_word in self.find_words(p2.b)}:
+                    occurrences.setdefault(key, []).append(p2.copy())
+        result: dict[str, list[Position]] = {}
+        for (word, alt_word), positions in occurrences.items():
+            if word in self.seen:
+                continue
+            try:
+                misspelled = (
+                    sc.check_word(word) is not None
+                    and (alt_word is None or sc.check_word(alt_word) is not None)
+                )
+            except ValueError:
+                continue
+            if misspelled:
+                result.setdefault(word, []).extend(positions)
+        # Remove duplicates, which are possible if alt_words differ.
+        for word, positions in result.items():
+            d = {p2.v: p2 for p2 in positions}
+            result[word] = sorted(d.values(), key=lambda p2: order[p2.v])
+        return result
     #@+node:ekr.20150514063305.503: *4* SpellTabHandler.add
     def add(self, event: LeoKeyEvent = None) -> None:
         """Add the selected suggestion to the dictionary."""
@@ -649,7 +828,7 @@ class SpellTabHandler:
         c.invalidateFocus()
         c.bodyWantsFocus()
         return False
-    #@+node:ekr.20150514063305.505: *4* SpellTabHandler.find & helper
+    #@+node:ekr.20150514063305.505: *4* SpellTabHandler.find & helpers
     # Create a pattern that matches words, including contractions.
 
     # The following pattern below is only approximate!
@@ -675,79 +854,7 @@ class SpellTabHandler:
         ins = w.getInsertPoint()
         last_p = p.copy()
         while True:
-            # Note: despite the tests below, finditer is a crucial speed boost.
-            for m in self.re_word.finditer(s[ins:]):
-                start, word = m.start(0), m.group(0)
-
-                # Strip leading and trailing underscores.
-                # sc.process_word throw ValueError otherwise.
-                while word and word.startswith(('_', '`')):
-                    word = word[1:]
-                    start += 1
-                if not word:
-                    continue
-                while word and word.endswith(('_', '`')):
-                    word = word[:-1]
-                if not word:
-                    continue
-
-                # Make sure the spell checker won't throw ValueError.
-                if '_' in word:
-                    # Only check up to those parts containing word characters.
-                    parts = word.split('_')
-                    parts = [z for z in parts if z]  # Handle '__'.
-                    for i, part in enumerate(parts):
-                        if not self.re_part.match(part):
-                            word = '_'.join(parts[:i]).replace('__', '_')
-                            if not word:
-                                continue
-                else:
-                    parts = [word]
-                    if not self.re_part.match(word):
-                        continue
-
-                # Ignore the word if numbers precede or follow it.
-                # Seems difficult to do this in the regex itself.
-                k1 = ins + start - 1
-                if k1 >= 0 and s[k1].isdigit():
-                    continue
-
-                # Special case: f-strings delimited by single quotes.
-                #               Don't bother testing for the obsolete u'xxx' syntax.
-                if word.startswith("f'"):
-                    word = word[2:]
-                    start += 2
-                    if not word:
-                        continue
-
-                # Don't check short words.
-                if len(word) < 3:
-                    continue
-
-                # Don't check words following `(http|https)://`.
-                i, j = g.getLine(s, ins + start)
-                line = s[i:j]
-                m = self.re_http.match(line)
-                if m and word in m.group(2):
-                    continue
-
-                # Special case: \b, \n, and \t delimit words.
-                #               It's hard to test for this in the regex.
-                alt_word = None
-                if word.startswith(('b', 'n', 't')) and k1 >= 0 and s[k1] == '\\':
-                    alt_word = word  # Search two ways.
-                    word = word[1:]
-                    start += 1
-                    if not word:
-                        continue
-
-                # Last checks.
-                k2 = ins + start + len(word)
-                if k2 < len(s) and s[k2].isdigit():
-                    continue
-                if word.startswith('_') or word.endswith('_'):
-                    g.trace('Can not happen: underscore in word', repr(word))
-                    continue
+            for start, word, alt_word in self.find_words(s, ins):
                 if word in self.seen:
                     continue
 
@@ -799,6 +906,88 @@ class SpellTabHandler:
                 c.invalidateFocus()
                 c.bodyWantsFocus()
                 return None
+    #@+node:ekr.20261018163010.5: *5* SpellTabHandler.find_words
+    def find_words(self, s: str, ins: int = 0) -> Iterator[tuple[int, str, Optional[str]]]:
+        """
+        Yield (start, word, alt_word) for all words of s[ins:] to be checked.
+
+        start is the index of word in s[ins:]. alt_word is None or the
+        word to check if word is misspelled.
+        """
+        # Note: despite the tests below, finditer is a crucial speed boost.
+        for m in self.re_word.finditer(s[ins:]):
+            start, word = m.start(0), m.group(0)
+
+            # Strip leading and trailing underscores.
+            # sc.process_word throw ValueError otherwise.
+            while word and word.startswith(('_', '`')):
+                word = word[1:]
+                start += 1
+            if not word:
+                continue
+            while word and word.endswith(('_', '`')):
+                word = word[:-1]
+            if not word:
+                continue
+
+            # Make sure the spell checker won't throw ValueError.
+            if '_' in word:
+                # Only check up to those parts containing word characters.
+                parts = word.split('_')
+                parts = [z for z in parts if z]  # Handle '__'.
+                for i, part in enumerate(parts):
+                    if not self.re_part.match(part):
+                        word = '_'.join(parts[:i]).replace('__', '_')
+                        if not word:
+                            continue
+            else:
+                parts = [word]
+                if not self.re_part.match(word):
+                    continue
+
+            # Ignore the word if numbers precede or follow it.
+            # Seems difficult to do this in the regex itself.
+            k1 = ins + start - 1
+            if k1 >= 0 and s[k1].isdigit():
+                continue
+
+            # Special case: f-strings delimited by single quotes.
+            #               Don't bother testing for the obsolete u'xxx' syntax.
+            if word.startswith("f'"):
+                word = word[2:]
+                start += 2
+                if not word:
+                    continue
+
+            # Don't check short words.
+            if len(word) < 3:
+                continue
+
+            # Don't check words following `(http|https)://`.
+            i, j = g.getLine(s, ins + start)
+            line = s[i:j]
+            m = self.re_http.match(line)
+            if m and word in m.group(2):
+                continue
+
+            # Special case: \b, \n, and \t delimit words.
+            #               It's hard to test for this in the regex.
+            alt_word = None
+            if word.startswith(('b', 'n', 't')) and k1 >= 0 and s[k1] == '\\':
+                alt_word = word  # Search two ways.
+                word = word[1:]
+                start += 1
+                if not word:
+                    continue
+
+            # Last checks.
+            k2 = ins + start + len(word)
+            if k2 < len(s) and s[k2].isdigit():
+                continue
+            if word.startswith('_') or word.endswith('_'):
+                g.trace('Can not happen: underscore in word', repr(word))
+                continue
+            yield start, word, alt_word
     #@+node:ekr.20160415033936.1: *5* SpellTabHandler.showMisspelled
     def showMisspelled(self, p: Position) -> None:
         """Show the position p, contracting the tree as needed."""
@@ -4,9 +4,11 @@
 #@+node:ekr.20120219194520.10463: ** << leoApp imports >>
 from __future__ import annotations
 from collections.abc import Callable
+import ast
 import importlib
 import io
 import os
+import re
 import subprocess
 import string
 import sys
@@ -17,7 +19,7 @@ import zipfile
 import platform
 from leo.core import leoGlobals as g
 from leo.core import leoExternalFiles
-from leo.core.leoCache import GlobalCacher
+from leo.core.leoCache import ExternalFilesCache, GlobalCacher
 from leo.core.leoJupytext import JupytextManager
 from leo.core.leoQt import QCloseEvent
 
@@ -39,6 +41,7 @@ if TYPE_CHECKING:  # pragma: no cover
     from leo.core.leoNodes import NodeIndices, Position
     from leo.core.leoPlugins import LeoPluginsController
     from leo.core.leoSessions import SessionManager
+    from leo.core.leoWriteChecks import WriteChecker
     from leo.plugins.qt_events import LossageData
     from leo.plugins.qt_idle_time import IdleTime
     from leo.plugins.qt_text import QTextEditWrapper as Wrapper
@@ -103,6 +106,40 @@ class IdleTimeManager:
         if self.timer:
             self.timer.start()
     #@-others
+#@+node:ekr.20261018180420.1: ** class LazyEntry
+class LazyEntry:
+    """
+    A stand-in for the 'func' entry of an importer module's importer_dict
+    or the 'class' entry of a writer module's writer_dict.
+
+    LM.createAllImporterData registers stand-ins instead of importing all
+    importer and writer modules at startup. Calling a stand-in imports its
+    module and calls the real function or class.
+    """
+
+    def __init__(self, module_name: str, dict_name: str, key: str, name: str) -> None:
+        # Like the real function or class. at.atAutoCacheParams uses these names.
+        self.__module__ = module_name
+        self.__qualname__ = self.__name__ = name
+        self.dict_name = dict_name
+        self.key = key
+        self.value: Optional[Callable] = None
+
+    def __repr__(self) -> str:
+        return f"<LazyEntry {self.__module__}.{self.__qualname__}>"
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.load()(*args, **kwargs)
+
+    def load(self) -> Callable:
+        """Import the module if necessary. Return the real function or class."""
+        if self.value is None:
+            t1 = time.perf_counter()
+            m = importlib.import_module(self.__module__)
+            if g.app.loadManager:
+                g.app.loadManager.import_times[self.__module__] = time.perf_counter() - t1
+            self.value = getattr(m, self.dict_name)[self.key]
+        return self.value
 #@+node:ekr.20120209051836.10241: ** class LeoApp
 class LeoApp:
     """
@@ -150,7 +187,7 @@ class LeoApp:
         self.disableSave = False  # May be set by plugins.
         self.idle_timers: list[IdleTime] = []  # A list of IdleTime instances, so they persist.
         self.log_listener: Optional[Popen] = None  # The external process created by the 'listen-for-log' command.
-        self.positions = 0  # The number of positions generated.
+        self.positions = 0  # No longer used. Leo does not count positions.
         self.scanErrors = 0  # The number of errors seen by g.scanError.
         self.statsDict: dict[str, Value] = {}  # dict used by g.stat, g.clear_stats, g.print_stats.
         self.statsLockout = False  # A lockout to prevent unbound recursion while gathering stats.
@@ -202,6 +239,7 @@ class LeoApp:
         self.nodeIndices: NodeIndices = None
         self.pluginsController: LeoPluginsController = None
         self.sessionManager: SessionManager = None
+        self.writeChecker: WriteChecker = None  # Created by leoWriteChecks.get_checker.
 
         # Global status vars for the Commands class...
         self.commandName: str = None  # The name of the command being executed.
@@ -1579,9 +1617,11 @@ class LoadManager:
     """A class to manage loading .leo files, including configuration files."""
 
     __slots__ = (
+        'cached_settings_files',
         'files',
         'globalBindingsDict',
         'globalSettingsDict',
+        'import_times',
         'leo_settings_c',
         'leo_settings_path',
         'more_cmdline_files',
@@ -1589,11 +1629,14 @@ class LoadManager:
         'my_settings_path',
         'old_argv',
         'options',
+        'startup_times',
         'theme_c',
         'theme_path',
     )
 
     LM_NOTHEME_FLAG = 'lm_theme_use_none'
+    # Change this to invalidate all entries of the settings cache.
+    settings_cache_version = 1
 
     #@+others
     #@+node:ekr.20120214060149.15851: *3*  LM.ctor
@@ -1627,6 +1670,16 @@ class LoadManager:
         self.my_settings_path: str = None
         self.theme_c: Cmdr = None  # #1374.
         self.theme_path: str = None
+
+        # Startup statistics, reported by --trace=startup...
+
+        # The paths of the settings files read from the settings cache.
+        self.cached_settings_files: list[str] = []
+        # Keys are the names of the phases of lm.doPrePluginsInit, values are times.
+        self.startup_times: dict[str, float] = {}
+        # Keys are the names of imported plugins, importers and writers,
+        # values are the times spent importing them. Reported by --trace=imports.
+        self.import_times: dict[str, float] = {}
     #@+node:ekr.20120211121736.10812: *3* LM.Directory & file utils
     #@+node:ekr.20120219154958.10481: *4* LM.completeFileName
     def completeFileName(self, fileName: str) -> str:
@@ -1956,6 +2009,23 @@ class LoadManager:
         """
         lm = self
         shortcuts_d2, settings_d2 = lm.createSettingsDicts(c, localFlag)
+        return lm.mergeSettingsDicts(c, settings_d, bindings_d, shortcuts_d2, settings_d2, localFlag)
+    #@+node:ekr.20261018173015.1: *4* LM.mergeSettingsDicts
+    def mergeSettingsDicts(self,
+        c: Optional[Cmdr],
+        settings_d: g.SettingsDict,
+        bindings_d: g.SettingsDict,
+        shortcuts_d2: Optional[g.SettingsDict],
+        settings_d2: Optional[g.SettingsDict],
+        localFlag: bool,
+    ) -> tuple[g.SettingsDict, g.SettingsDict]:
+        """
+        Merge settings_d2 and shortcuts_d2, the raw dicts of c's outline,
+        into *new copies of* settings_d and bindings_d.
+
+        c is None if the raw dicts came from the settings cache.
+        """
+        lm = self
         if not bindings_d:  # #1766: unit tests.
             settings_d, bindings_d = lm.createDefaultSettingsDicts()
         if settings_d2:
@@ -2173,12 +2243,17 @@ class LoadManager:
             # Never put a return in a finally clause.
             g.app.unlockLog()
             g.app.gui = oldGui
-    #@+node:ekr.20120213081706.10382: *4* LM.readGlobalSettingsFiles
-    def readGlobalSettingsFiles(self) -> None:
+    #@+node:ekr.20120213081706.10382: *4* LM.readGlobalSettingsFiles & helpers
+    def readGlobalSettingsFiles(self, use_cache: bool = False) -> None:
         """
         Read leoSettings.leo and myLeoSettings.leo using a null gui.
 
         New in Leo 6.1: this sets ivars for the ActiveSettingsOutline class.
+
+        use_cache: True if the raw dicts of unchanged settings files may come
+        from the settings cache. Reading a file from the cache sets the
+        corresponding ivar (lm.leo_settings_c, lm.my_settings_c or lm.theme_c)
+        to None.
         """
         trace = 'themes' in g.app.debug
         lm = self
@@ -2186,18 +2261,23 @@ class LoadManager:
         # Open the standard settings files with a nullGui.
         # Important: their commanders do not exist outside this method!
         old_commanders = g.app.commanders()
+        lm.cached_settings_files = []
         lm.leo_settings_path = lm.computeLeoSettingsPath()
         lm.my_settings_path = lm.computeMyLeoSettingsPath()
-        lm.leo_settings_c = lm.openSettingsFile(self.leo_settings_path)
-        lm.my_settings_c = lm.openSettingsFile(self.my_settings_path)
+        lm.leo_settings_c, leo_settings_dicts = lm.readSettingsFile(lm.leo_settings_path, use_cache)
+        lm.my_settings_c, my_settings_dicts = lm.readSettingsFile(lm.my_settings_path, use_cache)
         commanders = [lm.leo_settings_c, lm.my_settings_c]
         commanders = [z for z in commanders if z]
         settings_d, bindings_d = lm.createDefaultSettingsDicts()
-        for c in commanders:
-            # Merge the settings dicts from c's outline into
-            # *new copies of* settings_d and bindings_d.
-            settings_d, bindings_d = lm.computeLocalSettings(
-                c, settings_d, bindings_d, localFlag=False)
+        for c, dicts in (
+            (lm.leo_settings_c, leo_settings_dicts),
+            (lm.my_settings_c, my_settings_dicts),
+        ):
+            if dicts:
+                # Merge the settings dicts from the file into
+                # *new copies of* settings_d and bindings_d.
+                settings_d, bindings_d = lm.mergeSettingsDicts(
+                    c, settings_d, bindings_d, *dicts, localFlag=False)
         # Adjust the name.
         bindings_d.setName('lm.globalBindingsDict')
         lm.globalSettingsDict = settings_d
@@ -2206,11 +2286,11 @@ class LoadManager:
         # This must be done *after* reading myLeoSettings.leo.
         lm.theme_path = lm.computeThemeFilePath()
         if lm.theme_path and lm.theme_path != LoadManager.LM_NOTHEME_FLAG:
-            lm.theme_c = lm.openSettingsFile(lm.theme_path)
-            if lm.theme_c:
-                # Merge theme_c's settings into globalSettingsDict.
-                settings_d, junk_shortcuts_d = lm.computeLocalSettings(
-                    lm.theme_c, settings_d, bindings_d, localFlag=False)
+            lm.theme_c, theme_dicts = lm.readSettingsFile(lm.theme_path, use_cache)
+            if theme_dicts:
+                # Merge the theme's settings into globalSettingsDict.
+                settings_d, junk_shortcuts_d = lm.mergeSettingsDicts(
+                    lm.theme_c, settings_d, bindings_d, *theme_dicts, localFlag=False)
                 lm.globalSettingsDict = settings_d
                 # Set global var used by the StyleSheetManager.
                 g.app.theme_directory = g.os_path_dirname(lm.theme_path)
@@ -2221,6 +2301,141 @@ class LoadManager:
         for c in commanders:
             if c not in old_commanders:
                 g.app.forgetOpenFile(c.fileName())
+    #@+node:ekr.20261018173015.2: *5* LM.readSettingsFile
+    def readSettingsFile(self,
+        path: Optional[str],
+        use_cache: bool,
+    ) -> tuple[Optional[Cmdr], Optional[tuple[g.SettingsDict, g.SettingsDict]]]:
+        """
+        Read the settings file at the given path with a null gui.
+
+        Return (c, (shortcuts_d, settings_d)), where c is the file's commander
+        and the dicts are the *raw* dicts of the file's @settings tree.
+
+        c is None if the dicts came from the settings cache.
+        Return (None, None) if the file does not exist.
+        """
+        lm = self
+        cache = lm.settingsCache() if use_cache and path and os.path.exists(path) else None
+        if cache:
+            params = lm.settingsCacheParams()
+            data = cache.get('@settings', path, params)
+            # The cached dicts depend on the @ifenv nodes in the file.
+            if data and all(os.getenv(z) == data['environ'][z] for z in data['environ']):
+                if 'startup' in g.app.debug:
+                    print(f"reading cached settings for {os.path.normpath(path)}")
+                lm.applyCachedSettings(data)
+                lm.cached_settings_files.append(path)
+                return None, (data['shortcuts'], data['settings'])
+            # Compute the fingerprint *before* reading the file.
+            fingerprint = cache.fingerprint(path)
+        c = lm.openSettingsFile(path)
+        if not c:
+            return None, None
+        shortcuts_d, settings_d, data = lm.parseSettingsFile(c)
+        if cache and data:
+            cache.put('@settings', path, params, fingerprint, data)
+            cache.flush()
+        return c, (shortcuts_d, settings_d)
+    #@+node:ekr.20261018173015.3: *5* LM.settingsCache & settingsCacheParams
+    def settingsCache(self) -> Optional[ExternalFilesCache]:
+        """Return the settings cache, or None if the cache is disabled."""
+        cache = getattr(g.app.global_cacher, 'files_cache', None)
+        # --trace-binding requires the settings files' commanders.
+        if not cache or g.app.trace_binding:
+            return None
+        return cache
+
+    def settingsCacheParams(self) -> str:
+        """
+        Return a string describing everything, except the contents of a
+        settings file, that affects the result of parsing the file.
+        """
+        from leo.core import leoVersion
+        return repr((
+            leoVersion.version,
+            self.settings_cache_version,
+            sys.platform,  # For @ifplatform.
+            self.computeMachineName(),  # For @ifhostname.
+        ))
+    #@+node:ekr.20261018173015.4: *5* LM.parseSettingsFile
+    def parseSettingsFile(self, c: Cmdr) -> tuple[g.SettingsDict, g.SettingsDict, Optional[dict[str, Any]]]:
+        """
+        Parse the @settings tree of c, a global settings file.
+
+        Return (shortcuts_d, settings_d, data), where the dicts are the *raw*
+        dicts of the @settings tree and data is the settings cache entry for
+        the file.
+
+        Besides creating the dicts, parsing changes ivars of g.app.config.
+        data records those changes so that lm.applyCachedSettings can redo
+        them. data is None if the changes can not be cached.
+        """
+        from leo.core import leoConfig
+        config = g.app.config
+        # Parsing @menuat, @buttons and @commands changes lists in place.
+        n_buttons = len(config.atCommonButtonsList)
+        n_commands = len(config.atCommonCommandsList)
+        menus = config.menusList
+        menus_s = repr(menus)
+        old_modes = dict(config.modeCommandsDict)
+        old_popups = dict(getattr(config, 'context_menus', {}))
+        # Parsing sets these ivars, maybe to their previous values.
+        unset = object()
+        old_ivars = {
+            z: getattr(config, z)
+            for z in ('enabledPluginsFileName', 'enabledPluginsString', 'menusFileName')
+        }
+        for ivar in old_ivars:
+            setattr(config, ivar, unset)
+        try:
+            parser = leoConfig.SettingsTreeParser(c, localFlag=False)
+            shortcuts_d, settings_d = parser.traverse()
+        finally:
+            ivars: dict[str, Any] = {}
+            for ivar, old_value in old_ivars.items():
+                value = getattr(config, ivar)
+                if value is unset:
+                    setattr(config, ivar, old_value)
+                else:
+                    ivars[ivar] = value
+        if (
+            # The @buttons and @commands nodes contain positions.
+            len(config.atCommonButtonsList) > n_buttons
+            or len(config.atCommonCommandsList) > n_commands
+            # An @menuat node patched the previous menus.
+            or config.menusList is menus and repr(menus) != menus_s
+        ):
+            return shortcuts_d, settings_d, None
+        if config.menusList is not menus:
+            ivars['menusList'] = config.menusList
+        popups = getattr(config, 'context_menus', {})
+        data = {
+            'shortcuts': shortcuts_d,
+            'settings': settings_d,
+            'environ': parser.environ,
+            'ivars': ivars,
+            'modes': {
+                key: value for key, value in config.modeCommandsDict.items()
+                if old_modes.get(key) is not value
+            },
+            'popups': {
+                key: value for key, value in popups.items()
+                if old_popups.get(key) is not value
+            },
+        }
+        return shortcuts_d, settings_d, data
+    #@+node:ekr.20261018173015.5: *5* LM.applyCachedSettings
+    def applyCachedSettings(self, data: dict[str, Any]) -> None:
+        """Redo the changes that parsing a cached settings file made to g.app.config."""
+        config = g.app.config
+        for ivar, value in data['ivars'].items():
+            setattr(config, ivar, value)
+        config.modeCommandsDict.update(data['modes'])
+        if data['popups']:
+            if not hasattr(config, 'context_menus'):
+                config.context_menus = {}
+            config.context_menus.update(data['popups'])
     #@+node:ekr.20120214165710.10838: *4* LM.traceSettingsDict
     def traceSettingsDict(self, d: dict[str, str], verbose: bool = False) -> None:
         if verbose:
@@ -2296,11 +2511,17 @@ class LoadManager:
             t5 = time.process_time()
             print('')
             g.es_print(f"settings:{t2 - t1:5.2f} sec")
+            for phase, t in lm.startup_times.items():
+                g.es_print(f"  {phase:>8}:{t:5.2f} sec")
+            if lm.cached_settings_files:
+                g.es_print(f"  cached settings files: {len(lm.cached_settings_files)}")
             g.es_print(f" plugins:{t3 - t2:5.2f} sec")
             g.es_print(f"   files:{t4 - t3:5.2f} sec")
             g.es_print(f"  frames:{t5 - t4:5.2f} sec")
             g.es_print(f"   total:{t5 - t1:5.2f} sec")
             print('')
+        if 'imports' in g.app.debug:
+            lm.printImportTimes()
         # -- quit
         if g.app.quit_after_load:
             if 'shutdown' in g.app.debug or 'startup' in g.app.debug:
@@ -2316,6 +2537,15 @@ class LoadManager:
         g.app.gui.runMainLoop()
         # For scripts, the gui is a nullGui.
         # and the gui.setScript has already been called.
+    #@+node:ekr.20261018180420.4: *4* LM.printImportTimes
+    def printImportTimes(self) -> None:
+        """Print the time spent importing each plugin, importer and writer, slowest first."""
+        d = self.import_times
+        print('')
+        for name, t in sorted(d.items(), key=lambda z: z[1], reverse=True):
+            g.es_print(f"{t:6.3f} sec {name}")
+        g.es_print(f"{sum(d.values()):6.3f} sec total for {len(d)} modules")
+        print('')
     #@+node:ekr.20150225133846.7: *4* LM.doDiff
     def doDiff(self) -> None:
         """Support --diff option after loading Leo."""
@@ -2433,6 +2663,7 @@ class LoadManager:
     def doPrePluginsInit(self, fileName: str, pymacs: bool) -> None:
         """ Scan options, set directories and read settings."""
         lm = self
+        t1 = time.process_time()
         lm.computeStandardDirectories()
         # Scan the options as early as possible.
         lm.options = options = lm.scanOptions(fileName, pymacs)  # also sets lm.files.
@@ -2445,6 +2676,7 @@ class LoadManager:
         g.app.setGlobalDb()
         if verbose:
             lm.reportDirectories()
+        t2 = time.process_time()
         # Read settings *after* setting g.app.config and *before* opening plugins.
         # This means if-gui has effect only in per-file settings.
         if g.app.quit_after_load:
@@ -2453,12 +2685,15 @@ class LoadManager:
             # Read only standard settings files, using a null gui.
             # uses lm.files[0] to compute the local directory
             # that might contain myLeoSettings.leo.
-            lm.readGlobalSettingsFiles()
+            lm.readGlobalSettingsFiles(use_cache=True)
             # Read the recent files file.
             localConfigFile = lm.files[0] if lm.files else None
             g.app.recentFilesManager.readRecentFiles(localConfigFile)
+        t3 = time.process_time()
         # Create the gui after reading options and settings.
         lm.createGui(pymacs)
+        t4 = time.process_time()
+        lm.startup_times = {'options': t2 - t1, 'settings': t3 - t2, 'gui': t4 - t3}
     #@+node:ekr.20170302093006.1: *5* LM.createAllImporterData & helpers
     def createAllImporterData(self) -> None:
         """
@@ -2471,7 +2706,13 @@ class LoadManager:
         self.createImporterData()  # Was a LeoImportCommands method.
     #@+node:ekr.20140724064952.18037: *6* LM.createImporterData & helper
     def createImporterData(self) -> None:
-        """Create the data structures describing importer plugins."""
+        """
+        Create the data structures describing importer plugins.
+
+        This method imports an importer module only if LM.read_plugin_dict
+        can not read the module's importer_dict. Otherwise, Leo imports the
+        module when it first uses the importer.
+        """
         # Allow plugins to be defined in ~/.leo/plugins.
         for pattern in (
             # ~/.leo/plugins.
@@ -2485,8 +2726,20 @@ class LoadManager:
                 if sfn.endswith('.py') and sfn != '__init__.py':
                     try:
                         module_name = sfn[:-3]
+                        full_name = f"leo.plugins.importers.{module_name}"
+                        importer_d = self.read_plugin_dict(filename, 'importer_dict', 'func')
+                        if importer_d is not None:
+                            if importer_d:
+                                importer_d['func'] = LazyEntry(
+                                    full_name, 'importer_dict', 'func', importer_d['func'])
+                                self.register_importer_dict(importer_d)
+                            elif sfn != 'base_importer.py':  # A base class, not a real plugin.
+                                g.warning(f"leo/plugins/importers/{sfn} has no importer_dict")
+                            continue
                         # Important: use importlib to give imported modules their fully qualified names.
-                        m = importlib.import_module(f"leo.plugins.importers.{module_name}")
+                        t1 = time.perf_counter()
+                        m = importlib.import_module(full_name)
+                        self.import_times[full_name] = time.perf_counter() - t1
                         self.parse_importer_dict(sfn, m)
                         # print('createImporterData', m.__name__)
                     except Exception:
@@ -2500,30 +2753,81 @@ class LoadManager:
         """
         importer_d = getattr(m, 'importer_dict', None)
         if importer_d:
-            at_auto = importer_d.get('@auto', [])
-            scanner_func = importer_d.get('func', None)
-            # scanner_name = scanner_class.__name__
-            extensions = importer_d.get('extensions', [])
-            if at_auto:
-                # Make entries for each @auto type.
-                d = g.app.atAutoDict
-                for s in at_auto:
-                    d[s] = scanner_func
-                    g.app.atAutoDict[s] = scanner_func
-                    g.app.atAutoNames.add(s)
-            if extensions:
-                # Make entries for each extension.
-                d = g.app.classDispatchDict
-                for ext in extensions:
-                    d[ext] = scanner_func  # importer_d.get('func')#scanner_class
+            self.register_importer_dict(importer_d)
         elif sfn not in (
             # This is a base class, not a real plugin.
             'base_importer.py',
         ):
             g.warning(f"leo/plugins/importers/{sfn} has no importer_dict")
-    #@+node:ekr.20140728040812.17990: *6* LM.createWritersData & helper
+    #@+node:ekr.20261018180420.3: *7* LM.register_importer_dict
+    def register_importer_dict(self, importer_d: dict[str, Any]) -> None:
+        """
+        Set entries in g.app.classDispatchDict, g.app.atAutoDict and
+        g.app.atAutoNames using entries in importer_d, an importer_dict.
+        """
+        at_auto = importer_d.get('@auto', [])
+        scanner_func = importer_d.get('func', None)
+        extensions = importer_d.get('extensions', [])
+        if at_auto:
+            # Make entries for each @auto type.
+            d = g.app.atAutoDict
+            for s in at_auto:
+                d[s] = scanner_func
+                g.app.atAutoNames.add(s)
+        if extensions:
+            # Make entries for each extension.
+            d = g.app.classDispatchDict
+            for ext in extensions:
+                d[ext] = scanner_func
+    #@+node:ekr.20261018180420.2: *6* LM.read_plugin_dict
+    def read_plugin_dict(self, path: str, dict_name: str, key: str) -> Optional[dict[str, Any]]:
+        """
+        Read the importer_dict or writer_dict of the module at the given path
+        without importing the module.
+
+        dict_name: 'importer_dict' or 'writer_dict'.
+        key:       'func' or 'class'.
+
+        Return a copy of the dict in which the value of the key is the *name*
+        of the function or class. Return {} if the module never mentions the
+        dict. Return None if the module does not define the dict as a dict
+        literal whose other values are literals.
+        """
+        pattern = rf"^{dict_name}\s*=\s*\{{.*?^\}}"
+        try:
+            with open(path, encoding='utf-8') as f:
+                s = f.read()
+            if dict_name not in s:
+                return {}
+            m = re.search(pattern, s, re.DOTALL | re.MULTILINE)
+            node = ast.parse(m.group(0)).body[0] if m else None
+        except (OSError, UnicodeDecodeError, SyntaxError):
+            return None
+        if not isinstance(node, ast.Assign) or not isinstance(node.value, ast.Dict):
+            return None
+        d: dict[str, Any] = {}
+        for key_node, value_node in zip(node.value.keys, node.value.values):
+            if not isinstance(key_node, ast.Constant) or not isinstance(key_node.value, str):
+                return None
+            if key_node.value == key:
+                # Only the function or class may be a name.
+                if not isinstance(value_node, ast.Name):
+                    return None
+                d[key] = value_node.id
+            else:
+                try:
+                    d[key_node.value] = ast.literal_eval(value_node)
+                except ValueError:
+                    return None
+        return d if key in d else None
+    #@+node:ekr.20140728040812.17990: *6* LM.createWritersData & helpers
     def createWritersData(self) -> None:
-        """Create the data structures describing writer plugins."""
+        """
+        Create the data structures describing writer plugins.
+
+        Like LM.createImporterData, this method imports a writer module
+        only if LM.read_plugin_dict can not read the module's writer_dict.
+        """
         # Do *not* remove this trace.
         trace = False and 'createWritersData' not in g.app.debug_dict
         if trace:
@@ -2541,8 +2845,20 @@ class LoadManager:
                 sfn = g.shortFileName(filename)
                 if sfn.endswith('.py') and sfn != '__init__.py':
                     try:
+                        full_name = f"leo.plugins.writers.{sfn[:-3]}"
+                        writer_d = self.read_plugin_dict(filename, 'writer_dict', 'class')
+                        if writer_d is not None:
+                            if writer_d:
+                                writer_d['class'] = LazyEntry(
+                                    full_name, 'writer_dict', 'class', writer_d['class'])
+                                self.register_writer_dict(sfn, writer_d)
+                            elif sfn != 'basewriter.py':
+                                g.warning(f"leo/plugins/writers/{sfn} has no writer_dict")
+                            continue
                         # Important: use importlib to give imported modules their fully qualified names.
-                        m = importlib.import_module(f"leo.plugins.writers.{sfn[:-3]}")
+                        t1 = time.perf_counter()
+                        m = importlib.import_module(full_name)
+                        self.import_times[full_name] = time.perf_counter() - t1
                         self.parse_writer_dict(sfn, m)
                     except Exception:
                         g.es_exception()
@@ -2560,32 +2876,37 @@ class LoadManager:
         """
         writer_d = getattr(m, 'writer_dict', None)
         if writer_d:
-            at_auto = writer_d.get('@auto', [])
-            scanner_class = writer_d.get('class', None)
-            extensions = writer_d.get('extensions', [])
-            if at_auto:
-                # Make entries for each @auto type.
-                d = g.app.atAutoWritersDict
-                for s in at_auto:
-                    aClass = d.get(s)
-                    if aClass and aClass != scanner_class:
-                        g.trace(
-                            f"{sfn}: duplicate {s} class {aClass.__name__} "
-                            f"in {m.__file__}:")
-                    else:
-                        d[s] = scanner_class
-                        g.app.atAutoNames.add(s)
-            if extensions:
-                # Make entries for each extension.
-                d = g.app.writersDispatchDict
-                for ext in extensions:
-                    aClass = d.get(ext)
-                    if aClass and aClass != scanner_class:
-                        g.trace(f"{sfn}: duplicate {ext} class", aClass, scanner_class)
-                    else:
-                        d[ext] = scanner_class
+            self.register_writer_dict(sfn, writer_d)
         elif sfn not in ('basewriter.py',):
             g.warning(f"leo/plugins/writers/{sfn} has no writer_dict")
+    #@+node:ekr.20261018180420.5: *7* LM.register_writer_dict
+    def register_writer_dict(self, sfn: str, writer_d: dict[str, Any]) -> None:
+        """
+        Set entries in g.app.writersDispatchDict and g.app.atAutoWritersDict
+        using entries in writer_d, the writer_dict of sfn.
+        """
+        at_auto = writer_d.get('@auto', [])
+        scanner_class = writer_d.get('class', None)
+        extensions = writer_d.get('extensions', [])
+        if at_auto:
+            # Make entries for each @auto type.
+            d = g.app.atAutoWritersDict
+            for s in at_auto:
+                aClass = d.get(s)
+                if aClass and aClass != scanner_class:
+                    g.trace(f"{sfn}: duplicate {s} class {aClass.__name__}")
+                else:
+                    d[s] = scanner_class
+                    g.app.atAutoNames.add(s)
+        if extensions:
+            # Make entries for each extension.
+            d = g.app.writersDispatchDict
+            for ext in extensions:
+                aClass = d.get(ext)
+                if aClass and aClass != scanner_class:
+                    g.trace(f"{sfn}: duplicate {ext} class", aClass, scanner_class)
+                else:
+                    d[ext] = scanner_class
     #@+node:ekr.20120219154958.10478: *5* LM.createGui
     def createGui(self, pymacs: bool) -> None:
         lm = self
@@ -2721,8 +3042,9 @@ class LoadManager:
 
                 A comma-separated list. Valid values are:
                 abbrev, beauty, cache, coloring, drawing, events, focus,
-                git, gnx, keys, layouts, plugins, save, select, sections,
-                shutdown, size, speed, startup, themes, undo, verbose, zoom.
+                git, gnx, imports, keys, layouts, plugins, save, select,
+                sections, shutdown, size, speed, startup, themes, undo,
+                verbose, zoom.
 
           --trace-binding=KEY   trace commands bound to a key
           --trace-setting=NAME  trace where named setting is set
@@ -2852,8 +3174,9 @@ class LoadManager:
             # --trace=option.
             valid = [
                 'abbrev', 'beauty', 'cache', 'coloring', 'drawing', 'events', 'focus',
-                'git', 'gnx', 'keys', 'layouts', 'plugins', 'save', 'select', 'sections',
-                'shutdown', 'size', 'speed', 'startup', 'themes', 'undo', 'verbose', 'zoom',
+                'git', 'gnx', 'imports', 'keys', 'layouts', 'plugins', 'save', 'select',
+                'sections', 'shutdown', 'size', 'speed', 'startup', 'themes', 'undo',
+                'verbose', 'zoom',
             ]
             m = utils.find_complex_option(r'--trace=([\w\,]+)')
             if not m:
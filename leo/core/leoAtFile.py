@@ -5,7 +5,9 @@
 #@+node:ekr.20041005105605.2: ** << leoAtFile imports & annotations >>
 from __future__ import annotations
 from collections.abc import Callable
+import concurrent.futures
 import difflib
+import hashlib
 import io
 import os
 import re
@@ -16,13 +18,17 @@ import tokenize
 from typing import Any, Optional, TYPE_CHECKING
 from leo.core import leoGlobals as g
 from leo.core import leoNodes
+from leo.core import leoVersion
 
 if TYPE_CHECKING:  # pragma: no cover
+    from leo.core.leoCache import ExternalFilesCache
     from leo.core.leoCommands import Commands as Cmdr
     from leo.core.leoGui import LeoKeyEvent
     from leo.core.leoNodes import Position, VNode
     Args = Any
     Value = Any
+    # (nodes, bodies, complete). See fast_at.scan_lines.
+    ScanRecords = tuple[list[tuple[str, str, int]], dict[str, str], bool]
 #@-<< leoAtFile imports & annotations >>
 
 #@+others
@@ -54,6 +60,8 @@ class AtFile:
         'section_delim1', 'section_delim2',
         'outputFile', 'outputList',
         'targetFileName', 'unchangedFiles',  # For messages.
+        'comparedFiles', 'skippedFiles', 'writtenFiles',  # For messages.
+        'write_fingerprints',
         # User settings.
         'at_auto_encoding', 'encoding', 'explicitLineEnding',
         'force_newlines_in_at_nosent_bodies',
@@ -116,6 +124,12 @@ class AtFile:
         self.section_delim2 = '>>'
         self.targetFileName: str = ''
         self.unchangedFiles = 0
+        self.comparedFiles = 0  # Files read back and compared with the new contents.
+        self.skippedFiles = 0  # Unchanged files that were not read back.
+        self.writtenFiles = 0  # Created or changed files.
+        # Keys are full paths. Values are (mtime_ns, size, contents hash, tree hash)
+        # of the contents last written from (or found unchanged for) an @<file> tree.
+        self.write_fingerprints: dict[str, tuple[int, int, str, str]] = {}
         # User settings.
         self.at_auto_encoding = 'utf-8'
         self.encoding = 'utf-8'
@@ -172,6 +186,7 @@ class AtFile:
         at.section_delim2 = '>>'
         at.targetFileName = None
         # at.unchangedFiles = 0  # Only at.writeAll should init this ivar.
+        # at.comparedFiles, at.skippedFiles, at.writtenFiles: ditto.
         # User settings.
         at.at_auto_encoding = c.config.default_at_auto_file_encoding or 'utf-8'
         at.encoding = c.config.default_derived_file_encoding or 'utf-8'
@@ -382,6 +397,15 @@ class AtFile:
             at.error("Missing file name. Restoring @file tree from .leo file.")
             return False
 
+        # Use the cached node records if the file has not changed.
+        cache = None if fromString else at.externalFilesCache()
+        if cache:
+            params = at.fileCacheParams(root)
+            data = cache.get('@file', fileName, params)
+            if data and at.readScannedFile(root, data):
+                return True
+            fingerprint = cache.fingerprint(fileName)
+
         # #760531: always mark the root as read, even if there was an error.
         # #889175: Remember the full fileName.
         at.rememberReadPath(c.fullPath(root), root)
@@ -404,7 +428,16 @@ class AtFile:
         root.clearVisitedInTree()
         gnx2vnode = c.fileCommands.gnxDict
         contents = fromString or file_s
-        FastAtRead(c, gnx2vnode).read_into_root(contents, fileName, root)
+        fast_at = FastAtRead(c, gnx2vnode)
+        root_gnx = root.gnx  # fast_at.link_records may change root.gnx.
+        records = fast_at.scan(contents, fileName, root_gnx)
+        if records:
+            root.v._deleteAllChildren()
+            fast_at.link_records(records, root)
+            if cache:
+                cache.put('@file', fileName, params, fingerprint, (root_gnx, at.encoding, records))
+        else:  # pragma: no cover
+            g.trace(f"Invalid external file: {fileName}")
         root.clearDirty()
         g.doHook('after-reading-external-file', c=c, p=root)
         return True
@@ -432,14 +465,26 @@ class AtFile:
         t1 = time.time()
         c.init_error_dialogs()
         files = at.findFilesToRead(root, all=True)
-        for p in files:
-            at.readFileAtPosition(p)
+        workers = c.config.getInt('read-external-files-workers') or 0
+        if workers > 1 and len(files) > 1:
+            at.readFilesInParallel(files, workers)
+        else:
+            for p in files:
+                at.readFileAtPosition(p)
         for p in files:
             p.v.clearDirty()
         if not g.unitTesting and files:  # pragma: no cover
             t2 = time.time()
             g.es(f"read {len(files)} files in {t2 - t1:2.2f} seconds")
 
+        # Write all changes to the external files cache in one transaction,
+        # then limit the size of the cache.
+        cache = at.externalFilesCache()
+        if cache:
+            cache.flush()
+            megabytes = c.config.getInt('external-files-cache-size') or 64
+            cache.evict(megabytes * 1024 * 1024)
+
         # Carefully set c.changed.
         c.changed = old_changed or bool(at.changed_roots)
         update_p = at.clone_all_changed_vnodes()
@@ -508,6 +553,49 @@ class AtFile:
         c.contractAllHeadlinesCommand()
         update_p.expand()
         return update_p
+    #@+node:ekr.20261018090310.10: *6* at.externalFilesCache & at.fileCacheParams
+    def externalFilesCache(self) -> Optional[ExternalFilesCache]:
+        """Return the external files cache, or None if caching is disabled."""
+        cache = getattr(g.app.global_cacher, 'files_cache', None)
+        if not cache or not self.c.config.getBool('cache-external-files', default=False):
+            return None
+        return cache
+
+    def fileCacheParams(self, root: Position) -> str:
+        """
+        Return a string describing everything, except the contents of root's
+        external file, that affects the result of reading the file.
+
+        at.atAutoCacheParams adds the params that affect only @auto trees.
+        """
+        c = self.c
+        return repr((
+            leoVersion.version,
+            root.h,
+            root.gnx,
+            c.getEncoding(root),
+            c.getLanguage(root),
+            c.getDelims(root),
+            c.getTabWidth(root),
+            c.config.default_derived_file_encoding,
+        ))
+    #@+node:ekr.20261018130655.2: *6* at.atAutoCacheParams
+    def atAutoCacheParams(self, root: Position) -> str:
+        """
+        Return a string describing everything, except the contents of root's
+        external file, that affects the result of importing an @auto file.
+        """
+        c, ic = self.c, self.c.importCommands
+        fileName = c.fullPath(root)
+        ext = g.os_path_splitext(fileName)[1].lower()
+        # The importer that ic.createOutline would use.
+        func = ic.dispatch(ext, root)
+        importer = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', func)}" if func else None
+        return repr((
+            self.fileCacheParams(root),
+            importer,
+            c.config.getBool('suppress-import-parsing', default=False),
+        ))
     #@+node:ekr.20190108054317.1: *6* at.findFilesToRead
     def findFilesToRead(self, root: Position, all: bool) -> list[Position]:  # pragma: no cover
 
@@ -547,6 +635,85 @@ class AtFile:
             else:
                 p.moveToThreadNext()
         return files
+    #@+node:ekr.20261018061512.3: *6* at.readFilesInParallel & helper
+    def readFilesInParallel(self, files: list[Position], workers: int) -> None:
+        """
+        Read all @<file> nodes in files, scanning @file nodes in a pool of
+        worker processes.
+
+        The workers read, decode and scan external files into picklable node
+        records. The main process links the records into the outline in the
+        order of files, so clones and gnxs are resolved exactly as in the
+        serial code.
+
+        Files found in the external files cache are not scanned.
+        """
+        at, c = self, self.c
+        cache = at.externalFilesCache()
+        encoding = c.config.default_derived_file_encoding or 'utf-8'
+        executor: concurrent.futures.Executor
+        try:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        except (NotImplementedError, OSError):  # pragma: no cover
+            # This platform does not support multiprocessing.
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        with executor:
+            cached: dict[int, tuple[str, str, ScanRecords]] = {}
+            futures: dict[int, concurrent.futures.Future] = {}
+            params: dict[int, str] = {}
+            for i, p in enumerate(files):
+                if p.isAtFileNode() or p.isAtThinFileNode():
+                    fileName = c.fullPath(p)
+                    if not fileName:
+                        continue
+                    if cache:
+                        params[i] = at.fileCacheParams(p)
+                        data = cache.get('@file', fileName, params[i])
+                        if data:
+                            cached[i] = data
+                            continue
+                    futures[i] = executor.submit(
+                        scan_external_file, fileName, p.gnx, encoding, bool(cache))
+            for i, p in enumerate(files):
+                fingerprint, data = None, None
+                if i in cached:
+                    data = cached[i]
+                elif i in futures:
+                    try:
+                        fingerprint, data = futures[i].result()
+                    except Exception:  # A broken pool.
+                        pass
+                # Use the serial code for all other files and to report errors.
+                if not data or not at.readScannedFile(p, data):
+                    at.readFileAtPosition(p)
+                elif cache and fingerprint:
+                    cache.put('@file', c.fullPath(p), params[i], fingerprint, data)
+    #@+node:ekr.20261018061512.4: *7* at.readScannedFile
+    def readScannedFile(self, root: Position, data: tuple[str, str, ScanRecords]) -> bool:
+        """
+        Link the node records created by scan_external_file or found in the
+        external files cache into root's tree.
+
+        This is the equivalent of at.read for files that have already been
+        scanned. Return False if the records are stale.
+        """
+        at, c = self, self.c
+        root_gnx, encoding, records = data
+        fileName = c.fullPath(root)
+        if root.gnx != root_gnx:  # pragma: no cover (defensive)
+            return False
+        at.rememberReadPath(fileName, root)
+        at.initReadIvars(root, fileName)
+        at.encoding = encoding
+        at.setPathUa(root, fileName)
+        at.warnOnReadOnlyFile(fileName)
+        c.setFileTimeStamp(fileName)
+        root.clearVisitedInTree()
+        root.v._deleteAllChildren()
+        FastAtRead(c, c.fileCommands.gnxDict).link_records(records, root)
+        root.clearDirty()
+        g.doHook('after-reading-external-file', c=c, p=root)
+        return True
     #@+node:ekr.20190108054803.1: *6* at.readFileAtPosition
     def readFileAtPosition(self, p: Position) -> None:  # pragma: no cover
         """
@@ -656,11 +823,24 @@ class AtFile:
         # #889175: Remember the full fileName.
         at.rememberReadPath(fileName, p)
         old_p = p.copy()
+        cache = None if g.is_binary_external_file(fileName) else at.externalFilesCache()
         try:
             at.initReadIvars(p, fileName)
             p.v.b = ''  # Required for @auto API checks.
             p.v._deleteAllChildren()
-            p = ic.createOutline(parent=p.copy(), treeType='@auto')
+            if cache:
+                params = at.atAutoCacheParams(p)
+                data = cache.get('@auto', fileName, params)
+                if data:
+                    at.restoreAtAutoTree(p, data)
+                else:
+                    fingerprint = cache.fingerprint(fileName)
+                    errors = ic.errors
+                    p = ic.createOutline(parent=p.copy(), treeType='@auto')
+                    if p and ic.errors == errors:
+                        cache.put('@auto', fileName, params, fingerprint, at.archiveAtAutoTree(p))
+            else:
+                p = ic.createOutline(parent=p.copy(), treeType='@auto')
             # Do *not* call c.selectPosition(p) here.
             # That would improperly expand nodes.
         except Exception:
@@ -679,6 +859,36 @@ class AtFile:
             g.doHook('after-auto', c=c, p=p)
             g.doHook('after-reading-external-file', c=c, p=p)
         return p  # For #451: return p.
+    #@+node:ekr.20261018090310.8: *6* at.archiveAtAutoTree
+    def archiveAtAutoTree(self, root: Position) -> tuple[str, list[tuple[str, str, int]]]:
+        """
+        Return (body, nodes) describing root's tree for the external files
+        cache. nodes is a list of (headline, body, level) tuples.
+        """
+        level = root.level()
+        nodes = [(p.h, p.b, p.level() - level) for p in root.subtree()]
+        return root.b, nodes
+    #@+node:ekr.20261018090310.9: *6* at.restoreAtAutoTree
+    def restoreAtAutoTree(self, root: Position, data: tuple[str, list[tuple[str, str, int]]]) -> None:
+        """
+        Recreate root's tree from the data created by at.archiveAtAutoTree.
+        Like the importers, give all new nodes new gnxs.
+        """
+        c = self.c
+        body, nodes = data
+        root.v._bodyString = body
+        stack: list[VNode] = [root.v]  # stack[n] is the parent at level n + 1.
+        for h, b, level in nodes:
+            v = leoNodes.VNode(context=c)
+            v._headString = h
+            v._bodyString = b
+            del stack[level:]
+            parent_v = stack[-1]
+            parent_v.children.append(v)
+            v.parents.append(parent_v)
+            stack.append(v)
+        if not g.unitTesting:
+            root.contract()
     #@+node:ekr.20150204165040.5: *5* at.readOneAtCleanNode & helpers
     def readOneAtCleanNode(self, root: Position, *, new_contents: str = None) -> bool:
         """Update the @clean/@nosent node at root."""
@@ -714,8 +924,8 @@ class AtFile:
             del root.v.u['_mod_time']
 
         # #4385: Remember all old bodies.
-        for p in root.self_and_subtree():
-            at.bodies_dict[p.v] = p.b
+        for v in root.nodes():
+            at.bodies_dict[v] = v.b
 
         # Calculate data.
         new_public_lines = (
@@ -744,9 +954,8 @@ class AtFile:
 
         # Calculate all changed vnodes.
         changed_vnodes: list[VNode] = []
-        for p in root.self_and_subtree():
-            v = p.v
-            if at.bodies_dict.get(v) != p.b:
+        for v in root.nodes():
+            if at.bodies_dict.get(v) != v.b:
                 changed_vnodes.append(v)
                 v.setDirty()
 
@@ -1261,6 +1470,7 @@ class AtFile:
         # This is the *only* place where these are set.
         # promptForDangerousWrite sets cancelFlag only if canCancelFlag is True.
         at.unchangedFiles = 0
+        at.comparedFiles = at.skippedFiles = at.writtenFiles = 0
         at.canCancelFlag = True
         at.cancelFlag = False
         at.yesToAll = False
@@ -1346,7 +1556,11 @@ class AtFile:
             return
         if files:
             n = at.unchangedFiles
-            g.es(f"finished: {n} unchanged file{g.plural(n)}")
+            g.es(
+                f"finished: {n} unchanged file{g.plural(n)} "
+                f"({at.writtenFiles} written, {at.skippedFiles} skipped, "
+                f"{at.comparedFiles} compared)"
+            )
         elif all:
             g.warning("no @<file> nodes in the selected tree")
         elif dirty:
@@ -1392,8 +1606,8 @@ class AtFile:
         #
         # Clear the dirty bits in all descendant nodes.
         # The persistence data may still have to be written.
-        for p2 in p.self_and_subtree(copy=False):
-            p2.v.clearDirty()
+        for v in p.nodes():
+            v.clearDirty()
     #@+node:ekr.20190108105509.1: *7* at.writePathChanged
     def writePathChanged(self, p: Position) -> None:  # pragma: no cover
         """
@@ -1735,6 +1949,20 @@ class AtFile:
                 # The hook must print an error message.
                 return
 
+            # Don't regenerate the file if neither the tree nor the file
+            # has changed since the last write.
+            tree_hash = at.treeHash(root)
+            realFileName = g.os_path_realpath(fileName)
+            if at.isTreeUnchangedSinceWrite(realFileName, tree_hash):
+                root.clearDirty()
+                # Only Python files need the contents.
+                contents = ''
+                if realFileName.endswith(('py', 'pyw')):
+                    contents = g.readFileIntoUnicodeString(
+                        realFileName, encoding=at.encoding, silent=True) or ''
+                at.reportSkippedFile(contents, realFileName, root)
+                return
+
             at.outputList = []
             at.putFile(root, sentinels=True)
             at.warnAboutOrphandAndIgnoredNodes()
@@ -1743,7 +1971,9 @@ class AtFile:
                 at.addToOrphanList(root)
             else:
                 contents = ''.join(at.outputList)
-                at.replaceFile(contents, at.encoding, fileName, root)
+                at.replaceFile(contents, at.encoding, fileName, root, tree_hash=tree_hash)
+                if c.gotoCommands:
+                    c.gotoCommands.update_line_map(root, tree_hash, contents)
         except Exception:
             at.writeException(fileName, root)
     #@+node:ekr.20241023134114.1: *6* at.writeOneAtJupytextNode
@@ -2490,25 +2720,28 @@ class AtFile:
         c.orphan_at_file_nodes.append(root.h)
     #@+node:ekr.20090514111518.5661: *5* at.checkPythonCode & helpers
     def checkPythonCode(self, contents: str, fileName: str, root: Position) -> None:  # pragma: no cover
-        """Perform python-related checks on root."""
+        """
+        Perform python-related checks on root.
+
+        The WriteChecker runs all checks except the beautifier in the
+        background, and never checks the same contents twice.
+        """
         if not g.app.log:
             return  # We are auto-saving.
         is_python = fileName and fileName.endswith(('py', 'pyw'))
         if g.unitTesting or not contents or not is_python:
             return
-        ok = True
-        if self.checkPythonCodeOnWrite:  # First
-            ok = self.checkPythonSyntax(root, contents)
-        if ok and self.beautifyOnWrite:  # Second.
-            ok = self.runTokenBasedBeautifier(root, fileName)
-        if ok and self.runPyFlakesOnWrite:  # Creates clickable links.
-            ok = self.runPyflakes(root)
-        if ok and self.runFlake8OnWrite:  # Does *not* create clickable links.
-            ok = self.runFlake8(root)
-        if ok and self.runPylintOnWrite:
-            ok = self.runPylint(root)
-        if not ok:
-            g.app.syntax_error_files.append(g.shortFileName(fileName))
+        if self.beautifyOnWrite:
+            # The beautifier rewrites the file and reloads root's tree.
+            ok = not self.checkPythonCodeOnWrite or self.checkPythonSyntax(root, contents)
+            if ok:
+                ok = self.runTokenBasedBeautifier(root, fileName)
+            if not ok:
+                g.app.syntax_error_files.append(g.shortFileName(fileName))
+                return
+            contents = g.readFileIntoUnicodeString(fileName, silent=True) or contents
+        from leo.core import leoWriteChecks
+        leoWriteChecks.get_checker().check(self.c, root, fileName, contents)
     #@+node:ekr.20090514111518.5663: *6* at.checkPythonSyntax
     def checkPythonSyntax(self, p: Position, body: str) -> bool:
         """Check the syntax of the given node."""
@@ -2527,27 +2760,10 @@ class AtFile:
     #@+node:ekr.20090514111518.5666: *7* at.syntaxError (leoAtFile)
     def syntaxError(self, p: Position, body: str) -> None:  # pragma: no cover
         """Report a syntax error."""
-        g.error(f"Syntax error in: {p.h}")
+        from leo.core import leoWriteChecks
         typ, val, tb = sys.exc_info()
-        message = hasattr(val, 'message') and val.message
-        if message:
-            g.es_print(message)
-        if val is None:
-            return
-        lines = g.splitLines(body)
-        n = val.lineno
-        offset = val.offset or 0
-        if n is None:
-            return
-        i = val.lineno - 1
-        for j in range(max(0, i - 2), min(i + 2, len(lines) - 1)):
-            line = lines[j].rstrip()
-            if j == i:
-                unl = p.get_UNL()
-                g.es_print(f"{j+1:5}:* {line}", nodeLink=f"{unl}::-{j+1}")  # Global line.
-                g.es_print(' ' * (7 + offset) + '^')
-            else:
-                g.es_print(f"{j+1:5}: {line}")
+        messages = leoWriteChecks.syntax_error_messages(p.h, body, val)
+        leoWriteChecks.report_messages(messages, p.get_UNL())
     #@+node:ekr.20240926044644.1: *6* at.runTokenBasedBeautifier
     def runTokenBasedBeautifier(self, root: Position, filename: str) -> bool:
         """Run Leo's token-based beautifier on the selected position."""
@@ -2919,21 +3135,20 @@ class AtFile:
         fileName: str,
         root: Position,
         ignoreBlankLines: bool = False,
+        tree_hash: str = '',
     ) -> bool:
         """
         Write or create the given file from the contents.
         Return True if the original file was changed.
+
+        tree_hash: the result of at.treeHash(root), if known.
         """
         at, c = self, self.c
         assert root, g.callers()
         root.clearDirty()
 
         # Create the timestamp (only for messages).
-        if c.config.getBool('log-show-save-time', default=False):  # pragma: no cover
-            format = c.config.getString('log-timestamp-format') or "%H:%M:%S"
-            timestamp = time.strftime(format) + ' '
-        else:
-            timestamp = ''
+        timestamp = at.messageTimestamp()
 
         # Adjust the contents.
         assert isinstance(contents, str), g.callers()
@@ -2946,6 +3161,8 @@ class AtFile:
         if not g.os_path_exists(fileName):
             ok = g.writeFile(contents, encoding, fileName)
             if ok:
+                at.writtenFiles += 1
+                at.recordWriteFingerprint(fileName, contents, encoding, tree_hash)
                 c.setFileTimeStamp(fileName)
                 if not g.unitTesting:
                     g.es(f"{timestamp}created: {fileName}")  # pragma: no cover
@@ -2958,6 +3175,13 @@ class AtFile:
             # No original file to change. Return value tested by a unit test.
             return False  # No change to original file.
 
+        # Don't read the file if it still contains the contents Leo last wrote.
+        if not root.isAtCleanNode() and at.isUnchangedSinceWrite(fileName, contents, encoding):
+            at.recordWriteFingerprint(fileName, contents, encoding, tree_hash)
+            at.reportSkippedFile(contents, fileName, root)
+            return False  # No change to original file.
+
+        at.comparedFiles += 1
         old_contents = g.readFileIntoUnicodeString(fileName,
             encoding=at.encoding, silent=True)
         if not old_contents:
@@ -2970,6 +3194,8 @@ class AtFile:
                 or (not at.explicitLineEnding and at.compareIgnoringLineEndings(old_contents, contents))
                 or ignoreBlankLines and at.compareIgnoringBlankLines(old_contents, contents))
             if unchanged:
+                if contents == old_contents:
+                    at.recordWriteFingerprint(fileName, contents, encoding, tree_hash)
                 at.unchangedFiles += 1
                 if not g.unitTesting and c.config.getBool(
                     'report-unchanged-files', default=True):
@@ -2990,6 +3216,8 @@ class AtFile:
         # Write a changed file.
         ok = g.writeFile(contents, encoding, fileName)
         if ok:
+            at.writtenFiles += 1
+            at.recordWriteFingerprint(fileName, contents, encoding, tree_hash)
             c.setFileTimeStamp(fileName)
             if (
                 not g.unitTesting
@@ -3003,6 +3231,95 @@ class AtFile:
         # Check *after* writing the file.
         at.checkPythonCode(contents, fileName, root)
         return ok
+    #@+node:ekr.20261018101704.1: *6* at.Write fingerprints
+    #@+node:ekr.20261018101704.4: *7* at.contentsHash & at.treeHash
+    def contentsHash(self, contents: str, encoding: str) -> str:
+        """Return a hash of the contents, as written with the given encoding."""
+        return hashlib.sha1(f"{encoding}:{contents}".encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def treeHash(self, root: Position) -> str:
+        """
+        Return a hash of root's tree and of all settings that affect writing
+        root's external file.
+        """
+        at, c = self, self.c
+        params = repr((
+            at.fileCacheParams(root),
+            c.fullPath(root),
+            c.getLineEnding(root),
+            c.getPageWidth(root),
+            at.output_newline,
+            g.app.write_black_sentinels,
+        ))
+        h = hashlib.sha1(params.encode('utf-8', 'surrogatepass'))
+        for v, level, n in root.walk():
+            h.update(f"\0{level}\0{v.gnx}\0{v.h}\0{v.b}".encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+    #@+node:ekr.20261018101704.5: *7* at.isUnchangedSinceWrite & at.isTreeUnchangedSinceWrite
+    def isUnchangedSinceWrite(self, fileName: str, contents: str, encoding: str) -> bool:
+        """
+        Return True if the file contains exactly the given contents, judging
+        only by the file's stat and the fingerprint of the contents Leo last
+        wrote to it.
+        """
+        fingerprint = self.write_fingerprints.get(fileName)
+        if not fingerprint or not self.isStatUnchanged(fileName, fingerprint):
+            return False
+        return fingerprint[2] == self.contentsHash(contents, encoding)
+
+    def isTreeUnchangedSinceWrite(self, fileName: str, tree_hash: str) -> bool:
+        """
+        Return True if Leo wrote the file from a tree with the given hash and
+        the file has not changed since.
+        """
+        fingerprint = self.write_fingerprints.get(fileName)
+        if not fingerprint or fingerprint[3] != tree_hash:
+            return False
+        return self.isStatUnchanged(fileName, fingerprint)
+
+    def isStatUnchanged(self, fileName: str, fingerprint: tuple[int, int, str, str]) -> bool:
+        """Return True if the file's mtime and size match the fingerprint."""
+        try:
+            stat = os.stat(fileName)
+        except OSError:  # pragma: no cover
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == fingerprint[:2]
+    #@+node:ekr.20261018131502.1: *7* at.messageTimestamp
+    def messageTimestamp(self) -> str:
+        """Return the timestamp that starts messages about written files."""
+        c = self.c
+        if c.config.getBool('log-show-save-time', default=False):  # pragma: no cover
+            format = c.config.getString('log-timestamp-format') or "%H:%M:%S"
+            return time.strftime(format) + ' '
+        return ''
+    #@+node:ekr.20261018131502.2: *7* at.reportSkippedFile
+    def reportSkippedFile(self, contents: str, fileName: str, root: Position) -> None:
+        """
+        Count, report and check a file that Leo did not read back or write
+        because it has not changed since Leo last wrote it.
+
+        contents: the file's contents. Only checkPythonCode uses them.
+        """
+        at, c = self, self.c
+        at.skippedFiles += 1
+        at.unchangedFiles += 1
+        if not g.unitTesting and c.config.getBool('report-unchanged-files', default=True):
+            g.es(f"{at.messageTimestamp()}unchanged: {g.shortFileName(fileName)}")  # pragma: no cover
+        # Check unchanged files.
+        at.checkPythonCode(contents, fileName, root)
+    #@+node:ekr.20261018101704.6: *7* at.recordWriteFingerprint
+    def recordWriteFingerprint(self, fileName: str, contents: str, encoding: str, tree_hash: str = '') -> None:
+        """
+        Remember the fingerprint of the contents just written to (or found
+        in) the file, and the hash of the tree that produced them.
+        """
+        try:
+            stat = os.stat(fileName)
+        except OSError:  # pragma: no cover
+            self.write_fingerprints.pop(fileName, None)
+            return
+        self.write_fingerprints[fileName] = (
+            stat.st_mtime_ns, stat.st_size, self.contentsHash(contents, encoding), tree_hash)
     #@+node:ekr.20190114061452.27: *6* at.compareIgnoringBlankLines
     def compareIgnoringBlankLines(self, s1: str, s2: str) -> bool:  # pragma: no cover
         """Compare two strings, ignoring blank lines."""
@@ -3422,14 +3739,23 @@ class FastAtRead:
         lines: list[str],
         path: str,
         start: int,
-    ) -> None:
-        """Scan all lines of the file, creating vnodes."""
+        root_gnx: str,
+    ) -> ScanRecords:
+        """
+        Scan all lines of the file, creating node records.
+
+        Return (nodes, bodies, complete), where nodes is a list of
+        (gnx, headline, level) tuples in file order and bodies is a dict
+        whose keys are gnxs and whose values are body strings.
+
+        This method does not create or change any vnode, so it may run in a
+        worker process. fast_at.link_records creates the vnodes.
+        """
         #@+<< init scan_lines >>
         #@+node:ekr.20180602103135.9: *4* << init scan_lines >>
         #
         # Simple vars...
         afterref = False  # True: the next line follows @afterref.
-        clone_v: VNode = None  # The root of the clone tree.
         # The start/end *comment* delims.
         # Important: scan_header ends comment_delim1 with a blank when using black sentinels.
         comment_delim1, comment_delim2 = comment_delims
@@ -3438,7 +3764,6 @@ class FastAtRead:
         in_doc = False  # True: in @doc parts.
         is_cweb = comment_delim1 == '@q@' and comment_delim2 == '@>'  # True: cweb hack in effect.
         indent = 0  # The current indentation.
-        level_stack: list[tuple[VNode, VNode]] = []
         n_last_lines = 0  # The number of @@last directives seen.
 
         # #1065 so reads will not create spurious child nodes.
@@ -3453,17 +3778,12 @@ class FastAtRead:
         verbatim_line = comment_delim1 + '@verbatim' + comment_delim2
         verbatim = False  # True: the next line must be added without change.
 
-        # Init the parent vnode.
-        gnx = self.root.gnx
-        context = self.c
-        parent_v = self.root.v
-        root_v = parent_v  # Does not change.
-        level_stack.append((root_v, None))
+        # The node records, in file order.
+        gnx = root_gnx
+        nodes: list[tuple[str, str, int]] = []  # Entries are (gnx, headline, level).
 
         # Init the gnx dict last.
-        gnx2vnode = self.gnx2vnode  # Keys are gnx's, values are vnodes.
         gnx2body: dict[str, list[str]] = {}  # Keys are gnxs, values are list of body lines.
-        gnx2vnode[gnx] = parent_v  # Add gnx to the keys
 
         # Add gnx to the keys.
         # Body is the list of lines presently being accumulated.
@@ -3573,61 +3893,17 @@ class FastAtRead:
                 gnx, head = m.group(2), m.group(5)
                 # m.group(3) is the level number, m.group(4) is the number of stars.
                 level = int(m.group(3)) if m.group(3) else 1 + len(m.group(4))
-                v = gnx2vnode.get(gnx)
+                nodes.append((gnx, head, level))
 
-                # Case 1: The root @file node. Don't change the headline.
-                #         #3931: Always use root_v, but use the gnx from external file!
+                # #1065: The first +@node sentinel denotes the root, regardless of gnx.
                 if not root_seen:
                     root_seen = True
-                    clone_v = None
-                    v = root_v
-                    if root_v.gnx != gnx:
-                        # Delete all traces of root_v.gnx.
-                        if root_v.gnx in gnx2body:
-                            del gnx2body[root_v.gnx]
-                        if root_v.gnx in gnx2vnode:
-                            del gnx2vnode[root_v.gnx]
-                        # `refresh-from-disk` issues this messages, but 'git-diff' should not.
-                        # g.trace(f"Changing gnx! old: {root_v.gnx} new: {gnx} in {head}")
-                        root_v.fileIndex = gnx
-                    gnx2vnode[gnx] = root_v
-                    gnx2body[gnx] = body = []
-                    v.children = []
-                    continue  # End of case 1.
-
-                # Case 2: We are scanning the descendants of a clone.
-                parent_v, clone_v = level_stack[level - 2]
-                if v and clone_v:
-                    # The last version of the body and headline wins..
-                    gnx2body[gnx] = body = []
-                    v._headString = head
-                    # Update the level_stack.
-                    level_stack = level_stack[: level - 1]
-                    level_stack.append((v, clone_v))
-                    # Always clear the children!
-                    v.children = []
-                    parent_v.children.append(v)
-                    continue  # End of case 2.
-
-                # Case 3: we are not already scanning the descendants of a clone.
-                if v:
-                    # The *start* of a clone tree. Reset the children.
-                    clone_v = v
-                    v.children = []
-                else:
-                    # Make a new vnode.
-                    v = leoNodes.VNode(context=context, gnx=gnx)
-                # The last version of the body and headline wins.
-                gnx2vnode[gnx] = v
+                    if root_gnx != gnx and root_gnx in gnx2body:
+                        # Delete all traces of the old root gnx.
+                        del gnx2body[root_gnx]
+
+                # The last version of the body wins.
                 gnx2body[gnx] = body = []
-                v._headString = head
-                # Update the stack.
-                level_stack = level_stack[: level - 1]
-                level_stack.append((v, clone_v))
-                # Update the links.
-                assert v != root_v
-                parent_v.children.append(v)
-                v.parents.append(parent_v)
                 continue
             #@-<< handle node_start >>
             if in_doc:
@@ -3857,7 +4133,7 @@ class FastAtRead:
             #@-<< handle remaining @ lines >>
         else:
             # No @-leo sentinel!
-            return  # pragma: no cover
+            return nodes, {}, False  # pragma: no cover
         #@+<< final checks >>
         #@+node:ekr.20211104054823.1: *4* << final checks >>
         if g.unitTesting:
@@ -3880,38 +4156,164 @@ class FastAtRead:
                 n2 = len(last_lines)
                 g.trace(f"Expected {n1} trailing line{g.plural(n1)}, got {n2}")
         #@-<< insert @last lines >>
-        #@+<< post pass: set all body text>>
-        #@+node:ekr.20211104054426.1: *4* << post pass: set all body text>>
+        bodies = {key: ''.join(body) for key, body in gnx2body.items()}
+        return nodes, bodies, True
+    #@+node:ekr.20261018061512.1: *3* fast_at.link_records
+    def link_records(self, records: ScanRecords, root: Position) -> None:
+        """
+        Create the tree of vnodes described by the records from
+        fast_at.scan_lines, anchored in root.v.
+
+        This method must run in the main thread: it updates the global
+        gnx2vnode dict, so clones are resolved in the order of the records.
+        """
+        self.root = root
+        nodes, bodies, complete = records
+        context = self.c
+        gnx2vnode = self.gnx2vnode  # Keys are gnx's, values are vnodes.
+        root_v = root.v  # Does not change.
+        gnx2vnode[root_v.gnx] = root_v
+        clone_v: VNode = None  # The root of the clone tree.
+        level_stack: list[tuple[VNode, VNode]] = [(root_v, None)]
+        root_seen = False
+        for gnx, head, level in nodes:
+            v = gnx2vnode.get(gnx)
+
+            # Case 1: The root @file node. Don't change the headline.
+            #         #3931: Always use root_v, but use the gnx from external file!
+            if not root_seen:
+                root_seen = True
+                clone_v = None
+                v = root_v
+                if root_v.gnx != gnx:
+                    # Delete all traces of root_v.gnx.
+                    if root_v.gnx in gnx2vnode:
+                        del gnx2vnode[root_v.gnx]
+                    # `refresh-from-disk` issues this messages, but 'git-diff' should not.
+                    # g.trace(f"Changing gnx! old: {root_v.gnx} new: {gnx} in {head}")
+                    root_v.fileIndex = gnx
+                gnx2vnode[gnx] = root_v
+                v.children = []
+                continue  # End of case 1.
+
+            # Case 2: We are scanning the descendants of a clone.
+            parent_v, clone_v = level_stack[level - 2]
+            if v and clone_v:
+                # The last version of the body and headline wins..
+                v._headString = head
+                # Update the level_stack.
+                level_stack = level_stack[: level - 1]
+                level_stack.append((v, clone_v))
+                # Always clear the children!
+                v.children = []
+                parent_v.children.append(v)
+                continue  # End of case 2.
+
+            # Case 3: we are not already scanning the descendants of a clone.
+            if v:
+                # The *start* of a clone tree. Reset the children.
+                clone_v = v
+                v.children = []
+            else:
+                # Make a new vnode.
+                v = leoNodes.VNode(context=context, gnx=gnx)
+            # The last version of the body and headline wins.
+            gnx2vnode[gnx] = v
+            v._headString = head
+            # Update the stack.
+            level_stack = level_stack[: level - 1]
+            level_stack.append((v, clone_v))
+            # Update the links.
+            assert v != root_v
+            parent_v.children.append(v)
+            v.parents.append(parent_v)
+        if not complete:
+            return  # pragma: no cover
         # Set the body text.
         assert root_v.gnx in gnx2vnode, root_v
-        assert root_v.gnx in gnx2body, root_v
-        for key in gnx2body:
-            body = gnx2body.get(key)
+        assert root_v.gnx in bodies, root_v
+        for key, body in bodies.items():
             v = gnx2vnode.get(key)
             assert v, (key, v)
-            v._bodyString = g.toUnicode(''.join(body))
-        #@-<< post pass: set all body text>>
+            v._bodyString = g.toUnicode(body)
     #@+node:ekr.20180603170614.1: *3* fast_at.read_into_root
     def read_into_root(self, contents: str, path: str, root: Position) -> bool:
         """
         Parse the file's contents, creating a tree of vnodes
         anchored in root.v.
         """
-        self.path = path
-        self.root = root
-        contents = contents.replace('\r', '')
-        lines = g.splitLines(contents)
-        data = self.scan_header(lines)
-        if not data:  # pragma: no cover
+        records = self.scan(contents, path, root.gnx)
+        if not records:  # pragma: no cover
             g.trace(f"Invalid external file: {path}")
             return False
         # Clear all children.
         # Previously, this had been done in readOpenFile.
         root.v._deleteAllChildren()
-        comment_delims, first_lines, start_i = data
-        self.scan_lines(comment_delims, first_lines, lines, path, start_i)
+        self.link_records(records, root)
         return True
+    #@+node:ekr.20261018061512.2: *3* fast_at.scan
+    def scan(self, contents: str, path: str, root_gnx: str) -> Optional[ScanRecords]:
+        """
+        Scan the file's contents into node records without changing any vnode.
+        Return None if the file has no @+leo header.
+        """
+        self.path = path
+        contents = contents.replace('\r', '')
+        lines = g.splitLines(contents)
+        data = self.scan_header(lines)
+        if not data:
+            return None
+        comment_delims, first_lines, start_i = data
+        return self.scan_lines(comment_delims, first_lines, lines, path, start_i, root_gnx)
     #@-others
+#@+node:ekr.20261018061512.5: ** function: scan_external_file
+def scan_external_file(
+    path: str,
+    root_gnx: str,
+    encoding: str,
+    want_fingerprint: bool = False,
+) -> tuple[Optional[tuple[float, int, str]], Optional[tuple[str, str, ScanRecords]]]:
+    """
+    Read, decode and scan the external file created from an @file tree.
+
+    This function runs in worker processes. It must not change any vnode or
+    report errors. Callers should use at.read to handle all errors.
+
+    Return (fingerprint, data). fingerprint is None or the file's fingerprint
+    in the format of ExternalFilesCache.fingerprint. data is None or
+    (root_gnx, encoding, records).
+    """
+    try:
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            s_bytes = f.read()
+    except Exception:
+        return None, None
+    fingerprint = None
+    if want_fingerprint:
+        fingerprint = stat.st_mtime, len(s_bytes), hashlib.sha1(s_bytes).hexdigest()
+    if not s_bytes:
+        return fingerprint, None
+    # Compute the encoding as in at.readFileToUnicode.
+    e, s_bytes = g.stripBOM(s_bytes)
+    if not e:
+        e = encoding
+        s_temp = g.toUnicode(s_bytes, 'ascii', reportErrors=False)
+        for line in g.splitLines(s_temp):
+            if '@+leo' in line:
+                m = FastAtRead.header_pattern.match(line)
+                if m and m.group(6):
+                    e = m.group(6)
+                    if e.endswith(','):
+                        e = e[:-1]
+                    if not g.isValidEncoding(e):
+                        return fingerprint, None
+                break
+    s = g.toUnicode(s_bytes, encoding=e).replace('\r\n', '\n')
+    records = FastAtRead(None, gnx2vnode={}).scan(s, path, root_gnx)
+    if not records:
+        return fingerprint, None
+    return fingerprint, (root_gnx, e, records)
 #@+node:ekr.20240410111658.3: ** class LeoIOStatus
 class LeoIOStatus:
     """A class representing the status of a Leo file operation"""
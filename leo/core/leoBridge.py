@@ -188,7 +188,7 @@ class BridgeController:
             # reads only standard settings files, using a null gui.
             # uses lm.files[0] to compute the local directory
             # that might contain myLeoSettings.leo.
-            lm.readGlobalSettingsFiles()
+            lm.readGlobalSettingsFiles(use_cache=True)
         else:
             # Bug fix: 2012/11/26: create default global settings dicts.
             settings_d, bindings_d = lm.createDefaultSettingsDicts()
@@ -5,9 +5,11 @@
 #@+node:ekr.20100208223942.10436: ** << leoCache imports & annotations >>
 from __future__ import annotations
 import fnmatch
+import hashlib
 import os
 import pickle
 import sqlite3
+import time
 from typing import Any, Generator, Optional, TYPE_CHECKING, Union
 import zlib
 from leo.core import leoGlobals as g
@@ -81,13 +83,19 @@ class GlobalCacher:
         """Ctor for the GlobalCacher class."""
         trace = 'cache' in g.app.debug
         self.db: Union[dict, SqlitePickleShare]
+        self.files_cache: Optional[ExternalFilesCache] = None
         try:
             path = join(g.app.homeLeoDir, 'db', 'g_app_db')
             if trace:
                 print('path for g.app.db:', repr(path))
-            self.db = SqlitePickleShare(path)
+            # Buffer writes only if Leo can flush them at idle time.
+            idle_manager = g.app.idleTimeManager
+            self.db = SqlitePickleShare(path, write_behind=bool(idle_manager))
             if trace and self.db is not None:
                 self.dump(tag='Startup')
+            self.files_cache = ExternalFilesCache(self.db.conn)
+            if idle_manager:
+                idle_manager.add_callback(self.on_idle)
         except Exception:
             if trace:
                 g.es_exception()
@@ -108,6 +116,8 @@ class GlobalCacher:
             g.trace('unexpected exception')
             g.es_exception()
             self.db = {}
+        if self.files_cache:
+            self.files_cache.clear()
     #@+node:ekr.20180627042948.1: *3* g_cacher.commit_and_close()
     def commit_and_close(self) -> None:
         # Careful: self.db may be a dict.
@@ -115,6 +125,9 @@ class GlobalCacher:
             # pylint: disable=no-member
             if 'cache' in g.app.debug:
                 self.dump(tag='Shutdown')
+            if self.files_cache:
+                self.files_cache.flush()
+            self.db.flush()  # type:ignore
             self.db.conn.commit()
             self.db.conn.close()
     #@+node:ekr.20180627045953.1: *3* g_cacher.dump
@@ -123,6 +136,201 @@ class GlobalCacher:
         tag0 = 'Global Cache'
         tag2 = f"{tag0}: {tag}" if tag else tag0
         dump_cache(self.db, tag2)  # Careful: g.app.db may not be set yet.
+        if isinstance(self.db, SqlitePickleShare):
+            dump_payload_sizes(self.db)
+    #@+node:ekr.20261018141532.1: *3* g_cacher.on_idle
+    def on_idle(self) -> None:
+        """Write all pending changes to g.app.db."""
+        if isinstance(self.db, SqlitePickleShare):
+            self.db.flush()
+    #@-others
+#@+node:ekr.20261018090310.1: ** class ExternalFilesCache (g.app.global_cacher.files_cache)
+class ExternalFilesCache:
+    """
+    A persistent, size-bounded cache of the results of reading external
+    files. The cache shares g.app.db's sqlite connection, using its own
+    table.
+
+    Keys are '<kind>:<full path>'. Each entry contains:
+
+    - The fingerprint of the file: its mtime, size and content hash.
+    - The params: a string describing everything, except the file's
+      contents, that affects the result of reading the file.
+    - The pickled, compressed result.
+
+    Invalidation rules:
+
+    - Changing @path directives changes the full path, and so the key.
+    - Changing the encoding, the comment delims or any other param
+      invalidates the entry. Callers include Leo's version in the params.
+    - Changing the file's size or content hash invalidates the entry.
+      Changing only the file's mtime does not.
+
+    Eviction: self.evict deletes the least recently used entries until the
+    cache contains at most max_bytes bytes.
+
+    Writes: self.get and self.put change only in-memory dicts. self.flush
+    writes all pending changes in a single transaction.
+    """
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.hits = 0
+        self.misses = 0
+        # Pending changes. Keys are cache keys.
+        self.pending_puts: dict[str, tuple] = {}  # Values are rows.
+        self.pending_mtimes: dict[str, float] = {}
+        self.pending_used: dict[str, float] = {}
+        conn.execute(
+            'create table if not exists filecache('
+            'key text primary key, params text, mtime real, size integer, '
+            'hash text, used real, nbytes integer, data blob);'
+        )
+
+    #@+others
+    #@+node:ekr.20261018090310.2: *3* files_cache.clear
+    def clear(self) -> None:
+        """Delete all entries."""
+        self.pending_puts.clear()
+        self.pending_mtimes.clear()
+        self.pending_used.clear()
+        self.conn.execute('delete from filecache;')
+    #@+node:ekr.20261018090310.3: *3* files_cache.evict
+    def evict(self, max_bytes: int) -> int:
+        """
+        Delete the least recently used entries until the cache contains at
+        most max_bytes bytes. Return the number of deleted entries.
+        """
+        self.flush()
+        total = self.size()
+        if total <= max_bytes:
+            return 0
+        keys: list[str] = []
+        for key, nbytes in self.conn.execute('select key, nbytes from filecache order by used;'):
+            if total <= max_bytes:
+                break
+            keys.append(key)
+            total -= nbytes
+        self.conn.executemany('delete from filecache where key=?;', [(z,) for z in keys])
+        return len(keys)
+    #@+node:ekr.20261018090310.4: *3* files_cache.fingerprint
+    def fingerprint(self, path: str) -> Optional[tuple[float, int, str]]:
+        """
+        Return (mtime, size, hash) for the file at the given path, or None.
+
+        Call this method *before* reading the file, so that any later change
+        to the file invalidates the entry.
+        """
+        try:
+            stat = os.stat(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        return stat.st_mtime, len(data), hashlib.sha1(data).hexdigest()
+    #@+node:ekr.20261018090310.5: *3* files_cache.get
+    def get(self, kind: str, path: str, params: str) -> Optional[Value]:
+        """
+        Return the cached value for the file at the given path,
+        or None if there is no valid entry.
+        """
+        key = f"{kind}:{path}"
+        pending_row = self.pending_puts.get(key)
+        if pending_row:
+            row = pending_row[1:5] + pending_row[7:]
+        else:
+            row = self.conn.execute(
+                'select params, mtime, size, hash, data from filecache where key=?;', (key,)
+            ).fetchone()
+        if not row or row[0] != params:
+            self.misses += 1
+            return None
+        mtime, size, sha = row[1:4]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.misses += 1
+            return None
+        if stat.st_size != size:
+            self.misses += 1
+            return None
+        if stat.st_mtime != mtime:
+            # Only hash the file if its mtime has changed.
+            fingerprint = self.fingerprint(path)
+            if not fingerprint or fingerprint[1:] != (size, sha):
+                self.misses += 1
+                return None
+            self.pending_mtimes[key] = fingerprint[0]
+        try:
+            value = pickle.loads(zlib.decompress(row[4]))
+        except Exception:
+            self.misses += 1
+            return None
+        self.pending_used[key] = time.time()
+        self.hits += 1
+        return value
+    #@+node:ekr.20261018090310.6: *3* files_cache.put
+    def put(self,
+        kind: str,
+        path: str,
+        params: str,
+        fingerprint: tuple[float, int, str],
+        value: Value,
+    ) -> None:
+        """
+        Cache the value for the file at the given path.
+
+        fingerprint must be the result of self.fingerprint(path),
+        computed before reading the file.
+        """
+        if not fingerprint:
+            return
+        mtime, size, sha = fingerprint
+        key = f"{kind}:{path}"
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        self.pending_puts[key] = (key, params, mtime, size, sha, time.time(), len(data), data)
+        self.pending_mtimes.pop(key, None)
+        self.pending_used.pop(key, None)
+    #@+node:ekr.20261018130655.1: *3* files_cache.flush
+    def flush(self) -> None:
+        """Write all pending changes in a single transaction."""
+        if not (self.pending_puts or self.pending_mtimes or self.pending_used):
+            return
+        conn = self.conn
+        begin = not conn.in_transaction
+        if begin:
+            conn.execute('begin;')
+        try:
+            conn.executemany(
+                'replace into filecache(key, params, mtime, size, hash, used, nbytes, data) '
+                'values(?,?,?,?,?,?,?,?);',
+                [row[:7] + (sqlite3.Binary(row[7]),) for row in self.pending_puts.values()],
+            )
+            conn.executemany(
+                'update filecache set mtime=? where key=?;',
+                [(mtime, key) for key, mtime in self.pending_mtimes.items()],
+            )
+            conn.executemany(
+                'update filecache set used=? where key=?;',
+                [(used, key) for key, used in self.pending_used.items()],
+            )
+            if begin:
+                conn.execute('commit;')
+        except sqlite3.Error:
+            # The cache is an optimization. Report the error and continue.
+            if begin and conn.in_transaction:
+                conn.execute('rollback;')
+            g.es_exception()
+        finally:
+            self.pending_puts.clear()
+            self.pending_mtimes.clear()
+            self.pending_used.clear()
+    #@+node:ekr.20261018090310.7: *3* files_cache.size
+    def size(self) -> int:
+        """Return the total size of all entries, in bytes."""
+        self.flush()
+        row = self.conn.execute('select sum(nbytes) from filecache;').fetchone()
+        return row[0] or 0
     #@-others
 #@+node:vitalije.20170716201700.1: ** class SqlitePickleShare
 _sentinel = object()
@@ -134,6 +342,10 @@ class SqlitePickleShare:
 
     Opening this DB may fail. If so the GlobalCacher class uses a plain
     Python dict instead.
+
+    Write-behind mode: self.__setitem__ and self.__delitem__ change only
+    the self.pending dict. self.flush writes all pending changes in a
+    single transaction.
     """
     #@+others
     #@+node:vitalije.20170716201700.2: *3*  Birth & special methods
@@ -141,17 +353,28 @@ class SqlitePickleShare:
         sql = 'create table if not exists cachevalues(key text primary key, data blob);'
         conn.execute(sql)
     #@+node:vitalije.20170716201700.3: *4*  SqlitePickleShare.__init__
-    def __init__(self, root: str) -> None:
+    def __init__(self, root: str, write_behind: bool = False) -> None:
         """
         Init the SqlitePickleShare class.
         root: The directory that contains the data. Created if it doesn't exist.
+        write_behind: True: buffer all changes until self.flush.
         """
         self.root: str = abspath(expanduser(root))
         if not isdir(self.root) and not g.unitTesting:
             self._makedirs(self.root)
         dbfile = ':memory:' if g.unitTesting else join(root, 'cache.sqlite')
-        self.conn = sqlite3.connect(dbfile, isolation_level=None)
+        # leoserver's RequestScheduler may use the connection in worker threads.
+        # sqlite3 serializes all calls when sqlite3.threadsafety is 3.
+        self.conn = sqlite3.connect(dbfile, isolation_level=None,
+            check_same_thread=sqlite3.threadsafety != 3)
+        if dbfile != ':memory:':
+            # Write-ahead logging: commits append to the log and need fewer fsyncs.
+            self.conn.execute('pragma journal_mode=wal;')
+            self.conn.execute('pragma synchronous=normal;')
         self.init_dbtables(self.conn)
+        self.write_behind = write_behind
+        # Keys are dirty keys. Values are pickled data, or _sentinel for deleted keys.
+        self.pending: dict[str, Any] = {}
 
         def loadz(data: Value) -> Optional[Value]:
             if data:
@@ -164,17 +387,20 @@ class SqlitePickleShare:
                 return val
             return None
 
-        def dumpz(val: Value) -> Value:
+        def dumps(val: Value) -> bytes:
             try:
                 # Use Python 2's highest protocol, 2, if possible
-                data = pickle.dumps(val, protocol=2)
+                return pickle.dumps(val, protocol=2)
             except Exception:
                 # Use best available if that doesn't work (unlikely)
-                data = pickle.dumps(val, pickle.HIGHEST_PROTOCOL)
-            return sqlite3.Binary(zlib.compress(data))
+                return pickle.dumps(val, pickle.HIGHEST_PROTOCOL)
+
+        def dumpz(val: Value) -> Value:
+            return sqlite3.Binary(zlib.compress(dumps(val)))
 
         self.loader = loadz
         self.dumper = dumpz
+        self.pickler = dumps
         self.reset_protocol_in_values()
     #@+node:vitalije.20170716201700.4: *4* SqlitePickleShare.__contains__
     def __contains__(self, key: str) -> bool:
@@ -183,6 +409,9 @@ class SqlitePickleShare:
     #@+node:vitalije.20170716201700.5: *4* SqlitePickleShare.__delitem__
     def __delitem__(self, key: str) -> None:
         """ del db["key"] """
+        if self.write_behind:
+            self.pending[key] = _sentinel
+            return
         try:
             self.conn.execute(
                 '''delete from cachevalues
@@ -192,6 +421,11 @@ class SqlitePickleShare:
     #@+node:vitalije.20170716201700.6: *4* SqlitePickleShare.__getitem__
     def __getitem__(self, key: str) -> None:
         """ db['key'] reading """
+        data = self.pending.get(key)
+        if data is _sentinel:
+            raise KeyError(key)
+        if data is not None:
+            return pickle.loads(data)
         try:
             obj = None
             for row in self.conn.execute(
@@ -222,6 +456,10 @@ class SqlitePickleShare:
     #@+node:vitalije.20170716201700.9: *4* SqlitePickleShare.__setitem__
     def __setitem__(self, key: str, value: Value) -> None:
         """ db['key'] = 5 """
+        if self.write_behind:
+            # Pickle now: the caller may change the value later.
+            self.pending[key] = self.pickler(value)
+            return
         try:
             data = self.dumper(value)
             self.conn.execute(
@@ -273,7 +511,40 @@ class SqlitePickleShare:
         It would be more thorough to delete everything
         below the root directory, but it's not necessary.
         """
+        self.pending.clear()
         self.conn.execute('delete from cachevalues;')
+    #@+node:ekr.20261018141532.2: *3* flush (SqlitePickleShare)
+    def flush(self) -> int:
+        """
+        Write all pending changes in a single transaction.
+        Return the number of changed keys.
+        """
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, {}
+        conn = self.conn
+        begin = not conn.in_transaction
+        if begin:
+            conn.execute('begin;')
+        try:
+            conn.executemany(
+                'delete from cachevalues where key=?;',
+                [(key,) for key, data in pending.items() if data is _sentinel],
+            )
+            conn.executemany(
+                'replace into cachevalues(key, data) values(?,?);',
+                [
+                    (key, sqlite3.Binary(zlib.compress(data)))
+                    for key, data in pending.items() if data is not _sentinel
+                ],
+            )
+            if begin:
+                conn.execute('commit;')
+        except sqlite3.Error:
+            if begin and conn.in_transaction:
+                conn.execute('rollback;')
+            g.es_exception()
+        return len(pending)
     #@+node:vitalije.20170716201700.16: *3* get  (SqlitePickleShare)
     def get(self, key: str, default: Value = None) -> Value:
 
@@ -286,6 +557,9 @@ class SqlitePickleShare:
             return default
     #@+node:vitalije.20170716201700.17: *3* has_key (SqlitePickleShare)
     def has_key(self, key: str) -> bool:
+        data = self.pending.get(key)
+        if data is not None:
+            return data is not _sentinel
         sql = 'select 1 from cachevalues where key=?;'
         try:
             for _row in self.conn.execute(sql, (key,)):
@@ -295,6 +569,7 @@ class SqlitePickleShare:
         return False
     #@+node:vitalije.20170716201700.18: *3* items  (SqlitePickleShare)
     def items(self) -> Generator:
+        self.flush()
         sql = 'select key,data from cachevalues;'
         for key, data in self.conn.execute(sql):
             yield key, data
@@ -303,6 +578,7 @@ class SqlitePickleShare:
 
     def keys(self, globpat: str = None) -> Generator:
         """Return all keys in DB, or all keys matching a glob"""
+        self.flush()
         args: tuple
         if globpat is None:
             sql = 'select key from cachevalues;'
@@ -312,6 +588,12 @@ class SqlitePickleShare:
             args = tuple(globpat)
         for key in self.conn.execute(sql, args):
             yield key
+    #@+node:ekr.20261018141532.3: *3* payload_sizes (SqlitePickleShare)
+    def payload_sizes(self) -> list[tuple[str, int]]:
+        """Return a list of (key, size of the compressed value), largest first."""
+        self.flush()
+        sql = 'select key, length(data) from cachevalues order by length(data) desc, key;'
+        return [(key, size or 0) for key, size in self.conn.execute(sql)]
     #@+node:vitalije.20170818091008.1: *3* reset_protocol_in_values (SqlitePickleShare)
     def reset_protocol_in_values(self) -> None:
         PROTOCOLKEY = '__cache_pickle_protocol__'
@@ -346,6 +628,13 @@ class SqlitePickleShare:
         """not used in SqlitePickleShare"""
         pass
     #@-others
+#@+node:ekr.20261018141532.4: ** function: dump_payload_sizes
+def dump_payload_sizes(db: SqlitePickleShare) -> None:
+    """Print the size of each value in the given db."""
+    sizes = db.payload_sizes()
+    print(f"\n===== Payload sizes: {sum(z[1] for z in sizes)} bytes =====\n")
+    for key, size in sizes:
+        print(f"{size:>10} {key}")
 #@+node:ekr.20180627050237.1: ** function: dump_cache
 def dump_cache(db: Union[dict, SqlitePickleShare], tag: str) -> None:
     """Dump the given cache."""
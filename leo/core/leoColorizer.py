@@ -50,6 +50,9 @@ if TYPE_CHECKING:  # pragma: no cover
     QWidget = QtWidgets.QWidget
     RuleSet = list[Callable]
 #@-<< leoColorizer annotations >>
+
+# Matches the start of every gnx, unl and url. See jedit.colorRangeWithTag.
+url_leadin_pattern = re.compile(fr"gnx:|unl:|{g.url_kinds}://")
 #@+others
 #@+node:ekr.20190323044524.1: ** function: make_colorizer
 def make_colorizer(c: Cmdr, widget: QWidget) -> Union[JEditColorizer, PygmentsColorizer]:
@@ -105,6 +108,7 @@ class BaseColorizer:
     def configure_colors(self) -> None:
         """Configure all colors in the default colors dict."""
         c = self.c
+        self.tag_formats.clear()
 
         # getColor puts the color name in standard form:
         # color = color.replace(' ', '').lower().strip()
@@ -157,6 +161,7 @@ class BaseColorizer:
         - All fonts mentioned in any @font setting.
         """
         c = self.c
+        self.tag_formats.clear()
         self.font_selectors = ('family', 'size', 'slant', 'weight')
         # Keys are font names. Values are Dicts[selector, value]
         self.new_fonts: dict[str, dict] = {}
@@ -326,6 +331,7 @@ class BaseColorizer:
     #@+node:ekr.20110605121601.18579: *5* BaseColorizer.configure_variable_tags
     def configure_variable_tags(self) -> None:
         c = self.c
+        self.tag_formats.clear()
         use_pygments = pygments and c.config.getBool('use-pygments', default=False)
         name = 'name.other' if use_pygments else 'name'
         self.configUnderlineDict[name] = self.underline_undefined
@@ -669,10 +675,28 @@ class BaseColorizer:
         elif style_name != self.prev_style:
             g.es_print(f"New pygments style: {style_name}")
             self.prev_style = style_name
-    #@+node:ekr.20110605121601.18641: *3* BaseColorizer.setTag
+    #@+node:ekr.20110605121601.18641: *3* BaseColorizer.setTag & tag_format
     def setTag(self, tag: str, s: str, i: int, j: int) -> None:
         """Set the tag in the highlighter."""
         trace = 'coloring' in g.app.debug and not g.unitTesting
+        self.n_setTag += 1
+        if i == j:
+            return
+        # The format depends only on the language, the tag and the settings.
+        key = (self.language, tag)
+        if trace or key not in self.tag_formats:
+            self.tag_formats[key] = self.tag_format(tag, s, i, j)
+        format = self.tag_formats[key]
+        if format is not None:
+            self.tagCount += 1
+            self.highlighter.setFormat(i, j - i, format)
+
+    def tag_format(self, tag: str, s: str, i: int, j: int) -> Optional[QtGui.QTextCharFormat]:
+        """
+        Return the format for the tag in the present language, or None.
+        setTag caches the result. The configure_* methods clear the cache.
+        """
+        trace = 'coloring' in g.app.debug and not g.unitTesting
 
         default_tag = f"{tag}_font"  # See default_font_dict.
         full_tag = f"{self.language}.{tag}"
@@ -681,8 +705,8 @@ class BaseColorizer:
         def report(color: QtGui.QColor) -> None:
             """A superb trace. Don't remove it."""
             i_j_s = f"{i:>3}:{j:<3}"
-            matcher_name = g.caller(3)
-            rule_name = g.caller(4)
+            matcher_name = g.caller(4)
+            rule_name = g.caller(5)
             matcher_s = f"{self.rulesetName}::{rule_name}:{matcher_name}"
             s2 = s[i:j]  # Show only the colored string.
             print(
@@ -693,11 +717,8 @@ class BaseColorizer:
                 f"{i_j_s:7} {s2}"
             )
 
-        self.n_setTag += 1
-        if i == j:
-            return
         if not tag or not tag.strip():
-            return
+            return None
         tag = tag.lower().strip()
         # A hack to allow continuation dots on any tag.
         dots = tag.startswith('dots')
@@ -712,7 +733,7 @@ class BaseColorizer:
             d.get(tag)  # Legacy default.
         )
         if not colorName:
-            return
+            return None
         # New in Leo 5.8.1: allow symbolic color names here.
         #                   (All keys in leo_color_database are normalized.)
         colorName = self.normalize(colorName)
@@ -731,7 +752,7 @@ class BaseColorizer:
                     f"tag: {tag} = {d.get(tag)!r}"
                 )
                 g.print_unique_message(message)
-                return
+                return None
         underline = self.configUnderlineDict.get(tag)
         format = QtGui.QTextCharFormat()
         for font_name in (full_tag, tag, default_tag):
@@ -755,15 +776,15 @@ class BaseColorizer:
         else:
             format.setForeground(color)
             format.setUnderlineStyle(UnderlineStyle.NoUnderline)
-        self.tagCount += 1
         if trace:
             report(color)  # A superb trace.
-        self.highlighter.setFormat(i, j - i, format)
+        return format
     #@+node:ekr.20190324050727.1: *3* BaseColorizer.init_style_ivars
     def init_style_ivars(self) -> None:
         """Init Style data common to JEdit and Pygments colorizers."""
         # init() properly sets these for each language.
         self.actualColorDict: dict[str, QtGui.QColor] = {}  # Used only by setTag.
+        self.tag_formats: dict[tuple[str, str], Optional[QtGui.QTextCharFormat]] = {}  # Used only by setTag.
         self.hyperCount = 0
         # Attributes dict ivars: defaults are as shown...
         self.default = 'null'
@@ -791,6 +812,8 @@ class BaseColorizer:
         self.mode: JEditModeDescriptor = None  # The mode descriptor for the present language.
         self.modeStack: list[JEditModeDescriptor] = []
         self.rulesDict: dict[str, RuleSet] = {}
+        # Keys are ids of rulesDicts. Values are (rulesDict, len(rulesDict), pattern).
+        self.leadin_patterns: dict[int, tuple[dict[str, RuleSet], int, re.Pattern]] = {}
         # self.defineAndExtendForthWords()
         self.word_chars: dict[str, str] = {}  # Inited by init_keywords().
         self.tags = [
@@ -1299,7 +1322,8 @@ class JEditColorizer(BaseColorizer):
         """
         Colorize a *single* line s[i:j] starting in state n.
 
-        Except for traces, do not change this method in any way!
+        Except for traces and skipping characters that start no rule,
+        do not change this method in any way!
 
         Any substantial change would break all the pattern matchers!
         """
@@ -1311,9 +1335,15 @@ class JEditColorizer(BaseColorizer):
         f = self.restartDict.get(state)
         i = f(s) if f else i0
         j = min(j, len(s))  # Required.
+        leadins = self.leadin_pattern()
         while i < j:
             progress = i
             functions = self.rulesDict.get(s[i], [])
+            if not functions and leadins:
+                # Skip all characters that start no rule.
+                m = leadins.search(s, i + 1, j)
+                i = m.start() if m else j
+                continue
             for f in functions:
                 n = f(self, s, i)
                 if False and not g.unitTesting:
@@ -1334,6 +1364,28 @@ class JEditColorizer(BaseColorizer):
             assert i > progress
         # Don't even *think* about changing state here.
         self.tot_time += time.process_time() - t1
+    #@+node:ekr.20261018150812.1: *3* jedit.leadin_pattern
+    def leadin_pattern(self) -> Optional[re.Pattern]:
+        """
+        Return a compiled regex matching the keys of self.rulesDict,
+        the characters that may start a rule.
+
+        Rules may be added to self.rulesDict at any time,
+        so recompile the pattern if the number of keys changes.
+
+        Return None if self.rulesDict isn't a dict. For example,
+        plain.py's rulesDict has a default rule for all characters.
+        """
+        d = self.rulesDict
+        if not isinstance(d, dict):
+            return None
+        data = self.leadin_patterns.get(id(d))
+        if data and data[0] is d and data[1] == len(d):
+            return data[2]
+        chars = ''.join(re.escape(z) for z in sorted(d) if len(z) == 1)
+        pattern = re.compile(f"[{chars}]" if chars else r"(?!x)x")  # The second pattern never matches.
+        self.leadin_patterns[id(d)] = (d, len(d), pattern)
+        return pattern
     #@+node:ekr.20110605121601.18640: *3* jedit.recolor & helpers
     def recolor(self, s: str) -> None:
         """
@@ -1498,6 +1550,11 @@ class JEditColorizer(BaseColorizer):
         if tag != 'url':
             j = min(j, len(s))
             while i < j:
+                # Skip text that can't start a gnx, unl or url.
+                m = url_leadin_pattern.search(s, i, j)
+                if not m:
+                    break
+                i = m.start()
                 ch = s[i].lower()
                 if ch == 'g':
                     n = self.match_gnx(s, i)
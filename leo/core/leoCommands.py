@@ -3,6 +3,7 @@
 #@+<< leoCommands imports >>
 #@+node:ekr.20040712045933: ** << leoCommands imports >>
 from __future__ import annotations
+from collections import Counter
 from collections.abc import Callable
 import glob
 import json
@@ -38,6 +39,7 @@ if TYPE_CHECKING:  # pragma: no cover
     from leo.core.leoImport import LeoImportCommands
     from leo.core.leoKeys import KeyHandlerClass
     from leo.core.leoHistory import NodeHistory
+    from leo.core.leoNodes import PositionIndex
     from leo.core.leoPersistence import PersistenceDataController
     from leo.core.leoPrinting import PrintingController
     from leo.core.leoShadow import ShadowController
@@ -128,6 +130,7 @@ class Commands:
         self.importCommands: LeoImportCommands = None
         self.keyHandler: KeyHandlerClass = None
         self.nodeHistory: NodeHistory = None
+        self.positionIndex: PositionIndex = None
         self.persistenceController: PersistenceDataController = None
         self.printingController: PrintingController = None
         self.shadowController: ShadowController = None
@@ -283,6 +286,7 @@ class Commands:
         assert self.frame.c == c
         from leo.core import leoHistory
         self.nodeHistory = leoHistory.NodeHistory(c)
+        self.positionIndex = leoNodes.PositionIndex(c)
         self.initConfigSettings()
         c.setWindowPosition()  # Do this after initing settings.
 
@@ -398,6 +402,8 @@ class Commands:
         c.db = CommanderWrapper(c)
         c.free_layout = None  # Compatibility. Always None.
         c.quicksearch_controller = None  # Leo 6.8.0: Set by quicksearch plugin.
+        c.outlineIndex = None  # Set by leoIndex.get_index.
+        c.symbolIndex = None  # Set by leoSymbols.get_index.
 
         if hasattr(g.app.gui, 'styleSheetManagerClass'):
             self.styleSheetManager = g.app.gui.styleSheetManagerClass(c)
@@ -1386,14 +1392,14 @@ class Commands:
     def all_nodes(self) -> Generator:
         """A generator returning all vnodes in the outline, in outline order."""
         c = self
-        for p in c.all_positions():
-            yield p.v
+        for v, level, n in c.hiddenRootNode.walk():
+            yield v
 
     def all_unique_nodes(self) -> Generator:
         """A generator returning each vnode of the outline."""
         c = self
-        for p in c.all_unique_positions(copy=False):
-            yield p.v
+        for v, level, n in c.hiddenRootNode.walk(unique=True):
+            yield v
 
     # Compatibility with old code...
 
@@ -1413,6 +1419,16 @@ class Commands:
     all_positions_iter = all_positions
     allNodes_iter = all_positions
     safe_all_positions = all_positions
+    #@+node:ekr.20261018183010.20: *5* c.walk
+    def walk(self, unique: bool = False) -> Generator[tuple[VNode, int, int], None, None]:
+        """
+        A generator yielding (v, level, childIndex) for all vnodes in the
+        outline, in outline order, without creating positions.
+
+        unique: Yield each vnode only once, like c.all_unique_positions.
+        """
+        c = self
+        return c.hiddenRootNode.walk(0, unique)
     #@+node:ekr.20191014093239.1: *5* c.all_positions_for_v
     def all_positions_for_v(self, v: VNode, stack: list[tuple] = None) -> Generator:
         """
@@ -2242,9 +2258,8 @@ class Commands:
             v.fileIndex = ni.getNewIndex(v)
 
         count, gnx_errors = 0, 0
-        for p in c.all_positions(copy=False):
+        for v, level, n in c.walk():
             count += 1
-            v = p.v
             gnx = v.fileIndex
             if gnx:  # gnx must be a string.
                 aList = vnode_d.get(gnx, [])
@@ -2252,7 +2267,7 @@ class Commands:
             else:
                 gnx_errors += 1
                 new_gnx(v)
-                g.es_print(f"empty v.fileIndex: {v} new: {p.v.gnx!r}", color='red')
+                g.es_print(f"empty v.fileIndex: {v} new: {v.gnx!r}", color='red')
         for gnx in sorted(vnode_d.keys()):
             aList = list(vnode_d.get(gnx))
             ids = [id_ for (id_, v) in aList]
@@ -2412,8 +2427,8 @@ class Commands:
             messages: list[str] = []
             n = 0
             for parent_v in c.all_unique_nodes():  # Avoids recursion.
-                for child_v in parent_v.children:
-                    children_n = parent_v.children.count(child_v)
+                # Count each child once: list.count would be quadratic in the number of children.
+                for child_v, children_n in Counter(parent_v.children).items():
                     parents_n = child_v.parents.count(parent_v)
                     if children_n != parents_n:
                         error_list.append((parent_v, child_v))
@@ -2468,8 +2483,8 @@ class Commands:
             messages: list[str] = []
             n = 0
             for parent_v in c.all_unique_nodes():  # Avoids recursion.
-                for child_v in parent_v.children:
-                    children_n = parent_v.children.count(child_v)
+                # Count each child once: list.count would be quadratic in the number of children.
+                for child_v, children_n in Counter(parent_v.children).items():
                     parents_n = child_v.parents.count(parent_v)
                     if children_n != parents_n:  # pragma: no cover
                         error_list.append((parent_v, child_v))
@@ -4964,10 +4979,12 @@ class Commands:
         dir_: str = None,  # A directory or file name.
         ignore_pattern: re.Pattern = None,  # Ignore files matching this regex pattern.
         kind: str = '@file',
+        progress: Callable[[int, int, str], None] = None,
         recursive: bool = True,
         safe_at_file: bool = True,
         theTypes: list[str] = None,
         verbose: bool = True,
+        workers: int = None,
     ) -> None:
         #@+<< docstring >>
         #@+node:ekr.20130823083943.12614: *4* << docstring >>
@@ -4978,11 +4995,15 @@ class Commands:
             dir_              The path to a directory or file.
                               Relative paths must exist relative to the outline's directory.
             kind              One of ('@clean','@edit','@file','@nosent').
+            progress=None     A callable, called after importing each file with
+                              (n_imported_files, n_files, path).
             recursive=True    True: recurse into subdirectories.
             safe_at_file=True True: produce @@file nodes instead of @file nodes.
             theTypes=None     A list of file extensions to import.
                               None is equivalent to ['.py']
             verbose=False     True: report imported directories.
+            workers=None      The number of worker processes that read and split files.
+                              None: use @int recursive-import-workers.
 
         This method cleans imported files as follows:
 
@@ -5006,10 +5027,12 @@ class Commands:
                 dir_=dir_,
                 ignore_pattern=ignore_pattern,
                 kind=kind,
+                progress=progress,
                 recursive=recursive,
                 safe_at_file=safe_at_file,
                 theTypes=['.py'] if not theTypes else theTypes,
                 verbose=verbose,
+                workers=workers,
             )
             cc.run(dir_)
         except AssertionError:
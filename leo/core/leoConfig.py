@@ -75,6 +75,8 @@ class ParserBaseClass:
         # True if this is the .leo file being opened, not myLeoSettings.leo or leoSettings.leo.
         self.localFlag: bool = localFlag
         self.shortcutsDict: dict[str, list[g.BindingInfo]] = g.SettingsDict('parser.shortcutsDict')
+        # Keys are the names of environment variables tested by @ifenv, values are their values.
+        self.environ: dict[str, Optional[str]] = {}
         # A list of dicts containing 'name','shortcut','command' keys.
         self.openWithList: list[dict[str, Value]] = []
         # Keys are canonicalized names.
@@ -305,7 +307,7 @@ class ParserBaseClass:
         if not aList:
             return 'skip'
         name = aList[0]
-        env = os.getenv(name)
+        env = self.environ[name] = os.getenv(name)
         env = env.lower().strip() if env else 'none'
         for s in aList[1:]:
             if s.lower().strip() == env:
@@ -6,14 +6,18 @@ from __future__ import annotations
 from collections.abc import Callable
 import getpass
 import os
+import stat
+import struct
 import subprocess
+import sys
 import tempfile
 from typing import Any, Optional, TYPE_CHECKING
 from leo.core import leoGlobals as g
+from leo.core.leoIndex import unique_vnodes
 
 if TYPE_CHECKING:  # pragma: no cover
     from leo.core.leoCommands import Commands as Cmdr
-    from leo.core.leoNodes import Position
+    from leo.core.leoNodes import Position, VNode
     Value = Any
     Widget = Any  # 'Any' is the correct annotation for base class widgets.
 #@-<< leoExternalFiles imports & annotations >>
@@ -45,6 +49,219 @@ class ExternalFile:
         """Return True if the external file still exists."""
         return g.os_path_exists(self.path)
     #@-others
+#@+node:ekr.20261018183010.1: ** class AtFileRegistry
+class AtFileRegistry:
+    """
+    A registry of the @<file> nodes of an outline and the full paths of
+    their external files.
+
+    The registry rescans the outline only when the outline's structure or
+    some headline changes: v._addLink, v._addCopiedLink, v._cutLink and
+    v._deleteAllChildren increment c.frame.tree.generation and
+    v.setHeadString increments c.frame.tree.headline_generation.
+
+    The path of an @<file> node depends only on the headlines and bodies
+    of the node and its ancestors. The registry recomputes a path only
+    when one of those strings changes. Like leoIndex.py, the registry
+    compares strings by identity.
+    """
+
+    def __init__(self, c: Cmdr) -> None:
+        self.c = c
+        # A list of (p, path, strings) tuples, in outline order.
+        # strings is a tuple of (v, v._headString, v._bodyString) tuples
+        # for p and all of p's ancestors.
+        self.entries: list[tuple[Position, str, tuple[tuple[VNode, str, str], ...]]] = []
+        self.key: tuple[int, int, str] = None
+
+    #@+others
+    #@+node:ekr.20261018183010.2: *3* registry.files
+    def files(self) -> list[tuple[Position, str]]:
+        """Return a list of (p, path) tuples for all @<file> nodes of the outline."""
+        c = self.c
+        tree = c.frame.tree
+        key = (tree.generation, tree.headline_generation, c.fileName())
+        if key != self.key:
+            self.key = key
+            self.rescan()
+        else:
+            entries = self.entries
+            for i, (p, path, strings) in enumerate(entries):
+                if not all(v._headString is h and v._bodyString is b for v, h, b in strings):
+                    if not c.positionExists(p):
+                        # Code changed the outline without calling v._addLink or v._cutLink.
+                        self.rescan()
+                        break
+                    entries[i] = self.make_entry(p)
+        return [(p, path) for p, path, strings in self.entries]
+    #@+node:ekr.20261018183010.3: *3* registry.make_entry & rescan
+    def make_entry(self, p: Position) -> tuple[Position, str, tuple[tuple[VNode, str, str], ...]]:
+        """Return the registry entry for p."""
+        strings = tuple((z.v, z.v._headString, z.v._bodyString) for z in p.self_and_parents(copy=False))
+        return p, self.c.fullPath(p), strings
+
+    def rescan(self) -> None:
+        """
+        Find all @<file> nodes of the outline.
+
+        Recompute only the paths of changed or moved nodes.
+        """
+        c = self.c
+        old_d = {entry[0].v: entry for entry in self.entries}
+        entries = []
+        for v in unique_vnodes(c):
+            if not v.isAnyAtFileNode():
+                continue
+            p = c.positionIndex.find_vnode(v)
+            if not p:
+                continue
+            entry = old_d.get(v)
+            if (
+                entry and entry[0] == p
+                and all(v2._headString is h and v2._bodyString is b for v2, h, b in entry[2])
+            ):
+                entries.append(entry)
+            else:
+                entries.append(self.make_entry(p))
+        entries.sort(key=lambda entry: entry[0].sort_key(entry[0]))
+        self.entries = entries
+    #@-others
+#@+node:ekr.20261018183010.4: ** class InotifyWatcher
+class InotifyWatcher:
+    """
+    Watch directories for changed files using Linux's inotify API.
+
+    The watcher uses ctypes to call libc. It never blocks: the
+    ExternalFilesController reads pending events at idle time.
+
+    The watcher watches directories, not files, because many editors
+    replace files instead of rewriting them.
+    """
+
+    # Constants from <sys/inotify.h>.
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x1000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    event_mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    event_format = 'iIII'  # wd, mask, cookie, len.
+
+    def __init__(self) -> None:
+        self.fd = -1
+        self.failed = False  # True if inotify is not available.
+        self.libc: Any = None
+        # Keys are directories, values are (wd, tag) tuples.
+        self.directories: dict[str, tuple[int, int]] = {}
+        # Keys are watch descriptors, values are directories.
+        self.wd_d: dict[int, str] = {}
+
+    #@+others
+    #@+node:ekr.20261018183010.5: *3* watcher.start & stop
+    def start(self) -> bool:
+        """Create the inotify instance. Return True if inotify is available."""
+        if self.fd >= 0:
+            return True
+        if self.failed or not sys.platform.startswith('linux'):
+            self.failed = True
+            return False
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        except (AttributeError, ImportError, OSError):
+            fd = -1
+        if fd < 0:
+            self.failed = True
+            return False
+        self.fd, self.libc = fd, libc
+        return True
+
+    def stop(self) -> None:
+        """Close the inotify instance, removing all watches."""
+        if self.fd >= 0:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+        self.fd = -1
+        self.directories.clear()
+        self.wd_d.clear()
+    #@+node:ekr.20261018183010.6: *3* watcher.watch & since
+    def watch(self, directory: str, tag: int) -> bool:
+        """
+        Watch the given directory, associating the tag with the watch.
+
+        Return False if the directory can not be watched, say because
+        inotify is not available or the user's watch limit is exhausted.
+        """
+        if directory in self.directories:
+            return True
+        if not self.start():
+            return False
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), self.event_mask | self.IN_ONLYDIR)
+        if wd < 0:
+            return False
+        self.directories[directory] = wd, tag
+        self.wd_d[wd] = directory
+        return True
+
+    def since(self, directory: str) -> Optional[int]:
+        """Return the tag given when the watcher started watching directory, or None."""
+        data = self.directories.get(directory)
+        return data[1] if data else None
+    #@+node:ekr.20261018183010.7: *3* watcher.read
+    def read(self) -> Optional[list[str]]:
+        """
+        Return the list of the paths of all files changed since the last read.
+
+        Return None if the watcher may have missed events.
+        """
+        if self.fd < 0:
+            return []
+        data = b''
+        while True:
+            try:
+                chunk = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.stop()
+                return None
+            if not chunk:
+                break
+            data += chunk
+        result: list[str] = []
+        missed = False
+        i, size = 0, struct.calcsize(self.event_format)
+        while i + size <= len(data):
+            wd, mask, _cookie, n = struct.unpack_from(self.event_format, data, i)
+            name = data[i + size : i + size + n].rstrip(b'\0')
+            i += size + n
+            if mask & self.IN_Q_OVERFLOW:
+                missed = True
+                continue
+            directory = self.wd_d.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_IGNORED:
+                # The directory no longer exists.
+                del self.wd_d[wd]
+                self.directories.pop(directory, None)
+                missed = True
+            elif name:
+                result.append(os.path.join(directory, os.fsdecode(name)))
+        return None if missed else result
+    #@-others
 #@+node:ekr.20150405073203.1: ** class ExternalFilesController
 class ExternalFilesController:
     """
@@ -84,6 +301,23 @@ class ExternalFilesController:
         # DO NOT alter directly, use set_time(path) and
         # get_time(path), see set_time() for notes.
         self._time_d: dict[str, float] = {}
+        # Keys are real paths, values are file sizes.
+        self.size_d: dict[str, int] = {}
+        # Paths whose checksums efc.idle_hash_files will compute.
+        self.unhashed_paths: list[str] = []
+        # Keys are paths, values are real paths.
+        self.realpath_d: dict[str, str] = {}
+        # Keys are commanders, values are AtFileRegistry instances.
+        self.registry_d: dict[Cmdr, AtFileRegistry] = {}
+        # For efc.idle_check_commander.
+        self.check_count = 0
+        # Keys are commanders, values are the check_count of their last check.
+        self.checked_d: dict[Cmdr, int] = {}
+        # Keys are real paths, values are the check_count of their last watcher event.
+        self.event_d: dict[str, int] = {}
+        # The real paths of all files in efc.event_d.
+        self.watched_paths: set[str] = set()
+        self.watcher = InotifyWatcher()
         self.yesno_all_answer: str = None  # answer, 'yes-all', or 'no-all'
         g.app.idleTimeManager.add_callback(self.on_idle)
     #@+node:ekr.20150405105938.1: *3* efc.entries
@@ -110,6 +344,10 @@ class ExternalFilesController:
         for ef in files:
             self.destroy_temp_file(ef)
         self.files = [z for z in self.files if z.path not in paths]
+        for c in list(self.registry_d):
+            if c.frame == frame:
+                del self.registry_d[c]
+                self.checked_d.pop(c, None)
     #@+node:ekr.20150407141838.1: *4* efc.find_path_for_node (called from vim.py)
     def find_path_for_node(self, p: Position) -> Optional[str]:
         """
@@ -162,6 +400,7 @@ class ExternalFilesController:
                 z for z in g.app.commanders() if self.is_enabled(z)
             ]
             self.unchecked_files = [z for z in self.files if z.exists()]
+        self.idle_hash_files()
     #@+node:ekr.20150404045115.1: *5* efc.idle_check_commander
     def idle_check_commander(self, c: Cmdr) -> None:
         """
@@ -171,13 +410,24 @@ class ExternalFilesController:
         # #1240: Check the .leo file itself.
         self.idle_check_leo_file(c)
 
-        # #1100: always scan the entire file for @<file> nodes.
+        # The watcher reports changes to watched files.
+        # Check only the changed files and files that are not watched.
+        self.check_count += 1
+        self.read_watcher_events()
+        last_check = self.checked_d.get(c)
+        self.checked_d[c] = self.check_count
+
+        # #1100: The registry contains all @<file> nodes of the outline.
         # #1134: Nested @<file> nodes are no longer valid, but this will do no harm.
+        registry = self.get_registry(c)
+        key = registry.key
+        files = registry.files()
+        if registry.key != key:
+            self.realpath_d.clear()  # Symbolic links may have changed.
         state = 'no'
-        for p in c.all_unique_positions():
-            if not p.isAnyAtFileNode():
+        for p, path in files:
+            if self.is_unchanged(path, last_check):
                 continue
-            path = c.fullPath(p)
             if not self.has_changed(path):
                 continue
             # Prevent further checks for path.
@@ -213,6 +463,41 @@ class ExternalFilesController:
             # Do a complete restart of Leo.
             g.app.loadManager.revertCommander(c)
             g.es_print(f"reloaded {path}")
+    #@+node:ekr.20261018183010.8: *5* efc.idle_hash_files
+    hash_batch_size = 10
+
+    def idle_hash_files(self) -> None:
+        """
+        Compute the checksums of a few of the files that efc.has_changed
+        has seen for the first time.
+
+        Delaying the checksums spreads the cost of reading the files over
+        many idle-time passes.
+        """
+        paths = self.unhashed_paths[: self.hash_batch_size]
+        del self.unhashed_paths[: self.hash_batch_size]
+        for path in paths:
+            if path in self.checksum_d:
+                continue
+            realpath = self.realpath(path)
+            try:
+                st = os.stat(path)
+            except (OSError, ValueError):
+                continue
+            # Don't hide changes made after efc.has_changed saw the file.
+            if (st.st_mtime, st.st_size) == (self._time_d.get(realpath), self.size_d.get(realpath)):
+                self.checksum_d[path] = self.checksum(path)
+    #@+node:ekr.20261018183010.9: *5* efc.read_watcher_events
+    def read_watcher_events(self) -> None:
+        """Record the check_count of all changes that the watcher reports."""
+        paths = self.watcher.read()
+        if paths is None:
+            # The watcher may have missed changes. Check all files.
+            self.checked_d.clear()
+            return
+        for path in paths:
+            if path in self.watched_paths:
+                self.event_d[path] = self.check_count
     #@+node:ekr.20150407124259.1: *5* efc.idle_check_open_with_file & helper
     def idle_check_open_with_file(self, c: Cmdr, ef: ExternalFile) -> None:
         """Update the open-with node given by ef."""
@@ -493,6 +778,7 @@ class ExternalFilesController:
         for ef in self.files[:]:
             self.destroy_temp_file(ef)
         self.files = []
+        self.watcher.stop()
     #@+node:ekr.20150405110219.1: *3* efc.utilities
 
     #@+node:ekr.20150405200212.1: *4* efc.ask
@@ -558,6 +844,13 @@ class ExternalFilesController:
     def get_mtime(self, path: str) -> float:
         """Return the modification time for the path."""
         return g.os_path_getmtime(g.os_path_realpath(path))
+    #@+node:ekr.20261018183010.10: *4* efc.get_registry
+    def get_registry(self, c: Cmdr) -> AtFileRegistry:
+        """Return the registry of c's @<file> nodes, creating it if necessary."""
+        registry = self.registry_d.get(c)
+        if registry is None:
+            registry = self.registry_d[c] = AtFileRegistry(c)
+        return registry
     #@+node:ekr.20150405122428.1: *4* efc.get_time
     def get_time(self, path: str) -> float:
         """
@@ -565,32 +858,43 @@ class ExternalFilesController:
 
         see set_time() for notes
         """
-        return self._time_d.get(g.os_path_realpath(path))
+        return self._time_d.get(self.realpath(path))
     #@+node:ekr.20150403045207.1: *4* efc.has_changed
     def has_changed(self, path: str) -> bool:
         """Return True if the file at path has changed outside of Leo."""
         if not path:
             return False
-        if not g.os_path_exists(path):
-            return False
-        if g.os_path_isdir(path):
-            return False
         if path.endswith('.db'):
             return False
 
-        # First, check the modification times.
-        old_time = self.get_time(path)
-        new_time = self.get_mtime(path)
+        # First, stat the file. Never hash unless the modification times differ.
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            return False
+        if stat.S_ISDIR(st.st_mode):
+            return False
+        realpath = self.realpath(path)
+        old_time = self._time_d.get(realpath)
+        new_time = st.st_mtime
         if not old_time:
-            # Initialize.
-            self.set_time(path, new_time)
-            self.checksum_d[path] = self.checksum(path)
+            # Initialize. efc.idle_hash_files computes the checksum later.
+            self._time_d[realpath] = new_time
+            self.size_d[realpath] = st.st_size
+            if path not in self.checksum_d:
+                self.unhashed_paths.append(path)
             return False
         if old_time == new_time:
             return False
+        if self.size_d.get(realpath, st.st_size) != st.st_size:
+            # The file has really changed.
+            return True
 
         # Check the checksums *only* if the mod times don't match.
         old_sum = self.checksum_d.get(path)
+        if old_sum is None:
+            # The file changed before efc.idle_hash_files computed its checksum.
+            return True
         new_sum = self.checksum(path)
         if new_sum == old_sum:
             # The modtime changed, but its contents didn't.
@@ -610,10 +914,38 @@ class ExternalFilesController:
             val = c.config.getBool('check-for-changed-external-files', default=False)
             d[c] = val
         return val
+    #@+node:ekr.20261018183010.11: *4* efc.is_unchanged
+    def is_unchanged(self, path: str, last_check: Optional[int]) -> bool:
+        """
+        Return True if the watcher has reported no changes to path since
+        the check given by last_check.
+
+        Start watching path's directory if necessary.
+        """
+        realpath = self.realpath(path)
+        directory = os.path.dirname(realpath)
+        since = self.watcher.since(directory)
+        if since is None:
+            if self.watcher.watch(directory, self.check_count):
+                self.watched_paths.add(realpath)
+            return False
+        if realpath not in self.watched_paths:
+            self.watched_paths.add(realpath)
+            return False
+        if last_check is None or since >= last_check:
+            return False
+        return self.event_d.get(realpath, 0) < last_check
     #@+node:ekr.20150404083049.1: *4* efc.join
     def join(self, s1: str, s2: str) -> str:
         """Return s1 + ' ' + s2"""
         return f"{s1} {s2}"
+    #@+node:ekr.20261018183010.12: *4* efc.realpath
+    def realpath(self, path: str) -> str:
+        """Return the cached real path of path."""
+        realpath = self.realpath_d.get(path)
+        if realpath is None:
+            realpath = self.realpath_d[path] = g.os_path_realpath(path)
+        return realpath
     #@+node:tbrown.20150904102518.1: *4* efc.set_time
     def set_time(self, path: str, new_time: float = None) -> None:
         """
@@ -626,8 +958,17 @@ class ExternalFilesController:
         probably not Leo's fault but an underlying Python issue.
         Hence the need to call realpath() here.
         """
-        t = new_time or self.get_mtime(path)
-        self._time_d[g.os_path_realpath(path)] = t
+        realpath = self.realpath(path)
+        if new_time:
+            self._time_d[realpath] = new_time
+            return
+        try:
+            st = os.stat(realpath)
+        except (OSError, ValueError):
+            st = None
+        self._time_d[realpath] = st.st_mtime if st else self.get_mtime(path)
+        if st:
+            self.size_d[realpath] = st.st_size
     #@+node:ekr.20190218055230.1: *4* efc.warn
     def warn(self, c: Cmdr, path: str, p: Position) -> None:
         """
@@ -5,6 +5,7 @@
 #@+node:ekr.20050405141130: ** << leoFileCommands imports >>
 from __future__ import annotations
 import binascii
+import codecs
 from collections import defaultdict
 from collections.abc import Callable
 from datetime import datetime
@@ -25,6 +26,7 @@ import xml.sax
 import xml.sax.saxutils
 from leo.core import leoGlobals as g
 from leo.core import leoNodes
+from leo.core import leoSnapshot
 #@-<< leoFileCommands imports >>
 #@+<< leoFileCommands annotations >>
 #@+node:ekr.20220819121640.1: ** << leoFileCommands annotations >>
@@ -102,8 +104,7 @@ class FastRead:
     #@+node:ekr.20180604110143.1: *3* fast.readFile
     def readFile(self, theFile: IO, path: str) -> VNode:
         """Read the file, change splitter ratios, and return its hidden vnode."""
-        s = theFile.read()
-        v, _g_element = self.readWithElementTree(path, s)
+        v = self.readWithIterParse(path, theFile)
         if not v:  # #1510.
             return None
         # #1047: only this method changes splitter sizes.
@@ -116,6 +117,27 @@ class FastRead:
             v.children = [new_vnode]
         return v
 
+    #@+node:ekr.20261018140211.10: *3* fast.readSnapshot
+    def readSnapshot(self, path: str) -> Optional[VNode]:
+        """
+        Load the snapshot of the .leo file at the given path, change splitter
+        ratios, and return its hidden vnode.
+
+        Return None if the snapshot does not exist or is stale.
+        """
+        v = leoSnapshot.read_snapshot(self, path)
+        if not v:
+            return None
+        self.handleBits()
+        # #1047: only this method changes splitter sizes.
+        self.scanGlobals()
+        #
+        # #1111: ensure that all outlines have at least one node.
+        if not v.children:
+            new_vnode = leoNodes.VNode(context=self.c)
+            new_vnode.h = 'newHeadline'
+            v.children = [new_vnode]
+        return v
     #@+node:felix.20220618164929.1: *3* fast.readJsonFile
     def readJsonFile(self, theFile: IO, path: str) -> Optional[VNode]:
         """Read the leojs JSON file, change splitter ratios, and return its hidden vnode."""
@@ -140,7 +162,7 @@ class FastRead:
 
         Unlike readFile above, this does not affect splitter sizes.
         """
-        hidden_v, _g_element = self.readWithElementTree(path=None, s_or_b=s_or_b)
+        hidden_v = self.readWithIterParse(path=None, source=s_or_b)
         if not hidden_v:
             return None
         #
@@ -164,18 +186,7 @@ class FastRead:
         try:
             xroot = ElementTree.fromstring(contents)
         except Exception:
-            message = None
-            if path and path in self.bad_path_dict:
-                return None, None
-            if path:
-                self.bad_path_dict[path] = True
-                message = f"bad .leo file: {g.shortFileName(path)}"
-                g.es_exception()
-            else:
-                message = 'The clipboard is not a valid .leo file'
-            print('')
-            g.es_print(message, color='red')
-            print('')
+            self.reportBadLeoFile(path)
             return None, None
 
         g_element: Element = xroot.find('globals')
@@ -195,6 +206,20 @@ class FastRead:
         marked = marked.split(',') if marked else []
         fc.descendentExpandedList = expanded
         fc.descendentMarksList = marked
+    #@+node:ekr.20261018114210.1: *4* fast.reportBadLeoFile
+    def reportBadLeoFile(self, path: Optional[str]) -> None:
+        """Report a .leo file (or clipboard contents) that could not be parsed."""
+        if path and path in self.bad_path_dict:
+            return
+        if path:
+            self.bad_path_dict[path] = True
+            message = f"bad .leo file: {g.shortFileName(path)}"
+            g.es_exception()
+        else:
+            message = 'The clipboard is not a valid .leo file'
+        print('')
+        g.es_print(message, color='red')
+        print('')
     #@+node:ekr.20180606041211.1: *4* fast.resolveUa
     def resolveUa(self, attr: str, val: Value, kind: str = None) -> Value:
         # Kind is for unit testing.
@@ -397,6 +422,60 @@ class FastRead:
         # Traverse the tree of v elements.
         v_element_visitor(v_elements, hidden_v)
         return hidden_v
+    #@+node:ekr.20261018114210.2: *3* fast.readWithIterParse & helpers
+    chunk_size = 1 << 16
+
+    def readWithIterParse(self, path: Optional[str], source: Union[str, bytes, IO]) -> Optional[VNode]:
+        """
+        Read a .leo file incrementally from source, a string or a binary file.
+
+        Unlike readWithElementTree, this method never holds the entire file or
+        any element tree in memory. A FastReadTarget creates vnodes as the
+        parser reports <v> elements and sets bodies as it reports <t> elements.
+
+        The results are the same as the results of readWithElementTree,
+        including the handling of <v> elements without a 't' attribute (#1581):
+        each such element creates a new vnode with a new gnx.
+
+        If the parse fails, this method restores fc.gnxDict, which the VNode
+        ctor changes, and leaves self.gnx2vnode and all existing vnodes unchanged.
+
+        Return the hidden root vnode or None.
+        """
+        target = FastReadTarget(self)
+        parser = ElementTree.XMLParser(target=target)
+        try:
+            for chunk in self.iterChunks(source):
+                parser.feed(chunk)
+            parser.close()
+        except Exception:
+            target.rollback()
+            self.reportBadLeoFile(path)
+            return None
+        target.commit()
+        self.handleBits()
+        return target.hidden_v
+    #@+node:ekr.20261018114210.6: *4* fast.iterChunks
+    def iterChunks(self, source: Union[str, bytes, IO]) -> Iterable[str]:
+        """
+        Yield the contents of source, a string or a binary file, as a sequence
+        of strings, removing all invalid control characters.
+        """
+        n = self.chunk_size
+        if isinstance(source, str):
+            table = source.maketrans(self.translate_dict)  # type:ignore #1510.
+            for i in range(0, len(source), n):
+                yield source[i : i + n].translate(table)
+            return
+        if isinstance(source, bytes):
+            chunks = (source[i : i + n] for i in range(0, len(source), n))
+        else:
+            chunks = iter(lambda: source.read(n), b'')  # type:ignore
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        table = ''.maketrans(self.translate_dict)  # type:ignore #1510.
+        for chunk in chunks:
+            yield decoder.decode(chunk).translate(table)
+        yield decoder.decode(b'', final=True)
     #@+node:felix.20220621221215.1: *3* fast.readFileFromJsonClipboard
     def readFileFromJsonClipboard(self, s: str) -> VNode:
         """
@@ -574,6 +653,185 @@ class FastRead:
         fc.descendentTnodeUaDictList.append(gnx2ua)
         return hidden_v
     #@-others
+#@+node:ekr.20261018114210.11: ** class FastReadTarget
+class FastReadTarget:
+    """
+    The parser target for fast.readWithIterParse.
+
+    The parser calls the start, data and end methods as it reads each element.
+    No element trees exist.
+    """
+
+    def __init__(self, reader: FastRead) -> None:
+        self.reader = reader
+        self.c = c = reader.c
+        self.fc = fc = c.fileCommands
+        # The previous values of all fc.gnxDict entries that the VNode ctor changes.
+        self.replaced: dict[str, Optional[VNode]] = {
+            'hidden-root-vnode-gnx': fc.gnxDict.get('hidden-root-vnode-gnx'),
+        }
+        # The hidden root vnode.
+        self.hidden_v = hidden_v = leoNodes.VNode(context=c, gnx='hidden-root-vnode-gnx')
+        hidden_v._headString = '<hidden root vnode>'
+        # Vnodes created by this read. Keys are gnxs.
+        self.new_vnodes: dict[Optional[str], VNode] = {'hidden-root-vnode-gnx': hidden_v}
+        # Clones of vnodes that existed before this read.
+        self.old_vnodes: dict[str, VNode] = {}  # Keys are gnxs.
+        self.old_bodies: dict[str, str] = {}  # Keys are gnxs.
+        self.old_links: list[tuple[VNode, VNode]] = []  # (parent, child)
+        # <t> elements that precede their <v> elements.
+        self.early_bodies: dict[str, str] = {}
+        self.early_uas: dict[str, dict[str, Value]] = {}
+        # The non-empty vnode uA's of new vnodes. Keys are gnxs.
+        self.v_uas: dict[Optional[str], dict[str, Value]] = {}
+        # The vnodes of all open <v> elements. The vnode is None for
+        # <v> elements within the <v> element of a clone.
+        self.vnodes: list[Optional[VNode]] = [hidden_v]
+        # The text of the open <vh> or <t> element.
+        self.text: Optional[list[str]] = None
+        # The attributes of the open <t> element.
+        self.t_attrib: dict[str, str] = {}
+
+    #@+others
+    #@+node:ekr.20261018114210.12: *3* target.start
+    def start(self, tag: str, attrib: dict[str, str]) -> None:
+        """Handle the start of an element."""
+        if tag == 'v':
+            self.start_v(attrib)
+        elif tag == 'vh':
+            self.text = []
+        elif tag == 't':
+            self.text = []
+            self.t_attrib = attrib
+    #@+node:ekr.20261018114210.3: *4* target.start_v
+    def start_v(self, d: dict[str, str]) -> None:
+        """Link the vnode for a <v> element to its parent vnode."""
+        parent_v = self.vnodes[-1]
+        if parent_v is None:
+            self.vnodes.append(None)
+            return
+        # #1581: Attempt to handle old Leo outlines.
+        gnx = d.get('t')
+        v = None
+        if gnx is not None:
+            v = self.new_vnodes.get(gnx) or self.old_vnodes.get(gnx)
+            if not v:
+                v = self.reader.gnx2vnode.get(gnx)
+                if v:
+                    self.old_vnodes[gnx] = v
+        if v:
+            # A clone. Ignore all inner elements.
+            parent_v.children.append(v)
+            if gnx in self.old_vnodes:
+                self.old_links.append((parent_v, v))
+                self.old_bodies[gnx] = self.early_bodies.get(gnx, '')
+            else:
+                v.parents.append(parent_v)
+                v._bodyString = self.early_bodies.get(gnx, '')
+            self.vnodes.append(None)
+            return
+        if gnx is not None and gnx not in self.replaced:
+            self.replaced[gnx] = self.fc.gnxDict.get(gnx)
+        v = leoNodes.VNode(context=self.c, gnx=gnx)
+        self.new_vnodes[gnx] = v
+        parent_v.children.append(v)
+        v.parents.append(parent_v)
+        v._headString = 'PLACE HOLDER'
+        if self.early_bodies:
+            v._bodyString = self.early_bodies.get(gnx, '')
+        # Legacy <v> elements may have attributes but no 't' attribute.
+        if self.early_uas or any(key != 't' for key in d):
+            self.handle_v_attributes(d, gnx, v)
+        self.vnodes.append(v)
+    #@+node:ekr.20261018114210.4: *4* target.handle_v_attributes
+    def handle_v_attributes(self, d: dict[str, str], gnx: Optional[str], v: VNode) -> None:
+        """Handle all attributes of a <v> element other than 't'."""
+        fc, reader = self.fc, self.reader
+        # FastRead.nativeVnodeAttributes defines the native attributes of <v> elements.
+        s = d.get('descendentTnodeUnknownAttributes')
+        if s:
+            aDict = fc.getDescendentUnknownAttributes(s, v=v)
+            if aDict:
+                fc.descendentTnodeUaDictList.append(aDict)
+        s = d.get('descendentVnodeUnknownAttributes')
+        if s:
+            aDict = fc.getDescendentUnknownAttributes(s, v=v)
+            if aDict:
+                fc.descendentVnodeUaDictList.append((v, aDict),)
+        # Handle vnode uA's. They override tnode uA's.
+        uaDict = {
+            key: reader.resolveUa(key, val)
+            for key, val in d.items() if key not in reader.nativeVnodeAttributes
+        }
+        if uaDict:
+            self.v_uas[gnx] = uaDict
+        uaDict = {**self.early_uas.get(gnx, {}), **uaDict}
+        if uaDict:
+            v.unknownAttributes = uaDict
+    #@+node:ekr.20261018114210.13: *3* target.data
+    def data(self, s: str) -> None:
+        """Accumulate the text of <vh> and <t> elements."""
+        if self.text is not None:
+            self.text.append(s)
+    #@+node:ekr.20261018114210.14: *3* target.end
+    def end(self, tag: str) -> None:
+        """Handle the end of an element."""
+        if tag == 'v':
+            self.vnodes.pop()
+        elif tag == 'vh':
+            v = self.vnodes[-1]
+            if v:
+                v._headString = ''.join(self.text)
+            self.text = None
+        elif tag == 't':
+            self.end_t(''.join(self.text))
+            self.text = None
+    #@+node:ekr.20261018114210.5: *4* target.end_t
+    def end_t(self, body: str) -> None:
+        """Set the body and tnode uA's of the vnode for a <t> element."""
+        d = self.t_attrib
+        gnx = d['tx']
+        t_ua: dict[str, Value] = {}
+        if len(d) > 1:
+            for key, val in d.items():
+                if key != 'tx':
+                    ua = self.reader.resolveUa(key, val)
+                    if ua:
+                        t_ua[key] = ua
+        v = self.new_vnodes.get(gnx)
+        if v:
+            v._bodyString = body
+            v_ua = self.v_uas.get(gnx)
+            uaDict = {**t_ua, **v_ua} if v_ua else t_ua
+            if uaDict:
+                v.unknownAttributes = uaDict
+        elif gnx in self.old_vnodes:
+            self.old_bodies[gnx] = body
+        else:
+            self.early_bodies[gnx] = body
+            if t_ua:
+                self.early_uas[gnx] = t_ua
+    #@+node:ekr.20261018114210.15: *3* target.close
+    def close(self) -> None:
+        """Called by the parser at the end of the document."""
+    #@+node:ekr.20261018114210.16: *3* target.commit & rollback
+    def commit(self) -> None:
+        """Change existing vnodes and the reader's gnx2vnode dict after a successful read."""
+        for gnx, body in self.old_bodies.items():
+            self.old_vnodes[gnx]._bodyString = body
+        for parent_v, v in self.old_links:
+            v.parents.append(parent_v)
+        self.reader.gnx2vnode.update(self.new_vnodes)  # type:ignore
+
+    def rollback(self) -> None:
+        """Undo all changes to fc.gnxDict after a failed read."""
+        gnxDict = self.fc.gnxDict
+        for gnx, old_v in self.replaced.items():
+            if old_v is None:
+                gnxDict.pop(gnx, None)
+            else:
+                gnxDict[gnx] = old_v
+    #@-others
 #@+node:ekr.20160514120347.1: ** class FileCommands
 class FileCommands:
     """A class creating the FileCommands subcommander."""
@@ -609,6 +867,7 @@ class FileCommands:
         self.read_only = False
         self.rootPosition: Position = None
         self.outputFile: io.StringIO = None
+        self.snapshotRecorder: leoSnapshot.SnapshotRecorder = None
         self.usingClipboard = False
         self.currentPosition: Position = None
         # New in 3.12...
@@ -786,9 +1045,9 @@ class FileCommands:
         if not parent:
             return True
         parents = list(parent.self_and_parents())
-        for p in p.self_and_subtree(copy=False):
+        for v in p.nodes():
             for z in parents:
-                if p.v == z.v:
+                if v == z.v:
                     g.warning('Invalid paste: nodes may not descend from themselves')
                     return False
         return True
@@ -887,8 +1146,7 @@ class FileCommands:
     def reassignAllIndices(self, p: Position) -> None:
         """Reassign all indices in p's subtree."""
         ni = g.app.nodeIndices
-        for p2 in p.self_and_subtree(copy=False):
-            v = p2.v
+        for v in p.nodes():
             index = ni.getNewIndex(v)
             if 'gnx' in g.app.debug:
                 g.trace('**reassigning**', index, v)
@@ -982,6 +1240,10 @@ class FileCommands:
                 with open(path, 'rb') as theFile:
                     if path.endswith('.leojs'):
                         v = FastRead(c, self.gnxDict).readJsonFile(theFile, path)
+                    elif c.config.getBool('use-outline-snapshots'):
+                        # Fall back to the .leo file if the snapshot is stale.
+                        fast = FastRead(c, self.gnxDict)
+                        v = fast.readSnapshot(path) or fast.readFile(theFile, path)
                     else:
                         v = FastRead(c, self.gnxDict).readFile(theFile, path)
             except IOError as e:
@@ -1235,9 +1497,9 @@ class FileCommands:
     #@+node:ekr.20100124110832.6212: *5* fc.propagateDirtyNodes
     def propagateDirtyNodes(self) -> None:
         c = self.c
-        aList = [z for z in c.all_positions() if z.isDirty()]
-        for p in aList:
-            p.setAllAncestorAtFileNodesDirty()
+        for v in c.all_unique_nodes():
+            if v.isDirty():
+                v.setAllAncestorAtFileNodesDirty()
     #@+node:ekr.20080805132422.3: *5* fc.resolveArchivedPosition
     def resolveArchivedPosition(
         self,
@@ -1647,7 +1909,7 @@ class FileCommands:
                     'vnodes': [
                         self.leojs_vnode(sp, gnxSet)
                     ],
-                    'tnodes': {p.v.gnx: p.v._bodyString for p in sp.self_and_subtree() if p.v._bodyString}
+                    'tnodes': {v.gnx: v._bodyString for v in sp.nodes() if v._bodyString}
                 }
 
         else:  # write everything from the top node 'c.rootPosition()'
@@ -1753,12 +2015,22 @@ class FileCommands:
             g.es(f"can not open {fileName}")
             return False
         self.mFileName = fileName
+        # Record the outline for the snapshot. Other encodings may replace characters.
+        if c.config.getBool('use-outline-snapshots') and self.leo_file_encoding.lower() in ('utf-8', 'utf8'):
+            self.snapshotRecorder = leoSnapshot.SnapshotRecorder()
         try:
             s = self.outline_to_xml_string()
             # Write bytes.
-            f.write(bytes(s, self.leo_file_encoding, 'replace'))
+            b = bytes(s, self.leo_file_encoding, 'replace')
+            f.write(b)
             f.close()
             c.setFileTimeStamp(fileName)
+            if self.snapshotRecorder:
+                leoSnapshot.write_snapshot(self.snapshotRecorder, fileName, b)
+            if c.outlineIndex:
+                c.outlineIndex.save()
+            if c.symbolIndex:
+                c.symbolIndex.save()
             # Delete backup file.
             if backupName and g.os_path_exists(backupName):
                 self.deleteBackupFile(backupName)
@@ -1766,6 +2038,8 @@ class FileCommands:
         except Exception:
             self.handleWriteLeoFileException(fileName, backupName, f)
             return False
+        finally:
+            self.snapshotRecorder = None
     #@+node:ekr.20100119145629.6114: *5* fc.writeAllAtFileNodes
     def writeAllAtFileNodes(self) -> bool:
         """Write all @<file> nodes and set orphan bits."""
@@ -1957,6 +2231,8 @@ class FileCommands:
         ua = self.putUnknownAttributes(v)
         body = xml.sax.saxutils.escape(b or '', entities=self.entities)
         self.put(f'<t tx="{gnx}"{ua}>{body}</t>\n')
+        if self.snapshotRecorder:
+            self.snapshotRecorder.put_t(gnx, ua, b or '')
     #@+node:ekr.20031218072017.1575: *5* fc.put_t_elements
     def put_t_elements(self) -> None:
         """Put all <t> elements as required for copy or save commands"""
@@ -2052,12 +2328,17 @@ class FileCommands:
             v.setWriteBit()  # 4.2: Indicate we wrote the body text.
 
         attrs = fc.compute_attribute_bits(p)
+        recorder = fc.snapshotRecorder
         # Write the node.
         v_head = f'<v t="{gnx}"{attrs}>'
         if gnx in fc.vnodesDict:
             fc.put(v_head + '</v>\n')
+            if recorder:
+                recorder.put_clone(gnx)
         else:
             fc.vnodesDict[gnx] = True
+            if recorder:
+                recorder.start_v(gnx, attrs, p.v.headString() or '')
             h = xml.sax.saxutils.escape(p.v.headString() or '', entities=self.entities)
             v_head += f"<vh>{h}</vh>"
 
@@ -2077,6 +2358,8 @@ class FileCommands:
                 fc.put('</v>\n')
             else:
                 fc.put(f"{v_head}</v>\n")  # Call put only once.
+            if recorder:
+                recorder.end_v()
     #@+node:ekr.20031218072017.1865: *6* fc.compute_attribute_bits
     def compute_attribute_bits(self, p: Position) -> str:
         """Return the initial values of v's attributes."""
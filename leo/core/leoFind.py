@@ -5,6 +5,8 @@
 #@+node:ekr.20220415005856.1: ** << leoFind imports & annotations >>
 from __future__ import annotations
 from collections.abc import Callable
+import concurrent.futures
+import itertools
 import keyword
 import re
 import sys
@@ -12,6 +14,8 @@ import time
 from typing import Any, Generator, Optional, Union
 from typing import TYPE_CHECKING
 from leo.core import leoGlobals as g
+from leo.core import leoIndex
+from leo.core import leoSymbols
 
 if TYPE_CHECKING:  # pragma: no cover
     from leo.core.leoCommands import Commands as Cmdr
@@ -227,8 +231,17 @@ class LeoFind:
         self.minibuffer_mode = getBool('minibuffer-find-mode', default=False)
         self.reverse_find_defs = getBool('reverse-find-defs', default=False)
         self.prefer_nav_pane = getBool('prefer-nav-pane', default=True)
+        self.find_all_workers = c.config.getInt('find-all-workers') or 0
 
     reloadSettings = reload_settings  # Necessary alias.
+    #@+node:ekr.20261018152410.14: *4* find.search_options
+    def search_options(self) -> tuple:
+        """Return the picklable tuple of search options used by SearchEngine."""
+        return (
+            self.find_text, self.change_text,
+            self.ignore_case, self.pattern_match, self.whole_word,
+            self.search_headline, self.search_body,
+        )
     #@+node:ekr.20210108053422.1: *3* find.batch_change (script helper) & helpers
     def batch_change(self,
         root: Position,
@@ -570,15 +583,13 @@ class LeoFind:
         colorer = c.frame.body.colorizer
         if not colorer:
             return []
-        patterns = self._make_patterns(word)
-        matches = self._find_all_matches(patterns)
+        matches = self._find_defs(word)
         if g.unitTesting:
             return matches
         # Look for alternate matches only if there are no exact matches.
         if not matches:
             alt_word = self._switch_style(word)
-            patterns = self._make_patterns(alt_word)
-            matches = self._find_all_matches(patterns)
+            matches = self._find_defs(alt_word)
         if not matches:
             g.es(f"not found: {word!r}", color='red')
             return matches
@@ -731,6 +742,23 @@ class LeoFind:
         c.setChanged()
         found.expand()
         c.redraw(found)
+    #@+node:ekr.20261018160512.14: *6* find._find_defs
+    def _find_defs(self, word: str) -> list[tuple[int, Position, str]]:
+        """
+        Return a list of tuples (starting-index, p, matching-string) describing
+        the definitions of word.
+
+        Use the symbol index if it is enabled and knows of word. Otherwise,
+        search all nodes with the patterns of the language in effect.
+        """
+        c = self.c
+        index = leoSymbols.get_index(c)
+        if index and word:
+            matches = index.find_def(word, c.frame.body.colorizer.language)
+            if matches:
+                return matches
+        patterns = self._make_patterns(word)
+        return self._find_all_matches(patterns)
     #@+node:ekr.20240525172445.1: *6* find._make_patterns
     bad_regex_patterns: list[str] = []
 
@@ -1178,37 +1206,36 @@ class LeoFind:
             ok = self.compile_pattern()
             if not ok:
                 return 0
+        # Change each vnode once, using its first position.
         # #1428: Honor limiters in replace-all.
+        v2p: dict[VNode, Optional[Position]] = {}
         if self.node_only:
-            positions = [c.p]
+            v2p[c.p.v] = c.p
         elif self.suboutline_only:
-            positions = list(c.p.self_and_subtree())
+            for p in c.p.self_and_subtree():
+                v2p.setdefault(p.v, p)
         else:
-            positions = list(c.all_unique_positions())
+            # Compute positions only for changed vnodes.
+            v2p = dict.fromkeys(c.all_unique_nodes())
         count = 0
-        for p in positions:
-            count_h, count_b = 0, 0
+        engine = SearchEngine(self.search_options(), self.find_all_workers)
+        for v, count_h, new_h, count_b, new_b in engine.change_all(list(v2p)):
+            p = v2p[v] or c.positionIndex.find_vnode(v)
             undoData = u.beforeChangeNodeContents(p)
-            if self.search_headline:
-                count_h, new_h = self._change_all_search_and_replace(p.h)
-                if count_h:
-                    count += count_h
-                    p.h = new_h
-            if self.search_body:
-                count_b, new_b = self._change_all_search_and_replace(p.b)
-                if count_b:
-                    count += count_b
-                    p.b = new_b
-            # Check if there was at least one change with either body or headline
-            if count_h or count_b:
-                u.afterChangeNodeContents(p, 'Replace All', undoData)
-                # Also check to honor 'Mark Changes' option
-                if self.mark_changes and not p.isMarked():  # pragma: no cover
-                    markUndoType = 'Mark Changes'
-                    bunch = u.beforeMark(p, markUndoType)
-                    p.setMarked()
-                    p.setDirty()
-                    u.afterMark(p, markUndoType, bunch)
+            if count_h:
+                count += count_h
+                p.h = new_h
+            if count_b:
+                count += count_b
+                p.b = new_b
+            u.afterChangeNodeContents(p, 'Replace All', undoData)
+            # Also check to honor 'Mark Changes' option
+            if self.mark_changes and not p.isMarked():  # pragma: no cover
+                markUndoType = 'Mark Changes'
+                bunch = u.beforeMark(p, markUndoType)
+                p.setMarked()
+                p.setDirty()
+                u.afterMark(p, markUndoType, bunch)
 
         # suboutline-only is a one-shot for batch commands.
         self.ftm.set_radio_button('entire-outline')
@@ -1232,105 +1259,28 @@ class LeoFind:
 
         Return (found, new text)
         """
-        # This hack would be dangerous on MacOs: it uses '\r' instead of '\n' (!)
-        if sys.platform.lower().startswith('win'):
-            # Ignore '\r' characters, which may appear in @edit nodes.
-            # Fixes this bug: https://groups.google.com/forum/#!topic/leo-editor/yR8eL5cZpi4
-            s = s.replace('\r', '')
-        if not s:
-            return False, None
-        # Order matters: regex matches ignore whole-word.
-        if self.pattern_match:
-            return self._change_all_regex(s)
-        if self.whole_word:
-            return self._change_all_word(s)
-        return self._change_all_plain(s)
+        return change_all_in_string(s, self.search_options())
     #@+node:ekr.20190602151043.4: *7* find._change_all_plain
     def _change_all_plain(self, s: str) -> tuple[int, str]:
         """
         Perform all plain find/replace on s.
         return (count, new_s)
         """
-        find, change = self.find_text, self.change_text
-        # #1166: s0 and find0 aren't affected by ignore-case.
-        s0 = s
-        find0 = self.replace_back_slashes(find)
-        if self.ignore_case:
-            s = s0.lower()
-            find = find0.lower()
-        count, prev_i, result = 0, 0, []
-        while True:
-            progress = prev_i
-            # #1166: Scan using s and find.
-            i = s.find(find, prev_i)
-            if i == -1:
-                break
-            # #1166: Replace using s0 & change.
-            count += 1
-            result.append(s0[prev_i:i])
-            result.append(change)
-            prev_i = max(prev_i + 1, i + len(find))  # 2021/01/08 (!)
-            assert prev_i > progress, prev_i
-        # #1166: Complete the result using s0.
-        result.append(s0[prev_i:])
-        return count, ''.join(result)
+        return change_all_plain(s, self.find_text, self.change_text, self.ignore_case)
     #@+node:ekr.20190602151043.2: *7* find._change_all_regex
     def _change_all_regex(self, s: str) -> tuple[int, str]:
         """
         Perform all regex find/replace on s.
         return (count, new_s)
         """
-        count, prev_i, result = 0, 0, []
-
-        flags = re.MULTILINE
-        if self.ignore_case:
-            flags |= re.IGNORECASE
-        for m in re.finditer(self.find_text, s, flags):
-            count += 1
-            i = m.start()
-            result.append(s[prev_i:i])
-            # #1748.
-            groups = m.groups()
-            if groups:
-                change_text = self.make_regex_subs(self.change_text, groups)
-            else:
-                change_text = self.change_text
-            result.append(change_text)
-            prev_i = m.end()
-        # Compute the result.
-        result.append(s[prev_i:])
-        s = ''.join(result)
-        return count, s
+        return change_all_regex(s, self.find_text, self.change_text, self.ignore_case)
     #@+node:ekr.20190602155933.1: *7* find._change_all_word
     def _change_all_word(self, s: str) -> tuple[int, str]:
         """
         Perform all whole word find/replace on s.
         return (count, new_s)
         """
-        find, change = self.find_text, self.change_text
-        # #1166: s0 and find0 aren't affected by ignore-case.
-        s0 = s
-        find0 = self.replace_back_slashes(find)
-        if self.ignore_case:
-            s = s0.lower()
-            find = find0.lower()
-        count, prev_i, result = 0, 0, []
-        while True:
-            # #1166: Scan using s and find.
-            i = s.find(find, prev_i)
-            if i == -1:
-                break
-            # #1166: Replace using s0, change & find0.
-            result.append(s0[prev_i:i])
-            if g.match_word(s, i, find):
-                count += 1
-                result.append(change)
-            else:
-                result.append(find0)
-            prev_i = i + len(find)
-        # #1166: Complete the result using s0.
-        result.append(s0[prev_i:])
-        return count, ''.join(result)
+        return change_all_word(s, self.find_text, self.change_text, self.ignore_case)
     #@+node:ekr.20131117164142.17011: *4* find.clone-find-all & helper
     @cmd('clone-find-all')
     @cmd('find-clone-all')
@@ -1600,6 +1550,7 @@ class LeoFind:
             {
                 'body': body,  # List of indices into v.b
                 'head': head,  # List of indices into v.h
+                'lines': lines,  # List of (line_number, line), one per index in body.
                 'v': v,        # The vnode containing the matches.
             }
         """
@@ -1631,31 +1582,24 @@ class LeoFind:
         if self.node_only:
             vnodes = [c.p.v]
         elif self.suboutline_only:
-            vnodes = list(set(z.v for z in c.p.self_and_subtree()))
+            vnodes = list(c.p.unique_nodes())
         else:
             vnodes = list(c.all_unique_nodes())
+        # Search only the vnodes that might contain the find text.
+        index = None if self.pattern_match else leoIndex.get_index(c)
+        if index:
+            gnxs = index.candidates(self.replace_back_slashes(self.find_text))
+            if gnxs is not None:
+                vnodes = [z for z in vnodes if z.gnx in gnxs]
         matches_dict: list[dict] = []
         distinct_body_lines, total_matches, total_nodes = 0, 0, 0
-        for v in vnodes:
-            body, head = [], []
-            # Ignore @nosearch nodes.
-            if any(z.startswith('@nosearch') for z in g.splitLines(v.b)):
-                continue
-            if self.search_body:
-                body = self.find_all_matches_in_string(v.b)
-                total_matches += len(body)
-                # Update the distinct line numbers in this body.
-                line_number_set = set()
-                for index in body:
-                    line_number, _unused = self.index_to_line_info(index, v.b)
-                    line_number_set.add(line_number)
-                distinct_body_lines += len(list(line_number_set))
-            if self.search_headline:
-                head = self.find_all_matches_in_string(v.h)
-                total_matches += len(head)
-            if body or head:
-                total_nodes += 1
-                matches_dict.append({'body': body, 'head': head, 'v': v})
+        engine = SearchEngine(self.search_options(), self.find_all_workers)
+        for v, head, body, lines in engine.find_all(vnodes):
+            total_matches += len(head) + len(body)
+            # Update the distinct line numbers in this body.
+            distinct_body_lines += len({n for n, line in lines})
+            total_nodes += 1
+            matches_dict.append({'body': body, 'head': head, 'lines': lines, 'v': v})
         if not matches_dict:
             # Not even one match found!
             self.restore(saveData)
@@ -1734,8 +1678,8 @@ class LeoFind:
             if body:
                 results.append(f"body: matches: {len(body)}\n")
                 seen = set()
-                for i in body:
-                    n, line = self.index_to_line_info(i, v.b)
+                lines = d.get('lines') or [self.index_to_line_info(i, v.b) for i in body]
+                for i, (n, line) in zip(body, lines):
                     if (n, line) not in seen:
                         seen.add((n, line))
                         line_col_s = f"line {n:2}, col {i:2}"
@@ -1784,30 +1728,14 @@ class LeoFind:
         Perform all plain finds s, including whole-word finds.
         return a list indices into s.
         """
-        if self.ignore_case:
-            find_s = find_s.lower()
-            s = s.lower()
-        i, result = 0, []
-        # A line may contain more than one match.
-        i = 0
-        while i < len(s):
-            i = s.find(find_s, i)
-            if i == -1:
-                break
-            if not self.whole_word or self.whole_word and g.match_word(s, i, find_s):
-                result.append(i)
-            i += len(find_s)
-        return result
+        return find_all_plain(find_s, s, self.ignore_case, self.whole_word)
     #@+node:ekr.20230124130028.3: *8* find.find_all_regex
     def find_all_regex(self, find_s: str, s: str) -> list[int]:
         """
         Perform all regex find/replace on s.
         return a list of matching indices.
         """
-        flags = re.MULTILINE
-        if self.ignore_case:
-            flags |= re.IGNORECASE
-        return [m.start() for m in re.finditer(find_s, s, flags)]
+        return find_all_regex(find_s, s, self.ignore_case)
     #@+node:ekr.20250206055338.1: *4* find.find-source-for-command & helpers
     @cmd('find-source-for-command')
     def find_source_for_command(self, event: LeoKeyEvent = None) -> None:  # pragma: no cover (interactive)
@@ -2675,56 +2603,11 @@ class LeoFind:
 
         Groups is a tuple of strings, one for every matched group.
         """
-
-        # g.printObj(list(groups), tag=f"groups in {change_text!r}")
-
-        def repl(match_object: re.Match) -> str:
-            """re.sub calls this function once per group."""
-            # # 1494...
-            n = int(match_object.group(1)) - 1
-            if 0 <= n < len(groups):
-                # Executed only if the change text contains groups that match.
-                return (
-                    groups[n].
-                        replace(r'\b', r'\\b').
-                        replace(r'\f', r'\\f').
-                        replace(r'\n', r'\\n').
-                        replace(r'\r', r'\\r').
-                        replace(r'\t', r'\\t').
-                        replace(r'\v', r'\\v'))
-            # No replacement.
-            return match_object.group(0)
-
-        result = re.sub(r'\\([0-9])', repl, change_text)
-        return result
+        return make_regex_subs(change_text, groups)
     #@+node:ekr.20210110073117.49: *4* find.replace_back_slashes
     def replace_back_slashes(self, s: str) -> str:
         """Replace backslash-n with a newline and backslash-t with a tab."""
-        # Compare: https://docs.python.org/3/library/ast.html#ast.literal_eval
-        i, result = 0, []
-        while i < len(s):
-            progress = i
-            ch = s[i]
-            i += 1
-            if ch != '\\' or i >= len(s):
-                result.append(ch)
-                continue
-            ch = s[i]
-            i += 1
-            if ch == 'n':
-                result.append('\n')
-            elif ch == 't':
-                result.append('\t')
-            elif ch == 'f':
-                result.append('\f')
-            elif ch == '\\':  # 4284
-                result.append(ch)
-                result.append(ch)
-            else:
-                result.append('\\')
-                i -= 1
-            assert progress < i
-        return ''.join(result)
+        return replace_back_slashes(s)
     #@+node:ekr.20031218072017.3082: *3* LeoFind.Initing & finalizing
     #@+node:ekr.20031218072017.3086: *4* find.init_in_headline & helper
     def init_in_headline(self) -> None:
@@ -3271,6 +3154,334 @@ class LeoFind:
         if s not in self.findTextList:
             self.findTextList.append(s)
     #@-others
+#@+node:ekr.20261018152410.1: ** class SearchEngine
+class SearchEngine:
+    """
+    Find or change all matches in the headlines and bodies of many vnodes.
+
+    The engine copies the headlines and bodies of the vnodes, then searches
+    them in chunks, in a pool of worker processes if workers > 0. It yields
+    results in the order of the vnodes, as soon as each chunk is done.
+
+    The engine never changes vnodes. Callers apply changes and handle undo.
+
+    options is the tuple returned by LeoFind.search_options.
+    """
+
+    chunk_size = 1000
+
+    def __init__(self, options: tuple, workers: int = 0) -> None:
+        self.options = options
+        self.workers = workers
+
+    #@+others
+    #@+node:ekr.20261018152410.2: *3* engine.find_all & change_all
+    def find_all(self, vnodes: list[VNode]) -> Generator:
+        """
+        Yield (v, head, body, lines) for each vnode containing a match, where
+        head and body are lists of indices into v.h and v.b, and lines is a
+        list of (line_number, line) tuples, one for every index in body.
+
+        Ignore vnodes whose body contains an @nosearch directive.
+        """
+        for i, head, body, lines in self.run(find_all_in_chunk, vnodes):
+            yield vnodes[i], head, body, lines
+
+    def change_all(self, vnodes: list[VNode]) -> Generator:
+        """
+        Yield (v, count_h, new_h, count_b, new_b) for each vnode containing a
+        match.
+        """
+        for i, count_h, new_h, count_b, new_b in self.run(change_all_in_chunk, vnodes):
+            yield vnodes[i], count_h, new_h, count_b, new_b
+    #@+node:ekr.20261018152410.3: *3* engine.run
+    def run(self, func: Callable, vnodes: list[VNode]) -> Generator:
+        """Yield the results of func for all chunks of vnodes, in order."""
+        n = self.chunk_size
+        texts = [(i, v.h, v.b) for i, v in enumerate(vnodes)]
+        chunks = [texts[i : i + n] for i in range(0, len(texts), n)]
+        if self.workers < 1 or len(chunks) < 2:
+            for chunk in chunks:
+                yield from func(chunk, self.options)
+            return
+        executor: concurrent.futures.Executor
+        try:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        except (NotImplementedError, OSError):  # pragma: no cover
+            # This platform does not support multiprocessing.
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        with executor:
+            for results in executor.map(func, chunks, itertools.repeat(self.options)):
+                yield from results
+    #@-others
+#@+node:ekr.20261018152410.4: ** function: find_all_in_chunk
+def find_all_in_chunk(chunk: list[tuple[int, str, str]], options: tuple) -> list[tuple]:
+    """
+    Find all matches in the (i, head, body) tuples in chunk.
+
+    This function runs in worker processes. Return a list of
+    (i, head_indices, body_indices, body_lines) tuples, as described in
+    SearchEngine.find_all.
+    """
+    ignore_case, pattern_match, whole_word, search_headline, search_body = options[2:]
+    find_s = replace_back_slashes(options[0])
+    results = []
+    for i, h, b in chunk:
+        # Ignore @nosearch nodes.
+        if b.startswith('@nosearch') or '\n@nosearch' in b:
+            continue
+        head: list[int] = []
+        body: list[int] = []
+        lines: list[tuple[int, str]] = []
+        if search_body:
+            # This hack would be dangerous on MacOs: it uses '\r' instead of '\n' (!)
+            if sys.platform.lower().startswith('win'):
+                b = b.replace('\r', '')  # Ignore '\r' characters, which may appear in @edit nodes.
+            if b.strip():
+                if pattern_match:
+                    body = find_all_regex(find_s, b, ignore_case)
+                else:
+                    body = find_all_plain(find_s, b, ignore_case, whole_word)
+                lines = line_info(b, body)
+        if search_headline and h.strip():
+            if pattern_match:
+                head = find_all_regex(find_s, h, ignore_case)
+            else:
+                head = find_all_plain(find_s, h, ignore_case, whole_word)
+        if head or body:
+            results.append((i, head, body, lines))
+    return results
+#@+node:ekr.20261018152410.5: ** function: change_all_in_chunk
+def change_all_in_chunk(chunk: list[tuple[int, str, str]], options: tuple) -> list[tuple]:
+    """
+    Change all matches in the (i, head, body) tuples in chunk.
+
+    This function runs in worker processes. Return a list of
+    (i, count_h, new_h, count_b, new_b) tuples for all changed tuples.
+    """
+    search_headline, search_body = options[5:]
+    results = []
+    for i, h, b in chunk:
+        count_h, new_h, count_b, new_b = 0, None, 0, None
+        if search_headline:
+            count_h, new_h = change_all_in_string(h, options)
+        if search_body:
+            count_b, new_b = change_all_in_string(b, options)
+        if count_h or count_b:
+            results.append((i, count_h, new_h, count_b, new_b))
+    return results
+#@+node:ekr.20261018152410.6: ** function: change_all_in_string & helpers
+def change_all_in_string(s: str, options: tuple) -> tuple[int, str]:
+    """
+    Search s for the find text and replace with the change text.
+
+    Return (found, new text)
+    """
+    find_text, change_text, ignore_case, pattern_match, whole_word = options[:5]
+    # This hack would be dangerous on MacOs: it uses '\r' instead of '\n' (!)
+    if sys.platform.lower().startswith('win'):
+        # Ignore '\r' characters, which may appear in @edit nodes.
+        # Fixes this bug: https://groups.google.com/forum/#!topic/leo-editor/yR8eL5cZpi4
+        s = s.replace('\r', '')
+    if not s:
+        return False, None
+    # Order matters: regex matches ignore whole-word.
+    if pattern_match:
+        return change_all_regex(s, find_text, change_text, ignore_case)
+    if whole_word:
+        return change_all_word(s, find_text, change_text, ignore_case)
+    return change_all_plain(s, find_text, change_text, ignore_case)
+#@+node:ekr.20261018152410.7: *3* function: change_all_plain
+def change_all_plain(s: str, find: str, change: str, ignore_case: bool) -> tuple[int, str]:
+    """
+    Perform all plain find/replace on s.
+    return (count, new_s)
+    """
+    # #1166: s0 and find0 aren't affected by ignore-case.
+    s0 = s
+    find0 = replace_back_slashes(find)
+    if ignore_case:
+        s = s0.lower()
+        find = find0.lower()
+    count, prev_i, result = 0, 0, []
+    while True:
+        progress = prev_i
+        # #1166: Scan using s and find.
+        i = s.find(find, prev_i)
+        if i == -1:
+            break
+        # #1166: Replace using s0 & change.
+        count += 1
+        result.append(s0[prev_i:i])
+        result.append(change)
+        prev_i = max(prev_i + 1, i + len(find))  # 2021/01/08 (!)
+        assert prev_i > progress, prev_i
+    # #1166: Complete the result using s0.
+    result.append(s0[prev_i:])
+    return count, ''.join(result)
+#@+node:ekr.20261018152410.8: *3* function: change_all_regex
+def change_all_regex(s: str, find: str, change: str, ignore_case: bool) -> tuple[int, str]:
+    """
+    Perform all regex find/replace on s.
+    return (count, new_s)
+    """
+    count, prev_i, result = 0, 0, []
+
+    flags = re.MULTILINE
+    if ignore_case:
+        flags |= re.IGNORECASE
+    for m in re.finditer(find, s, flags):
+        count += 1
+        i = m.start()
+        result.append(s[prev_i:i])
+        # #1748.
+        groups = m.groups()
+        if groups:
+            change_text = make_regex_subs(change, groups)
+        else:
+            change_text = change
+        result.append(change_text)
+        prev_i = m.end()
+    # Compute the result.
+    result.append(s[prev_i:])
+    s = ''.join(result)
+    return count, s
+#@+node:ekr.20261018152410.9: *3* function: change_all_word
+def change_all_word(s: str, find: str, change: str, ignore_case: bool) -> tuple[int, str]:
+    """
+    Perform all whole word find/replace on s.
+    return (count, new_s)
+    """
+    # #1166: s0 and find0 aren't affected by ignore-case.
+    s0 = s
+    find0 = replace_back_slashes(find)
+    if ignore_case:
+        s = s0.lower()
+        find = find0.lower()
+    count, prev_i, result = 0, 0, []
+    while True:
+        # #1166: Scan using s and find.
+        i = s.find(find, prev_i)
+        if i == -1:
+            break
+        # #1166: Replace using s0, change & find0.
+        result.append(s0[prev_i:i])
+        if g.match_word(s, i, find):
+            count += 1
+            result.append(change)
+        else:
+            result.append(find0)
+        prev_i = i + len(find)
+    # #1166: Complete the result using s0.
+    result.append(s0[prev_i:])
+    return count, ''.join(result)
+#@+node:ekr.20261018152410.10: ** function: find_all_plain & find_all_regex
+def find_all_plain(find_s: str, s: str, ignore_case: bool, whole_word: bool) -> list[int]:
+    """
+    Perform all plain finds s, including whole-word finds.
+    return a list indices into s.
+    """
+    if ignore_case:
+        find_s = find_s.lower()
+        s = s.lower()
+    i, result = 0, []
+    # A line may contain more than one match.
+    i = 0
+    while i < len(s):
+        i = s.find(find_s, i)
+        if i == -1:
+            break
+        if not whole_word or whole_word and g.match_word(s, i, find_s):
+            result.append(i)
+        i += len(find_s)
+    return result
+
+def find_all_regex(find_s: str, s: str, ignore_case: bool) -> list[int]:
+    """
+    Perform all regex find/replace on s.
+    return a list of matching indices.
+    """
+    flags = re.MULTILINE
+    if ignore_case:
+        flags |= re.IGNORECASE
+    return [m.start() for m in re.finditer(find_s, s, flags)]
+#@+node:ekr.20261018152410.11: ** function: line_info
+def line_info(s: str, indices: list[int]) -> list[tuple[int, str]]:
+    """
+    Return a list of (line_number, line) tuples, one for each index into s.
+
+    Line numbers are 1-based. indices must be in ascending order. This
+    function scans s once, so it is much faster than calling
+    LeoFind.index_to_line_info for each index.
+    """
+    result: list[tuple[int, str]] = []
+    n, prev, start, end = 1, 0, 0, 0
+    for index in indices:
+        if index >= end:
+            # The index is on a new line.
+            n += s.count('\n', prev, index)
+            prev = index
+            start = s.rfind('\n', 0, index) + 1
+            end = s.find('\n', index) + 1 or len(s) + 1
+        result.append((n, s[start:end]))
+    return result
+#@+node:ekr.20261018152410.12: ** function: make_regex_subs
+def make_regex_subs(change_text: str, groups: MatchGroups) -> str:
+    """
+    Substitute group[i-1] for \\i strings in change_text.
+
+    Groups is a tuple of strings, one for every matched group.
+    """
+
+    # g.printObj(list(groups), tag=f"groups in {change_text!r}")
+
+    def repl(match_object: re.Match) -> str:
+        """re.sub calls this function once per group."""
+        # # 1494...
+        n = int(match_object.group(1)) - 1
+        if 0 <= n < len(groups):
+            # Executed only if the change text contains groups that match.
+            return (
+                groups[n].
+                    replace(r'\b', r'\\b').
+                    replace(r'\f', r'\\f').
+                    replace(r'\n', r'\\n').
+                    replace(r'\r', r'\\r').
+                    replace(r'\t', r'\\t').
+                    replace(r'\v', r'\\v'))
+        # No replacement.
+        return match_object.group(0)
+
+    result = re.sub(r'\\([0-9])', repl, change_text)
+    return result
+#@+node:ekr.20261018152410.13: ** function: replace_back_slashes
+def replace_back_slashes(s: str) -> str:
+    """Replace backslash-n with a newline and backslash-t with a tab."""
+    # Compare: https://docs.python.org/3/library/ast.html#ast.literal_eval
+    i, result = 0, []
+    while i < len(s):
+        progress = i
+        ch = s[i]
+        i += 1
+        if ch != '\\' or i >= len(s):
+            result.append(ch)
+            continue
+        ch = s[i]
+        i += 1
+        if ch == 'n':
+            result.append('\n')
+        elif ch == 't':
+            result.append('\t')
+        elif ch == 'f':
+            result.append('\f')
+        elif ch == '\\':  # 4284
+            result.append(ch)
+            result.append(ch)
+        else:
+            result.append('\\')
+            i -= 1
+        assert progress < i
+    return ''.join(result)
 #@-others
 #@@language python
 #@@tabwidth -4
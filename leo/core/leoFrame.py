@@ -988,6 +988,8 @@ class LeoTree:
         # "public" ivars: correspond to setters & getters.
         self.drag_p = None
         self.generation = 0  # low-level vnode methods increment this count.
+        self.headline_generation = 0  # v.setHeadString increments this count.
+        self.body_generation = 0  # v.setBodyString increments this count.
         self.redrawCount = 0  # For traces
         self.use_chapters = False  # May be overridden in subclasses.
         # Define these here to keep pylint happy.
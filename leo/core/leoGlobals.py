@@ -7070,14 +7070,13 @@ def findGnx(gnx: str, c: Cmdr) -> Optional[Position]:
             n = int(m.group(2))
         except(TypeError, ValueError):
             pass
-    # Search forwards, setting p2.
-    for p in c.all_unique_positions():
-        if p.gnx == gnx:
-            if n is None:
-                return p
-            p2, offset = c.gotoCommands.find_file_line(-n, p)
-            return p2 or p
-    return None
+    p = c.positionIndex.find(gnx)
+    if not p:
+        return None
+    if n is None:
+        return p
+    p2, offset = c.gotoCommands.find_file_line(-n, p)
+    return p2 or p
 #@+node:tbrown.20140311095634.15188: *3* g.findUnl & helpers (legacy unls)
 def findUnl(unlList1: list[str], c: Cmdr) -> Optional[Position]:
     """
@@ -538,6 +538,9 @@ class NullGui(LeoGui):
     def runMainLoop(self) -> None:
         """Run the null gui's main loop."""
         if self.script:
+            if not self.lastFrame:
+                # The settings cache may have read all settings files without opening them.
+                g.app.newCommander(fileName=None, gui=self)
             frame = self.lastFrame
             g.app.log = frame.log
             self.lastFrame.c.executeScript(script=self.script)
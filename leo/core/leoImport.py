@@ -4,6 +4,7 @@
 #@+node:ekr.20091224155043.6539: ** << leoImport imports >>
 from __future__ import annotations
 from collections.abc import Callable
+import concurrent.futures
 import csv
 import io
 import os
@@ -39,6 +40,7 @@ if TYPE_CHECKING:  # pragma: no cover
     from leo.core.leoCommands import Commands as Cmdr
     from leo.core.leoGui import LeoKeyEvent
     from leo.core.leoNodes import Position
+    ImportRecords = list[tuple[int, str, str]]
     Value = Any
 #@-<< leoImport annotations >>
 #@+others
@@ -745,8 +747,10 @@ class LeoImportCommands:
         shortFn: bool = False,
         treeType: str = '@file',
         verbose: bool = True,  # Legacy value.
+        check: bool = True,
     ) -> None:
         # Not a command.  It must *not* have an event arg.
+        # check: False if the caller will call c.checkOutline.
         c, u = self.c, self.c.undoer
         if not c or not c.p or not files:
             return
@@ -773,7 +777,8 @@ class LeoImportCommands:
             except Exception:
                 g.es_print('Exception importing', fn)
                 g.es_exception()
-        c.checkOutline()
+        if check:
+            c.checkOutline()
         parent.expand()
     #@+node:ekr.20160503125237.1: *4* ic.importFreeMind
     def importFreeMind(self, files: list[str]) -> None:
@@ -1597,16 +1602,26 @@ class RecursiveImportController:
         dir_: Optional[str],
         ignore_pattern: re.Pattern = None,
         kind: str,
+        progress: Callable[[int, int, str], None] = None,
         recursive: bool = True,
         safe_at_file: bool = True,
         theTypes: list[str] = None,
         verbose: bool = True,  # legacy value.
+        workers: int = None,
     ) -> None:
         """Ctor for RecursiveImportController class."""
         self.c = c
+        self.cancelled = False  # Set by ric.cancel.
+        # Keys are paths of files, values are futures of import_file_in_worker.
+        self.futures: dict[str, concurrent.futures.Future] = {}
         self.ignore_pattern = ignore_pattern or re.compile(r'\.git|node_modules')
         self.kind = kind  # ric.run checks the kind.
+        # Keys are directories, values are the lists of their files and subdirectories.
+        self.listings: dict[str, tuple[list[str], list[str]]] = {}
         self.n_files: int = 0
+        self.n_total: int = 0
+        self.progress = progress
+        self.progress_time = 0.0
         self.recursive = recursive
         self.root: Position = None
         file_name = c.fileName()
@@ -1614,40 +1629,38 @@ class RecursiveImportController:
         self.safe_at_file = safe_at_file
         self.theTypes = theTypes
         self.verbose = verbose
+        if workers is None:
+            workers = c.config.getInt('recursive-import-workers') or 0
+        self.workers = workers
+    #@+node:ekr.20261019090010.8: *3* ric.cancel
+    def cancel(self) -> None:
+        """
+        Stop importing files. ric.run keeps and cleans the files imported so far.
+
+        Progress callbacks may call this method.
+        """
+        self.cancelled = True
     #@+node:ekr.20230828090452.1: *3* ric.error
     def error(self, message: str) -> None:
         """Print an error message."""
         g.es_print(message, color='red')
+    #@+node:ekr.20261019090010.9: *3* ric.find_files
+    def find_files(self, dir_: str) -> list[str]:
+        """Return the paths of all files that ric.import_dir will import, in order."""
+        files, dirs = self.list_dir(dir_)
+        result = [z for z in files if not self.ignore_pattern.search(z)]
+        for dir2 in sorted(dirs):
+            result.extend(self.find_files(dir2))
+        return result
     #@+node:ekr.20130823083943.12597: *3* ric.import_dir
     def import_dir(self, dir_: str, parent: Position) -> None:
         """Import selected files from dir_, a directory."""
-        files = []
         if not os.path.exists(dir_):
             self.error(f"Not found: {dir_!r}")
             return
-        if g.os_path_isfile(dir_):
-            files = [dir_]
-        else:
-            if self.verbose:
-                print(f"importing: {os.path.normpath(dir_)}")
-            files = list(sorted(os.listdir(dir_)))
-
-        dirs: list[str] = []
-        files2: list[str] = []
-        for path in files:
-            try:
-                # Catch path exceptions: keep going on small errors.
-                path = g.os_path_join(dir_, path)
-                if g.os_path_isfile(path):
-                    name, ext = g.os_path_splitext(path)
-                    if ext in self.theTypes:
-                        files2.append(path)
-                elif self.recursive:
-                    if not self.ignore_pattern.search(path):
-                        dirs.append(path)
-            except OSError:
-                self.error(f"Exception computing: {path!r}")
-                g.es_exception()
+        if self.verbose and not g.os_path_isfile(dir_):
+            print(f"importing: {os.path.normpath(dir_)}")
+        files2, dirs = self.list_dir(dir_)
         if files2 or dirs:
             parent = parent.insertAsLastChild()
             parent.v.h = dir_
@@ -1657,11 +1670,15 @@ class RecursiveImportController:
                         self.import_one_file(f, parent=parent)
             if dirs:
                 for dir_ in sorted(dirs):
+                    if self.cancelled:
+                        break
                     self.import_dir(dir_, parent)
     #@+node:ekr.20170404103953.1: *3* ric.import_one_file
     def import_one_file(self, path: str, parent: Position) -> None:
         """Import one file to the last top-level node."""
         c = self.c
+        if self.cancelled:
+            return
         self.n_files += 1
         if self.kind == '@edit':
             p = parent.insertAsLastChild()
@@ -1669,15 +1686,31 @@ class RecursiveImportController:
             p.v.h = '@edit ' + path.replace('\\', '/')
             s, e = g.readFileIntoString(path, kind=self.kind)
             p.v.b = s
+            self.report_progress(path)
             return
-        # #1484: Use this for @auto as well.
-        c.importCommands.importFilesCommand(
-            files=[path],
-            parent=parent,
-            shortFn=True,
-            treeType=self.kind,  # Leo 6.8.6.
-            verbose=self.verbose,  # Leo 6.6.
-        )
+        result = None
+        future = self.futures.pop(path, None)
+        if future:
+            try:
+                result = future.result()
+            except Exception:  # A broken pool.
+                pass
+        if result:
+            records, messages = result
+            for s, color, newline in messages:
+                g.es(s, color=color, newline=newline)
+            self.link_records(path, parent, records)
+        else:
+            # Use the serial code for all other files and to report errors.
+            # #1484: Use this for @auto as well.
+            c.importCommands.importFilesCommand(
+                files=[path],
+                parent=parent,
+                check=False,  # ric.run checks the outline once.
+                shortFn=True,
+                treeType=self.kind,  # Leo 6.8.6.
+                verbose=self.verbose,  # Leo 6.6.
+            )
 
         # #4385: set mod time for @clean files. Clear the mod time for all other files.
         p = parent.lastChild()
@@ -1688,6 +1721,63 @@ class RecursiveImportController:
 
         if self.safe_at_file:
             p.v.h = '@' + p.v.h
+        self.report_progress(path)
+    #@+node:ekr.20261019090010.10: *3* ric.link_records
+    def link_records(self, path: str, parent: Position, records: ImportRecords) -> None:
+        """
+        Create the last child of parent from the records that
+        import_file_in_worker created by importing the file at path.
+
+        This is the equivalent of ic.importFilesCommand for one file.
+        """
+        c = self.c
+        g.setGlobalOpenDir(path)
+        p = parent.insertAsLastChild()
+        p.v.h = records[0][1]
+        p.v.b = records[0][2]
+        stack = [p.v]
+        for level, h, b in records[1:]:
+            del stack[level:]
+            v = stack[-1].insertAsLastChild()
+            v._headString, v._bodyString = h, b
+            stack.append(v)
+        c.atFileCommands.rememberReadPath(c.fullPath(p), p)
+        p.contract()
+        p.setDirty()
+        c.setChanged()
+    #@+node:ekr.20261019090010.11: *3* ric.list_dir
+    def list_dir(self, dir_: str) -> tuple[list[str], list[str]]:
+        """
+        Return (files, dirs), the sorted lists of the files to import
+        and the directories to search in dir_, which may be a file.
+        """
+        if dir_ in self.listings:
+            return self.listings[dir_]
+        if g.os_path_isfile(dir_):
+            paths = [dir_]
+        else:
+            try:
+                paths = list(sorted(os.listdir(dir_)))
+            except OSError:
+                paths = []
+        dirs: list[str] = []
+        files: list[str] = []
+        for path in paths:
+            try:
+                # Catch path exceptions: keep going on small errors.
+                path = g.os_path_join(dir_, path)
+                if g.os_path_isfile(path):
+                    name, ext = g.os_path_splitext(path)
+                    if ext in self.theTypes:
+                        files.append(path)
+                elif self.recursive:
+                    if not self.ignore_pattern.search(path):
+                        dirs.append(path)
+            except OSError:
+                self.error(f"Exception computing: {path!r}")
+                g.es_exception()
+        self.listings[dir_] = files, dirs
+        return files, dirs
     #@+node:ekr.20130823083943.12607: *3* ric.post_process
     def post_process(self, p: Position) -> None:
         """
@@ -1744,7 +1834,8 @@ class RecursiveImportController:
             return path
 
         # The paths of all @<file> nodes should start with outline_dir.
-        p.h = p.h.replace('\\', '/')  # Defensive.
+        # Set p.v.h and p.v.b: ric.clear_dirty_bits clears all dirty bits.
+        p.v.h = p.h.replace('\\', '/')  # Defensive.
         outline_dir = norm(self.outline_directory.replace('\\', '/'))
         len_outline_dir = len(outline_dir)
 
@@ -1756,16 +1847,16 @@ class RecursiveImportController:
                 file_name = os.path.basename(path)
                 dir_name = os.path.dirname(path)
                 r_path = rel_path(dir_name)
-                p.h = f"{kind} {file_name}"
+                p.v.h = f"{kind} {file_name}"
                 if r_path:
-                    p.b = f"@path {r_path}\n{p.b}"
+                    p.v.b = f"@path {r_path}\n{p.b}"
             return
 
         # Handle everything else.
         if norm(p.h).startswith(outline_dir):
             r_path = rel_path(p.h)
             if r_path:
-                p.h = f"path: {r_path}"
+                p.v.h = f"path: {r_path}"
     #@+node:ekr.20230831011155.1: *4* ric.move_leading_blank_lines
     def move_leading_blank_lines(self, parent: Position) -> None:
         """
@@ -1775,8 +1866,8 @@ class RecursiveImportController:
             if p.hasBack() and p.b.startswith('\n'):
                 back = p.back()
                 while p.b.startswith('\n'):
-                    p.b = p.b[1:]
-                    back.b = back.b + '\n'
+                    p.v.b = p.b[1:]
+                    back.v.b = back.b + '\n'
     #@+node:ekr.20130823083943.12612: *4* ric.remove_empty_nodes
     def remove_empty_nodes(self, p: Position) -> None:
         """Remove empty nodes. Not called for @auto or @edit trees."""
@@ -1799,6 +1890,22 @@ class RecursiveImportController:
                 if not p2.b.strip() and not has_significant_children(p2)]
         if aList:
             c.deletePositionsInList(aList)  # Don't redraw.
+    #@+node:ekr.20261019090010.12: *3* ric.report_progress
+    def report_progress(self, path: str) -> None:
+        """
+        Report that ric.import_one_file has imported the file at path.
+
+        Call the progress callback, if any, with (n_files, n_total, path).
+        Otherwise, if self.verbose is True, report progress at most once
+        a second.
+        """
+        if self.progress:
+            self.progress(self.n_files, self.n_total, path)
+        elif self.verbose and not g.unitTesting:
+            t = time.time()
+            if t - self.progress_time > 1.0 or self.n_files == self.n_total:
+                self.progress_time = t
+                g.es_print(f"imported {self.n_files} of {self.n_total} files")
     #@+node:ekr.20230829043849.1: *3* ric_resolve_dir_arg
     def resolve_dir_arg(self, arg: str) -> Optional[str]:
         """
@@ -1835,6 +1942,31 @@ class RecursiveImportController:
         assert os.path.isabs(arg), repr(arg1)
         assert os.path.exists(arg), repr(arg1)
         return arg
+    #@+node:ekr.20261019090010.13: *3* ric.start_workers
+    def start_workers(self, paths: list[str]) -> Optional[concurrent.futures.Executor]:
+        """
+        Start importing the files at the given paths in a pool of worker
+        processes. ric.import_one_file links the results into the outline.
+
+        Return the pool, or None if Leo's process should import all files.
+        """
+        c = self.c
+        if self.workers < 2 or len(paths) < 2 or self.kind == '@edit':
+            return None
+        try:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=init_import_worker,
+                initargs=(c.fileName(), g.app.leoID, c.config.settingsDict),
+            )
+        except (NotImplementedError, OSError):  # pragma: no cover
+            # This platform does not support multiprocessing.
+            return None
+        for path in paths:
+            # Use the same headline as ic.importFilesCommand.
+            headline = f"{self.kind} {c.relativeDirectory(path)}"
+            self.futures[path] = executor.submit(import_file_in_worker, path, headline, self.kind)
+        return executor
     #@+node:ekr.20130823083943.12613: *3* ric.run
     def run(self, dir_: Optional[str]) -> None:
         """
@@ -1860,6 +1992,7 @@ class RecursiveImportController:
             return
 
         # Import all requested files.
+        executor: Optional[concurrent.futures.Executor] = None
         try:
             c, u = self.c, self.c.undoer
             t1 = time.time()
@@ -1870,9 +2003,14 @@ class RecursiveImportController:
             # Always create a new last top-level node.
             self.root = parent = last.insertAfter()
             parent.v.h = 'imported files'
-            # Special case for a single file.
+            self.cancelled = False
             self.n_files = 0
-            if g.os_path_isfile(dir_):
+            # Special case for a single file.
+            is_file = g.os_path_isfile(dir_)
+            paths = [dir_] if is_file else self.find_files(dir_)
+            self.n_total = len(paths)
+            executor = self.start_workers(paths)
+            if is_file:
                 if self.verbose:
                     # Only print this message if importing a *single* file.
                     print('')
@@ -1880,17 +2018,23 @@ class RecursiveImportController:
                 self.import_one_file(dir_, parent)
             else:
                 self.import_dir(dir_, parent)
+            c.checkOutline()
             self.post_process(parent)
             u.afterInsertNode(parent, 'recursive-import', undoData)
         except Exception:
             self.error('Exception in recursive import')
             g.es_exception()
         finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+            self.futures = {}
             g.app.disable_redraw = False
             for p2 in parent.self_and_subtree(copy=False):
                 p2.contract()
             c.setChanged()  # #4385: Ensure that mod times are written.
             c.redraw(parent)
+        if self.cancelled:
+            g.es_print(f"recursive import cancelled after {self.n_files} of {self.n_total} files")
         if not g.unitTesting:
             t2 = time.time()
             n = len(list(parent.subtree()))
@@ -1899,6 +2043,75 @@ class RecursiveImportController:
                 f"in {self.n_files} file{g.plural(self.n_files)} "
                 f"in {t2 - t1:2.2f} seconds")
     #@-others
+#@+node:ekr.20261019090010.14: ** function: init_import_worker
+# The commander of an import worker process.
+import_worker_c: Optional[Cmdr] = None
+
+def init_import_worker(file_name: str, leo_id: str, settings_d: g.SettingsDict) -> None:
+    """
+    Create a Leo application and commander using the null gui in a worker
+    process of the recursive import command.
+
+    file_name:  The file name of the importing commander.
+    leo_id:     The importing application's id.
+    settings_d: The settings dict of the importing commander.
+    """
+    global import_worker_c
+    from leo.core import leoApp, leoCommands, leoConfig, leoNodes
+    from leo.core.leoGui import NullGui
+    if not g.app:
+        # The worker process did not inherit g.app.
+        g.app = leoApp.LeoApp()
+        g.app.loadManager = lm = leoApp.LoadManager()
+        lm.computeStandardDirectories()
+        g.app.config = leoConfig.GlobalConfigManager()
+        g.app.db = g.NullObject('g.app.db')  # type:ignore
+        g.app.pluginsController = g.NullObject('g.app.pluginsController')  # type:ignore
+    # Never touch the gui or the log of a parent process.
+    g.app.gui = NullGui()
+    g.app.log = None
+    g.app.logInited = False
+    g.app.logWaiting = []
+    g.app.leoID = leo_id
+    g.app.nodeIndices = leoNodes.NodeIndices(leo_id)
+    lm = g.app.loadManager
+    lm.globalSettingsDict = settings_d
+    lm.createAllImporterData()
+    c = leoCommands.Commands(fileName=file_name, gui=g.app.gui)
+    import_worker_c = c
+#@+node:ekr.20261019090010.15: ** function: import_file_in_worker
+def import_file_in_worker(path: str, headline: str, kind: str) -> Optional[tuple[ImportRecords, list]]:
+    """
+    Import the file at path into a new @<file> node with the given
+    headline, exactly as ic.importFilesCommand would.
+
+    This function runs in the worker processes of the recursive import
+    command. It must not report errors. Callers should use the serial code
+    to handle all errors.
+
+    Return None or (records, messages). records is a list of (level, h, b)
+    tuples describing the created tree in outline order, starting with the
+    @<file> node itself. messages is a list of (s, color, newline) tuples,
+    one for each call to g.es.
+    """
+    c = import_worker_c
+    if not c:
+        return None
+    root = c.lastTopLevel().insertAfter()
+    root.v.h = headline
+    try:
+        g.app.logWaiting = []
+        if not c.importCommands.createOutline(parent=root.copy(), treeType=kind):
+            return None
+        records = [(0, root.v.h, root.v.b)]
+        records.extend((level, v.h, v.b) for v, level, n in root.v.walk(level=1))
+        messages = [z[:3] for z in g.app.logWaiting]
+        return records, messages
+    except Exception:
+        return None
+    finally:
+        root.doDelete()
+        g.app.logWaiting = []
 #@+node:ekr.20161006071801.1: ** class TabImporter
 class TabImporter:
     """
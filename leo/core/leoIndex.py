@@ -0,0 +1,316 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018154020.1: * @file leoIndex.py
+"""
+An inverted index of the words in an outline's headlines and bodies.
+
+The index maps lower-case words (runs of \\w characters) to the gnxs of
+the vnodes containing them. It answers substring queries without scanning
+the outline: the text 'ab cd' can only appear in vnodes containing a word
+ending with 'ab' and a word starting with 'cd'. Callers search only those
+candidate vnodes.
+
+The index is updated incrementally. Before each query, the index checks
+c.frame.tree.generation, headline_generation and body_generation. If none
+has changed since the last query, the index is current. Otherwise, the
+index reindexes only the vnodes whose headline or body strings have
+changed since it last indexed them, and removes deleted vnodes. Leo's
+readers and the paste commands set v._headString and v._bodyString
+directly, so the index compares strings by identity. Those commands also
+change the outline's structure, which changes the generation.
+
+Leo saves the index in c.db, in Leo's cache directory, when saving the
+outline. The first query after opening the outline reloads the index,
+reindexing only the vnodes whose contents have changed.
+
+@bool use-outline-index enables the index.
+"""
+#@+<< leoIndex imports & annotations >>
+#@+node:ekr.20261018154020.2: ** << leoIndex imports & annotations >>
+from __future__ import annotations
+import bisect
+import re
+import sys
+import threading
+import zlib
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from leo.core.leoCommands import Commands as Cmdr
+    from leo.core.leoNodes import VNode
+#@-<< leoIndex imports & annotations >>
+
+word_pattern = re.compile(r'\w+')
+glob_separator_pattern = re.compile(r'[*?]|\[!?\]?[^\]]*\]?')
+db_key = 'outline-index'
+db_version = 1
+
+#@+others
+#@+node:ekr.20261018154020.3: ** function: get_index
+def get_index(c: Cmdr) -> Optional[OutlineIndex]:
+    """
+    Return c's outline index, creating it if necessary.
+
+    Return None if @bool use-outline-index is False.
+    """
+    if not c.config.getBool('use-outline-index', default=False):
+        return None
+    if c.outlineIndex is None:
+        c.outlineIndex = OutlineIndex(c)
+        c.outlineIndex.load()
+    return c.outlineIndex
+#@+node:ekr.20261018154020.4: ** function: words, content_key & unique_vnodes
+def words(s: str) -> frozenset[str]:
+    """Return the set of interned, lower-case words in s."""
+    return frozenset(map(sys.intern, set(word_pattern.findall(s.lower()))))
+
+def content_key(v: VNode) -> tuple[int, int, int]:
+    """Return a key that changes whenever v's headline or body changes."""
+    h, b = v._headString, v._bodyString
+    crc = zlib.crc32(b.encode('utf-8', 'surrogatepass'), zlib.crc32(h.encode('utf-8', 'surrogatepass')))
+    return len(h), len(b), crc
+
+def unique_vnodes(c: Cmdr) -> list[VNode]:
+    """Return a list of all vnodes of c's outline, without creating positions."""
+    result: list[VNode] = []
+    seen: set[int] = set()
+    stack = [c.hiddenRootNode]
+    while stack:
+        for v in stack.pop().children:
+            if id(v) not in seen:
+                seen.add(id(v))
+                result.append(v)
+                stack.append(v)
+    return result
+#@+node:ekr.20261018154020.5: ** class OutlineIndex
+class OutlineIndex:
+    """An inverted index of the words in an outline's headlines and bodies."""
+
+    def __init__(self, c: Cmdr) -> None:
+        self.c = c
+        # Keys are words, values are the gnxs of the vnodes containing them.
+        self.postings: dict[str, set[str]] = {}
+        # Keys are gnxs, values are the (h, b) strings of the indexed vnodes.
+        self.nodes: dict[str, tuple[str, str]] = {}
+        # The cached result of self.vocabulary(), or None.
+        self._vocabulary: Optional[tuple[str, list[int], list[str]]] = None
+        # The state of the outline when the index was last refreshed:
+        # (c.hiddenRootNode, generation, headline_generation, body_generation).
+        self.key: Optional[tuple[VNode, int, int, int]] = None
+        # The quicksearch plugin queries the index in a worker thread.
+        self.lock = threading.RLock()
+
+    #@+others
+    #@+node:ekr.20261018154020.6: *3* index.add & remove
+    def add(self, gnx: str, h: str, b: str) -> None:
+        """Add the words of the given headline and body to the index."""
+        self.remove(gnx)
+        self.nodes[gnx] = h, b
+        postings = self.postings
+        for word in words(h) | words(b):
+            aSet = postings.get(word)
+            if aSet is None:
+                postings[word] = {gnx}
+                self._vocabulary = None
+            else:
+                aSet.add(gnx)
+
+    def remove(self, gnx: str) -> None:
+        """Remove the given node from the index."""
+        data = self.nodes.pop(gnx, None)
+        if data is None:
+            return
+        h, b = data
+        postings = self.postings
+        for word in words(h) | words(b):
+            aSet = postings.get(word)
+            if aSet is not None:
+                aSet.discard(gnx)
+                if not aSet:
+                    del postings[word]
+                    self._vocabulary = None
+    #@+node:ekr.20261018154020.7: *3* index.refresh
+    def refresh(self) -> int:
+        """
+        Reindex all vnodes whose headline or body has changed since the
+        index last indexed them, and remove all deleted vnodes.
+
+        Return the number of reindexed or removed vnodes.
+        """
+        c = self.c
+        tree = c.frame.tree
+        key = (c.hiddenRootNode, tree.generation, tree.headline_generation, tree.body_generation)
+        if key == self.key:
+            return 0
+        self.key = key
+        n, nodes = 0, self.nodes
+        vnodes = unique_vnodes(c)
+        for v in vnodes:
+            h, b = v._headString, v._bodyString
+            data = nodes.get(v.gnx)
+            if data is None or data[0] is not h or data[1] is not b:
+                # Strings that are equal but not identical have the same words.
+                if data is None or data[0] != h or data[1] != b:
+                    self.add(v.gnx, h, b)
+                    n += 1
+                else:
+                    nodes[v.gnx] = h, b
+        if len(nodes) > len(vnodes):
+            gnxs = {v.gnx for v in vnodes}
+            for gnx in [z for z in nodes if z not in gnxs]:
+                self.remove(gnx)
+                n += 1
+        return n
+    #@+node:ekr.20261018154020.8: *3* index.candidates & glob_candidates
+    def candidates(self, s: str) -> Optional[set[str]]:
+        """
+        Return the set of gnxs of all vnodes whose headline or body might
+        contain s, ignoring case.
+
+        Return None if the index can not limit the search, that is, if s
+        contains no word characters.
+        """
+        with self.lock:
+            self.refresh()
+            return self.intersect(self.word_groups(s))
+
+    def glob_candidates(self, pattern: str) -> Optional[set[str]]:
+        """
+        Return the set of gnxs of all vnodes whose headline or body might
+        match the given fnmatch pattern, ignoring case.
+
+        Return None if the index can not limit the search.
+        """
+        with self.lock:
+            self.refresh()
+            groups: list[list[str]] = []
+            for s in glob_separator_pattern.split(pattern):
+                groups.extend(self.word_groups(s))
+            return self.intersect(groups)
+    #@+node:ekr.20261018154020.11: *3* index.intersect
+    def intersect(self, groups: list[list[str]]) -> Optional[set[str]]:
+        """
+        Return the set of gnxs of the vnodes containing at least one word
+        of each group, or None if there are no groups.
+
+        The result may contain extra gnxs: this method ignores groups
+        that would not much reduce the result. Return None if even the
+        smallest group would not much reduce the search.
+        """
+        if not groups:
+            return None
+        postings = self.postings
+        sized = sorted(
+            (sum(len(postings[z]) for z in group), i) for i, group in enumerate(groups)
+        )
+        if sized[0][0] > len(self.nodes) // 2:
+            return None  # Searching the candidates would not be much faster.
+        result: Optional[set[str]] = None
+        for size, i in sized:
+            if result is not None and size > 8 * len(result):
+                break
+            gnxs = set().union(*(postings[z] for z in groups[i]))
+            result = gnxs if result is None else result & gnxs
+            if not result:
+                break
+        return result
+    #@+node:ekr.20261018154020.9: *3* index.word_groups
+    def word_groups(self, s: str) -> list[list[str]]:
+        """
+        Return a list of groups, one for each word in s. A group is the
+        list of indexed words that the word matches.
+
+        The first word of s matches indexed words ending with it. The last
+        word of s matches indexed words starting with it. A word that is
+        both first and last matches indexed words containing it.
+        """
+        s = s.lower()
+        groups: list[list[str]] = []
+        for m in word_pattern.finditer(s):
+            word, left_open, right_open = m.group(0), m.start() == 0, m.end() == len(s)
+            if left_open or right_open:
+                groups.append(self.matching_words(word, left_open, right_open))
+            else:
+                groups.append([word] if word in self.postings else [])
+        return groups
+    #@+node:ekr.20261018154020.21: *3* index.matching_words & vocabulary
+    def matching_words(self, word: str, left_open: bool, right_open: bool) -> list[str]:
+        """
+        Return the list of indexed words containing word.
+
+        left_open:  True if matching words may start with other characters.
+        right_open: True if matching words may end with other characters.
+        """
+        s, starts, vocabulary = self.vocabulary()
+        target = ('' if left_open else '\n') + word + ('' if right_open else '\n')
+        delta = 0 if left_open else 1
+        result: list[str] = []
+        i = s.find(target)
+        while i > -1:
+            n = bisect.bisect_right(starts, i + delta) - 1
+            result.append(vocabulary[n])
+            # Continue at the newline following the matched word.
+            i = s.find(target, starts[n] + len(vocabulary[n]))
+        return result
+
+    def vocabulary(self) -> tuple[str, list[int], list[str]]:
+        """
+        Return (s, starts, vocabulary), where vocabulary is the list of all
+        indexed words, s contains all the words, each preceded and followed
+        by a newline, and starts[i] is the index in s of vocabulary[i].
+        """
+        if self._vocabulary is None:
+            vocabulary = list(self.postings)
+            starts, i = [], 1
+            for word in vocabulary:
+                starts.append(i)
+                i += len(word) + 1
+            s = '\n' + '\n'.join(vocabulary) + '\n'
+            self._vocabulary = s, starts, vocabulary
+        return self._vocabulary
+    #@+node:ekr.20261018154020.10: *3* index.load & save
+    def load(self) -> int:
+        """
+        Load the index saved in c.db, then refresh the index.
+
+        Return the number of vnodes whose saved words were still valid.
+        """
+        c = self.c
+        data = c.db.get(db_key)
+        with self.lock:
+            if data and data.get('version') == db_version:
+                keys: dict[str, tuple[int, int, int]] = data['keys']
+                for v in unique_vnodes(c):
+                    if keys.get(v.gnx) == content_key(v):
+                        self.nodes[v.gnx] = v._headString, v._bodyString
+                # Remove the saved words of all changed or deleted vnodes.
+                postings: dict[str, set[str]] = data['postings']
+                stale = set(keys) - set(self.nodes)
+                if stale:
+                    for word, gnxs in list(postings.items()):
+                        gnxs -= stale
+                        if not gnxs:
+                            del postings[word]
+                self.postings = postings
+                self._vocabulary = None
+            n = len(self.nodes)
+            self.refresh()
+        return n
+
+    def save(self) -> None:
+        """Save the index of all vnodes in c's outline in c.db."""
+        c = self.c
+        with self.lock:
+            self.refresh()
+            vnodes = unique_vnodes(c)
+            data = {
+                'version': db_version,
+                'keys': {v.gnx: content_key(v) for v in vnodes},
+                'postings': self.postings,
+            }
+            c.db[db_key] = data
+    #@-others
+#@-others
+#@@language python
+#@@tabwidth -4
+#@@pagewidth 70
+#@-leo
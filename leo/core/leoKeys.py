@@ -16,6 +16,7 @@ import time
 from typing import Any, Optional, Union, TYPE_CHECKING
 from types import ModuleType
 from leo.core import leoGlobals as g
+from leo.core import leoSymbols
 from leo.external import codewise
 from leo.core.leoFrame import NullLog
 try:
@@ -30,6 +31,7 @@ if TYPE_CHECKING:  # pragma: no cover
     from leo.core.leoGlobals import BindingInfo
     from leo.core.leoGui import LeoKeyEvent
     from leo.core.leoNodes import Position
+    from leo.core.leoSymbols import SymbolIndex
     from leo.plugins.qt_frame import LeoQtLog
     from leo.plugins.qt_text import QTextEditWrapper as Wrapper
     Args = Any
@@ -565,7 +567,18 @@ class AutoCompleterClass:
                 d[prefix] = aList
                 return aList
         #
-        # Not jedi. Use codewise.
+        # Not jedi. Prefer the symbol index to codewise.
+        index = leoSymbols.get_index(self.c)
+        if index:
+            aList = d.get(prefix)
+            if not aList:
+                aList = (
+                    # Prefer the Leo completions.
+                    self.get_leo_completions(prefix) or
+                    self.get_symbol_completions(index, prefix)
+                )
+                d[prefix] = aList
+            return aList
         # Precompute the codewise completions for '.self'.
         if not self.codewiseSelfList:
             aList = self.get_codewise_completions('self.')
@@ -609,6 +622,21 @@ class AutoCompleterClass:
         if 1:  # A kludge: add the prefix to each hit.
             hits = [f"{varname}.{z}" for z in hits]
         return hits
+    #@+node:ekr.20261018160512.15: *5* ac.get_symbol_completions
+    def get_symbol_completions(self, index: SymbolIndex, prefix: str) -> list[str]:
+        """Use the symbol index to generate a list of hits."""
+        c = self.c
+        m = re.match(r"(\S+(\.\w+)*)\.(\w*)$", prefix)
+        if not m:
+            return index.names_with_prefix(prefix)
+        varname = m.group(1)
+        class_name = index.class_of(c.p.v) if varname == 'self' else None
+        if not class_name:
+            aList = self.guess_class(c, varname)[1]
+            class_name = aList[0] if aList else None
+        if not class_name:
+            return []
+        return [f"{varname}.{z}" for z in index.members(class_name)]
     #@+node:ekr.20110510120621.14540: *6* ac.clean
     def clean(self, hits: list[list[str]]) -> list[str]:
         """Clean up hits, a list of ctags patterns, for use in completion lists."""
@@ -638,7 +666,7 @@ class AutoCompleterClass:
         # if varname == 'g':
             # return 'module',['leoGlobals']
         if varname == 'p':
-            return 'class', ['position']
+            return 'class', ['Position']
         if varname == 'c':
             return 'class', ['Commands']
         if varname == 'self':
@@ -259,7 +259,6 @@ class Position:
             self.stack = stack[:]  # Creating a copy here is safest and best.
         else:
             self.stack = []
-        g.app.positions += 1
     #@+node:ekr.20091210082012.6230: *4* p.__ge__ & __le__& __lt__
     def __ge__(self, other: object) -> bool:
         return self.__eq__(other) or self.__gt__(other)
@@ -573,11 +572,10 @@ class Position:
     def nodes(self) -> Generator:
         """Yield p.v and all vnodes in p's subtree."""
         p = self
-        p = p.copy()
-        after = p.nodeAfterTree()
-        while p and p != after:  # bug fix: 2013/10/12
+        if p.v:
             yield p.v
-            p.moveToThreadNext()
+            for v, level, n in p.v.walk():
+                yield v
 
     # Compatibility with old code.
 
@@ -651,11 +649,10 @@ class Position:
     def unique_nodes(self) -> Generator:
         """Yield p.v and all unique vnodes in p's subtree."""
         p = self
-        seen = set()
-        for p in p.self_and_subtree(copy=False):
-            if p.v not in seen:
-                seen.add(p.v)
-                yield p.v
+        if p.v:
+            yield p.v
+            for v, level, n in p.v.walk(unique=True):
+                yield v
 
     # Compatibility with old code.
 
@@ -674,6 +671,23 @@ class Position:
     # Compatibility with old code...
 
     subtree_with_unique_vnodes_iter = unique_subtree
+    #@+node:ekr.20261018183010.18: *4* p.walk
+    def walk(self, unique: bool = False) -> Generator[tuple[VNode, int, int], None, None]:
+        """
+        Yield (v, level, childIndex) for p.v and for all vnodes in p's
+        subtree, in outline order, without creating positions.
+
+        level and childIndex are the values p.level() and p.childIndex()
+        would return for the corresponding positions.
+
+        unique: Yield each vnode only once, skipping the subtrees of
+                vnodes already seen, like c.all_unique_positions.
+        """
+        p = self
+        if p.v:
+            level = len(p.stack)
+            yield p.v, level, p._childIndex
+            yield from p.v.walk(level + 1, unique)
     #@+node:ekr.20040306212636: *3* p.Getters
     #@+node:ekr.20040306214240.2: *4* p.children & parents
     #@+node:ekr.20040326064330: *5* p.childIndex
@@ -1363,13 +1377,23 @@ class Position:
     #@+node:ekr.20080416161551.205: *4* p.moveToNodeAfterTree
     def moveToNodeAfterTree(self) -> Position:
         """Move a position to the node after the position's tree."""
+        # This is time-critical code. Don't call other position methods.
         p = self
-        while p:
-            if p.hasNext():
-                p.moveToNext()
-                break
-            p.moveToParent()
-        return p
+        v, n, stack = p.v, p._childIndex, p.stack
+        if not v:
+            return p
+        hidden_v = v.context.hiddenRootNode
+        while True:
+            siblings = stack[-1][0].children if stack else hidden_v.children
+            if n + 1 < len(siblings):
+                p.v, p._childIndex = siblings[n + 1], n + 1
+                return p
+            if not stack:
+                # mypy rightly doesn't like setting p.v to None.
+                # Leo's code must use the test `if p:` as appropriate.
+                p.v, p._childIndex = None, n  # type:ignore
+                return p
+            v, n = stack.pop()
     #@+node:ekr.20080416161551.206: *4* p.moveToNthChild
     def moveToNthChild(self, n: int) -> Position:
         p = self
@@ -1406,21 +1430,14 @@ class Position:
     #@+node:ekr.20080416161551.209: *4* p.moveToThreadNext
     def moveToThreadNext(self) -> Position:
         """Move a position to threadNext position."""
+        # This is time-critical code. Don't call other position methods.
         p = self
-        if p.v:
-            if p.v.children:
-                p.moveToFirstChild()
-            elif p.hasNext():
-                p.moveToNext()
-            else:
-                p.moveToParent()
-                while p:
-                    if p.hasNext():
-                        p.moveToNext()
-                        break  #found
-                    p.moveToParent()
-                # not found.
-        return p
+        v = p.v
+        if v and v.children:
+            p.stack.append((v, p._childIndex))
+            p.v, p._childIndex = v.children[0], 0
+            return p
+        return p.moveToNodeAfterTree()
     #@+node:ekr.20080416161551.210: *4* p.moveToVisBack & helper
     def moveToVisBack(self, c: Cmdr) -> Position:
         """Move a position to the position of the previous visible node."""
@@ -1496,7 +1513,10 @@ class Position:
     #@+node:ekr.20040117171654: *4* p.copy
     def copy(self) -> Position:
         """"Return an independent copy of a position."""
-        return Position(self.v, self._childIndex, self.stack)
+        # This is time-critical code. Don't call Position.__init__.
+        p = object.__new__(Position)
+        p.v, p._childIndex, p.stack = self.v, self._childIndex, self.stack[:]
+        return p
     #@+node:ekr.20040303175026.9: *4* p.copyTreeAfter, copyTreeTo
     # These used by unit tests, by the group_operations plugin,
     # and by the files-compare-leo-files command.
@@ -2003,6 +2023,108 @@ class Position:
     #@-others
 
 position = Position  # compatibility.
+#@+node:ekr.20261018143010.1: ** class PositionIndex (c.positionIndex)
+class PositionIndex:
+    """
+    A per-commander index from gnxs to canonical positions.
+
+    The canonical position of a vnode is its first position in outline
+    order, the first position with the vnode's gnx that
+    c.all_unique_positions yields.
+
+    The index computes canonical positions on demand from v.parents, so
+    finding a position takes time proportional to the number of the
+    vnode's ancestors, not the size of the outline.
+
+    The low-level link methods, v._addLink, v._addCopiedLink and
+    v._cutLink, increment c.frame.tree.generation. The index clears all
+    entries when the generation changes, so moving, cloning or deleting
+    nodes invalidates the index.
+    """
+
+    def __init__(self, c: Cmdr) -> None:
+        self.c = c
+        self.generation = -1
+        # Keys are vnodes. Values are (key, position) tuples, where key
+        # is the tuple of child indices of the canonical position.
+        # Both are None for vnodes that are not in the outline.
+        self.d: dict[VNode, tuple[Optional[tuple[int, ...]], Optional[Position]]] = {}
+
+    #@+others
+    #@+node:ekr.20261018143010.2: *3* index.find & find_vnode
+    def find(self, gnx: str, unique: bool = False) -> Optional[Position]:
+        """
+        Return a copy of the canonical position of the vnode with the given gnx.
+
+        unique: Return None if the vnode has more than one position.
+        """
+        v = self.c.fileCommands.gnxDict.get(gnx)
+        return self.find_vnode(v, unique) if v else None
+
+    def find_vnode(self, v: VNode, unique: bool = False) -> Optional[Position]:
+        """
+        Return a copy of the canonical position of v.
+
+        unique: Return None if v has more than one position.
+        """
+        c = self.c
+        generation = c.frame.tree.generation
+        if generation != self.generation:
+            self.d.clear()
+            self.generation = generation
+        data = self.d.get(v)
+        p = data[1] if data else self.compute(v)
+        if p and not c.positionExists(p):
+            # Code changed the children of some vnode without calling v._addLink or v._cutLink.
+            self.d.clear()
+            p = self.compute(v)
+        if not p:
+            return None
+        if unique and any(len(z.parents) != 1 for z in [p.v, *(z[0] for z in p.stack)]):
+            return None
+        return p.copy()
+    #@+node:ekr.20261018143010.3: *3* index.compute
+    def compute(self, v: VNode) -> Optional[Position]:
+        """
+        Compute the canonical positions of v and all of v's ancestors.
+        Return the canonical position of v.
+        """
+        d = self.d
+        hidden_v = self.c.hiddenRootNode
+        if hidden_v not in d:
+            d[hidden_v] = ((), None)
+        # Don't use recursion: outlines may be deep.
+        todo = [v]
+        while todo:
+            v2 = todo[-1]
+            if v2 in d:
+                todo.pop()
+                continue
+            parents = [z for z in v2.parents if z not in d]
+            if parents:
+                todo.extend(parents)
+                continue
+            todo.pop()
+            # The canonical position of v2 is the first position of v2 in
+            # outline order. Comparing tuples of child indices compares
+            # positions in outline order.
+            best_key: Optional[tuple[int, ...]] = None
+            best_parent: VNode = None
+            for parent_v in v2.parents:
+                parent_key = d[parent_v][0]
+                if parent_key is None:
+                    continue  # The parent is not in the outline.
+                key = parent_key + (parent_v.children.index(v2),)
+                if best_key is None or key < best_key:
+                    best_key, best_parent = key, parent_v
+            if best_key is None:
+                d[v2] = (None, None)
+                continue
+            parent_p = d[best_parent][1]
+            stack = parent_p.stack + [(parent_p.v, parent_p._childIndex)] if parent_p else []
+            d[v2] = (best_key, Position(v2, best_key[-1], stack))
+        return d[v][1]
+    #@-others
 #@+node:ekr.20031218072017.3341: ** class VNode
 #@@nobeautify
 
@@ -2340,6 +2462,31 @@ class VNode:
     def numberOfChildren(self) -> int:
         v = self
         return len(v.children)
+    #@+node:ekr.20261018183010.19: *5* v.walk
+    def walk(self, level: int = 0, unique: bool = False) -> Generator[tuple[VNode, int, int], None, None]:
+        """
+        Yield (v2, level, childIndex) for all descendants v2 of v, in outline
+        order, without creating positions. The level of v's children is the
+        given level.
+
+        unique: Yield each vnode only once, skipping the subtrees of vnodes
+                already seen, like c.all_unique_positions.
+        """
+        # Don't use recursion: outlines may be deep.
+        seen: set[VNode] = set()
+        stack = [enumerate(self.children)]
+        while stack:
+            for n, v in stack[-1]:
+                if unique:
+                    if v in seen:
+                        continue
+                    seen.add(v)
+                yield v, level + len(stack) - 1, n
+                if v.children:
+                    stack.append(enumerate(v.children))
+                    break
+            else:
+                stack.pop()
     #@+node:ekr.20040323100443: *4* v.directParents
     def directParents(self) -> list[VNode]:
         """(New in 4.2) Return a list of all direct parent vnodes of a VNode.
@@ -2585,6 +2732,9 @@ class VNode:
             v._bodyString = g.toUnicode(s, reportErrors=True)
             self.contentModified()  # #1413.
             signal_manager.emit(self.context, 'body_changed', self)
+        frame = v.context.frame
+        if frame and frame.tree:  # The frame does not exist while creating the commander.
+            frame.tree.body_generation += 1
         v.updateIcon()
 
     def setHeadString(self, s: object) -> None:
@@ -2601,6 +2751,9 @@ class VNode:
         # #4394: Clear the the mod_time.
         if '_mod_time' in v.u:
             del v.u['_mod_time']
+        frame = v.context.frame
+        if frame and frame.tree:  # The frame does not exist while creating the commander.
+            frame.tree.headline_generation += 1
         # Update the icon last.
         v.updateIcon()
 
@@ -2714,6 +2867,9 @@ class VNode:
         It is not intended as a general replacement for p.doDelete().
         """
         v = self
+        frame = v.context.frame
+        if frame and frame.tree:
+            frame.tree.generation += 1
         for v2 in v.children:
             try:
                 v2.parents.remove(v)
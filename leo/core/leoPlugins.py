@@ -6,6 +6,7 @@
 from __future__ import annotations
 from collections.abc import Callable
 import sys
+import time
 from typing import Any, Iterator, Sequence, Union, TYPE_CHECKING
 from types import ModuleType
 from leo.core import leoGlobals as g
@@ -544,7 +545,10 @@ class LeoPluginsController:
         def loadOnePluginHelper(moduleName: str) -> Value:
             result = None
             try:
+                t1 = time.perf_counter()
                 __import__(moduleName)
+                if g.app.loadManager:
+                    g.app.loadManager.import_times[moduleName] = time.perf_counter() - t1
                 # Look up through sys.modules, __import__ returns toplevel package
                 result = sys.modules[moduleName]
             except g.UiTypeException:
@@ -0,0 +1,348 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018140211.1: * @file leoSnapshot.py
+"""
+Binary snapshots of .leo files.
+
+A snapshot is a compact, memory-mappable image of the outline contained in
+a .leo file. Leo writes the snapshot next to the .leo file, as
+<file>.leo.snapshot, whenever it saves the outline. fc.put_v_element and
+fc.put_t_element record the outline while Leo writes the .leo file, so
+writing a snapshot never parses the .leo file.
+
+When opening the outline, Leo loads the snapshot instead of parsing the
+.leo file, provided the snapshot is fresh. The snapshot records the size,
+modification time and sha1 hash of the .leo file. Leo hashes the .leo file
+only if its size matches but its modification time does not, or if the
+modification time is too close to the time Leo wrote the snapshot.
+
+@bool use-outline-snapshots enables snapshots.
+
+Snapshot format (all integers are little-endian)::
+
+    header: magic, format version, .leo size, .leo mtime (ns), .leo sha1,
+            number of nodes
+    section table: (offset, length) of each section
+    sections:
+        gnxs:       utf-8 gnxs, separated by newlines
+        heads:      utf-8 string table of headlines
+        head_ends:  uint32 end (character) offset of each headline
+        bodies:     utf-8 string table of bodies
+        body_ends:  uint64 end (character) offset of each body
+        parents:    uint32 parent index of each link
+        children:   uint32 child index of each link
+        attrs:      marshaled dict: node index -> (<v> attrs, <t> attrs)
+
+Node 0 is the hidden root vnode. Nodes appear in the order in which their
+first <v> elements appear in the .leo file. Links (parent, child) appear
+in the order of the <v> elements in the .leo file, so loading the links
+creates the same children and parents lists as parsing the .leo file.
+Headlines, bodies and attributes are the strings that the XML parser would
+read from the .leo file.
+
+Loading a snapshot maps the file, decodes each string table once, and
+slices the headlines and bodies of all vnodes from the decoded tables.
+"""
+#@+<< leoSnapshot imports & annotations >>
+#@+node:ekr.20261018140211.2: ** << leoSnapshot imports & annotations >>
+from __future__ import annotations
+from array import array
+import hashlib
+import marshal
+import mmap
+import os
+import re
+import struct
+from typing import Any, Optional, TYPE_CHECKING
+import xml.etree.ElementTree as ElementTree
+from leo.core import leoGlobals as g
+from leo.core import leoNodes
+
+if TYPE_CHECKING:  # pragma: no cover
+    from leo.core.leoFileCommands import FastRead
+    from leo.core.leoNodes import VNode
+    Value = Any
+#@-<< leoSnapshot imports & annotations >>
+
+magic = b'LEOSNAP\x00'
+format_version = 2
+header_struct = struct.Struct('<8sIQQ20sI')
+section_struct = struct.Struct('<QQ')
+section_names = (
+    'gnxs', 'heads', 'head_ends', 'bodies', 'body_ends',
+    'parents', 'children', 'attrs',
+)
+# Characters that the XML writer removes or the XML parser changes.
+control_pattern = re.compile('[\x00-\x08\x0b-\x1f]')
+# fc.entities removes these characters when writing text.
+entities_dict = {z: None for z in range(32) if chr(z) not in '\t\r\n'}
+# FastRead removes these characters before parsing.
+translate_dict = {z: None for z in range(20) if chr(z) not in '\t\r\n'}
+
+#@+others
+#@+node:ekr.20261018140211.3: ** function: snapshot_path
+def snapshot_path(path: str) -> str:
+    """Return the path to the snapshot of the given .leo file."""
+    return path + '.snapshot'
+#@+node:ekr.20261018140211.4: ** class SnapshotRecorder
+class SnapshotRecorder:
+    """
+    Record the outline that fc.put_v_elements and fc.put_t_elements write
+    to a .leo file, without parsing the .leo file.
+    """
+
+    def __init__(self) -> None:
+        self.index: dict[str, int] = {}  # Keys are gnxs, values are node indices.
+        self.gnxs: list[str] = ['hidden-root-vnode-gnx']
+        self.heads: list[str] = ['<hidden root vnode>']
+        self.links: list[tuple[int, int]] = []  # (parent index, child index).
+        # Unparsed attributes of <v> and <t> elements.
+        self.v_attrs: dict[int, str] = {}
+        self.t_attrs: dict[str, str] = {}  # Keys are gnxs.
+        self.bodies: dict[str, str] = {}  # Keys are gnxs.
+        self.stack: list[int] = [0]  # The node index of each open <v> element.
+
+    #@+others
+    #@+node:ekr.20261018140211.5: *3* recorder.start_v, end_v, put_clone & put_t
+    def start_v(self, gnx: str, attrs: str, head: str) -> None:
+        """Record the start of the first <v> element for gnx."""
+        i = len(self.gnxs)
+        self.index[gnx] = i
+        self.gnxs.append(gnx)
+        self.heads.append(xml_text(head))
+        self.links.append((self.stack[-1], i))
+        if attrs:
+            self.v_attrs[i] = attrs
+        self.stack.append(i)
+
+    def end_v(self) -> None:
+        """Record the end of the first <v> element for a gnx."""
+        self.stack.pop()
+
+    def put_clone(self, gnx: str) -> None:
+        """Record an empty <v> element for an already-written gnx."""
+        self.links.append((self.stack[-1], self.index[gnx]))
+
+    def put_t(self, gnx: str, attrs: str, body: str) -> None:
+        """Record a <t> element."""
+        self.bodies[gnx] = xml_text(body)
+        if attrs:
+            self.t_attrs[gnx] = attrs
+    #@+node:ekr.20261018140211.6: *3* recorder.to_bytes
+    def to_bytes(self, size: int, mtime_ns: int, sha1: bytes) -> bytes:
+        """
+        Return the snapshot of the recorded outline.
+
+        size, mtime_ns and sha1 describe the .leo file containing the outline.
+        """
+        gnxs, bodies = self.gnxs, self.bodies
+        n = len(gnxs)
+        body_list = [bodies.get(gnx, '') for gnx in gnxs]
+        body_list[0] = ''
+        attrs: dict[int, tuple[dict[str, str], dict[str, str]]] = {}
+        for i, v_attrs in self.v_attrs.items():
+            attrs[i] = (parse_attributes(v_attrs), {})
+        for gnx, t_attrs in self.t_attrs.items():
+            i = self.index[gnx]
+            attrs[i] = (attrs.get(i, ({}, {}))[0], parse_attributes(t_attrs))
+        sections = (
+            '\n'.join(gnxs).encode('utf-8'),
+            ''.join(self.heads).encode('utf-8', 'surrogatepass'),
+            cumulative_lengths('I', self.heads),
+            ''.join(body_list).encode('utf-8', 'surrogatepass'),
+            cumulative_lengths('Q', body_list),
+            array('I', [z[0] for z in self.links]).tobytes(),
+            array('I', [z[1] for z in self.links]).tobytes(),
+            marshal.dumps(attrs),
+        )
+        header = header_struct.pack(magic, format_version, size, mtime_ns, sha1, n)
+        offset = header_struct.size + section_struct.size * len(sections)
+        table: list[bytes] = []
+        for section in sections:
+            table.append(section_struct.pack(offset, len(section)))
+            offset += len(section)
+        return b''.join([header, *table, *sections])
+    #@-others
+#@+node:ekr.20261018140211.7: ** function: cumulative_lengths
+def cumulative_lengths(typecode: str, strings: list[str]) -> bytes:
+    """Return an array of the end offsets of the given strings, as bytes."""
+    ends = array(typecode)
+    total = 0
+    for s in strings:
+        total += len(s)
+        ends.append(total)
+    return ends.tobytes()
+#@+node:ekr.20261019090010.39: ** function: parse_attributes
+def parse_attributes(attrs: str) -> dict[str, str]:
+    """
+    Return the attributes that the XML parser reads from attrs, a string of
+    attributes written by fc.put_v_element or fc.put_t_element.
+    """
+    return dict(ElementTree.fromstring(f"<a{attrs.translate(translate_dict)}/>").attrib)
+#@+node:ekr.20261018140211.18: ** function: to_array
+def to_array(typecode: str, buffer: memoryview) -> array:
+    """Return an array containing a copy of the given buffer."""
+    result = array(typecode)
+    result.frombytes(buffer)
+    return result
+#@+node:ekr.20261019090010.40: ** function: xml_text
+def xml_text(s: str) -> str:
+    """Return the text that the XML parser reads from s after Leo escapes s."""
+    if not control_pattern.search(s):
+        return s
+    # The XML parser normalizes the line endings that fc.entities retains.
+    return s.translate(entities_dict).replace('\r\n', '\n').replace('\r', '\n')
+#@+node:ekr.20261018140211.8: ** function: write_snapshot
+def write_snapshot(recorder: SnapshotRecorder, path: str, leo_bytes: bytes) -> bool:
+    """
+    Write the snapshot of the outline that recorder recorded while Leo wrote
+    leo_bytes to the .leo file at the given path.
+
+    Return True if the snapshot was written.
+    """
+    snapshot = snapshot_path(path)
+    temp = snapshot + '.tmp'
+    try:
+        stat = os.stat(path)
+        sha1 = hashlib.sha1(leo_bytes).digest()
+        with open(temp, 'wb') as f:
+            f.write(recorder.to_bytes(len(leo_bytes), stat.st_mtime_ns, sha1))
+        os.replace(temp, snapshot)
+        return True
+    except Exception:
+        g.es_print(f"can not write snapshot: {g.shortFileName(snapshot)}")
+        g.es_exception()
+        if os.path.exists(temp):
+            os.remove(temp)
+        return False
+#@+node:ekr.20261018140211.9: ** function: read_snapshot & helper
+def read_snapshot(reader: FastRead, path: str) -> Optional[VNode]:
+    """
+    Load the snapshot of the .leo file at the given path.
+
+    Return the hidden root vnode, or None if the snapshot does not exist,
+    is invalid, or is stale.
+    """
+    snapshot = snapshot_path(path)
+    try:
+        if not os.path.exists(snapshot):
+            return None
+        with open(snapshot, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < header_struct.size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not is_fresh(path, mm, stat.st_mtime_ns):
+                    return None
+                return load_snapshot(reader, mm)
+    except Exception:
+        g.es_print(f"invalid snapshot: {g.shortFileName(snapshot)}")
+        g.es_exception()
+        return None
+
+def is_fresh(path: str, mm: mmap.mmap, snapshot_mtime_ns: int) -> bool:
+    """
+    Return True if mm, the mapped snapshot of the .leo file at the given
+    path, describes the present contents of the .leo file.
+    """
+    magic2, version, size, mtime_ns, sha1, _n = header_struct.unpack_from(mm, 0)
+    if (magic2, version) != (magic, format_version):
+        return False
+    stat = os.stat(path)
+    if stat.st_size != size:
+        return False
+    # A .leo file changed in the clock tick in which Leo wrote the snapshot
+    # may keep its size and modification time. Hash such files.
+    if stat.st_mtime_ns == mtime_ns and mtime_ns < snapshot_mtime_ns:
+        return True
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).digest() == sha1
+
+def load_snapshot(reader: FastRead, mm: mmap.mmap) -> Optional[VNode]:
+    """Create vnodes from mm, the mapped snapshot of a .leo file."""
+    c = reader.c
+    fc = c.fileCommands
+    n = header_struct.unpack_from(mm, 0)[-1]
+    sections: dict[str, memoryview] = {}
+    with memoryview(mm) as mv:
+        for i, name in enumerate(section_names):
+            offset, length = section_struct.unpack_from(mm, header_struct.size + i * section_struct.size)
+            sections[name] = mv[offset : offset + length]
+        try:
+            gnxs = str(sections['gnxs'], 'utf-8').split('\n')
+            heads = str(sections['heads'], 'utf-8', 'surrogatepass')
+            bodies = str(sections['bodies'], 'utf-8', 'surrogatepass')
+            head_ends = to_array('I', sections['head_ends'])
+            body_ends = to_array('Q', sections['body_ends'])
+            parents = to_array('I', sections['parents'])
+            children = to_array('I', sections['children'])
+            attrs = marshal.loads(sections['attrs'])
+        finally:
+            for section in sections.values():
+                section.release()
+    if not (len(gnxs) == len(head_ends) == len(body_ends) == n):
+        return None
+    # Let the caller read the .leo file if any vnode already exists.
+    gnx2vnode = reader.gnx2vnode
+    if any(gnx in gnx2vnode for gnx in gnxs[1:]):
+        return None
+    # The VNode ctor changes fc.gnxDict.
+    gnxDict = fc.gnxDict
+    old_hidden_v = gnxDict.get('hidden-root-vnode-gnx')
+    hidden_v = leoNodes.VNode(context=c, gnx='hidden-root-vnode-gnx')
+    vnodes = [hidden_v]
+    try:
+        # Create the vnodes.
+        VNode = leoNodes.VNode
+        head_start = head_ends[0]
+        body_start = body_ends[0]
+        hidden_v._headString = heads[:head_start]
+        for i in range(1, n):
+            v = VNode(context=c, gnx=gnxs[i] or None)
+            head_end, body_end = head_ends[i], body_ends[i]
+            v._headString = heads[head_start:head_end]
+            v._bodyString = bodies[body_start:body_end]
+            head_start, body_start = head_end, body_end
+            vnodes.append(v)
+        # Link the vnodes.
+        for parent_i, child_i in zip(parents, children):
+            parent_v, child_v = vnodes[parent_i], vnodes[child_i]
+            parent_v.children.append(child_v)
+            child_v.parents.append(parent_v)
+        # Handle uA's exactly as FastReadTarget does.
+        for i in sorted(attrs):
+            v_attrs, t_attrs = attrs[i]
+            v = vnodes[i]
+            s = v_attrs.get('descendentTnodeUnknownAttributes')
+            if s:
+                aDict = fc.getDescendentUnknownAttributes(s, v=v)
+                if aDict:
+                    fc.descendentTnodeUaDictList.append(aDict)
+            s = v_attrs.get('descendentVnodeUnknownAttributes')
+            if s:
+                aDict = fc.getDescendentUnknownAttributes(s, v=v)
+                if aDict:
+                    fc.descendentVnodeUaDictList.append((v, aDict),)
+            uaDict: dict[str, Value] = {}
+            for key, val in t_attrs.items():
+                ua = reader.resolveUa(key, val)
+                if ua:
+                    uaDict[key] = ua
+            for key, val in v_attrs.items():
+                if key not in reader.nativeVnodeAttributes:
+                    uaDict[key] = reader.resolveUa(key, val)
+            if uaDict:
+                v.unknownAttributes = uaDict
+    except Exception:
+        # Restore fc.gnxDict.
+        for v in vnodes[1:]:
+            gnxDict.pop(v.gnx, None)
+        if old_hidden_v:
+            gnxDict['hidden-root-vnode-gnx'] = old_hidden_v
+        raise
+    gnx2vnode.update((v.gnx, v) for v in vnodes)
+    return hidden_v
+#@-others
+#@@language python
+#@@tabwidth -4
+#@@pagewidth 70
+#@-leo
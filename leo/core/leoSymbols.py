@@ -0,0 +1,445 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018160512.1: * @file leoSymbols.py
+"""
+An index of the definitions in an outline's @<file> trees.
+
+The index maps the names of classes, functions, methods and variables to
+the gnxs of the nodes defining them and the offsets of the definitions
+within the nodes' bodies. The find-def command, ctrl-click and the
+autocompleter use the index instead of scanning the outline or using
+codewise's ctags database.
+
+The index parses Python nodes with the ast module, replacing Leo's
+directives and section references with equivalent Python statements. For
+other languages, the index uses the block patterns of Leo's importers.
+
+A method's class is the class defined in the method's node or in the
+nearest ancestor whose class contains an @others directive.
+
+Like leoIndex.OutlineIndex, the index does nothing if the outline's
+generation counts have not changed since the last query. Otherwise, the
+index reparses only the nodes whose body, language or class has changed
+since the index last saw them, and rescans only changed headlines and
+bodies for @<file>, @language and @nosearch. Leo saves the index in c.db
+when saving the outline.
+
+@bool use-symbol-index enables the index.
+"""
+#@+<< leoSymbols imports & annotations >>
+#@+node:ekr.20261018160512.2: ** << leoSymbols imports & annotations >>
+from __future__ import annotations
+import ast
+import importlib
+import re
+import textwrap
+from typing import Optional, TYPE_CHECKING
+from leo.core import leoGlobals as g
+from leo.core.leoIndex import content_key
+
+if TYPE_CHECKING:  # pragma: no cover
+    from leo.core.leoCommands import Commands as Cmdr
+    from leo.core.leoNodes import Position, VNode
+
+    # (name, kind, owner, offset, text): kind is 'class', 'def' or 'var'.
+    # owner is the name of the enclosing class or None. text is the text of
+    # the definition, from its first non-blank character to the end of name.
+    Symbol = tuple[str, str, Optional[str], int, str]
+#@-<< leoSymbols imports & annotations >>
+
+db_key = 'symbol-index'
+db_version = 1
+others_pattern = re.compile(r'^([ \t]*)(@others|@all)\b.*$', re.MULTILINE)
+section_pattern = re.compile(r'^([ \t]*)<<.+?>>.*$', re.MULTILINE)
+directive_pattern = re.compile(r'^@(\w+)')
+name_pattern = re.compile(r'[\w$]+')
+# Keys are languages, values are importers' block patterns.
+block_patterns_dict: dict[str, tuple] = {}
+# Statements whose bodies may define symbols. ast.TryStar is new in Python 3.11.
+compound_statements = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith,
+    ast.Try, getattr(ast, 'TryStar', ast.Try),
+)
+
+#@+others
+#@+node:ekr.20261018160512.3: ** function: get_index
+def get_index(c: Cmdr) -> Optional[SymbolIndex]:
+    """
+    Return c's symbol index, creating it if necessary.
+
+    Return None if @bool use-symbol-index is False.
+    """
+    if not c.config.getBool('use-symbol-index', default=False):
+        return None
+    if c.symbolIndex is None:
+        c.symbolIndex = SymbolIndex(c)
+        c.symbolIndex.load()
+    return c.symbolIndex
+#@+node:ekr.20261018160512.4: ** function: find_symbols
+def find_symbols(b: str, language: str) -> tuple[list[Symbol], Optional[str]]:
+    """
+    Return (symbols, others_class) for body b, where others_class is the
+    name of the innermost class containing an @others directive, or None.
+    """
+    if language == 'python':
+        result = find_python_symbols(b)
+        if result is not None:
+            return result
+    return find_pattern_symbols(b, language), None
+#@+node:ekr.20261018160512.5: ** function: find_python_symbols & helpers
+def find_python_symbols(b: str) -> Optional[tuple[list[Symbol], Optional[str]]]:
+    """
+    Use Python's ast module to find the symbols defined in b.
+
+    Return None if b is not valid Python.
+    """
+    lines = g.splitLines(b)
+    # Replace @others and section references by pass statements and
+    # other Leo directives by blank lines, preserving all line numbers.
+    others_lines: list[int] = []
+
+    def replace_others(m: re.Match) -> str:
+        others_lines.append(b.count('\n', 0, m.start()) + 1)
+        return m.group(1) + 'pass'
+
+    s = others_pattern.sub(replace_others, b)
+    s = section_pattern.sub(lambda m: m.group(1) + 'pass', s)
+    s = ''.join(
+        '\n' if (m := directive_pattern.match(z)) and m.group(1) in g.globalDirectiveList else z
+        for z in g.splitLines(s)
+    )
+    try:
+        tree = ast.parse(s)
+    except (SyntaxError, ValueError):
+        try:
+            tree = ast.parse(textwrap.dedent(s))
+        except (SyntaxError, ValueError):
+            return None
+    starts, i = [], 0
+    for line in lines:
+        starts.append(i)
+        i += len(line)
+    symbols: list[Symbol] = []
+    others_class: Optional[str] = None
+
+    def add(name: str, kind: str, owner: Optional[str], lineno: int, prefix: str = '') -> None:
+        """Add a symbol defined on the given (1-based) line."""
+        line = lines[lineno - 1]
+        m = re.search(rf"\b{re.escape(prefix + name)}\b", line)
+        if m:
+            k = len(line) - len(line.lstrip())
+            symbols.append((name, kind, owner, starts[lineno - 1] + k, line[k : m.end()]))
+
+    def add_targets(targets: list[ast.expr], owner: Optional[str], lineno: int) -> None:
+        for target in targets:
+            if isinstance(target, ast.Name):
+                add(target.id, 'var', owner, lineno)
+            elif isinstance(target, (ast.Tuple, ast.List)):
+                add_targets(target.elts, owner, lineno)
+
+    def visit_body(statements: list[ast.stmt], owner: Optional[str]) -> None:
+        nonlocal others_class
+        for node in statements:
+            if isinstance(node, ast.ClassDef):
+                add(node.name, 'class', owner, node.lineno)
+                if any(node.lineno < n <= (node.end_lineno or 0) for n in others_lines):
+                    others_class = node.name
+                visit_body(node.body, node.name)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                add(node.name, 'def', owner, node.lineno)
+                args = node.args.args
+                if args and (owner or args[0].arg == 'self'):
+                    visit_method(node, owner)
+            elif isinstance(node, ast.Assign):
+                add_targets(node.targets, owner, node.lineno)
+            elif isinstance(node, ast.AnnAssign):
+                add_targets([node.target], owner, node.lineno)
+            elif isinstance(node, compound_statements):
+                # Visit the bodies in source order.
+                visit_body(node.body, owner)
+                for handler in getattr(node, 'handlers', []):
+                    visit_body(handler.body, owner)
+                visit_body(getattr(node, 'orelse', []), owner)
+                visit_body(getattr(node, 'finalbody', []), owner)
+
+    def visit_method(node: ast.FunctionDef | ast.AsyncFunctionDef, owner: Optional[str]) -> None:
+        """Add the ivars assigned to self.x in the given method."""
+        self_name = node.args.args[0].arg
+        seen: set[str] = set()
+        for z in ast.walk(node):
+            if isinstance(z, (ast.Assign, ast.AnnAssign)):
+                for target in z.targets if isinstance(z, ast.Assign) else [z.target]:
+                    if (
+                        isinstance(target, ast.Attribute)
+                        and isinstance(target.value, ast.Name)
+                        and target.value.id == self_name
+                        and target.attr not in seen
+                    ):
+                        seen.add(target.attr)
+                        add(target.attr, 'var', owner, target.lineno, prefix=f"{self_name}.")
+
+    visit_body(tree.body, None)
+    return symbols, others_class
+#@+node:ekr.20261018160512.6: ** function: find_pattern_symbols & get_block_patterns
+def find_pattern_symbols(b: str, language: str) -> list[Symbol]:
+    """Use the block patterns of language's importer to find the symbols defined in b."""
+    patterns = get_block_patterns(language)
+    if not patterns:
+        return []
+    symbols: list[Symbol] = []
+    i = 0
+    for line in g.splitLines(b):
+        for kind, pattern in patterns:
+            if m := pattern.match(line):
+                # Some patterns match text following the name.
+                if name_m := name_pattern.search(m.group(1)):
+                    name = name_m.group(0)
+                    k = len(line) - len(line.lstrip())
+                    kind = 'class' if kind in ('class', 'struct', 'impl', 'trait') else 'def'
+                    symbols.append((name, kind, None, i + k, line[k : m.start(1) + name_m.end()]))
+                break
+        i += len(line)
+    return symbols
+
+def get_block_patterns(language: str) -> tuple:
+    """Return the block patterns of the importer for the given language."""
+    if language in block_patterns_dict:
+        return block_patterns_dict[language]
+    patterns: tuple = ()
+    try:
+        module = importlib.import_module(f"leo.plugins.importers.{language}")
+        for obj in vars(module).values():
+            if getattr(obj, 'language', None) == language and getattr(obj, 'block_patterns', None):
+                patterns = obj.block_patterns
+                break
+    except Exception:
+        pass
+    block_patterns_dict[language] = patterns
+    return patterns
+#@+node:ekr.20261018160512.7: ** class SymbolIndex
+class SymbolIndex:
+    """An index of the definitions in an outline's @<file> trees."""
+
+    def __init__(self, c: Cmdr) -> None:
+        self.c = c
+        # Keys are gnxs. Values are (b, language, node_class, symbols, others_class),
+        # where b is the body from which the symbols were computed and node_class is
+        # the class of the node's top-level definitions, the owner of symbols
+        # whose owner is None.
+        self.nodes: dict[str, tuple[str, str, Optional[str], list[Symbol], Optional[str]]] = {}
+        # Keys are names, values are the gnxs of the nodes defining the names.
+        self.names: dict[str, set[str]] = {}
+        # Keys are class names, values are the gnxs of the nodes defining their members.
+        self.classes: dict[str, set[str]] = {}
+        # Keys are gnxs, values are the order in which refresh visited the nodes.
+        self.order: dict[str, int] = {}
+        # Keys are gnxs, values are (h, file_language), where file_language is
+        # None if v is not an @<file> node and '' if h implies no language.
+        self.heads: dict[str, tuple[str, Optional[str]]] = {}
+        # Keys are gnxs, values are (b, nosearch, language), where language is
+        # the language of b's first valid @language directive or None.
+        self.bodies: dict[str, tuple[str, bool, Optional[str]]] = {}
+        # The state of the outline when the index was last refreshed. See leoIndex.py.
+        self.key: Optional[tuple[VNode, int, int, int]] = None
+
+    #@+others
+    #@+node:ekr.20261018160512.8: *3* symbols.add & remove
+    def add(self,
+        gnx: str,
+        b: str,
+        language: str,
+        node_class: Optional[str],
+        parsed: tuple[list[Symbol], Optional[str]] = None,
+    ) -> None:
+        """Add the symbols defined in the given node to the index."""
+        self.remove(gnx)
+        symbols, others_class = parsed or find_symbols(b, language)
+        self.nodes[gnx] = b, language, node_class, symbols, others_class
+        for name, kind, owner, offset, text in symbols:
+            self.names.setdefault(name, set()).add(gnx)
+            class_name = owner or node_class
+            if class_name:
+                self.classes.setdefault(class_name, set()).add(gnx)
+
+    def remove(self, gnx: str) -> None:
+        """Remove the given node from the index."""
+        data = self.nodes.pop(gnx, None)
+        if data is None:
+            return
+        for name, kind, owner, offset, text in data[3]:
+            for d, key in ((self.names, name), (self.classes, owner or data[2])):
+                aSet = d.get(key)
+                if aSet is not None:
+                    aSet.discard(gnx)
+                    if not aSet:
+                        del d[key]
+    #@+node:ekr.20261018160512.9: *3* symbols.refresh
+    def refresh(self) -> int:
+        """
+        Reparse all nodes in @<file> trees whose body, language or class has
+        changed since the index last parsed them. Return the number of
+        reparsed nodes.
+        """
+        c, n, nodes = self.c, 0, self.nodes
+        tree = c.frame.tree
+        key = (c.hiddenRootNode, tree.generation, tree.headline_generation, tree.body_generation)
+        if key == self.key:
+            return 0
+        self.key = key
+        heads, bodies = self.heads, self.bodies
+        default_language = c.target_language or 'python'
+        order: dict[str, int] = {}
+        indexed: set[str] = set()
+        # Entries are (v, language, node_class, in_file).
+        stack: list[tuple[VNode, Optional[str], Optional[str], bool]] = [
+            (z, None, None, False) for z in reversed(c.hiddenRootNode.children)
+        ]
+        while stack:
+            v, language, node_class, in_file = stack.pop()
+            gnx, h, b = v.gnx, v._headString, v._bodyString
+            if gnx in order:
+                continue
+            order[gnx] = len(order)
+            # Compare strings by identity, like leoIndex.py.
+            body_data = bodies.get(gnx)
+            if body_data is None or body_data[0] is not b:
+                body_data = bodies[gnx] = (
+                    b,
+                    b.startswith('@nosearch') or '\n@nosearch' in b,
+                    g.findFirstValidAtLanguageDirective(b) if '@language' in b else None,
+                )
+            if body_data[1]:
+                continue  # Ignore @nosearch trees.
+            head_data = heads.get(gnx)
+            if head_data is None or head_data[0] is not h:
+                head_data = heads[gnx] = (
+                    h, (self.language_from_headline(v) or '') if v.isAnyAtFileNode() else None)
+            if head_data[1] is not None:
+                in_file = True
+                language = head_data[1] or language
+            if body_data[2]:
+                language = body_data[2]
+            others_class = None
+            if in_file:
+                node_language = language or default_language
+                data = nodes.get(gnx)
+                if (
+                    data is None or data[0] is not b
+                    or data[1] != node_language or data[2] != node_class
+                ):
+                    if data and data[0] == b and data[1] == node_language:
+                        self.add(gnx, b, node_language, node_class, (data[3], data[4]))
+                    else:
+                        self.add(gnx, b, node_language, node_class)
+                        n += 1
+                indexed.add(gnx)
+                others_class = nodes[gnx][4]
+            for child in reversed(v.children):
+                stack.append((child, language, others_class or node_class, in_file))
+        # Remove deleted nodes and nodes no longer in @<file> trees.
+        for gnx in list(nodes):
+            if gnx not in indexed:
+                self.remove(gnx)
+        for d in (heads, bodies):
+            for gnx in [z for z in d if z not in order]:
+                del d[gnx]
+        self.order = order
+        return n
+
+    def language_from_headline(self, v: VNode) -> Optional[str]:
+        """Return the language implied by the extension of an @<file> node."""
+        ext = g.os_path_splitext(v.anyAtFileNodeName())[1][1:]
+        language = g.app.extension_dict.get(ext)
+        return language if g.isValidLanguage(language) else None
+    #@+node:ekr.20261018160512.10: *3* symbols.definitions & find_def
+    def definitions(self, name: str, language: str = None) -> list[tuple[str, Symbol]]:
+        """
+        Return a list of (gnx, symbol) tuples describing all definitions of name,
+        in outline order.
+        """
+        self.refresh()
+        result: list[tuple[str, Symbol]] = []
+        for gnx in self.names.get(name, ()):
+            node_language, symbols = self.nodes[gnx][1], self.nodes[gnx][3]
+            if language is None or language == node_language:
+                result.extend((gnx, z) for z in symbols if z[0] == name)
+        result.sort(key=lambda z: (self.order.get(z[0], 0), z[1][3]))
+        return result
+
+    def find_def(self, name: str, language: str = None) -> list[tuple[int, Position, str]]:
+        """
+        Return a list of (offset, p, text) tuples describing the first
+        definition of name in each node, like LeoFind._find_all_matches.
+        """
+        c = self.c
+        gnx_dict = c.fileCommands.gnxDict
+        result: list[tuple[int, Position, str]] = []
+        seen: set[str] = set()
+        for gnx, symbol in self.definitions(name, language):
+            offset, text = symbol[3], symbol[4]
+            v = gnx_dict.get(gnx)
+            if gnx not in seen and v:
+                seen.add(gnx)
+                p = c.vnode2position(v)
+                if p:
+                    result.append((offset, p, text))
+        return result
+    #@+node:ekr.20261018160512.11: *3* symbols.members, class_of & names_with_prefix
+    def members(self, class_name: str) -> list[str]:
+        """Return the sorted list of the names of all members of the given class."""
+        self.refresh()
+        result: set[str] = set()
+        for gnx in self.classes.get(class_name, ()):
+            node_class, symbols = self.nodes[gnx][2], self.nodes[gnx][3]
+            result.update(z[0] for z in symbols if (z[2] or node_class) == class_name)
+        return sorted(result)
+
+    def class_of(self, v: VNode) -> Optional[str]:
+        """Return the class of the definitions in v, or None."""
+        self.refresh()
+        data = self.nodes.get(v.gnx)
+        if not data:
+            return None
+        return data[4] or data[2]
+
+    def names_with_prefix(self, prefix: str) -> list[str]:
+        """Return the sorted list of all defined names starting with prefix."""
+        self.refresh()
+        return sorted(z for z in self.names if z.startswith(prefix))
+    #@+node:ekr.20261018160512.12: *3* symbols.load & save
+    def load(self) -> int:
+        """
+        Load the index saved in c.db, then refresh the index.
+
+        Return the number of nodes whose saved symbols were still valid.
+        """
+        c, n = self.c, 0
+        data = c.db.get(db_key)
+        if data and data.get('version') == db_version:
+            saved = data['nodes']
+            for gnx, v in c.fileCommands.gnxDict.items():
+                entry = saved.get(gnx)
+                if entry and entry[0] == content_key(v):
+                    language, node_class, symbols, others_class = entry[1:]
+                    self.add(gnx, v._bodyString, language, node_class, (symbols, others_class))
+                    n += 1
+        self.refresh()
+        return n
+
+    def save(self) -> None:
+        """Save the index in c.db."""
+        c = self.c
+        self.refresh()
+        gnx_dict = c.fileCommands.gnxDict
+        nodes = {}
+        for gnx, data in self.nodes.items():
+            v = gnx_dict.get(gnx)
+            if v:
+                # Replace the body by its content key.
+                nodes[gnx] = (content_key(v), *data[1:])
+        c.db[db_key] = {'version': db_version, 'nodes': nodes}
+    #@-others
+#@-others
+#@@language python
+#@@tabwidth -4
+#@@pagewidth 70
+#@-leo
@@ -47,7 +47,9 @@
 #@+node:ekr.20220821074023.1: ** << leoUndo imports & annotations >>
 from __future__ import annotations
 from collections.abc import Callable
-from typing import TYPE_CHECKING
+import difflib
+import sys
+from typing import Optional, TYPE_CHECKING
 from leo.core import leoGlobals as g
 from leo.core.leoFileCommands import FastRead
 from leo.core.leoNodes import Position, VNode
@@ -63,6 +65,127 @@ def cmd(name: str) -> Callable:
     return g.new_cmd_decorator(name, ['c', 'undoer',])
 
 #@+others
+#@+node:ekr.20261018151931.1: ** class BodyDiff
+class BodyDiff:
+    """
+    A compact description of a change to a body text.
+
+    ops is a list of (i1, i2, j1, j2, old_s, new_s) tuples: old[i1:i2] == old_s
+    became new[j1:j2] == new_s. Either text can be rebuilt from the other.
+
+    Diffs for the same vnode form a chain: prev is the diff whose new text is
+    this diff's old text. Every keyframe_interval'th diff is a keyframe that
+    also contains its full old text, so any diff's texts can be rebuilt even
+    if the body has changed in ways the undoer does not know about.
+    """
+
+    keyframe_interval = 16
+    min_size = 1024  # Store smaller texts in full.
+
+    def __init__(self, old: str, new: str, ops: list[tuple], prev: BodyDiff) -> None:
+        self.ops = ops
+        self.old_key = (len(old), hash(old))
+        self.new_key = (len(new), hash(new))
+        if prev and prev.new_key == self.old_key and prev.depth + 1 < self.keyframe_interval:
+            self.prev, self.depth, self.text = prev, prev.depth + 1, None
+        else:
+            self.prev, self.depth, self.text = None, 0, old  # A keyframe.
+        self.size = sum(sys.getsizeof(z[4]) + sys.getsizeof(z[5]) for z in ops)
+        if self.text is not None:
+            self.size += sys.getsizeof(self.text)
+
+    def __repr__(self) -> str:
+        kind = 'keyframe' if self.text is not None else f"depth {self.depth}"
+        return f"<BodyDiff {kind}: {len(self.ops)} ops, {self.size} bytes>"
+
+    #@+others
+    #@+node:ekr.20261018151931.2: *3* BodyDiff.create
+    @classmethod
+    def create(cls, old: str, new: str, prev: BodyDiff = None) -> Optional[BodyDiff]:
+        """
+        Return a BodyDiff describing how old became new, or None if storing
+        both texts in full would be about as small.
+        """
+        if len(old) + len(new) < cls.min_size:
+            return None
+        # Trim the common leading and trailing lines first: this is fast and
+        # handles typical edits without running difflib on the whole text.
+        old_lines, new_lines = old.splitlines(True), new.splitlines(True)
+        n = min(len(old_lines), len(new_lines))
+        lead = 0
+        while lead < n and old_lines[lead] == new_lines[lead]:
+            lead += 1
+        trail = 0
+        while trail < n - lead and old_lines[-1 - trail] == new_lines[-1 - trail]:
+            trail += 1
+        old_mid = old_lines[lead : len(old_lines) - trail]
+        new_mid = new_lines[lead : len(new_lines) - trail]
+        i0 = sum(len(z) for z in old_lines[:lead])
+        j0 = i0
+        # Offsets of lines in old_mid and new_mid.
+        old_offsets, new_offsets = [i0], [j0]
+        for z in old_mid:
+            old_offsets.append(old_offsets[-1] + len(z))
+        for z in new_mid:
+            new_offsets.append(new_offsets[-1] + len(z))
+        ops: list[tuple] = []
+        matcher = difflib.SequenceMatcher(None, old_mid, new_mid)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != 'equal':
+                i, j = old_offsets[i1], new_offsets[j1]
+                k, m = old_offsets[i2], new_offsets[j2]
+                ops.append((i, k, j, m, old[i:k], new[j:m]))
+        payload = sum(len(z[4]) + len(z[5]) for z in ops)
+        if 2 * payload >= len(old) + len(new):
+            return None
+        return cls(old, new, ops, prev)
+    #@+node:ekr.20261018151931.3: *3* BodyDiff.old_text & new_text
+    def old_text(self, new: str = None) -> str:
+        """
+        Return the old text. Rebuild it from new if possible, otherwise from
+        the nearest keyframe.
+        """
+        if new is not None and (len(new), hash(new)) == self.new_key:
+            return self.apply(new, undo=True)
+        if self.text is not None:
+            return self.text
+        # Find the keyframe, then apply all diffs after it.
+        chain, diff = [], self.prev
+        while diff.text is None:
+            chain.append(diff)
+            diff = diff.prev
+        s = diff.apply(diff.text, undo=False)
+        for diff in reversed(chain):
+            s = diff.apply(s, undo=False)
+        return s
+
+    def new_text(self, old: str = None) -> str:
+        """
+        Return the new text. Rebuild it from old if possible, otherwise from
+        the nearest keyframe.
+        """
+        if old is None or (len(old), hash(old)) != self.old_key:
+            old = self.old_text()
+        return self.apply(old, undo=False)
+    #@+node:ekr.20261018151931.4: *3* BodyDiff.apply
+    def apply(self, s: str, undo: bool) -> str:
+        """
+        undo: True:  convert the new text s to the old text.
+        undo: False: convert the old text s to the new text.
+        """
+        result, i = [], 0
+        for i1, i2, j1, j2, old_s, new_s in self.ops:
+            if undo:
+                result.append(s[i:j1])
+                result.append(old_s)
+                i = j2
+            else:
+                result.append(s[i:i1])
+                result.append(new_s)
+                i = i2
+        result.append(s[i:])
+        return ''.join(result)
+    #@-others
 #@+node:ekr.20031218072017.3605: ** class Undoer
 class Undoer:
     """A class that implements unlimited undo and redo."""
@@ -74,6 +197,7 @@ class Undoer:
         self.p: Position = None  # The position/node being operated upon for undo and redo.
         self.granularity = None  # Set in reloadSettings.
         self.max_undo_stack_size = c.config.getInt('max-undo-stack-size') or 0
+        self.max_undo_stack_bytes = c.config.getInt('max-undo-stack-bytes') or 0
         # State ivars...
         self.beads = []  # List of undo nodes.
         self.bead = -1  # Index of the present bead: -1:len(beads)
@@ -93,6 +217,8 @@ class Undoer:
         # mypy doesn't care about these.
         self.afterTree = None
         self.beforeTree = None
+        self.bodyDiff: BodyDiff = None
+        self.bodyDiffs: dict[str, BodyDiff] = {}  # Keys are gnx's. Values are the latest diffs.
         self.children = None
         self.deleteMarkedNodesData: g.Bunch = None
         self.followingSibs: list[VNode] = None
@@ -108,7 +234,6 @@ class Undoer:
         self.newN = None
         self.newP = None
         self.newParent = None
-        self.newPastedTree = None
         self.newParent_v = None
         self.newRecentFiles = None
         self.newSel = None
@@ -124,7 +249,6 @@ class Undoer:
         self.oldN = None
         self.oldParent = None
         self.oldParent_v = None
-        self.oldPastedTree = None
         self.oldRecentFiles = None
         self.oldSel = None
         self.oldSiblings = None
@@ -134,6 +258,8 @@ class Undoer:
         self.pasteAsClone = None
         self.prevSel = None
         self.sortChildren = None
+        self.treeChanges: list[tuple] = None
+        self.treeSnapshot: dict[VNode, tuple] = None
         self.verboseUndoGroup = None
         self.reloadSettings()
     #@+node:ekr.20191213085126.1: *4* u.reloadSettings
@@ -168,19 +294,172 @@ class Undoer:
                 # g.trace('Cutting undo stack to %d entries' % (n))
             u.beads = u.beads[-n:]
             u.bead = n - 1
+        if u.max_undo_stack_bytes > 0 and not g.unitTesting:
+            u.cutStackToSize(u.max_undo_stack_bytes)
         if 'undo' in g.app.debug and 'verbose' in g.app.debug:  # pragma: no cover
             print(f"u.cutStack: {len(u.beads):3}")
+    #@+node:ekr.20261018151204.1: *4* u.cutStackToSize & u.beadSize
+    def cutStackToSize(self, max_bytes: int) -> int:
+        """
+        Delete the oldest beads until the estimated size of all beads is at
+        most max_bytes. Never delete the present bead.
+
+        Return the number of deleted beads.
+        """
+        u = self
+        # Do nothing if we are in the middle of creating a group.
+        if any(getattr(z, 'kind', None) == 'beforeGroup' for z in u.beads):
+            return 0
+        total = sum(u.beadSize(z) for z in u.beads)
+        n = 0
+        while total > max_bytes and n < u.bead:
+            total -= u.beadSize(u.beads[n])
+            n += 1
+        if n:
+            u.beads = u.beads[n:]
+            u.bead -= n
+        return n
+
+    def beadSize(self, bunch: g.Bunch) -> int:
+        """
+        Return the estimated number of bytes used by the strings in the bead.
+
+        Vnodes and positions belong to the outline, so they count as zero.
+        """
+        u = self
+        # The top bead may still change. See u.setUndoTypingParams.
+        size = bunch.__dict__.get('estimatedSize')
+        if size is not None:
+            return size
+        size, seen, stack = 0, set(), list(bunch.__dict__.values())
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, (str, bytes)):
+                size += sys.getsizeof(obj)
+            elif isinstance(obj, BodyDiff):
+                size += obj.size  # Don't count obj.prev: it belongs to another bead.
+            elif isinstance(obj, (list, tuple, set)):
+                stack.extend(obj)
+            elif isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, g.Bunch):
+                stack.extend(obj.__dict__.values())
+        if u.bead < 0 or bunch is not u.beads[u.bead]:
+            bunch.estimatedSize = size
+        return size
+    #@+node:ekr.20261018151931.5: *4* u.compressBody & u.getBody
+    def compressBody(self, p: Position, bunch: g.Bunch) -> None:
+        """
+        Replace bunch.oldBody and bunch.newBody by a BodyDiff if doing so
+        saves space.
+        """
+        u = self
+        diff = BodyDiff.create(bunch.oldBody, bunch.newBody, u.bodyDiffs.get(p.gnx))
+        if diff:
+            u.bodyDiffs[p.gnx] = diff
+            bunch.bodyDiff = diff
+            bunch.oldBody = bunch.newBody = None
+
+    def getBody(self, kind: str) -> str:
+        """
+        Return u.oldBody or u.newBody, rebuilding the text from u.bodyDiff
+        if necessary.
+
+        kind: 'old' or 'new'.
+        """
+        u = self
+        diff = u.bodyDiff
+        if kind == 'old':
+            return u.oldBody if diff is None else diff.old_text(u.p.b)
+        return u.newBody if diff is None else diff.new_text(u.p.b)
+    #@+node:ekr.20261018151204.2: *4* u.snapshotTree, diffTree & applyTreeChanges
+    def snapshotTree(self, p: Position) -> dict[VNode, tuple]:
+        """Return a dict describing all vnodes in p's subtree."""
+        result: dict[VNode, tuple] = {}
+        stack = [p.v]
+        while stack:
+            v = stack.pop()
+            if v not in result:
+                uA = getattr(v, 'unknownAttributes', None)
+                result[v] = (
+                    v._headString, v._bodyString, v.children[:], v.isMarked(),
+                    None if uA is None else dict(uA),
+                )
+                stack.extend(v.children)
+        return result
+
+    def diffTree(self, snapshot: dict[VNode, tuple]) -> list[tuple]:
+        """
+        Return a list of (v, kind, old, new) tuples describing how the vnodes
+        in the snapshot have changed. New vnodes need no tuples: linking them
+        into their parents restores them.
+        """
+        changes: list[tuple] = []
+        for v, (h, b, children, marked, uA) in snapshot.items():
+            if v._headString != h:
+                changes.append((v, 'head', h, v._headString))
+            if v._bodyString != b:
+                changes.append((v, 'body', b, v._bodyString))
+            if v.children != children:
+                changes.append((v, 'children', children, v.children[:]))
+            if v.isMarked() != marked:
+                changes.append((v, 'marked', marked, not marked))
+            new_uA = getattr(v, 'unknownAttributes', None)
+            if new_uA != uA:
+                changes.append((v, 'uA', uA, None if new_uA is None else dict(new_uA)))
+        return changes
+
+    def applyTreeChanges(self, changes: list[tuple], undo: bool) -> None:
+        """
+        Apply the changes returned by u.diffTree.
+
+        undo: True: restore the old values. False: restore the new values.
+
+        The caller is responsible for selecting and redrawing the outline.
+        """
+        c = self.c
+        for v, kind, old, new in (reversed(changes) if undo else changes):
+            if undo:
+                old, new = new, old
+            if kind == 'children':
+                for child in old:
+                    child.parents.remove(v)
+                v.children = new[:]
+                for child in new:
+                    child.parents.append(v)
+            elif kind == 'head':
+                v.setHeadString(new)
+            elif kind == 'body':
+                v.setBodyString(new)
+            elif kind == 'marked':
+                if new:
+                    v.setMarked()
+                else:
+                    v.clearMarked()
+            elif kind == 'uA':
+                if new is not None:
+                    v.unknownAttributes = dict(new)
+                elif hasattr(v, 'unknownAttributes'):
+                    delattr(v, 'unknownAttributes')
+        for v in {z[0] for z in changes}:
+            v.setDirty()
+            v.setAllAncestorAtFileNodesDirty()
+        c.setChanged()
     #@+node:ekr.20080623083646.10: *4* u.dumpBead
     def dumpBead(self, n: int) -> str:  # pragma: no cover
         u = self
         if n < 0 or n >= len(u.beads):
-            return 'no bead: n = ', n
-        # bunch = u.beads[n]
+            return f"no bead: n = {n}"
+        bunch = u.beads[n]
         result = []
         result.append('-' * 10)
-        result.append(f"len(u.beads): {len(u.beads)}, n: {n}")
-        for ivar in ('kind', 'newP', 'newN', 'p', 'oldN', 'undoHelper'):
-            result.append(f"{ivar} = {getattr(self, ivar)}")
+        result.append(f"len(u.beads): {len(u.beads)}, n: {n}, size: {u.beadSize(bunch)} bytes")
+        for ivar in ('kind', 'undoType', 'newP', 'newN', 'p', 'oldN', 'bodyDiff', 'undoHelper'):
+            result.append(f"{ivar} = {bunch.get(ivar)}")
         return '\n'.join(result)
 
     def dumpTopBead(self) -> str:  # pragma: no cover
@@ -364,6 +643,7 @@ class Undoer:
         bunch.newHead = p.h
         bunch.newIns = w.getInsertPoint()
         bunch.newMarked = p.isMarked()
+        u.compressBody(p, bunch)
         # Careful: don't use ternary operator.
         if w:
             bunch.newSel = w.getSelectionRange()
@@ -485,9 +765,12 @@ class Undoer:
     afterChangeMultiHead = afterChangeMultiHeadline
     #@+node:ekr.20230721130238.1: *5* u.afterChangeTree
     def afterChangeTree(self, command: str, bunch: g.Bunch) -> None:
+        """
+        Create an undo node for arbitrary changes to bunch.p's subtree.
 
+        The bead contains only the changes to the subtree, not copies of it.
+        """
         c = self.c
-        p = self.p
         u = self
         w = c.frame.body.wrapper
         # Set types.
@@ -495,15 +778,13 @@ class Undoer:
         bunch.undoType = command
         bunch.undoHelper = u.undoChangeTree
         bunch.redoHelper = u.redoChangeTree
-        bunch.newPastedTree = c.fileCommands.outline_to_clipboard_string(c.p)
+        bunch.treeChanges = u.diffTree(bunch.treeSnapshot)
+        bunch.treeSnapshot = None  # Don't retain the snapshot.
         bunch.newIns = w.getInsertPoint()
         bunch.newSel = w.getSelectionRange()
-        bunch.newMarked = p.isMarked()
-        # Push the bunch.
-        u.bead += 1
-        u.beads[u.bead:] = [bunch]
-        # Recalculate the menu labels.
-        u.setUndoTypes()
+        bunch.newMarked = bunch.p.isMarked()
+        bunch.newYScroll = w.getYScrollPosition()
+        u.pushBead(bunch)
     #@+node:ekr.20231225132413.1: *5* u.afterChangeUA
     def afterChangeUA(self, p: Position, command: str, bunch: g.Bunch) -> None:
         u = self
@@ -793,15 +1074,12 @@ class Undoer:
         bunch.oldYScroll = w.getYScrollPosition() if w else 0
         return bunch
     #@+node:ekr.20230721130319.1: *5* u.beforeChangeTree
-    def beforeChangeTree(self, p: Position) -> None:
-
-        c = self.c
-        w = self.c.frame.body.wrapper
-        bunch = self.createCommonBunch(p)  # Sets u.oldMarked, u.oldSel, u.p
-
-        bunch.oldPastedTree = c.fileCommands.outline_to_clipboard_string(c.p)
-        bunch.oldBody = p.b
-        bunch.oldHead = p.h
+    def beforeChangeTree(self, p: Position) -> g.Bunch:
+        """Remember the state of all nodes in p's subtree."""
+        u = self
+        w = u.c.frame.body.wrapper
+        bunch = u.createCommonBunch(p)  # Sets u.oldMarked, u.oldSel, u.p
+        bunch.treeSnapshot = u.snapshotTree(p)
         bunch.oldIns = w.getInsertPoint()
         bunch.oldYScroll = w.getYScrollPosition()
         return bunch
@@ -935,6 +1213,7 @@ class Undoer:
         u.setUndoType(undoType)
         u.beads = []  # List of undo nodes.
         u.bead = -1  # Index of the present bead: -1:len(beads)
+        u.bodyDiffs = {}
     #@+node:ekr.20031218072017.1490: *4* u.doTyping & helper
     def doTyping(
         self,
@@ -1312,7 +1591,8 @@ class Undoer:
         """
         c.restoreFromCopiedTree: restore v from a copied tree.
 
-        This is a low-level method. See u.undo/redoChangeTree for examples.
+        This is a low-level method. u.undo/redoChangeTree no longer use it:
+        they apply the changes computed by u.diffTree.
 
         The caller is responsible for:
 
@@ -1352,6 +1632,21 @@ class Undoer:
         ni = g.app.nodeIndices
         for v in c.all_unique_nodes():
             ni.check_gnx(c, v.fileIndex, v)
+    #@+node:ekr.20261018151931.6: *3* u.dumpUndoStack
+    @cmd('dump-undo-stack')
+    def dumpUndoStack(self, event: LeoKeyEvent = None) -> None:
+        """Print all undo beads and their estimated sizes."""
+        u = self
+        g.es_print('dump-undo-stack...')
+        total = 0
+        for n, bunch in enumerate(u.beads):
+            size = u.beadSize(bunch)
+            total += size
+            diff = bunch.get('bodyDiff')
+            g.es_print(
+                f"{'*' if n == u.bead else ' '}{n:4} {size:10} "
+                f"{bunch.get('undoType')}{' ' + repr(diff) if diff else ''}")
+        g.es_print(f"{len(u.beads)} beads, {total} bytes")
     #@+node:ekr.20031218072017.2030: *3* u.redo
     @cmd('redo')
     def redo(self, event: LeoKeyEvent = None) -> None:
@@ -1392,7 +1687,8 @@ class Undoer:
         if c.p != u.p:  # #1333.
             c.selectPosition(u.p)
         u.p.setDirty()
-        u.p.b = u.newBody
+        new_body = u.getBody('new')
+        u.p.b = new_body
         u.p.h = u.newHead
         # This is required so. Otherwise redraw will revert the change!
         c.frame.tree.setHeadline(u.p, u.newHead)
@@ -1401,7 +1697,7 @@ class Undoer:
         else:
             u.p.clearMarked()
         if u.groupCount == 0:
-            w.setAllText(u.newBody)
+            w.setAllText(new_body)
             i, j = u.newSel
             w.setSelectionRange(i, j, insert=u.newIns)
             w.setYScrollPosition(u.newYScroll)
@@ -1435,29 +1731,25 @@ class Undoer:
         # selectPosition causes recoloring, so don't do this unless needed.
         if c.p != u.p:  # #1333.
             c.selectPosition(u.p)
-    #@+node:ekr.20230721131611.1: *4* u.redoChangeTree (to do)
+    #@+node:ekr.20230721131611.1: *4* u.redoChangeTree
     def redoChangeTree(self) -> None:
+        """
+        Redo all changes to the node and its subtree.
+        """
         c, u, w = self.c, self, self.c.frame.body.wrapper
         # selectPosition causes recoloring, so don't do this unless needed.
         if c.p != u.p:
             c.selectPosition(u.p)
-        u.p.setDirty()
-        u.p.b = u.newBody
-        u.p.h = u.newHead
-        # This is required so. Otherwise redraw will revert the change!
-        c.frame.tree.setHeadline(u.p, u.newHead)
-        if u.newMarked:
-            u.p.setMarked()
-        else:
-            u.p.clearMarked()
+        u.applyTreeChanges(u.treeChanges, undo=False)
+        # This is required. Otherwise redraw will revert the change!
+        c.frame.tree.setHeadline(u.p, u.p.h)
         if u.groupCount == 0:
-            w.setAllText(u.newBody)
+            w.setAllText(u.p.b)
             i, j = u.newSel
             w.setSelectionRange(i, j, insert=u.newIns)
             w.setYScrollPosition(u.newYScroll)
-            c.recolor(u.p)
+        c.recolor(u.p)
         u.updateMarks('new')
-        u.p.setDirty()
     #@+node:ekr.20231225134021.1: *4* u.redoChangeUA
     def redoChangeUA(self) -> None:
         u = self
@@ -1768,7 +2060,8 @@ class Undoer:
         if c.p != u.p:
             c.selectPosition(u.p)
         u.p.setDirty()
-        u.p.b = u.oldBody
+        old_body = u.getBody('old')
+        u.p.b = old_body
         u.p.h = u.oldHead
         # This is required.  Otherwise c.redraw will revert the change!
         c.frame.tree.setHeadline(u.p, u.oldHead)
@@ -1777,7 +2070,7 @@ class Undoer:
         else:
             u.p.clearMarked()
         if u.groupCount == 0:
-            w.setAllText(u.oldBody)
+            w.setAllText(old_body)
             i, j = u.oldSel
             w.setSelectionRange(i, j, insert=u.oldIns)
             w.setYScrollPosition(u.oldYScroll)
@@ -2022,33 +2315,19 @@ class Undoer:
         """
         Undo all changes to the node and its subtree.
         """
-        c = self.c
-        u = self
-        w = c.frame.body.wrapper
-        # selectPosition causes recoloring, so don't do this unless needed.
+        c, u, w = self.c, self, self.c.frame.body.wrapper
+        # Select u.p first: c.p may not exist after undoing the changes.
         if c.p != u.p:
             c.selectPosition(u.p)
-        assert c.p == u.p
-        p = u.p
-        # u.p.setDirty()
-
-        # Paste the outline and select it.
-        s = u.oldPastedTree
-        pasted = c.fileCommands.getLeoOutlineFromClipboardRetainingClones(s)
-        assert c.p == pasted
-
-        # Delete the old tree. Its position should still exist.
-        c.p.back.doDelete(pasted)
-
-        # Finish
-        w.setAllText(u.oldBody)
+        u.applyTreeChanges(u.treeChanges, undo=True)
+        # This is required. Otherwise c.redraw will revert the change!
+        c.frame.tree.setHeadline(u.p, u.p.h)
+        if u.groupCount == 0:
+            w.setAllText(u.p.b)
+            i, j = u.oldSel
+            w.setSelectionRange(i, j, insert=u.oldIns)
+            w.setYScrollPosition(u.oldYScroll)
         c.recolor(u.p)
-        p.h = u.oldHead
-        # This is required.  Otherwise c.redraw will revert the change!
-        c.frame.tree.setHeadline(p, u.oldHead)
-        i, j = u.oldSel
-        w.setSelectionRange(i, j)
-        w.setYScrollPosition(u.oldYScroll)
         u.updateMarks('old')
     #@+node:ekr.20230713150109.1: *4* u.undoParseBody
     def undoParseBody(self) -> None:
@@ -0,0 +1,337 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261019090010.19: * @file leoWriteChecks.py
+"""
+Check Python files after Leo writes them, without blocking Leo.
+
+at.checkPythonCode calls WriteChecker.check for each Python file that Leo
+writes or finds unchanged. The checker runs Python's compiler, pyflakes and
+flake8 on the file's contents in a pool of worker processes. At idle time,
+Leo's process reports the results of all finished checks to the log, with
+clickable links to the offending lines, and starts pylint (via the
+BackgroundProcessManager) for the files that passed all other checks.
+
+The checker caches the results of all checks by a hash of the file's name
+and contents, so Leo never checks the same contents twice. Leo reports the
+cached errors of a file each time it saves the file.
+
+The checker can not run Leo's token-based beautifier in the workers: the
+beautifier rewrites the file and reloads the outline. at.checkPythonCode
+runs the beautifier before calling WriteChecker.check.
+
+@int write-check-workers sets the number of worker processes. 0: check
+all files in Leo's process, as they are written.
+"""
+#@+<< leoWriteChecks imports & annotations >>
+#@+node:ekr.20261019090010.20: ** << leoWriteChecks imports & annotations >>
+from __future__ import annotations
+import concurrent.futures
+import hashlib
+import io
+import re
+import subprocess
+import sys
+from typing import Any, Optional, TYPE_CHECKING
+from leo.core import leoGlobals as g
+
+if TYPE_CHECKING:  # pragma: no cover
+    from leo.core.leoCommands import Commands as Cmdr
+    from leo.core.leoNodes import Position
+    # (s, line, color): line is the 1-based line of the file, or 0 for no link.
+    Message = tuple[str, int, Optional[str]]
+    CheckResult = tuple[bool, list[Message]]
+    # (c, root, unl, fileName): the commander and the @<file> node to report.
+    Waiter = tuple[Cmdr, Position, str, str]
+#@-<< leoWriteChecks imports & annotations >>
+
+# Matches the messages of pyflakes and flake8: path:line:column: message.
+message_pattern = re.compile(r'^(.+?):(\d+):')
+
+#@+others
+#@+node:ekr.20261019090010.21: ** function: get_checker
+def get_checker() -> WriteChecker:
+    """Return the singleton WriteChecker, creating it if necessary."""
+    if g.app.writeChecker is None:
+        g.app.writeChecker = WriteChecker()
+    return g.app.writeChecker
+#@+node:ekr.20261019090010.22: ** function: check_python_file
+def check_python_file(fileName: str, contents: str, h: str, checks: tuple[str, ...]) -> CheckResult:
+    """
+    Run the given checks, in order, on the contents of the file. Stop after
+    the first check that fails.
+
+    fileName: The full path to the file.
+    h:        The headline of the file's @<file> node.
+    checks:   A tuple containing 'syntax', 'pyflakes' or 'flake8'.
+
+    This function runs in the worker processes of the WriteChecker.
+    Return (ok, messages).
+    """
+    messages: list[Message] = []
+    for check in checks:
+        if check == 'syntax':
+            body = contents.replace('\r', '')
+            try:
+                compile(body + '\n', f"<node: {h}>", 'exec')
+            except SyntaxError as e:
+                return False, syntax_error_messages(h, body, e)
+            except Exception as e:
+                return False, [(f"Syntax error in: {h}", 0, 'error'), (f"{e.__class__.__name__}: {e}", 0, None)]
+        elif check == 'pyflakes':
+            ok = run_pyflakes(fileName, contents, messages)
+            if not ok:
+                return False, messages
+        elif check == 'flake8':
+            # Like at.runFlake8, report flake8's messages, but never fail.
+            run_flake8(fileName, messages)
+    return True, messages
+#@+node:ekr.20261019090010.23: ** function: run_flake8 & run_pyflakes
+def run_flake8(fileName: str, messages: list[Message]) -> None:
+    """Run flake8 on the file, appending its output to messages."""
+    try:
+        result = subprocess.run(
+            [sys.executable, '-m', 'flake8', fileName],
+            capture_output=True,
+            check=False,
+            text=True,
+        )
+    except OSError as e:
+        messages.append((f"flake8: {e}", 0, 'error'))
+        return
+    for s in result.stdout.splitlines():
+        if s.strip():
+            m = message_pattern.match(s)
+            messages.append((s, int(m.group(2)) if m else 0, None))
+
+def run_pyflakes(fileName: str, contents: str, messages: list[Message]) -> bool:
+    """
+    Run pyflakes on the contents, appending its output to messages.
+    Return True if pyflakes found no errors.
+    """
+    try:
+        from pyflakes import api, reporter
+    except Exception:
+        return True  # Suppress errors if pyflakes can not be imported.
+    stream = io.StringIO()
+    r = reporter.Reporter(errorStream=stream, warningStream=stream)
+    errors = api.check(contents, g.shortFileName(fileName), r)
+    for s in stream.getvalue().splitlines():
+        if s.strip():
+            m = message_pattern.match(s)
+            messages.append((s, int(m.group(2)) if m else 0, None))
+    if errors:
+        # This message is important for clarity.
+        messages.append((f"ERROR: pyflakes: {errors} error{g.plural(errors)}", 0, None))
+    return errors == 0
+#@+node:ekr.20261019090010.24: ** function: syntax_error_messages
+def syntax_error_messages(h: str, body: str, val: Optional[BaseException]) -> list[Message]:
+    """
+    Return the messages reporting the given SyntaxError in body, showing
+    the lines surrounding the error.
+
+    h: The headline of the node containing body.
+    """
+    messages: list[Message] = [(f"Syntax error in: {h}", 0, 'error')]
+    message = getattr(val, 'message', None)
+    if message:
+        messages.append((message, 0, None))
+    n = getattr(val, 'lineno', None)
+    if n is None:
+        return messages
+    lines = g.splitLines(body)
+    offset = getattr(val, 'offset', 0) or 0
+    i = n - 1
+    for j in range(max(0, i - 2), min(i + 2, len(lines) - 1)):
+        line = lines[j].rstrip()
+        if j == i:
+            messages.append((f"{j+1:5}:* {line}", j + 1, None))
+            messages.append((' ' * (7 + offset) + '^', 0, None))
+        else:
+            messages.append((f"{j+1:5}: {line}", 0, None))
+    return messages
+#@+node:ekr.20261019090010.25: ** function: report_messages
+def report_messages(messages: list[Message], unl: str) -> None:
+    """Print the messages and put them to the log, linking them to the lines of unl."""
+    for s, line, color in messages:
+        if line:
+            g.es_print(s, color=color, nodeLink=f"{unl}::{-line}")  # Global line.
+        else:
+            g.es_print(s, color=color)
+#@+node:ekr.20261019090010.26: ** class WriteChecker
+class WriteChecker:
+    """Check Python files in worker processes, caching the results."""
+
+    # The maximum number of cached results.
+    max_cache_size = 2000
+
+    def __init__(self) -> None:
+        # Keys are hashes of file names, headlines, checks and contents.
+        # Values are the results of check_python_file.
+        self.cache: dict[str, CheckResult] = {}
+        self.executor: Optional[concurrent.futures.Executor] = None
+        # Keys are cache keys, values are the arguments of check_python_file.
+        self.args: dict[str, tuple[str, str, str, tuple[str, ...]]] = {}
+        # Keys are cache keys, values are the futures of check_python_file.
+        self.futures: dict[str, concurrent.futures.Future] = {}
+        # Keys are cache keys, values are the nodes waiting for the result.
+        self.waiters: dict[str, list[Waiter]] = {}
+        # The commanders whose files failed checks since the checker became idle.
+        self.failed: list[Cmdr] = []
+        self.timer: Any = None  # An IdleTime instance.
+        self.workers = 0
+
+    #@+others
+    #@+node:ekr.20261019090010.27: *3* checker.check
+    def check(self, c: Cmdr, root: Position, fileName: str, contents: str) -> None:
+        """
+        Check the contents that Leo has just written to the given file,
+        the external file of root.
+
+        The checks run in a worker process unless @int write-check-workers
+        is 0. Report cached results immediately.
+        """
+        at = c.atFileCommands
+        checks = self.checks(c, root)
+        if not checks and not at.runPylintOnWrite:
+            return
+        key = self.key(fileName, root.h, checks, contents)
+        waiter = (c, root.copy(), root.get_UNL(), fileName)
+        result = self.cache.get(key)
+        if result:
+            # Keep the most recently used results.
+            del self.cache[key]
+            self.cache[key] = result
+            self.report(waiter, result, cached=True)
+            return
+        if key in self.waiters:
+            self.waiters[key].append(waiter)
+            return
+        args = (fileName, contents, root.h, checks)
+        workers = c.config.getInt('write-check-workers') or 0
+        if workers < 1:
+            self.finish(key, [waiter], check_python_file(*args))
+            return
+        self.args[key] = args
+        self.waiters[key] = [waiter]
+        self.futures[key] = self.start_executor(workers).submit(check_python_file, *args)
+        if not self.timer:
+            self.timer = g.IdleTime(self.on_idle, delay=100, tag='WriteChecker')
+            if self.timer:
+                self.timer.start()
+            else:
+                # No gui: wait for the results.
+                self.wait()
+    #@+node:ekr.20261019090010.28: *3* checker.checks & key
+    def checks(self, c: Cmdr, root: Position) -> tuple[str, ...]:
+        """Return the checks to run on root's external file."""
+        at = c.atFileCommands
+        checks: list[str] = []
+        if at.checkPythonCodeOnWrite:
+            checks.append('syntax')
+        if at.runPyFlakesOnWrite or at.runFlake8OnWrite:
+            from leo.commands import checkerCommands
+            # #1306: nopyflakes
+            if (
+                at.runPyFlakesOnWrite and checkerCommands.pyflakes
+                and not any(z.strip().startswith('@nopyflakes') for z in g.splitLines(root.b))
+            ):
+                checks.append('pyflakes')
+            if at.runFlake8OnWrite and checkerCommands.flake8:
+                checks.append('flake8')
+        return tuple(checks)
+
+    def key(self, fileName: str, h: str, checks: tuple[str, ...], contents: str) -> str:
+        """Return the cache key of the given check."""
+        s = '\0'.join((fileName, h, ','.join(checks), contents))
+        return hashlib.sha1(s.encode('utf-8', 'surrogatepass')).hexdigest()
+    #@+node:ekr.20261019090010.29: *3* checker.finish & report
+    def finish(self, key: str, waiters: list[Waiter], result: CheckResult) -> None:
+        """Cache the result of a check and report it to all waiting nodes."""
+        self.cache[key] = result
+        while len(self.cache) > self.max_cache_size:
+            del self.cache[next(iter(self.cache))]
+        for waiter in waiters:
+            self.report(waiter, result, cached=False)
+
+    def report(self, waiter: Waiter, result: CheckResult, cached: bool) -> None:
+        """
+        Report the result of checking one external file.
+
+        Run pylint on the files that passed all checks, unless the result
+        comes from the cache.
+        """
+        c, root, unl, fileName = waiter
+        if not c.exists:
+            return
+        ok, messages = result
+        report_messages(messages, unl)
+        if not ok:
+            g.app.syntax_error_files.append(g.shortFileName(fileName))
+        elif not cached and c.atFileCommands.runPylintOnWrite and c.positionExists(root):
+            c.atFileCommands.runPylint(root)
+    #@+node:ekr.20261019090010.30: *3* checker.on_idle & wait
+    def on_idle(self, timer: Any) -> None:
+        """Report the results of all finished checks."""
+        for key, future in list(self.futures.items()):
+            if future.done():
+                self.finish_future(key, future)
+        if not self.futures:
+            timer.stop()
+            self.timer = None
+            self.stop()
+
+    def wait(self) -> None:
+        """Wait for all checks to finish, reporting their results as they finish."""
+        keys = {future: key for key, future in self.futures.items()}
+        for future in concurrent.futures.as_completed(keys):
+            self.finish_future(keys[future], future)
+        self.timer = None
+        self.stop()
+    #@+node:ekr.20261019090010.31: *3* checker.finish_future
+    def finish_future(self, key: str, future: concurrent.futures.Future) -> None:
+        """Report the result of a check that has finished in a worker."""
+        del self.futures[key]
+        args = self.args.pop(key)
+        waiters = self.waiters.pop(key)
+        try:
+            result = future.result()
+        except Exception:  # A broken pool.
+            result = check_python_file(*args)
+        self.finish(key, waiters, result)
+        if not result[0]:
+            # The save command has already called c.syntaxErrorDialog.
+            for c, root, unl, fileName in waiters:
+                if c not in self.failed:
+                    self.failed.append(c)
+    #@+node:ekr.20261019090010.32: *3* checker.start_executor & stop
+    def start_executor(self, workers: int) -> concurrent.futures.Executor:
+        """Return the pool of worker processes, starting it if necessary."""
+        if self.executor and workers != self.workers:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        if not self.executor:
+            self.workers = workers
+            try:
+                self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            except (NotImplementedError, OSError):  # pragma: no cover
+                # This platform does not support multiprocessing.
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        return self.executor
+
+    def stop(self) -> None:
+        """
+        All checks have finished. Stop the worker processes and warn about
+        files with errors.
+        """
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        failed, self.failed = self.failed, []
+        for c in failed:
+            if c.exists:
+                c.syntaxErrorDialog()
+    #@-others
+#@-others
+#@@language python
+#@@tabwidth -4
+#@@pagewidth 70
+#@-leo
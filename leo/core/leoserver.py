@@ -15,7 +15,9 @@ To run externally, do `python -m leo.core.leoserver`.
 # pylint: disable=raise-missing-from
 import argparse
 import asyncio
+import collections
 from collections.abc import Callable
+import concurrent.futures
 import fnmatch
 import inspect
 import itertools
@@ -25,9 +27,11 @@ import re
 import sys
 import socket
 import textwrap
+import threading
 import time
 from typing import Any, Generator, Iterable, Iterator, Optional, Union
 import warnings
+import weakref
 
 # Third-party.
 try:
@@ -72,6 +76,7 @@ from leo.core.leoCommands import Commands as Cmdr  # noqa
 from leo.core.leoNodes import Position, VNode  # noqa
 from leo.core.leoGui import StringFindTabManager  # noqa
 from leo.core.leoExternalFiles import ExternalFilesController  # noqa
+from leo.core import leoIndex  # noqa
 #@-<< leoserver imports >>
 #@+<< leoserver annotations >>
 #@+node:ekr.20220820155747.1: ** << leoserver annotations >>
@@ -88,7 +93,7 @@ Socket = Any
 #@-<< leoserver annotations >>
 #@+<< leoserver version >>
 #@+node:ekr.20220820160619.1: ** << leoserver version >>
-version_tuple = (1, 0, 14)
+version_tuple = (1, 0, 15)
 # Version History
 # 1.0.1 Initial commit.
 # 1.0.2 July 2022: Adding ui-scroll, undo/redo, chapters, ua's & node_tags info.
@@ -104,6 +109,7 @@ version_tuple = (1, 0, 14)
 # 1.0.12 June 2025: Added goto_line_in_leo_outline and insert_file_node commands.
 # 1.0.13 July 2025: Added support for websockets version 14+.
 # 1.0.14 August 2025: Added support for Python 3.14+.
+# 1.0.15 October 2026: Added get_structure_delta, cancel_request and the --workers option.
 v1, v2, v3 = version_tuple
 __version__ = f"leoserver.py version {v1}.{v2}.{v3}"
 #@-<< leoserver version >>
@@ -123,6 +129,7 @@ wsPersist = False
 wsSkipDirty = False
 wsHost = "localhost"
 wsPort = 32125
+wsWorkers = 0  # The number of RequestScheduler threads. 0: handle requests in the loop's thread.
 #@-<< leoserver globals >>
 #@+others
 #@+node:felix.20210712224107.1: ** class SetEncoder
@@ -534,8 +541,12 @@ class QuickSearchController:
             bNodes = [c.p]
 
         if not hitBase:
-            # hNodes = list(hNodes)
-            # bNodes = list(bNodes)
+            # Search only the nodes that might match pat.
+            index = None if pat.startswith('r:') else leoIndex.get_index(c)
+            gnxs = index.glob_candidates(pat) if index else None
+            if gnxs is not None:
+                hNodes = [z for z in hNodes if z.gnx in gnxs]
+                bNodes = [z for z in bNodes if z.gnx in gnxs]
             hm = self.find_h(hpat, list(hNodes), flags)  # Returns a list of positions.
             bm = self.find_b(bpat, list(bNodes), flags)  # Returns a list of positions.
             bm_keys = [match[0].key() for match in bm]
@@ -880,6 +891,521 @@ class QuickSearchController:
         except Exception:
             raise ServerError("QuickSearchController onSelectItem error")
     #@-others
+#@+node:ekr.20261018144120.1: ** class OutlineSync (leoserver.py)
+class OutlineSync:
+    """
+    The versioned state of one commander's outline, as sent to clients by
+    LeoServer.get_structure_delta.
+
+    The state describes each vnode once, so clones appear only once.
+    Each version has a list of ops that change the previous version into
+    the new version. See LeoServer.get_structure_delta.
+
+    v._addLink, v._addCopiedLink, v._cutLink and v._deleteAllChildren
+    increment c.frame.tree.generation. update walks the outline only if the generation
+    has changed, and then only below vnodes whose children have changed.
+    Changing headlines and flags does not change the outline's structure,
+    so update checks the headlines and flags of all known vnodes without
+    walking the outline.
+    """
+
+    # The names of the flags of each vnode, as sent to clients.
+    flag_names = ('hasBody', 'marked', 'dirty', 'cloned', 'atFile', 'expanded', 'nodeTags')
+    # The maximum number of versions whose ops the history retains.
+    max_versions = 100
+
+    def __init__(self) -> None:
+        self.version = 0
+        # Keys are gnxs. Values are (headline, flags, children gnxs).
+        self.nodes: dict[str, tuple[str, tuple, tuple[str, ...]]] = {}
+        self.history: list[tuple[int, list[dict[str, Any]]]] = []  # (version, ops)
+        self.key: tuple[VNode, int] = None  # (c.hiddenRootNode, c.frame.tree.generation)
+        # Keys are gnxs. Values are copies of v.children as of the key.
+        self.links: dict[str, list[VNode]] = {}
+        self.vnodes: dict[str, VNode] = {}  # Keys are gnxs.
+
+    #@+others
+    #@+node:ekr.20261018144120.2: *3* sync.flags & scan
+    def flags(self, v: VNode, at_file: bool) -> tuple:
+        """Return the flags of v."""
+        u = v.u
+        return (
+            bool(v._bodyString),
+            v.isMarked(),
+            v.isDirty(),
+            len(v.parents) > 1,
+            at_file,
+            v.isExpanded(),
+            len(u.get('__node_tags', [])) if u else 0,
+        )
+
+    def scan(self, c: Cmdr) -> None:
+        """Find all vnodes in c's outline."""
+        vnodes: dict[str, VNode] = {}
+        todo = [c.hiddenRootNode]
+        while todo:
+            v = todo.pop()
+            if v.gnx not in vnodes:
+                vnodes[v.gnx] = v
+                todo.extend(v.children)
+        self.vnodes = vnodes
+    #@+node:ekr.20261019090010.41: *3* sync.relink
+    def relink(self) -> set[str]:
+        """
+        Update self.vnodes after v._addLink, v._addCopiedLink or v._cutLink
+        have changed the outline.
+
+        Return the gnxs of all vnodes whose children have changed.
+        """
+        links, vnodes = self.links, self.vnodes
+        changed = {gnx for gnx, v in vnodes.items() if v.children != links.get(gnx)}
+        # Add the subtrees of all new children.
+        todo = [z for gnx in list(changed) for z in vnodes[gnx].children]
+        while todo:
+            v = todo.pop()
+            if v.gnx not in vnodes:
+                vnodes[v.gnx] = v
+                changed.add(v.gnx)
+                todo.extend(v.children)
+        # Remove all vnodes that are no longer in the outline.
+        alive: dict[str, bool] = {}
+
+        def is_alive(v: VNode) -> bool:
+            result = alive.get(v.gnx)
+            if result is None:
+                alive[v.gnx] = False  # Guard against cycles.
+                result = alive[v.gnx] = v.gnx == 'hidden-root-vnode-gnx' or any(
+                    z.gnx in vnodes and is_alive(z) for z in v.parents)
+            return result
+
+        todo = [z for gnx in changed for z in links.get(gnx, [])]
+        while todo:
+            v = todo.pop()
+            if v.gnx in vnodes and not is_alive(v):
+                del vnodes[v.gnx]
+                todo.extend(links.get(v.gnx, []))
+        return changed
+    #@+node:ekr.20261018144120.3: *3* sync.update
+    def update(self, c: Cmdr) -> None:
+        """Create a new version if c's outline has changed since the latest version."""
+        key = (c.hiddenRootNode, c.frame.tree.generation)
+        old_key, self.key = self.key, key
+        if old_key is None or key[0] is not old_key[0]:
+            self.scan(c)
+            self.links = {}
+            changed = set(self.vnodes)
+        elif key[1] != old_key[1]:
+            changed = self.relink()
+        else:
+            changed = set()
+        nodes, vnodes = self.nodes, self.vnodes
+        ops: list[dict[str, Any]] = []
+        for gnx, v in vnodes.items():
+            data = nodes.get(gnx)
+            if data is None:
+                children = tuple(z.gnx for z in v.children)
+                nodes[gnx] = data = (v._headString, self.flags(v, v.isAnyAtFileNode()), children)
+                ops.append(self.insert_op(gnx, data))
+                continue
+            headline, flags, children = data
+            # Like leoIndex.py, compare headlines by identity.
+            if v._headString is headline:
+                flags = self.flags(v, flags[4])
+            else:
+                headline, flags = v._headString, self.flags(v, v.isAnyAtFileNode())
+            if gnx in changed:
+                children = tuple(z.gnx for z in v.children)
+                if children != data[2]:
+                    ops.append({'op': 'children', 'gnx': gnx, 'children': list(children)})
+            if (headline, flags) != data[:2]:
+                ops.append({'op': 'update', 'gnx': gnx, 'headline': headline, **self.flags_d(flags)})
+            if (headline, flags, children) != data:
+                nodes[gnx] = (headline, flags, children)
+        if changed:
+            for gnx in [z for z in nodes if z not in vnodes]:
+                del nodes[gnx]
+                self.links.pop(gnx, None)
+                ops.append({'op': 'delete', 'gnx': gnx})
+            for gnx in changed:
+                if gnx in vnodes:
+                    self.links[gnx] = vnodes[gnx].children[:]
+        if ops:
+            self.version += 1
+            self.history.append((self.version, ops))
+            del self.history[: -self.max_versions]
+    #@+node:ekr.20261018144120.4: *3* sync.delta & full
+    def delta(self, version: Any) -> Optional[list[dict[str, Any]]]:
+        """
+        Return the ops that change the given version into the latest version,
+        or None if the history does not contain the ops.
+        """
+        if version == self.version:
+            return []
+        if (
+            not isinstance(version, int) or not self.history
+            or not self.history[0][0] - 1 <= version < self.version
+        ):
+            return None
+        ops: list[dict[str, Any]] = []
+        for version2, ops2 in self.history:
+            if version2 > version:
+                ops.extend(ops2)
+        return ops
+
+    def full(self) -> list[dict[str, Any]]:
+        """Return ops that create the latest version from an empty outline."""
+        return [self.insert_op(gnx, data) for gnx, data in self.nodes.items()]
+    #@+node:ekr.20261018144120.5: *3* sync.flags_d & insert_op
+    def flags_d(self, flags: tuple) -> dict[str, Any]:
+        """Return a dict containing all true flags."""
+        return {name: val for name, val in zip(self.flag_names, flags) if val}
+
+    def insert_op(self, gnx: str, data: tuple[str, tuple, tuple[str, ...]]) -> dict[str, Any]:
+        headline, flags, children = data
+        return {
+            'op': 'insert', 'gnx': gnx, 'headline': headline,
+            'children': list(children), **self.flags_d(flags),
+        }
+    #@-others
+#@+node:ekr.20261018150105.1: ** class ReadWriteLock (leoserver.py)
+class ReadWriteLock:
+    """
+    A lock that any number of readers or a single writer may hold.
+    Waiting writers have priority over new readers.
+    """
+
+    def __init__(self) -> None:
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.waiting_writers = 0
+        self.writer = False
+
+    #@+others
+    #@+node:ekr.20261018150105.2: *3* lock.acquire & release
+    def acquire(self, shared: bool) -> None:
+        """Acquire the lock for reading (shared) or for writing."""
+        with self.condition:
+            if shared:
+                while self.writer or self.waiting_writers:
+                    self.condition.wait()
+                self.readers += 1
+                return
+            self.waiting_writers += 1
+            try:
+                while self.writer or self.readers:
+                    self.condition.wait()
+            finally:
+                self.waiting_writers -= 1
+            self.writer = True
+
+    def release(self, shared: bool) -> None:
+        """Release a lock acquired with acquire(shared)."""
+        with self.condition:
+            if shared:
+                self.readers -= 1
+            else:
+                self.writer = False
+            self.condition.notify_all()
+    #@-others
+#@+node:ekr.20261018150105.3: ** class ScheduledRequest (leoserver.py)
+class ScheduledRequest:
+    """A request from a client, waiting in a RequestScheduler."""
+
+    def __init__(self, seq: int, websocket: Socket, d: dict[str, Any], kind: str) -> None:
+        self.seq = seq  # The request's position in the sequence of all requests.
+        self.websocket = websocket  # The client.
+        self.d = d  # The request.
+        self.kind = kind  # 'global', 'read' or 'write'.
+        self.cancelled = False
+        self.param = d.get('param') or {}
+#@+node:ekr.20261018150105.4: ** class RequestScheduler (leoserver.py)
+class RequestScheduler:
+    """
+    Run LeoServer requests in a pool of worker threads.
+
+    - Each commander has a serial queue. Consecutive read-only requests in
+      a queue run concurrently. Other requests run alone, in order.
+    - Read-only requests for different commanders run concurrently, so a
+      slow find in one outline doesn't block reading other outlines.
+    - Write requests run one at a time, even for different commanders:
+      Leo's commands share g.app, the log and other global state.
+    - Global requests, which open, close or select commanders or change
+      the server's settings, wait for all earlier requests. All later
+      requests wait for global requests.
+    - A read-only request supersedes identical requests from the same client
+      that have not started. Clients may cancel any request that has not
+      started with the !cancel_request action.
+
+    Worker threads hold a ReadWriteLock for each commander they access.
+    Write requests first acquire the writer lock, shared by all commanders.
+    """
+
+    # Requests that only read the outline.
+    read_only_actions = frozenset([
+        '!get_all_gnx', '!get_all_leo_commands', '!get_all_open_commanders',
+        '!get_all_positions', '!get_all_server_commands', '!get_body',
+        '!get_body_length', '!get_body_states', '!get_branch', '!get_chapters',
+        '!get_children', '!get_focus', '!get_is_valid', '!get_leoid',
+        '!get_parent', '!get_position_data', '!get_recent_files',
+        '!get_structure', '!get_ua', '!get_ui_states', '!get_undos',
+        '!get_unl', '!get_version',
+    ])
+    # Requests that change the open commanders, LeoServer.c or global state.
+    global_actions = frozenset([
+        '!close_file', '!open_file', '!open_files', '!set_ask_result',
+        '!set_config', '!set_leoid', '!set_opened_file', '!shut_down',
+    ])
+
+    def __init__(self, server: "LeoServer", workers: int, notify: Callable = None) -> None:
+        self.server = server
+        self.notify = notify  # An async function: notify(action, websocket).
+        self.pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='leoserver')
+        self.changed: asyncio.Event = None  # Set whenever a request finishes.
+        self.globals: list[int] = []  # The seqs of unfinished global requests.
+        self.locks: weakref.WeakKeyDictionary[Cmdr, ReadWriteLock] = weakref.WeakKeyDictionary()
+        self.locks_lock = threading.Lock()
+        self.queues: dict[str, collections.deque[ScheduledRequest]] = {}  # Keys are commander ids.
+        self.seq = 0
+        self.tasks: set[asyncio.Task] = set()  # Strong references to all tasks.
+        self.unfinished: set[int] = set()  # The seqs of all unfinished requests.
+        self.writer_lock = threading.Lock()  # Serializes all write requests.
+
+    #@+others
+    #@+node:ekr.20261018150105.5: *3* scheduler.submit
+    async def submit(self, websocket: Socket, d: dict[str, Any]) -> None:
+        """
+        Schedule request d from the given client.
+        The scheduler sends the answer when the request completes.
+        """
+        if self.changed is None:
+            self.changed = asyncio.Event()
+        action = d.get('action') or ''
+        if action == '!cancel_request':
+            # Cancel at once, in the loop's thread.
+            param = d.get('param') or {}
+            cancelled = self.cancel(websocket, param.get('requestId'))
+            await self.send(websocket, json.dumps({'id': d.get('id'), 'cancelled': cancelled}))
+            return
+        if action in self.global_actions:
+            kind = 'global'
+        elif action in self.read_only_actions:
+            kind = 'read'
+        else:
+            kind = 'write'
+        self.seq += 1
+        request = ScheduledRequest(self.seq, websocket, d, kind)
+        self.unfinished.add(request.seq)
+        if kind == 'global':
+            self.globals.append(request.seq)
+            self.start(self.run_global(request))
+            return
+        key = self.queue_key(request.param)
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = collections.deque()
+            self.start(self.consume(key, queue))
+        if kind == 'read':
+            # Supersede identical requests that have not started.
+            for request2 in queue:
+                if (
+                    request2.websocket is websocket
+                    and request2.d.get('action') == action
+                    and request2.param == request.param
+                ):
+                    self.cancel_request(request2)
+        queue.append(request)
+    #@+node:ekr.20261018150105.6: *3* scheduler.cancel & helpers
+    def cancel(self, websocket: Socket, id_: Any) -> bool:
+        """
+        Cancel the client's request with the given id if it has not started.
+        Return True if the request was cancelled.
+        """
+        for queue in self.queues.values():
+            for request in queue:
+                if request.websocket is websocket and request.d.get('id') == id_:
+                    self.cancel_request(request)
+                    return True
+        return False
+
+    def cancel_request(self, request: ScheduledRequest, reply: bool = True) -> None:
+        """Cancel the request and tell the client."""
+        if request.cancelled:
+            return
+        request.cancelled = True
+        self.finish(request)
+        if reply:
+            answer = json.dumps({'id': request.d.get('id'), 'cancelled': True})
+            self.start(self.send(request.websocket, answer))
+
+    def forget(self, websocket: Socket) -> None:
+        """Cancel all requests from a disconnected client."""
+        for queue in self.queues.values():
+            for request in queue:
+                if request.websocket is websocket:
+                    self.cancel_request(request, reply=False)
+    #@+node:ekr.20261018150105.7: *3* scheduler.consume & run_global
+    async def consume(self, key: str, queue: collections.deque[ScheduledRequest]) -> None:
+        """Run the requests in the queue until the queue is empty."""
+        running: set[asyncio.Future] = set()
+        while True:
+            running = {z for z in running if not z.done()}
+            if not queue:
+                if not running:
+                    break
+                await asyncio.wait(running)
+                continue
+            request = queue[0]
+            if request.cancelled:
+                queue.popleft()
+                continue
+            if request.kind == 'write' and running:
+                # Wait for earlier readers.
+                await asyncio.wait(running)
+                continue
+            queue.popleft()
+            await self.wait_for_turn(request)
+            future = asyncio.ensure_future(self.run(request))
+            if request.kind == 'read':
+                running.add(future)
+            else:
+                await future
+        del self.queues[key]
+
+    async def run_global(self, request: ScheduledRequest) -> None:
+        """Run a global request after all earlier requests finish."""
+        await self.wait_for_turn(request)
+        await self.run(request)
+    #@+node:ekr.20261018150105.8: *3* scheduler.run & execute
+    async def run(self, request: ScheduledRequest) -> None:
+        """Run the request in a worker thread, then send the answer."""
+        tag = 'server'
+        d, websocket = request.d, request.websocket
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                answer = await loop.run_in_executor(self.pool, self.execute, request)
+            except TerminateServer as e:
+                await websocket.close(code=1000, reason=str(e))
+                return
+            except ServerError as e:
+                error = f"{tag}:  ServerError: {e}...\n{tag}:  {d}"
+                print("", flush=True)
+                print(error, flush=True)
+                print("", flush=True)
+                package = {
+                    "id": d.get('id'),
+                    "action": d.get('action'),
+                    "request": f"{d}",
+                    "ServerError": f"{e}",
+                }
+                answer = json.dumps(package, separators=(',', ':'), cls=SetEncoder)
+            except Exception as e:  # pragma: no cover
+                print(f"{tag}: Unexpected Exception! {e}", flush=True)
+                g.print_exception()
+                print('', flush=True)
+                await websocket.close(code=1011, reason=str(e))
+                return
+            await self.send(websocket, answer)
+            # If not a 'getter' send refresh signal to other clients
+            action = d.get('action') or ''
+            if self.notify and action[0:5] != "!get_" and action != "!do_nothing":
+                await self.notify(action, websocket)
+        finally:
+            self.finish(request)
+
+    def execute(self, request: ScheduledRequest) -> Response:
+        """Handle the request in a worker thread."""
+        server = self.server
+        locks: list[tuple[ReadWriteLock, bool]] = []
+        if request.kind != 'global':
+            try:
+                c = server._check_c(request.param)
+            except ServerError:
+                c = None
+            if c:
+                locks.append((self.lock_for(c), request.kind == 'read'))
+            # _make_response reads server.c.
+            if server.c and server.c is not c:
+                locks.append((self.lock_for(server.c), True))
+        # Always acquire the writer lock before any commander's lock.
+        if request.kind == 'write':
+            self.writer_lock.acquire()
+        try:
+            for lock, shared in locks:
+                lock.acquire(shared)
+            try:
+                return server._do_message(request.d)
+            finally:
+                for lock, shared in reversed(locks):
+                    lock.release(shared)
+        finally:
+            if request.kind == 'write':
+                self.writer_lock.release()
+    #@+node:ekr.20261018150105.9: *3* scheduler.utils
+    def busy(self) -> bool:
+        """Return True if any request is unfinished."""
+        return bool(self.unfinished)
+
+    def finish(self, request: ScheduledRequest) -> None:
+        """Mark the request as finished and wake all waiters."""
+        self.unfinished.discard(request.seq)
+        if request.seq in self.globals:
+            self.globals.remove(request.seq)
+        if self.changed:
+            self.changed.set()
+            self.changed = asyncio.Event()
+
+    async def join(self) -> None:
+        """Wait until all requests have finished."""
+        await self.wait_for(lambda: not self.unfinished)
+
+    def lock_for(self, c: Cmdr) -> ReadWriteLock:
+        """Return the lock for commander c."""
+        with self.locks_lock:
+            lock = self.locks.get(c)
+            if lock is None:
+                lock = self.locks[c] = ReadWriteLock()
+            return lock
+
+    def queue_key(self, param: Param) -> str:
+        """Return the key of the queue for a request."""
+        commanderId = param.get('commanderId')
+        if commanderId:
+            return str(commanderId)
+        c = self.server.c
+        return str(id(c)) if c else ''
+
+    async def send(self, websocket: Socket, answer: str) -> None:
+        try:
+            await websocket.send(answer)
+        except ConnectionClosed:  # pragma: no cover
+            pass  # The client has disconnected.
+
+    def shutdown(self) -> None:
+        """Stop all worker threads."""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self, coroutine: Any) -> None:
+        """Start a task, keeping a reference to it until it completes."""
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def wait_for(self, predicate: Callable[[], bool]) -> None:
+        """Wait until the predicate is true."""
+        while not predicate():
+            await self.changed.wait()
+
+    async def wait_for_turn(self, request: ScheduledRequest) -> None:
+        """Wait until the request may start."""
+        if request.kind == 'global':
+            # Wait for all earlier requests.
+            await self.wait_for(lambda: min(self.unfinished) == request.seq)
+        else:
+            # Wait for all earlier global requests.
+            await self.wait_for(lambda: not self.globals or self.globals[0] > request.seq)
+    #@-others
 #@+node:felix.20210621233316.4: ** class LeoServer
 class LeoServer:
     """Leo Server Controller"""
@@ -894,11 +1420,15 @@ class LeoServer:
         t1 = time.process_time()
         #
         # Init ivars first.
+        self.request_state = threading.local()  # See the action, current_id and log_flag properties.
         self.c: Cmdr = None  # Currently Selected Commander.
         self.dummy_c: Cmdr = None  # Set below, after we set g.
-        self.action: str = None
+        self.action = None
         self.bad_commands_list: list[str] = []  # Set below.
         self.idle_tasks: list[tuple[Callable, Union[int, float]]] = []
+        # Keys are commanders. Used by get_structure_delta.
+        self.outline_syncs: weakref.WeakKeyDictionary[Cmdr, OutlineSync] = weakref.WeakKeyDictionary()
+        self.scheduler: RequestScheduler = None  # Set by main when the --workers option is given.
         #
         # Debug utilities
         self.current_id = 0  # Id of action being processed.
@@ -953,6 +1483,33 @@ class LeoServer:
         t2 = time.process_time()
         if not testing:
             print(f"LeoServer: init leoBridge in {t2-t1:4.2} sec.", flush=True)
+    #@+node:ekr.20261018150105.10: *3* server.action, current_id & log_flag
+    # The state of the request being processed by the current thread.
+    # RequestScheduler handles requests in more than one thread.
+
+    @property
+    def action(self) -> Optional[str]:
+        return getattr(self.request_state, 'action', None)
+
+    @action.setter
+    def action(self, value: Optional[str]) -> None:
+        self.request_state.action = value
+
+    @property
+    def current_id(self) -> int:
+        return getattr(self.request_state, 'current_id', 0)
+
+    @current_id.setter
+    def current_id(self, value: int) -> None:
+        self.request_state.current_id = value
+
+    @property
+    def log_flag(self) -> bool:
+        return getattr(self.request_state, 'log_flag', False)
+
+    @log_flag.setter
+    def log_flag(self, value: bool) -> None:
+        self.request_state.log_flag = value
     #@+node:felix.20240110004711.1: *3* server.finishCreate
     def finishCreate(self, c: Cmdr) -> None:
         """Finalize commander creation and add to windowList in leoserver"""
@@ -1119,6 +1676,8 @@ class LeoServer:
         """A background task that calls func every n seconds."""
         while True:
             await asyncio.sleep(seconds)
+            if self.scheduler and self.scheduler.busy():
+                continue  # Don't run Leo's code while worker threads run requests.
             func(self)
     #@+node:felix.20210627004039.1: *4* LeoServer._idleTime
     def _idleTime(self, fn: Callable, delay: Union[int, float], tag: str) -> None:
@@ -2403,10 +2962,8 @@ class LeoServer:
             assert c
             ap = param.get("ap")
             gnx = ap.get("gnx")
-            if gnx:
-                for p in c.all_unique_positions(copy=False):
-                    if p.gnx == gnx:
-                        return self._make_minimal_response({'valid': True})
+            if gnx and c.positionIndex.find(gnx):
+                return self._make_minimal_response({'valid': True})
         except Exception:  # pragma: no cover
             pass
         return self._make_minimal_response()
@@ -2449,13 +3006,61 @@ class LeoServer:
         # return selected node either ways
         return self._make_minimal_response({"structure": result})
 
+    #@+node:ekr.20261018144120.6: *5* server.get_structure_delta
+    def get_structure_delta(self, param: Param) -> Response:
+        """
+        Return the changes to the outline since the client's version.
+
+        param["version"]: the latest version that the client has seen.
+        Omit the version to get the entire outline.
+
+        The response contains:
+
+        "version": the server's current version.
+        "full": True if the client must discard its outline and apply
+                the ops to an empty outline. The server sends the entire
+                outline if it no longer has the ops for the client's
+                version.
+        "ops": the changes, a list of dicts describing vnodes. The
+               outline contains each vnode once, even if it is cloned.
+               The hidden root vnode, 'hidden-root-vnode-gnx', contains
+               the top-level vnodes.
+
+               {"op": "insert", "gnx", "headline", "children", flags...}
+               {"op": "update", "gnx", "headline", flags...}
+               {"op": "children", "gnx", "children"}
+               {"op": "delete", "gnx"}
+
+               "children" is the list of the gnxs of the vnode's children.
+               "children" ops describe moved, inserted and deleted nodes.
+               Flags appear only if true: "hasBody", "marked", "dirty",
+               "cloned", "atFile", "expanded" and "nodeTags", the number
+               of tags.
+        "selected": the ap of the selected position.
+        """
+        c = self._check_c(param)
+        sync = self.outline_syncs.get(c)
+        if sync is None:
+            sync = self.outline_syncs[c] = OutlineSync()
+        sync.update(c)
+        ops = sync.delta(param.get('version'))
+        full = ops is None
+        if full:
+            ops = sync.full()
+        return self._make_minimal_response({
+            "version": sync.version,
+            "full": full,
+            "ops": ops,
+            "selected": self._p_to_ap(c.p) if c.p else None,
+        })
+
     #@+node:felix.20210621233316.38: *5* server.get_all_gnx
     def get_all_gnx(self, param: Param) -> Response:
         """Get gnx array from all unique nodes"""
         if self.log_flag:  # pragma: no cover
             print('\nget_all_gnx\n', flush=True)
         c = self._check_c(param)
-        all_gnx = [p.v.gnx for p in c.all_unique_positions(copy=False)]
+        all_gnx = [v.gnx for v in c.all_unique_nodes()]
         return self._make_minimal_response({"gnx": all_gnx})
     #@+node:felix.20221031010236.1: *5* server.get_branch
     def get_branch(self, param: Param) -> Response:
@@ -3262,21 +3867,20 @@ class LeoServer:
         u, wrapper = c.undoer, c.frame.body.wrapper
         if body is None:  # pragma: no cover
             raise ServerError(f"{tag}: no body given")
-        for p in c.all_positions():
-            if p.v.gnx == gnx:
-                if body == p.v.b:
-                    return self._make_response()
-                    # Just exit if there is no need to change at all.
-                bunch = u.beforeChangeNodeContents(p)
-                p.v.setBodyString(body)
-                u.afterChangeNodeContents(p, "Body Text", bunch)
-                if c.p == p:
-                    wrapper.setAllText(body)
-                if not c.isChanged():  # pragma: no cover
-                    c.setChanged()
-                if not p.v.isDirty():  # pragma: no cover
-                    p.setDirty()
-                break
+        p = c.positionIndex.find(gnx) if gnx else None
+        if p:
+            if body == p.v.b:
+                return self._make_response()
+                # Just exit if there is no need to change at all.
+            bunch = u.beforeChangeNodeContents(p)
+            p.v.setBodyString(body)
+            u.afterChangeNodeContents(p, "Body Text", bunch)
+            if c.p == p:
+                wrapper.setAllText(body)
+            if not c.isChanged():  # pragma: no cover
+                c.setChanged()
+            if not p.v.isDirty():  # pragma: no cover
+                p.setDirty()
         # additional forced string setting
         if gnx:
             v = c.fileCommands.gnxDict.get(gnx)  # vitalije
@@ -3490,6 +4094,15 @@ class LeoServer:
                 g.app.nodeIndices.defaultId = leoID
                 g.app.nodeIndices.userId = leoID
         return self._make_response()
+    #@+node:ekr.20261018150105.11: *5* server.cancel_request
+    def cancel_request(self, param: Param) -> Response:
+        """
+        Cancel the request whose id is param["requestId"] if it has not started.
+
+        Only the RequestScheduler queues requests. It handles this action
+        itself, so there is nothing to cancel here.
+        """
+        return self._make_minimal_response({"cancelled": False})
     #@+node:felix.20210818012827.1: *5* server.do_nothing
     def do_nothing(self, param: Param) -> Response:
         """Simply return states from _make_response"""
@@ -4812,6 +5425,9 @@ class LeoServer:
             # Make p and check p.
             p = Position(v, childIndex, stack)
             if not c.positionExists(p):  # pragma: no cover.
+                # The stack is out of date. Use the only position of v, if it exists.
+                p = c.positionIndex.find_vnode(v, unique=True)
+            if not p:  # pragma: no cover.
                 raise ServerError(f"{tag}: p does not exist in {c.shortFileName()}")
         except Exception:
             if self.log_flag or traces:
@@ -5142,17 +5758,16 @@ class LeoServer:
             if not p:
                 # Try to get a gnx parameter as secondary fallback selection criteria
                 gnx = ap.get('gnx')
-                if gnx:
-                    for p in c.all_unique_positions():
-                        if p.v.gnx == gnx:
-                            return p
+                p = self._positionFromGnx(gnx, c) if gnx else None
+                if p:
+                    return p
                 raise ServerError(f"{tag}: position does not exist. ap: {ap!r}")
             return p  # Return the position
         if gnx:
             # Had no 'ap', but a 'gnx' param was passed instead.
-            for p in c.all_unique_positions():
-                if p.v.gnx == gnx:
-                    return p
+            p = self._positionFromGnx(gnx, c)
+            if p:
+                return p
         # Fallback to c.p
         if not c.p:  # pragma: no cover
             raise ServerError(f"{tag}: no c.p")
@@ -5363,11 +5978,8 @@ class LeoServer:
         }
     #@+node:felix.20210621233316.96: *4* server._positionFromGnx
     def _positionFromGnx(self, gnx: str, c: Cmdr) -> Optional[Position]:
-        """Return first p node with this gnx or false"""
-        for p in c.all_unique_positions():
-            if p.v.gnx == gnx:
-                return p
-        return None
+        """Return first p node with this gnx or None"""
+        return c.positionIndex.find(gnx)
     #@+node:felix.20250606210256.1: *4* server._capitalizeDrive
     def _capitalize_drive(self, drive: str) -> str:
         """
@@ -5388,7 +6000,13 @@ class LeoServer:
         if "async" not in package:
             raise InternalServerError(f"\n{tag}: async member missing in package {jsonPackage} \n")
         if self.loop and self.loop.is_running():
-            asyncio.create_task(self._async_output(jsonPackage, toAll))
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # A worker thread of the RequestScheduler.
+                asyncio.run_coroutine_threadsafe(self._async_output(jsonPackage, toAll), self.loop)
+            else:
+                asyncio.create_task(self._async_output(jsonPackage, toAll))
         elif not g.unitTesting:
             raise InternalServerError(f"\n{tag}: loop not ready {jsonPackage} \n")
     #@+node:felix.20210621233316.89: *5* server._async_output
@@ -5620,7 +6238,7 @@ def main() -> None:  # pragma: no cover (tested in client)
         """
         Get arguments from the command line and sets them globally.
         """
-        global wsHost, wsPort, wsLimit, wsPersist, wsSkipDirty, argFile  # traces
+        global wsHost, wsPort, wsLimit, wsPersist, wsSkipDirty, wsWorkers, argFile  # traces
 
         def leo_file(s: str) -> str:
             if os.path.exists(s):
@@ -5640,7 +6258,7 @@ def main() -> None:  # pragma: no cover (tested in client)
             "  - leoInteg (https://github.com/boltex/leointeg) is written in typescript.\n"
         ])
         # Usage:
-        # leoserver.py [-a <address>] [-p <port>] [-l <limit>] [-f <file>] [--dirty] [--persist]
+        # leoserver.py [-a <address>] [-p <port>] [-l <limit>] [-f <file>] [-w <workers>] [--dirty] [--persist]
         usage = 'python leo.core.leoserver [options...]'
         trace_s = 'request,response,verbose'
         valid_traces = [z.strip() for z in trace_s.split(',')]
@@ -5655,6 +6273,9 @@ def main() -> None:  # pragma: no cover (tested in client)
             help='maximum number of clients. Defaults to ' + str(wsLimit))
         add('-f', '--file', dest='argFile', type=leo_file, metavar='PATH',
             help='open a .leo file at startup')
+        add('-w', '--workers', dest='wsWorkers', type=int, default=wsWorkers, metavar='N',
+            help='handle requests concurrently in N worker threads.\n'
+            'Defaults to 0: handle requests one at a time')
         add('--persist', dest='wsPersist', action='store_true',
             help='do not quit when last client disconnects')
         add('-d', '--dirty', dest='wsSkipDirty', action='store_true',
@@ -5671,6 +6292,7 @@ def main() -> None:  # pragma: no cover (tested in client)
         wsLimit = args.wsLimit
         wsPersist = bool(args.wsPersist)
         wsSkipDirty = bool(args.wsSkipDirty)
+        wsWorkers = max(0, args.wsWorkers)
         argFile = args.argFile
         if args.traces:
             ok = True
@@ -5765,6 +6387,10 @@ def main() -> None:  # pragma: no cover (tested in client)
                         print(f"{tag}: got: {d}", flush=True)
                     elif trace:
                         print(f"{tag}: got: {d}", flush=True)
+                    if controller.scheduler:
+                        # The scheduler sends the answer when the request completes.
+                        await controller.scheduler.submit(websocket, d)
+                        continue
                     answer = controller._do_message(d)
                 except TerminateServer as e:
                     await websocket.close(code=1000, reason=str(e))
@@ -5803,11 +6429,15 @@ def main() -> None:  # pragma: no cover (tested in client)
         finally:
             if connected:
                 connectionsTotal -= 1
+                if controller.scheduler:
+                    controller.scheduler.forget(websocket)
                 await unregister_client(websocket)
                 print(f"{tag} connection finished.  Total: {connectionsTotal}, Limit: {wsLimit}")
             # Check for persistence flag if all connections are closed
             if connectionsTotal == 0 and not wsPersist:
                 print("Shutting down leoserver")
+                if controller.scheduler:
+                    controller.scheduler.shutdown()
                 # Preemptive closing of tasks
                 for task in asyncio.all_tasks():
                     task.cancel()
@@ -5823,6 +6453,9 @@ def main() -> None:  # pragma: no cover (tested in client)
 
     # Open leoBridge.
     controller = LeoServer()  # Single instance of LeoServer, i.e., an instance of leoBridge
+    if wsWorkers:
+        controller.scheduler = RequestScheduler(controller, wsWorkers, notify_clients)
+        print(f"Handling requests in {wsWorkers} worker threads", flush=True)
     if argFile:
         # Open specified file argument
         try:
@@ -5,6 +5,7 @@
 #@+<< imports, annotations: base_importer.py >>
 #@+node:ekr.20230920091345.1: ** << imports, annotations: base_importer.py >>
 from __future__ import annotations
+import functools
 import re
 from typing import TYPE_CHECKING
 from leo.core import leoGlobals as g
@@ -182,54 +183,7 @@ class Importer:
         The input and guide lines are "parallel": they have the same number of
         lines.
         """
-        string_delims = self.string_list
-        line_comment, start_comment, end_comment = g.set_delims_from_language(self.language)
-        target = ''  # The string ending a multi-line comment or string.
-        escape = '\\'
-        result = []
-        for line in lines:
-            result_line, skip_count = [], 0
-            for i, ch in enumerate(line):
-                if ch == '\n':
-                    break  # Avoid appending the newline twice.
-                elif skip_count > 0:
-                    # Replace the character with a blank.
-                    result_line.append(' ')
-                    skip_count -= 1
-                elif ch == escape:  # #3620: test for escape before testing for target.
-                    assert skip_count == 0
-                    result_line.append(' ')
-                    skip_count = 1
-                elif target:
-                    result_line.append(' ')
-                    # Clear the target, but skip any remaining characters of the target.
-                    if g.match(line, i, target):
-                        skip_count = max(0, (len(target) - 1))
-                        target = ''
-                elif line_comment and line.startswith(line_comment, i):
-                    # Skip the rest of the line. It can't contain significant characters.
-                    break
-                elif any(g.match(line, i, z) for z in string_delims):
-                    # Allow multi-character string delimiters.
-                    result_line.append(' ')
-                    for z in string_delims:
-                        if g.match(line, i, z):
-                            target = z
-                            skip_count = max(0, (len(z) - 1))
-                            break
-                elif start_comment and g.match(line, i, start_comment):
-                    result_line.append(' ')
-                    target = end_comment
-                    skip_count = max(0, len(start_comment) - 1)
-                else:
-                    result_line.append(ch)
-
-            # End the line and append it to the result.
-            # Strip trailing whitespace. It can't affect significant characters.
-            end_s = '\n' if line.endswith('\n') else ''
-            result.append(''.join(result_line).rstrip() + end_s)
-        assert len(result) == len(lines)  # A crucial invariant.
-        return result
+        return self.scan_guide_lines(lines)
     #@+node:ekr.20230529075138.10: *4* i.find_blocks
     def find_blocks(self, i1: int, i2: int) -> list[Block]:
         """
@@ -709,6 +663,73 @@ class Importer:
             else:
                 result.append(line)
         return result
+    #@+node:ekr.20261019090010.1: *4* i.scan_guide_lines
+    def scan_guide_lines(self, lines: list[str], apparent_regexes: bool = False) -> list[str]:
+        """
+        Importer.scan_guide_lines: Return the guide lines for the given lines.
+
+        apparent_regexes: True if '/' starts an *apparent* regex ending at
+                          the next '/' in the line.
+
+        A compiled regex finds the next significant delimiter. Characters
+        between delimiters are copied or blanked in slices.
+        """
+        line_comment, start_comment = self.single_comment, self.block1
+        end_comment = self.block2 or ''
+        string_delims = tuple(z for z in self.string_list if z)
+        delim_pat = guide_line_pattern(string_delims, line_comment, start_comment, apparent_regexes)
+        target = ''  # The string ending a multi-line comment or string.
+        result = []
+        for line in lines:
+            n = line.find('\n')
+            if n == -1:
+                n = len(line)
+            i, parts = 0, []
+            while i < n:
+                if target:
+                    m = target_pattern(target).search(line, i, n)
+                    if not m:
+                        break  # Blank the rest of the line.
+                    # #3620: test for escape before testing for target.
+                    if m.group() == '\\':
+                        j = min(n, m.start() + 2)
+                    else:
+                        j, target = m.end(), ''
+                    parts.append(' ' * (j - i))
+                    i = j
+                    continue
+                m = delim_pat.search(line, i, n)
+                if not m:
+                    parts.append(line[i:n])
+                    break
+                j, delim = m.start(), m.group()
+                parts.append(line[i:j])
+                if delim == '\\':
+                    # Blank the escape and the escaped character.
+                    i = min(n, j + 2)
+                elif delim == line_comment:
+                    # Skip the rest of the line. It can't contain significant characters.
+                    break
+                elif delim in string_delims:
+                    target, i = delim, m.end()
+                elif delim == start_comment:
+                    target, i = end_comment, m.end()
+                else:
+                    assert delim == '/', repr(delim)
+                    k = line.find('/', j + 1)
+                    if k == -1:
+                        parts.append(delim)
+                        i = j + 1
+                        continue
+                    # Blank the *apparent* regular expression and the following character.
+                    i = min(n, k + 2)
+                parts.append(' ' * (i - j))
+            # End the line and append it to the result.
+            # Strip trailing whitespace. It can't affect significant characters.
+            end_s = '\n' if line.endswith('\n') else ''
+            result.append(''.join(parts).rstrip() + end_s)
+        assert len(result) == len(lines)  # A crucial invariant.
+        return result
     #@+node:ekr.20230529075138.17: *4* i.trace_blocks & trace_block
     def trace_blocks(self, blocks: list[Block]) -> None:
         """For debugging: trace the list of blocks."""
@@ -727,6 +748,35 @@ class Importer:
         tag = f"  {block.kind:>10} {block.name:<20} {block.start} {block.start_body} {block.end}"
         g.printObj(block.lines[block.start:block.end], tag=tag)
     #@-others
+#@+node:ekr.20261019090010.2: ** function: guide_line_pattern & target_pattern
+@functools.lru_cache
+def guide_line_pattern(
+    string_delims: tuple[str, ...],
+    line_comment: str,
+    start_comment: str,
+    apparent_regexes: bool,
+) -> re.Pattern:
+    """
+    Return a compiled regex matching the delimiters that i.scan_guide_lines
+    must handle outside of strings and comments.
+
+    Alternation is leftmost-first, so the order of the alternatives is the
+    priority of the delimiters starting at the same position.
+    """
+    delims = ['\\']
+    if line_comment:
+        delims.append(line_comment)
+    delims.extend(string_delims)
+    if start_comment:
+        delims.append(start_comment)
+    if apparent_regexes:
+        delims.append('/')
+    return re.compile('|'.join(re.escape(z) for z in delims))
+
+@functools.lru_cache
+def target_pattern(target: str) -> re.Pattern:
+    """Return a compiled regex matching an escape or the given target."""
+    return re.compile(r'\\|' + re.escape(target))
 #@-others
 #@@language python
 #@@tabwidth -4
@@ -4,7 +4,6 @@
 from __future__ import annotations
 import re
 from typing import TYPE_CHECKING
-from leo.core import leoGlobals as g
 from leo.plugins.importers.base_importer import Importer
 
 if TYPE_CHECKING:
@@ -48,63 +47,7 @@ class JS_Importer(Importer):
         In general, tokenizing Javascript is context dependent(!!), but it
         would be unbearable to include a full JS tokenizer.
         """
-        string_delims = self.string_list
-        line_comment, start_comment, end_comment = g.set_delims_from_language(self.language)
-        target = ''  # The string ending a multi-line comment or string.
-        escape = '\\'
-        result = []
-        for line in lines:
-            result_line, skip_count = [], 0
-            for i, ch in enumerate(line):
-                # g.trace(f"{i:3} {ch!r:4} skip: {skip_count} target: {target!r:4}")
-                if ch == '\n':
-                    break  # Avoid appending the newline twice.
-                elif skip_count > 0:
-                    # Replace the character with a blank.
-                    result_line.append(' ')
-                    skip_count -= 1
-                elif ch == escape:  # #3620: test for escape before testing for target.
-                    assert skip_count == 0
-                    result_line.append(' ')
-                    skip_count = 1
-                elif target:
-                    result_line.append(' ')
-                    # Clear the target, but skip any remaining characters of the target.
-                    if g.match(line, i, target):
-                        skip_count = max(0, (len(target) - 1))
-                        target = ''
-                elif line_comment and line.startswith(line_comment, i):
-                    # Skip the rest of the line. It can't contain significant characters.
-                    break
-                elif any(g.match(line, i, z) for z in string_delims):
-                    # Allow multi-character string delimiters.
-                    result_line.append(' ')
-                    for z in string_delims:
-                        if g.match(line, i, z):
-                            target = z
-                            skip_count = max(0, (len(z) - 1))
-                            break
-                elif start_comment and g.match(line, i, start_comment):
-                    result_line.append(' ')
-                    target = end_comment
-                    skip_count = max(0, len(start_comment) - 1)
-                elif ch == '/':
-                    j = line.find('/', i + 1)
-                    if j > -1:
-                        # An *apparent* regular expression.
-                        result_line.append(' ')
-                        skip_count = j - i + 1
-                    else:
-                        result_line.append(ch)
-                else:
-                    result_line.append(ch)
-
-            # End the line and append it to the result.
-            # Strip trailing whitespace. It can't affect significant characters.
-            end_s = '\n' if line.endswith('\n') else ''
-            result.append(''.join(result_line).rstrip() + end_s)
-        assert len(result) == len(lines)  # A crucial invariant.
-        return result
+        return self.scan_guide_lines(lines, apparent_regexes=True)
     #@-others
 #@-others
 
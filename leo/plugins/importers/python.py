@@ -35,8 +35,8 @@ class Python_Importer(Importer):
 
     #@+others
     #@+node:ekr.20230830051934.1: *3* python_i.delete_comments_and_strings
-    string_pat1 = re.compile(r'([fFrR]*)("""|")')
-    string_pat2 = re.compile(r"([fFrR]*)('''|')")
+    # Group 2 matches a string's opening delim. Group 1 matches its prefix.
+    string_pat = re.compile(r'''[#\n]|([fFrR]*)("""|"|\'\'\'|')''')
 
     def delete_comments_and_strings(self, lines: list[str]) -> list[str]:
         """
@@ -52,47 +52,36 @@ class Python_Importer(Importer):
             String ends:      return ('', i)
             String continues: return (delim, len(line))
             """
-            if delim not in line:
-                return delim, len(line)
-            # Create a pattern so we don't have to create substrings.
-            delim_pat = re.compile(delim)
-            while i < len(line):
-                ch = line[i]
-                if ch == '\\':
-                    i += 2
-                    continue
-                if delim_pat.match(line, i):
-                    return '', i + len(delim)
-                i += 1
-            return delim, i
+            if delim in line:
+                for m in skip_pats[delim].finditer(line, i):
+                    if m.group() == delim:
+                        return '', m.end()
+            return delim, len(line)
 
         # g.printObj(lines, tag='delete_comments_and_strings')
 
+        string_pat = self.string_pat
+        # Patterns matching an escaped character or a string's closing delim.
+        skip_pats = {
+            z: re.compile(r'\\.|' + z, re.DOTALL) for z in ('"""', '"', "'''", "'")
+        }
         delim: str = ''  # The open string delim.
         result: list[str] = []
-        for line_i, line in enumerate(lines):
+        for line in lines:
             i, result_line = 0, []
             while i < len(line):
                 if delim:
                     delim, i = skip_string(delim, i, line)
                     continue
-                ch = line[i]
-                if ch in '#\n':
+                m = string_pat.search(line, i)
+                if not m:
+                    result_line.append(line[i:])
                     break
-                m = (
-                    self.string_pat1.match(line, i) or
-                    self.string_pat2.match(line, i)
-                )
-                if m:
-                    # Start skipping the string.
-                    prefix, delim = m.group(1), m.group(2)
-                    i += len(prefix)
-                    i += len(delim)
-                    if i < len(line):
-                        delim, i = skip_string(delim, i, line)
-                else:
-                    result_line.append(ch)
-                    i += 1
+                result_line.append(line[i : m.start()])
+                if not m.group(2):
+                    break  # A comment or the end of the line.
+                # Start skipping the string.
+                delim, i = m.group(2), m.end()
 
             # End the line and append it to the result.
             if line.endswith('\n'):
@@ -5,6 +5,7 @@
 #@+node:ekr.20140907131341.18709: ** << qt_tree imports >>
 from __future__ import annotations
 from collections.abc import Callable
+import difflib
 import re
 import time
 from typing import Any, TYPE_CHECKING
@@ -12,6 +13,7 @@ from leo.core.leoQt import QtCore, QtGui, QtWidgets
 from leo.core.leoQt import EndEditHint, Format, ItemFlag, KeyboardModifier
 from leo.core import leoGlobals as g
 from leo.core import leoFrame
+from leo.core import leoNodes
 from leo.core import leoPlugins  # Uses leoPlugins.TryNext.
 from leo.plugins import qt_text
 #@-<< qt_tree imports >>
@@ -56,6 +58,10 @@ class LeoQtTree(leoFrame.LeoTree):
         self.nodeIconsDict: dict[str, list[str]] = {}
         self.position2itemDict: dict[str, QTreeWidgetItem] = {}  # Keys are gnxs.
         self.vnode2itemsDict: dict[VNode, list[QTreeWidgetItem]] = {}  # values are lists of items.
+        # Keys are item hashes, values are the node states drawn in the items.
+        self.item_states: dict[str, tuple] = {}
+        # Keys are vnodes, values are (node state, composite icon).
+        self.icon_cache: dict[VNode, tuple[tuple, QIcon]] = {}
         # keys are native QLineEdit widgets, values are wrappers.
         self.editWidgetsDict: dict[QLineEdit, QHeadlineWrapper] = {}
         self.reloadSettings()
@@ -131,6 +137,7 @@ class LeoQtTree(leoFrame.LeoTree):
         self.stayInTree = c.config.getBool('stayInTreeAfterSelect')
         self.use_chapters = c.config.getBool('use-chapters')
         self.use_declutter = c.config.getBool('tree-declutter', default=False)
+        self.use_incremental_redraw = c.config.getBool('incremental-tree-redraw', default=False)
         self.use_mouse_expand_gestures = c.config.getBool('use-mouse-expand-gestures',
                                                            default=False)
     #@+node:ekr.20110605121601.17868: *3* qtree.Debugging & tracing
@@ -174,12 +181,24 @@ class LeoQtTree(leoFrame.LeoTree):
             c.setCurrentPosition(p)
         assert not self.busy, g.callers()
         self.redrawCount += 1
-        self.initData()
-        try:
-            self.busy = True
-            self.drawTopTree(p)
-        finally:
-            self.busy = False
+        if self.can_redraw_incrementally():
+            try:
+                self.busy = True
+                self.incremental_redraw()
+            except RuntimeError:
+                # A Qt item has been deleted behind our back.
+                g.es_exception()
+                self.initData()
+                self.drawTopTree(p)
+            finally:
+                self.busy = False
+        else:
+            self.initData()
+            try:
+                self.busy = True
+                self.drawTopTree(p)
+            finally:
+                self.busy = False
         self.setItemForCurrentPosition()
         return p  # Return the position, which may have changed.
 
@@ -432,64 +451,85 @@ class LeoQtTree(leoFrame.LeoTree):
         else:
             self.contractItem(parent_item)
     #@+node:ekr.20110605121601.17875: *5* qtree.drawNode
-    def drawNode(self, p: Position, parent_item: QTreeWidgetItem) -> QTreeWidgetItem:
-        """Draw the node p."""
-        c = self.c
-        v = p.v
+    def drawNode(self, p: Position, parent_item: QTreeWidgetItem, n: int = None) -> QTreeWidgetItem:
+        """
+        Draw the node p.
+
+        Append the new item to parent_item's children, or insert it as the
+        n'th child if n is given.
+        """
         # Allocate the QTreeWidgetItem.
-        item = self.createTreeItem(p, parent_item)
+        item = self.createTreeItem(p, parent_item, n)
         # Update the data structures.
         itemHash = self.itemHash(item)
+        self.addItem(p, item, itemHash)
+        # Set the headline and the icon.
+        state = self.node_state(p.v)
+        self.drawItem(p, item, state)
+        self.item_states[itemHash] = state
+        return item
+    #@+node:ekr.20261018171020.1: *5* qtree.addItem & drawItem
+    def addItem(self, p: Position, item: QTreeWidgetItem, itemHash: str) -> None:
+        """
+        Associate item with p and p.v.
+
+        p must be a copy that the caller will not change.
+        """
+        v = p.v
         self.position2itemDict[p.key()] = item
-        self.item2positionDict[itemHash] = p.copy()  # was item
+        self.item2positionDict[itemHash] = p  # was item
         self.item2vnodeDict[itemHash] = v  # was item
         d = self.vnode2itemsDict
         aList = d.get(v, [])
         if item not in aList:
             aList.append(item)
         d[v] = aList
-        # Set the headline and maybe the icon.
+
+    def drawItem(self, p: Position, item: QTreeWidgetItem, state: tuple) -> None:
+        """Set the headline and the icon of the item for p."""
+        c, v = self.c, p.v
         self.setItemText(item, p.h)
         # #1310: Add a tool tip.
         item.setToolTip(0, p.h)
         if self.use_declutter:
-            icon = self.declutter_node(c, p.v, item)
+            icon = self.declutter_node(c, v, item)
             if icon:
                 item.setIcon(0, icon)
-            return item
+            return
         # Draw the icon: **Slow**, but allows per-vnode icons.
-        icon = self.getCompositeIconImage(p.v)
+        data = self.icon_cache.get(v)
+        if data and data[0] == state:
+            icon = data[1]
+        else:
+            icon = self.getCompositeIconImage(v)
+            self.icon_cache[v] = state, icon
         if icon:
             item.setIcon(0, icon)
-        return item
     #@+node:ekr.20110605121601.17876: *5* qtree.drawTopTree
     def drawTopTree(self, p: Position) -> None:
         """Draw the tree rooted at p."""
         trace = 'drawing' in g.app.debug and not g.unitTesting
         if trace:
             t1 = time.process_time()
-        c = self.c
         self.clear()
         # Draw all top-level nodes and their visible descendants.
+        for p2 in self.topPositions():
+            self.drawTree(p2)
+        if trace:
+            t2 = time.process_time()
+            g.trace(f"{t2 - t1:5.2f} sec.", g.callers(5))
+    #@+node:ekr.20261018171020.2: *5* qtree.topPositions
+    def topPositions(self) -> list[Position]:
+        """Return the list of positions of the top-level items."""
+        c = self.c
         if c.hoistStack:
             bunch = c.hoistStack[-1]
             p = bunch.p
             h = p.h
             if len(c.hoistStack) == 1 and h.startswith('@chapter') and p.hasChildren():
-                p = p.firstChild()
-                while p:
-                    self.drawTree(p)
-                    p.moveToNext()
-            else:
-                self.drawTree(p)
-        else:
-            p = c.rootPosition()
-            while p:
-                self.drawTree(p)
-                p.moveToNext()
-        if trace:
-            t2 = time.process_time()
-            g.trace(f"{t2 - t1:5.2f} sec.", g.callers(5))
+                return list(p.children())
+            return [p.copy()]
+        return list(c.rootPosition().self_and_siblings())
     #@+node:ekr.20110605121601.17877: *5* qtree.drawTree
     def drawTree(self, p: Position, parent_item: QTreeWidgetItem = None) -> None:
         if g.app.gui.isNullGui:
@@ -505,6 +545,144 @@ class LeoQtTree(leoFrame.LeoTree):
         self.position2itemDict = {}
         self.vnode2itemsDict = {}
         self.editWidgetsDict = {}
+        self.item_states = {}
+    #@+node:ekr.20261018171020.4: *5* qtree.incremental_redraw & helpers
+    def can_redraw_incrementally(self) -> bool:
+        """
+        Return True if full_redraw can update the existing items.
+
+        Plugins that visit tree items may style items using any data, so
+        their items must be redrawn from scratch.
+        """
+        visitor = getattr(g, 'visit_tree_item', None)
+        return self.use_incremental_redraw and not getattr(visitor, 'chain', None)
+
+    def incremental_redraw(self) -> None:
+        """
+        Update the existing items so that they match the outline.
+
+        Unlike drawTopTree, this method keeps the items of all nodes that
+        remain visible. It diffs each item's children against the children
+        of the item's node, then inserts, removes or moves only the items
+        that differ. It redraws an item's headline and icon only if the
+        item's node state has changed.
+
+        Moved nodes keep their items (and the items' descendants) when
+        possible.
+        """
+        old_item2vnode = self.item2vnodeDict
+        old_vnode2items = self.vnode2itemsDict
+        old_states = self.item_states
+        # Rebuild the data structures as we go.
+        self.item2positionDict = {}
+        self.item2vnodeDict = {}
+        self.position2itemDict = {}
+        self.vnode2itemsDict = {}
+        self.item_states = {}
+        # Keys are vnodes, values are lists of removed items.
+        removed: dict[VNode, list[QTreeWidgetItem]] = {}
+
+        def child_positions(p: Position) -> list[Position]:
+            """Return the list of p's children, without moving positions."""
+            stack = p.stack + [(p.v, p._childIndex)]
+            return [leoNodes.Position(v, i, stack) for i, v in enumerate(p.v.children)]
+
+        def reusable_item(v: VNode, parent_item: QTreeWidgetItem) -> QTreeWidgetItem:
+            """Return an existing item for v that may become a child of parent_item."""
+            items = removed.get(v)
+            if items:
+                return items.pop()
+            for item in old_vnode2items.get(v, []):
+                if self.itemHash(item) in self.item2vnodeDict:
+                    continue  # The item has already been placed.
+                # Don't move an item into its own descendants.
+                ancestor = parent_item
+                while ancestor and ancestor is not item:
+                    ancestor = ancestor.parent()
+                if not ancestor:
+                    self.takeItem(item)
+                    return item
+            return None
+
+        def update_children(parent_item: QTreeWidgetItem, positions: list[Position], deep: bool) -> None:
+            """
+            Make the children of parent_item (or the top-level items) the
+            items of the given positions.
+
+            deep: True if the items should show their visible descendants.
+            """
+            items = self.childItems(parent_item)
+            hashes = [self.itemHash(z) for z in items]
+            old_vnodes = [old_item2vnode.get(z) for z in hashes]
+            new_vnodes = [z.v for z in positions]
+            new_items: list[QTreeWidgetItem] = items
+            new_hashes: list[str] = hashes
+            if old_vnodes != new_vnodes:
+                # Remove the items that differ.
+                new_items, new_hashes = [None] * len(positions), [None] * len(positions)
+                matcher = difflib.SequenceMatcher(None, old_vnodes, new_vnodes, autojunk=False)
+                for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                    if tag == 'equal':
+                        new_items[j1:j2], new_hashes[j1:j2] = items[i1:i2], hashes[i1:i2]
+                        continue
+                    for i in range(i1, i2):
+                        self.takeItem(items[i])
+                        if old_vnodes[i]:
+                            removed.setdefault(old_vnodes[i], []).append(items[i])
+            # Place the kept items before looking for reusable items.
+            for p, item, itemHash in zip(positions, new_items, new_hashes):
+                if item:
+                    self.addItem(p, item, itemHash)
+            for n, p in enumerate(positions):
+                item, itemHash = new_items[n], new_hashes[n]
+                if item is None:
+                    item = reusable_item(p.v, parent_item)
+                    if not item:
+                        # Draw a new item and its visible descendants.
+                        item = self.drawNode(p, parent_item, n)
+                        if deep:
+                            self.drawChildren(p, item)
+                        continue
+                    itemHash = self.itemHash(item)
+                    self.insertItem(n, parent_item, item)
+                    self.addItem(p, item, itemHash)
+                update_item(p, item, itemHash, deep)
+
+        def update_item(p: Position, item: QTreeWidgetItem, itemHash: str, deep: bool) -> None:
+            """Update an existing item and its descendants."""
+            v = p.v
+            state = self.node_state(v)
+            if old_states.get(itemHash) != state:
+                self.resetItem(item)
+                self.drawItem(p, item, state)
+            self.item_states[itemHash] = state
+            if not deep:
+                if item.childCount():
+                    update_children(item, [], deep=False)
+            elif v.children and p.isExpanded():
+                update_children(item, child_positions(p), deep=True)
+                if not item.isExpanded():
+                    self.expandItem(item)
+            else:
+                if v.children or item.childCount():
+                    update_children(item, child_positions(p), deep=False)
+                if item.isExpanded():
+                    self.contractItem(item)
+
+        update_children(None, self.topPositions(), deep=True)
+    #@+node:ekr.20261018171020.5: *6* qtree.node_state
+    def node_state(self, v: VNode) -> tuple:
+        """Return a tuple that changes whenever v's headline or icons change."""
+        d = getattr(v, 'unknownAttributes', None)
+        icons = d and d.get('icons')
+        return v._headString, v.computeIcon(), repr(icons) if icons else ''
+    #@+node:ekr.20261018171020.6: *6* qtree.resetItem
+    def resetItem(self, item: QTreeWidgetItem) -> None:
+        """Remove any styling that declutter rules applied to item."""
+        if self.use_declutter:
+            ItemDataRole = QtCore.Qt.ItemDataRole
+            for role in (ItemDataRole.BackgroundRole, ItemDataRole.ForegroundRole, ItemDataRole.FontRole):
+                item.setData(0, role, None)
     #@+node:ekr.20110605121601.17880: *4* qtree.redraw_after_contract
     def redraw_after_contract(self, p: Position) -> None:
 
@@ -875,6 +1053,27 @@ class LeoQtTree(leoFrame.LeoTree):
             w = self.treeWidget
             n = w.indexOfTopLevelItem(item)
         return n
+    #@+node:ekr.20261018171020.3: *4* qtree.insertItem & takeItem
+    def insertItem(self, n: int, parent_item: QTreeWidgetItem, item: QTreeWidgetItem) -> None:
+        """
+        Insert item as the n'th child of parent_item,
+        or as the n'th top-level item if parent_item is None.
+        """
+        if parent_item:
+            parent_item.insertChild(n, item)
+        else:
+            self.treeWidget.insertTopLevelItem(n, item)
+
+    def takeItem(self, item: QTreeWidgetItem) -> None:
+        """Remove item (and its descendants) from its parent, if any."""
+        parent = item.parent()
+        if parent:
+            parent.takeChild(parent.indexOfChild(item))
+        else:
+            w = self.treeWidget
+            n = w.indexOfTopLevelItem(item)
+            if n > -1:
+                w.takeTopLevelItem(n)
     #@+node:ekr.20110605121601.18416: *4* qtree.childItems
     def childItems(self, parent_item: QTreeWidgetItem) -> list[QTreeWidgetItem]:
         """
@@ -951,11 +1150,15 @@ class LeoQtTree(leoFrame.LeoTree):
         self.connectEditorWidget(e, item)
         self.sizeTreeEditor(c, e)
     #@+node:ekr.20110605121601.18421: *4* qtree.createTreeItem
-    def createTreeItem(self, p: Position, parent_item: QTreeWidgetItem) -> QTreeWidgetItem:
+    def createTreeItem(self, p: Position, parent_item: QTreeWidgetItem, n: int = None) -> QTreeWidgetItem:
 
         w = self.treeWidget
-        itemOrTree = parent_item or w
-        item = QtWidgets.QTreeWidgetItem(itemOrTree)
+        if n is None:
+            itemOrTree = parent_item or w
+            item = QtWidgets.QTreeWidgetItem(itemOrTree)
+        else:
+            item = QtWidgets.QTreeWidgetItem()
+            self.insertItem(n, parent_item, item)
         item.setFlags(item.flags() | ItemFlag.ItemIsEditable)
         ChildIndicatorPolicy = QtWidgets.QTreeWidgetItem.ChildIndicatorPolicy
         item.setChildIndicatorPolicy(ChildIndicatorPolicy.DontShowIndicatorWhenChildless)
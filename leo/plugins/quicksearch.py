@@ -97,6 +97,7 @@ import re
 from typing import Any, Iterable, Iterator, Union
 from typing import TYPE_CHECKING
 from leo.core import leoGlobals as g
+from leo.core import leoIndex
 from leo.core.leoQt import Qt, QtCore, QtWidgets
 from leo.core.leoQt import KeyboardModifier
 from leo.plugins import threadutil
@@ -606,6 +607,12 @@ class QuickSearchController:
             bNodes = [self.c.p]
 
         if not hitBase:
+            # Search only the nodes that might match pat.
+            index = None if pat.startswith('r:') else leoIndex.get_index(self.c)
+            gnxs = index.glob_candidates(pat) if index else None
+            if gnxs is not None:
+                hNodes = [z for z in hNodes if z.gnx in gnxs]
+                bNodes = [z for z in bNodes if z.gnx in gnxs]
             hm = self.find_h(hpat, hNodes, flags)
             bm = self.find_b(bpat, bNodes, flags)
             bm_keys = [match[0].key() for match in bm]
@@ -650,6 +657,10 @@ class QuickSearchController:
             hNodes = self.c.p.self_and_subtree()
         else:
             hNodes = [self.c.p]
+        index = None if pat.startswith('r:') else leoIndex.get_index(self.c)
+        gnxs = index.glob_candidates(pat) if index else None
+        if gnxs is not None:
+            hNodes = [z for z in hNodes if z.gnx in gnxs]
         hm = self.find_h(hpat, hNodes, flags)
         # self.addHeadlineMatches(hm)
         # bm = self.c.find_b(bpat, flags)
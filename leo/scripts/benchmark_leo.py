@@ -0,0 +1,1251 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018061512.8: * @file ../scripts/benchmark_leo.py
+"""
+benchmark_leo.py: Benchmarks of Leo's performance-critical code.
+
+Each benchmark compares the legacy code with the faster code on
+synthetic outlines and prints the elapsed times.
+
+Usage:
+    cd {path-to-leo-editor}
+    python -m leo.scripts.benchmark_leo [name...]
+
+Run all benchmarks if no names are given.
+"""
+#@+<< benchmark_leo imports & annotations >>
+#@+node:ekr.20261018061512.9: ** << benchmark_leo imports & annotations >>
+from __future__ import annotations
+from collections.abc import Callable
+import os
+import sys
+import tempfile
+import time
+from typing import Any, TYPE_CHECKING
+from leo.core import leoGlobals as g
+from leo.core.leoTest2 import create_app
+
+if TYPE_CHECKING:  # pragma: no cover
+    from leo.core.leoCommands import Commands as Cmdr
+    from leo.core.leoNodes import Position
+#@-<< benchmark_leo imports & annotations >>
+
+benchmarks: dict[str, Callable] = {}
+
+#@+others
+#@+node:ekr.20261018061512.10: ** benchmark (decorator)
+def benchmark(name: str) -> Callable:
+    """Register a benchmark function."""
+
+    def decorator(func: Callable) -> Callable:
+        benchmarks[name] = func
+        return func
+
+    return decorator
+#@+node:ekr.20261018061512.11: ** function: new_commander
+def new_commander() -> Cmdr:
+    """Return a new commander using the null gui."""
+    from leo.core import leoCommands
+    if not g.app:
+        create_app(gui_name='null')
+    c = leoCommands.Commands(fileName=None, gui=g.app.gui)
+    return c
+#@+node:ekr.20261018061512.12: ** function: make_at_file_trees
+def make_at_file_trees(c: Cmdr, directory: str, n_files: int, n_nodes: int) -> list[Position]:
+    """Create and write n_files @file trees, each containing n_nodes nodes."""
+    roots: list[Position] = []
+    last = c.rootPosition()
+    for i in range(n_files):
+        root = last.insertAfter()
+        root.h = f"@file {directory}{os.sep}bench_{i}.py"
+        root.b = f'"""File {i}"""\n@others\n'
+        for j in range(n_nodes):
+            child = root.insertAsLastChild()
+            child.h = f"def f{i}_{j}"
+            child.b = ''.join(f"def f{i}_{j}_{k}(a, b):\n    return a + b * {k}\n\n" for k in range(5))
+        roots.append(root)
+        last = root
+    for root in roots:
+        c.atFileCommands.writeOneAtFileNode(root)
+    return roots
+#@+node:ekr.20261018114210.10: ** function: make_leo_file
+def make_leo_file(n_nodes: int, width: int) -> str:
+    """Return the contents of a .leo file containing n_nodes nodes with width children each."""
+    vnodes: list[str] = []
+    tnodes: list[str] = []
+    stack = [0]  # Node numbers. A negative number closes the node.
+    while stack:
+        n = stack.pop()
+        if n < 0:
+            vnodes.append('</v>\n')
+            continue
+        vnodes.append(f'<v t="bench.{n}"><vh>node {n}</vh>')
+        tnodes.append(f'<t tx="bench.{n}">def f{n}(a, b):\n    return a + b * {n}\n</t>\n')
+        stack.append(-1)
+        children = [n * width + i for i in range(1, width + 1)]
+        stack.extend(reversed([z for z in children if z < n_nodes]))
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<leo_file>\n<leo_header file_format="2"/>\n'
+        f"<vnodes>\n{''.join(vnodes)}</vnodes>\n"
+        f"<tnodes>\n{''.join(tnodes)}</tnodes>\n"
+        '</leo_file>\n'
+    )
+#@+node:ekr.20261018061512.13: ** function: timeit
+def timeit(tag: str, func: Callable, repeat: int = 3) -> float:
+    """Print and return the best time of func() in seconds."""
+    best = None
+    for _i in range(repeat):
+        t1 = time.perf_counter()
+        func()
+        t2 = time.perf_counter()
+        best = t2 - t1 if best is None else min(best, t2 - t1)
+    print(f"{tag:>40}: {best:7.3f} sec")
+    return best
+#@+node:ekr.20261018150812.2: ** benchmark: color
+@benchmark('color')
+def bench_color() -> None:
+    """Color large synthetic files with the jEdit colorizer in the heavy modes."""
+    import importlib
+    import random
+    from leo.core import leoColorizer
+    c = new_commander()
+    n_lines = 20_000
+    print(f"color: {n_lines} lines in each mode")
+
+    def make_text(language: str) -> str:
+        """Return n_lines of keywords, identifiers, literals, operators and comments."""
+        module = importlib.import_module(f"leo.modes.{language}")
+        keywords = sorted(getattr(module, f"{language}_main_keywords_dict", {}))
+        comment = module.properties.get('lineComment', '#')
+        words = keywords[:300] + ['alpha', 'beta_1', 'gamma', 'x', 'y2']
+        others = ['=', '+', '(', ')', '"a string"', "'s'", '123', '4.5', '{', '}', '[', ']', ',', ';']
+        r = random.Random(1)
+        lines = []
+        for i in range(n_lines):
+            parts = [r.choice(words) for _j in range(r.randint(2, 10))]
+            parts.insert(r.randint(0, len(parts)), r.choice(others))
+            if r.random() < 0.2:
+                parts.append(f"{comment} comment {i} http://leo-editor.github.io")
+            lines.append(' '.join(parts) + '\n')
+        return ''.join(lines)
+
+    def color(language: str, lines: list[str]) -> None:
+        x = leoColorizer.JEditColorizer(c, None)
+        x.language = language
+        x.enabled = True
+        x.init()
+        x.init_all_state()
+        n = x.initBlock0()
+        for s in lines:
+            x.mainLoop(n, s, 0, len(s))
+
+    for language in ('latex', 'php', 'matlab', 'r'):
+        lines = g.splitLines(make_text(language))
+        t = timeit(f"jedit: {language}", lambda language=language, lines=lines: color(language, lines))
+        print(f"{'lines/sec':>40}: {n_lines / t:7.0f}")
+#@+node:ekr.20261018061512.14: ** benchmark: read
+@benchmark('read')
+def bench_read() -> None:
+    """Compare serial and parallel reading of @file trees."""
+    from leo.core.leoAtFile import scan_external_file
+    c = new_commander()
+    at = c.atFileCommands
+    n_files, n_nodes = 200, 50
+    print(f"read: {n_files} @file nodes, {n_nodes} children each, {os.cpu_count()} cpus")
+    with tempfile.TemporaryDirectory() as directory:
+        roots = make_at_file_trees(c, directory, n_files, n_nodes)
+
+        def serial() -> None:
+            for root in roots:
+                at.readFileAtPosition(root)
+
+        def parallel(workers: int) -> Callable:
+            return lambda: at.readFilesInParallel(roots, workers)
+
+        def scan() -> None:
+            for root in roots:
+                scan_external_file(c.fullPath(root), root.gnx, 'utf-8')
+
+        t1 = timeit('serial', serial)
+        timeit('scanning only (parallelizable)', scan)
+        for workers in (2, 4, 8):
+            t2 = timeit(f"parallel ({workers} workers)", parallel(workers))
+            print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+#@+node:ekr.20261018090310.14: ** benchmark: read-cache
+@benchmark('read-cache')
+def bench_read_cache() -> None:
+    """Compare reading @file trees with and without the external files cache."""
+    import sqlite3
+    from leo.core.leoCache import ExternalFilesCache
+    c = new_commander()
+    c.config.set(p=None, kind='bool', name='cache-external-files', val=True)
+    at = c.atFileCommands
+    n_files, n_nodes = 200, 50
+    print(f"read-cache: {n_files} @file nodes, {n_nodes} children each")
+    old_cacher = g.app.global_cacher
+    with tempfile.TemporaryDirectory() as directory:
+        roots = make_at_file_trees(c, directory, n_files, n_nodes)
+
+        def read() -> None:
+            for root in roots:
+                at.read(root)
+            if g.app.global_cacher:
+                g.app.global_cacher.files_cache.flush()
+
+        try:
+            g.app.global_cacher = None
+            t1 = timeit('no cache', read)
+            # Use an on-disk, autocommit connection, like g.app.db.
+            conn = sqlite3.connect(os.path.join(directory, 'cache.sqlite'), isolation_level=None)
+            cache = ExternalFilesCache(conn)
+            g.app.global_cacher = g.Bunch(files_cache=cache)
+            read()  # Fill the cache.
+            t2 = timeit('cache hits', read)
+            print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+        finally:
+            g.app.global_cacher = old_cacher
+#@+node:ekr.20261018101704.3: ** benchmark: write
+@benchmark('write')
+def bench_write() -> None:
+    """Compare writing unchanged @file trees with and without write fingerprints."""
+    c = new_commander()
+    at = c.atFileCommands
+    n_files, n_nodes = 200, 50
+    print(f"write: {n_files} unchanged @file nodes, {n_nodes} children each")
+    with tempfile.TemporaryDirectory() as directory:
+        roots = make_at_file_trees(c, directory, n_files, n_nodes)
+
+        def write(forget: bool) -> Callable:
+            def func() -> None:
+                if forget:
+                    at.write_fingerprints.clear()
+                for root in roots:
+                    at.writeOneAtFileNode(root)
+            return func
+
+        t1 = timeit('read back and compare', write(forget=True))
+        t2 = timeit('skip unchanged files', write(forget=False))
+        print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+#@+node:ekr.20261018114210.9: ** benchmark: read-leo
+@benchmark('read-leo')
+def bench_read_leo() -> None:
+    """Compare reading a large .leo file with ElementTree and with the streaming reader."""
+    import tracemalloc
+    from leo.core.leoFileCommands import FastRead
+    n_nodes, width = 200_000, 10
+    print(f"read-leo: {n_nodes} nodes, {width} children per node")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.leo')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_leo_file(n_nodes, width))
+        print(f"{'file size':>40}: {os.path.getsize(path) / 1e6:7.1f} MB")
+
+        def element_tree(c: Cmdr) -> None:
+            with open(path, 'rb') as f:
+                FastRead(c, c.fileCommands.gnxDict).readWithElementTree(path, f.read())
+
+        def iter_parse(c: Cmdr) -> None:
+            with open(path, 'rb') as f:
+                FastRead(c, c.fileCommands.gnxDict).readWithIterParse(path, f)
+
+        results = []
+        for tag, reader in (('readWithElementTree', element_tree), ('readWithIterParse', iter_parse)):
+            # Each read needs its own commander to avoid gnx clashes.
+            commanders = [new_commander() for _i in range(3)]
+            t = timeit(tag, lambda reader=reader, commanders=commanders: reader(commanders.pop()))
+            c = new_commander()
+            tracemalloc.start()
+            reader(c)
+            _size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{'peak memory':>40}: {peak / 1e6:7.1f} MB")
+            results.append((t, peak))
+        (t1, peak1), (t2, peak2) = results
+        print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+        print(f"{'peak memory ratio':>40}: {peak2 / peak1:7.2f}")
+#@+node:ekr.20261018140211.19: ** benchmark: snapshot
+@benchmark('snapshot')
+def bench_snapshot() -> None:
+    """Compare reading a large .leo file with loading its snapshot."""
+    from leo.core.leoFileCommands import FastRead
+    from leo.core import leoSnapshot
+    n_nodes, width = 200_000, 10
+    print(f"snapshot: {n_nodes} nodes, {width} children per node")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.leo')
+        c = new_commander()
+        c.hiddenRootNode = FastRead(c, c.fileCommands.gnxDict).readWithIterParse(None, make_leo_file(n_nodes, width))
+        save_times = []
+        for val in (False, True):
+            c.config.set(p=None, kind='bool', name='use-outline-snapshots', val=val)
+            tag = 'save with snapshot' if val else 'save'
+            save_times.append(timeit(tag, lambda: c.fileCommands.write_xml_file(path), repeat=1))
+        print(f"{'snapshot overhead':>40}: {save_times[1] / save_times[0]:7.2f}")
+        print(f"{'snapshot size':>40}: {os.path.getsize(leoSnapshot.snapshot_path(path)) / 1e6:7.1f} MB")
+
+        def iter_parse(c: Cmdr) -> None:
+            with open(path, 'rb') as f:
+                assert FastRead(c, c.fileCommands.gnxDict).readWithIterParse(path, f)
+
+        def snapshot(c: Cmdr) -> None:
+            assert leoSnapshot.read_snapshot(FastRead(c, c.fileCommands.gnxDict), path)
+
+        times = []
+        for tag, reader in (('readWithIterParse', iter_parse), ('read_snapshot', snapshot)):
+            # Each read needs its own commander to avoid gnx clashes.
+            commanders = [new_commander() for _i in range(3)]
+            times.append(timeit(tag, lambda reader=reader, commanders=commanders: reader(commanders.pop())))
+        print(f"{'speedup':>40}: {times[0] / times[1]:7.2f}")
+#@+node:ekr.20261018141532.9: ** benchmark: db
+@benchmark('db')
+def bench_db() -> None:
+    """Compare get/set throughput of g.app.db with and without write-behind."""
+    from leo.core.leoCache import SqlitePickleShare
+    new_commander()  # Create g.app.
+    n_keys = 2_000
+    print(f"db: {n_keys} keys")
+    value = {'expanded': ','.join(f"ekr.20261018.{i}" for i in range(50)), 'marked': ''}
+    old_unit_testing = g.unitTesting
+    g.unitTesting = False  # Use an on-disk database.
+    try:
+        for tag, journal_mode, synchronous, write_behind in (
+            ('legacy', 'delete', 'full', False),
+            ('wal', 'wal', 'normal', False),
+            ('wal, write-behind', 'wal', 'normal', True),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                db = SqlitePickleShare(directory, write_behind=write_behind)
+                db.conn.execute(f"pragma journal_mode={journal_mode};")
+                db.conn.execute(f"pragma synchronous={synchronous};")
+
+                def set_all(db: SqlitePickleShare = db) -> None:
+                    for i in range(n_keys):
+                        db[f"key {i}"] = value
+                    db.flush()
+
+                def get_all(db: SqlitePickleShare = db) -> None:
+                    for i in range(n_keys):
+                        assert db[f"key {i}"] == value
+
+                t = timeit(f"{tag}: set", set_all, repeat=1)
+                print(f"{'sets/sec':>40}: {n_keys / t:7.0f}")
+                t = timeit(f"{tag}: get", get_all, repeat=1)
+                print(f"{'gets/sec':>40}: {n_keys / t:7.0f}")
+                sizes = db.payload_sizes()
+                print(f"{'largest payload':>40}: {sizes[0][1]:7} bytes")
+                db.conn.close()
+    finally:
+        g.unitTesting = old_unit_testing
+#@+node:ekr.20261018143010.8: ** benchmark: gnx
+@benchmark('gnx')
+def bench_gnx() -> None:
+    """Compare finding positions by scanning the outline and with c.positionIndex."""
+    c = new_commander()
+    n_top, n_children, n_lookups = 100, 100, 1_000
+    print(f"gnx: {n_top * n_children} nodes, {n_lookups} lookups")
+    last = c.rootPosition()
+    for i in range(n_top):
+        last = last.insertAfter()
+        last.h = f"node {i}"
+        for j in range(n_children):
+            child = last.insertAsLastChild()
+            child.h = f"child {i}.{j}"
+    gnxs = [p.gnx for p in c.all_unique_positions()]
+    gnxs = [gnxs[i * len(gnxs) // n_lookups] for i in range(n_lookups)]
+
+    def scan() -> None:
+        for gnx in gnxs:
+            for p in c.all_unique_positions():
+                if p.v.gnx == gnx:
+                    break
+
+    def index() -> None:
+        c.frame.tree.generation += 1  # Clear the index.
+        for gnx in gnxs:
+            assert c.positionIndex.find(gnx)
+
+    t1 = timeit('scan all_unique_positions', scan, repeat=1)
+    t2 = timeit('c.positionIndex.find', index)
+    print(f"{'speedup':>40}: {t1 / t2:7.0f}")
+#@+node:ekr.20261018150105.13: ** benchmark: server
+@benchmark('server')
+def bench_server() -> None:
+    """
+    Measure the latency of leoserver's requests under concurrent clients,
+    with and without the --workers option.
+
+    One client repeatedly gets the structure of a large outline. The other
+    clients get bodies from small outlines.
+    """
+    import asyncio
+    import json
+    import socket
+    import statistics
+    import subprocess
+    import threading
+    import websockets
+    from leo.core import leoserver
+    n_clients, n_requests, n_nodes = 4, 50, 20_000
+    print(
+        f"server: 1 client getting the structure of {n_nodes} nodes, "
+        f"{n_clients} clients getting bodies, {n_requests} requests each")
+
+    async def request(ws: Any, d: dict, action: str, param: dict) -> dict:
+        """Send a request and return the answer, skipping async messages."""
+        d['id'] += 1
+        await ws.send(json.dumps({'id': d['id'], 'action': action, 'param': param}))
+        while True:
+            answer = json.loads(await ws.recv())
+            if answer.get('id') == d['id']:
+                return answer
+
+    async def client(port: int, path: str, action: str, param: dict, stop: asyncio.Event, latencies: list) -> None:
+        async with websockets.connect(f"ws://localhost:{port}", max_size=None) as ws:
+            d = {'id': 0}
+            answer = await request(ws, d, '!open_file', {'filename': path})
+            param = dict(param, commanderId=answer['commander']['id'])
+            await stop.wait()  # Wait until all clients have opened their outlines.
+            for _i in range(n_requests):
+                t1 = time.perf_counter()
+                await request(ws, d, action, param)
+                latencies.append(time.perf_counter() - t1)
+
+    async def slow_client(port: int, path: str, started: asyncio.Event, done: asyncio.Event) -> None:
+        async with websockets.connect(f"ws://localhost:{port}", max_size=None) as ws:
+            d = {'id': 0}
+            answer = await request(ws, d, '!open_file', {'filename': path})
+            param = {'commanderId': answer['commander']['id']}
+            started.set()
+            while not done.is_set():
+                await request(ws, d, '!get_structure', param)
+
+    async def run_clients(port: int, paths: list[str]) -> list[float]:
+        latencies: list[float] = []
+        started, done = asyncio.Event(), asyncio.Event()
+        slow = asyncio.ensure_future(slow_client(port, paths[0], started, done))
+        await started.wait()
+        await asyncio.gather(*(
+            client(port, path, '!get_body', {'gnx': 'bench.1'}, started, latencies)
+            for path in paths[1:]
+        ))
+        done.set()
+        await slow
+        return latencies
+
+    def run_server(workers: int, paths: list[str]) -> None:
+        with socket.socket() as sock:
+            sock.bind(('localhost', 0))
+            port = sock.getsockname()[1]
+        args = [
+            sys.executable, '-m', 'leo.core.leoserver', '--port', str(port),
+            '--limit', str(n_clients + 1), '--workers', str(workers), '--dirty',
+        ]
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            for line in proc.stdout:
+                if line.startswith(leoserver.SERVER_STARTED_TOKEN):
+                    break
+            # Drain the server's output.
+            threading.Thread(target=proc.stdout.read, daemon=True).start()
+            latencies = sorted(asyncio.run(run_clients(port, paths)))
+        finally:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        p95 = latencies[int(len(latencies) * 0.95)]
+        print(
+            f"{f'--workers {workers}':>20}: median {statistics.median(latencies) * 1000:7.1f} ms, "
+            f"p95 {p95 * 1000:7.1f} ms, max {latencies[-1] * 1000:7.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(n_clients + 1):
+            path = os.path.join(directory, f"bench_{i}.leo")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(make_leo_file(n_nodes if i == 0 else 100, 10))
+            paths.append(path)
+        for workers in (0, 4):
+            run_server(workers, paths)
+#@+node:ekr.20261018151204.6: ** benchmark: undo
+@benchmark('undo')
+def bench_undo() -> None:
+    """
+    Compare change-tree undo using clipboard snapshots with structural undo,
+    then time undo and redo of large paste, sort and import operations.
+    """
+    c = new_commander()
+    fc, u = c.fileCommands, c.undoer
+    n_children, n_grand_children = 100, 50
+    print(f"undo: {n_children * (n_grand_children + 1)} nodes")
+    root = c.rootPosition().insertAfter()
+    root.h = 'root'
+    for i in range(n_children):
+        child = root.insertAsLastChild()
+        child.h = f"child {i}"
+        for j in range(n_grand_children):
+            grand_child = child.insertAsLastChild()
+            grand_child.h = f"grand child {i}.{j}"
+            grand_child.b = f"def f{i}_{j}(a, b):\n    return a + b * {j}\n" * 5
+    c.selectPosition(root)
+    target = root.lastChild().lastChild()
+
+    def legacy_change_tree() -> None:
+        s1 = fc.outline_to_clipboard_string(root)
+        target.b += 'x'
+        s2 = fc.outline_to_clipboard_string(root)
+        u.restoreFromCopiedTree(root.v, s1)
+        assert len(s1) + len(s2) > 0
+
+    def change_tree() -> None:
+        bunch = u.beforeChangeTree(root)
+        target.b += 'x'
+        u.afterChangeTree('bench-change-tree', bunch)
+        u.undo()
+
+    size = 2 * len(fc.outline_to_clipboard_string(root))
+    t1 = timeit('change-tree: clipboard snapshots', legacy_change_tree, repeat=1)
+    t2 = timeit('change-tree: structural changes', change_tree)
+    print(f"{'speedup':>40}: {t1 / t2:7.0f}")
+    print(f"{'snapshot bytes':>40}: {size:7}")
+    u.redo()
+    print(f"{'bead bytes':>40}: {u.beadSize(u.beads[u.bead]):7}")
+    u.undo()
+
+    def undo_redo(tag: str) -> None:
+        timeit(f"undo {tag}", u.undo, repeat=1)
+        timeit(f"redo {tag}", u.redo, repeat=1)
+        u.undo()
+
+    # Paste.
+    s = fc.outline_to_clipboard_string(root)
+    c.selectPosition(root)
+    timeit('paste', lambda: c.pasteOutline(s=s), repeat=1)
+    undo_redo('paste')
+    # Sort.
+    parent = root.lastChild()
+    for i in range(5_000):
+        parent.insertAsLastChild().h = f"sort {i % 100:02} {i}"
+    c.selectPosition(parent)
+    timeit('sort', lambda: c.sortChildren(reverse=True), repeat=1)
+    undo_redo('sort')
+    # Body diffs. Use a small outline: c.checkOutline runs after every undo.
+    c2 = new_commander()
+    u2, target = c2.undoer, c2.rootPosition()
+    c2.selectPosition(target)
+    lines = [f"line {i}: {'x' * 20}\n" for i in range(8_000)]
+    target.b = ''.join(lines)
+    n_edits = 100
+
+    def edit_body() -> None:
+        for i in range(n_edits):
+            bunch = u2.beforeChangeBody(target)
+            lines[i * 80] = f"changed {i}\n"
+            target.b = ''.join(lines)
+            u2.afterChangeBody(target, 'bench-change-body', bunch)
+
+    timeit(f"{n_edits} body changes ({len(target.b) // 1000} KB)", edit_body, repeat=1)
+    print(f"{'full texts':>40}: {2 * n_edits * sys.getsizeof(target.b):7} bytes")
+    print(f"{'bead bytes':>40}: {sum(u2.beadSize(z) for z in u2.beads):7} bytes")
+    timeit(f"undo {n_edits} body changes", lambda: [u2.undo() for _i in range(n_edits)], repeat=1)
+    # Import.
+    g.app.loadManager.createAllImporterData()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench_import.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(2_000):
+                f.write(f"def f{i}(a, b):\n    return a + b * {i}\n\n")
+        c.selectPosition(root)
+        timeit('import', lambda: c.importCommands.importFilesCommand([path], parent=root, treeType='@clean'), repeat=1)
+        undo_redo('import')
+#@+node:ekr.20261018152410.17: ** benchmark: find
+@benchmark('find')
+def bench_find() -> None:
+    """
+    Compare the legacy find-all and change-all loops with the search engine.
+    """
+    from leo.core import leoFind
+    from leo.core.leoGui import StringFindTabManager
+
+    def new_finder(n_nodes: int) -> leoFind.LeoFind:
+        c = new_commander()
+        c.findCommands = x = leoFind.LeoFind(c)
+        x.ftm = StringFindTabManager(c)  # type:ignore
+        root = c.rootPosition()
+        for i in range(n_nodes):
+            p = root.insertAsLastChild()
+            p.h = f"node {i}"
+            p.b = ''.join(f"def f{i}_{j}(a, b):\n    return a + b * {j}\n\n" for j in range(10))
+        c.selectPosition(root)
+        return x
+
+    def settings(x: leoFind.LeoFind, find_text: str, change_text: str, pattern_match: bool) -> Any:
+        settings = x.default_settings()
+        settings.find_text, settings.change_text = find_text, change_text
+        settings.pattern_match = pattern_match
+        x.init_ivars_from_settings(settings)
+        if pattern_match:
+            x.compile_pattern()
+        return settings
+
+    n_nodes = 20_000
+    print(f"find: {n_nodes} nodes")
+    x = new_finder(n_nodes)
+    vnodes = list(x.c.all_unique_nodes())
+
+    def legacy_find_all() -> None:
+        matches: list[dict] = []
+        for v in vnodes:
+            if any(z.startswith('@nosearch') for z in g.splitLines(v.b)):
+                continue
+            body = x.find_all_matches_in_string(v.b)
+            head = x.find_all_matches_in_string(v.h)
+            if body or head:
+                for i in body:
+                    x.index_to_line_info(i, v.b)
+                matches.append({'body': body, 'head': head, 'v': v})
+        x.make_result_from_matches(matches)
+
+    def find_all(workers: int) -> None:
+        engine = leoFind.SearchEngine(x.search_options(), workers)
+        matches = [
+            {'body': body, 'head': head, 'lines': lines, 'v': v}
+            for v, head, body, lines in engine.find_all(vnodes)
+        ]
+        x.make_result_from_matches(matches)
+
+    for find_text, pattern_match in (('return a', False), (r'b \* [0-9]+', True)):
+        settings(x, find_text, '', pattern_match)
+        kind = 'regex' if pattern_match else 'plain'
+        t1 = timeit(f"find-all {kind}: legacy", legacy_find_all, repeat=1)
+        t2 = timeit(f"find-all {kind}: engine", lambda: find_all(0), repeat=1)
+        t3 = timeit(f"find-all {kind}: engine, 4 workers", lambda: find_all(4), repeat=1)
+        print(f"{'speedup':>40}: {t1 / t2:7.1f} {t1 / t3:7.1f}")
+    # Change all, changing only one node in ten.
+    x = new_finder(n_nodes)
+    c, u = x.c, x.c.undoer
+
+    def legacy_change_all() -> None:
+        u.beforeChangeGroup(c.p, 'Replace All')
+        for p in list(c.all_unique_positions()):
+            undoData = u.beforeChangeNodeContents(p)
+            count_h, new_h = x._change_all_search_and_replace(p.h)
+            if count_h:
+                p.h = new_h
+            count_b, new_b = x._change_all_search_and_replace(p.b)
+            if count_b:
+                p.b = new_b
+            u.afterChangeNodeContents(p, 'Replace All', undoData)
+        u.afterChangeGroup(c.p, 'Replace All')
+
+    settings(x, 'f[0-9]*7_', 'g7_', pattern_match=True)
+    t1 = timeit('change-all: legacy', legacy_change_all, repeat=1)
+    u.undo()
+    t2 = timeit('change-all: engine', lambda: x.do_change_all(settings(x, 'f[0-9]*7_', 'g7_', True)), repeat=1)
+    print(f"{'speedup':>40}: {t1 / t2:7.1f}")
+#@+node:ekr.20261018154020.20: ** benchmark: index
+@benchmark('index')
+def bench_index() -> None:
+    """
+    Compare searching all headlines and bodies with searching only the
+    nodes found by the outline index.
+    """
+    import fnmatch
+    import re
+    from leo.core import leoIndex
+    import pickle
+
+    class PickledDict(dict):
+        """A stand-in for c.db that pickles its values, like Leo's cache."""
+
+        def __setitem__(self, key: str, value: Any) -> None:
+            super().__setitem__(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+        def get(self, key: str, default: Any = None) -> Any:
+            value = super().get(key)
+            return default if value is None else pickle.loads(value)
+
+    c = new_commander()
+    c.db = PickledDict()  # type:ignore
+    n_nodes = 20_000
+    print(f"index: {n_nodes} nodes")
+    root = c.rootPosition()
+    for i in range(n_nodes):
+        p = root.insertAsLastChild()
+        p.h = f"node {i}"
+        p.b = ''.join(f"def f{i}_{j}(a, b):\n    return a + b * {j}\n\n" for j in range(10))
+    vnodes = list(c.all_unique_nodes())
+
+    def scan(vnodes: list, pattern: str) -> list:
+        regex = re.compile(fnmatch.translate(pattern).replace(r'\Z', ''), re.IGNORECASE)
+        return [v for v in vnodes if regex.search(v.h) or regex.search(v.b)]
+
+    index = leoIndex.OutlineIndex(c)
+    timeit('build index', index.refresh, repeat=1)
+    timeit('refresh: no changes', index.refresh)
+    timeit('save index', index.save, repeat=1)
+    timeit('load index', lambda: leoIndex.OutlineIndex(c).load(), repeat=1)
+    for pattern in ('f123_4', 'return*b * 7', 'f1999'):
+        gnxs = index.glob_candidates(pattern)
+        if gnxs is not None:
+            expected = scan(vnodes, pattern)
+            assert expected == scan([v for v in vnodes if v.gnx in gnxs], pattern), pattern
+        t1 = timeit(f"scan: {pattern}", lambda pattern=pattern: scan(vnodes, pattern))
+
+        def search(pattern: str = pattern) -> list:
+            gnxs = index.glob_candidates(pattern)
+            return scan(vnodes if gnxs is None else [v for v in vnodes if v.gnx in gnxs], pattern)
+
+        t2 = timeit(f"index: {pattern}", search)
+        print(f"{'speedup':>40}: {t1 / t2:7.1f}")
+    p = root.firstChild()
+    p.b = p.b + 'x'
+    timeit('refresh: one change', index.refresh, repeat=1)
+#@+node:ekr.20261018160512.23: ** benchmark: symbols
+@benchmark('symbols')
+def bench_symbols() -> None:
+    """
+    Compare find-def's scan of the outline with the symbol index, and
+    time autocompleting self.
+    """
+    from leo.core import leoFind
+    from leo.core import leoSymbols
+
+    c = new_commander()
+    c.config.set(p=None, kind='bool', name='use-symbol-index', val=True)
+    n_files, n_classes, n_methods = 20, 50, 20
+    print(f"symbols: {n_files * n_classes * (n_methods + 1)} nodes")
+    root = c.rootPosition()
+    for i in range(n_files):
+        file_p = root.insertAfter()
+        file_p.h = f"@file module{i}.py"
+        file_p.b = '@language python\n@others\n'
+        for j in range(n_classes):
+            class_p = file_p.insertAsLastChild()
+            class_p.h = f"class Class{i}_{j}"
+            class_p.b = f"class Class{i}_{j}:\n    @others\n"
+            for k in range(n_methods):
+                p = class_p.insertAsLastChild()
+                p.h = f"method{j}_{k}"
+                p.b = f"def method{j}_{k}(self, a):\n    self.ivar{k} = a\n    return a\n"
+    x = leoFind.LeoFind(c)
+    index = leoSymbols.SymbolIndex(c)
+    timeit('build index', index.refresh, repeat=1)
+    timeit('refresh: no changes', index.refresh)
+    word = 'method49_19'
+    t1 = timeit(f"scan: {word}", lambda: x._find_all_matches(x._make_patterns(word)), repeat=1)
+    t2 = timeit(f"index: {word}", lambda: index.find_def(word, 'python'))
+    print(f"{'speedup':>40}: {t1 / t2:7.1f}")
+    assert [p.h for i, p, s in index.find_def(word)] == [word] * n_files
+    class_v = c.lastTopLevel().firstChild().v
+    timeit('members', lambda: index.members(index.class_of(class_v)))
+    p = c.lastTopLevel().firstChild().firstChild()
+    p.b = p.b + 'x = 1\n'
+    timeit('refresh: one change', index.refresh, repeat=1)
+#@+node:ekr.20261018163010.10: ** benchmark: spell
+@benchmark('spell')
+def bench_spell() -> None:
+    """
+    Compare the legacy spelling suggestions with the suggestion index, and
+    time spell-checking a subtree.
+    """
+    import pickle
+    import random
+    from leo.commands.spellCommands import BaseSpellWrapper, DefaultDict, SpellTabHandler
+
+    c = new_commander()
+    random.seed(1)
+    letters = 'etaoinshrdlcumwfgypb'
+    words: set[str] = set()
+    while len(words) < 100_000:
+        words.add(''.join(random.choice(letters) for i in range(random.randint(3, 12))))
+    d = DefaultDict(list(words))
+    print(f"spell: {len(words)} words")
+    g.app.db = {}  # type:ignore
+    timeit('build index', d.suggestion_index, repeat=1)
+    s = pickle.dumps(g.app.db, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"{'index size':>40}: {len(s) // 1024:7} KB")
+    timeit('unpickle index', lambda: pickle.loads(s), repeat=1)
+    g.app.db = pickle.loads(s)
+    timeit('load index', lambda: DefaultDict(list(words)).suggestion_index(), repeat=1)
+    for word in ('spellingx', 'qqtaoinshq'):
+
+        def legacy(word: str = word) -> list[str]:
+            known = {z for z in d.edits1(word) if z in d.words}
+            return sorted(known or {z for z in d.edits2(word) if z in d.words} - {word})
+
+        t1 = timeit(f"legacy suggest: {word}", legacy, repeat=1)
+        t2 = timeit(f"suggest: {word}", lambda word=word: d.suggest(word))
+        assert legacy() == d.suggest(word)
+        print(f"{'speedup':>40}: {t1 / t2:7.1f}")
+
+    class Wrapper(BaseSpellWrapper):
+
+        def __init__(self) -> None:
+            self.d = d
+
+    root = c.rootPosition()
+    sample = random.sample(sorted(words), 2_000)
+    for i in range(5_000):
+        p = root.insertAsLastChild()
+        p.b = ' '.join(random.sample(sample, 20)) + ' mispeled\n'
+    handler = SpellTabHandler(c, 'Spell')
+    handler.spellController = Wrapper()  # type:ignore
+    handler.loaded = True
+    timeit('check subtree: 5000 nodes', lambda: handler.check_subtree(root), repeat=1)
+    assert len(handler.check_subtree(root)['mispeled']) == 5_000
+#@+node:ekr.20261018165530.7: ** benchmark: goto
+@benchmark('goto')
+def bench_goto() -> None:
+    """
+    Compare regenerating and scanning an external file for each
+    goto-global-line with using the cached line map.
+    """
+    import random
+
+    c = new_commander()
+    x = c.gotoCommands
+    root = c.rootPosition()
+    root.h = '@file bench.py'
+    root.b = '@language python\n@others\n'
+    for i in range(2_000):
+        p = root.insertAsLastChild()
+        p.h = f"def f{i}"
+        p.b = f"def f{i}(a):\n" + ''.join(f"    a += {j}\n" for j in range(8)) + '    return a\n'
+    n_lines = len(g.splitLines(x.get_external_file_with_sentinels(root)))
+    random.seed(1)
+    targets = [random.randint(1, n_lines) for i in range(50)]
+    print(f"goto: {len(targets)} lines of a {n_lines}-line file")
+
+    def legacy() -> None:
+        for n in targets:
+            lines = g.splitLines(x.get_external_file_with_sentinels(root))
+            assert x.scan_sentinel_lines(lines, n, root)[0]
+
+    def cached() -> None:
+        x.line_maps.clear()
+        for n in targets:
+            assert x.find_file_line(n, root)[0]
+
+    t1 = timeit('regenerate & scan', legacy, repeat=1)
+    t2 = timeit('line map', cached, repeat=1)
+    print(f"{'speedup':>40}: {t1 / t2:7.1f}")
+#@+node:ekr.20261018171020.9: ** benchmark: redraw
+@benchmark('redraw')
+def bench_redraw() -> None:
+    """
+    Compare full and incremental redraws of a 50k-node outline after
+    inserting one node.
+    """
+    from leo.core.leoPlugins import CommandChainDispatcher
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    c = create_app(gui_name='qt')
+    if g.app.gui.guiName() != 'qt':
+        print('redraw: requires Qt')
+        return
+    g.visit_tree_item = CommandChainDispatcher()
+    tree = c.frame.tree
+    n_parents, n_children = 100, 499
+    last = c.rootPosition()
+    for i in range(n_parents):
+        parent = last.insertAfter() if i else last
+        parent.h = f"parent {i}"
+        for j in range(n_children):
+            child = parent.insertAsLastChild()
+            child.h = f"child {i}.{j}"
+        parent.expand()
+        last = parent
+    print(f"redraw: {n_parents * (n_children + 1)} visible nodes")
+    counter = 0
+
+    def insert_and_redraw() -> None:
+        nonlocal counter
+        counter += 1
+        p = c.rootPosition().next().insertAsNthChild(counter)
+        p.h = f"new node {counter}"
+        c.selectPosition(p)
+        c.redraw()
+
+    def set_incremental(val: bool) -> None:
+        c.config.set(p=None, kind='bool', name='incremental-tree-redraw', val=val)
+        tree.reloadSettings()
+
+    set_incremental(False)
+    c.redraw()
+    t1 = timeit('full redraw', insert_and_redraw)
+    set_incremental(True)
+    c.redraw()
+    t2 = timeit('incremental redraw', insert_and_redraw)
+    print(f"{'speedup':>40}: {t1 / t2:7.1f}")
+#@+node:ekr.20261018180420.7: ** benchmark: importers
+@benchmark('importers')
+def bench_importers() -> None:
+    """
+    Compare the startup cost of registering all importers and writers
+    with and without importing their modules.
+
+    Each measurement runs in a new Python process, so that no module has
+    already been imported.
+    """
+    import subprocess
+    import textwrap
+    script = textwrap.dedent(
+        """\
+        import sys, time
+        from leo.core import leoGlobals as g
+        from leo.core.leoTest2 import create_app
+        create_app(gui_name='null')
+        t1 = time.perf_counter()
+        g.app.loadManager.createAllImporterData()
+        if sys.argv[1] == 'eager':
+            for d in (g.app.classDispatchDict, g.app.atAutoDict, g.app.writersDispatchDict):
+                for entry in d.values():
+                    entry.load()
+        print(time.perf_counter() - t1)
+        """)
+
+    def run(tag: str, mode: str) -> float:
+        times = []
+        for _i in range(3):
+            out = subprocess.check_output([sys.executable, '-c', script, mode], text=True)
+            times.append(float(out.splitlines()[-1]))
+        print(f"{tag:>40}: {min(times):7.3f} sec")
+        return min(times)
+
+    print('importers: register all importers and writers in a new process')
+    t1 = run('import all modules', 'eager')
+    t2 = run('read importer & writer dicts', 'lazy')
+    print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+#@+node:ekr.20261018173015.7: ** benchmark: settings
+@benchmark('settings')
+def bench_settings() -> None:
+    """Compare reading the global settings files with and without the settings cache."""
+    import sqlite3
+    from leo.core.leoCache import ExternalFilesCache
+    new_commander()
+    lm = g.app.loadManager
+    print(f"settings: {lm.computeLeoSettingsPath()}")
+    old_cacher = g.app.global_cacher
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            g.app.global_cacher = None
+            t1 = timeit('no cache', lambda: lm.readGlobalSettingsFiles(use_cache=True))
+            # Use an on-disk, autocommit connection, like g.app.db.
+            conn = sqlite3.connect(os.path.join(directory, 'cache.sqlite'), isolation_level=None)
+            g.app.global_cacher = g.Bunch(files_cache=ExternalFilesCache(conn))
+            lm.readGlobalSettingsFiles(use_cache=True)  # Fill the cache.
+            t2 = timeit('cache hits', lambda: lm.readGlobalSettingsFiles(use_cache=True))
+            print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+        finally:
+            g.app.global_cacher = old_cacher
+#@+node:ekr.20261018183010.23: ** benchmark: traversal
+@benchmark('traversal')
+def bench_traversal() -> None:
+    """
+    Micro-benchmarks of outline traversals: the legacy position-based code
+    and the allocation-free vnode walkers.
+    """
+    from leo.core.leoFileCommands import FastRead
+    from leo.core.leoNodes import Position
+    n_nodes, width = 100_000, 10
+    print(f"traversal: {n_nodes} nodes, {width} children per node")
+    c = new_commander()
+    c.hiddenRootNode = FastRead(c, c.fileCommands.gnxDict).readWithIterParse(None, make_leo_file(n_nodes, width))
+
+    def legacy_copy(p: Position) -> Position:
+        g.app.positions += 1  # Position.__init__ counted positions.
+        return Position(p.v, p._childIndex, p.stack)
+
+    def legacy_thread_next(p: Position) -> Position:
+        if p.v:
+            if p.v.children:
+                p.moveToFirstChild()
+            elif p.hasNext():
+                p.moveToNext()
+            else:
+                p.moveToParent()
+                while p:
+                    if p.hasNext():
+                        p.moveToNext()
+                        break
+                    p.moveToParent()
+        return p
+
+    def legacy_traverse() -> None:
+        p = c.rootPosition()
+        while p:
+            legacy_thread_next(p)
+
+    def traverse() -> None:
+        p = c.rootPosition()
+        while p:
+            p.moveToThreadNext()
+
+    def legacy_all_nodes() -> None:
+        p = c.rootPosition()
+        while p:
+            legacy_copy(p).v
+            legacy_thread_next(p)
+
+    def legacy_unique_nodes() -> None:
+        p = c.rootPosition()
+        seen = set()
+        while p:
+            if p.v in seen:
+                p.moveToNodeAfterTree()
+            else:
+                seen.add(p.v)
+                legacy_thread_next(p)
+
+    def legacy_levels() -> None:
+        for p in c.all_positions(copy=False):
+            p.v, p.level(), p.childIndex()
+
+    p = c.rootPosition().firstChild().firstChild().firstChild()
+    table = (
+        ('moveToThreadNext', legacy_traverse, traverse),
+        ('p.copy', lambda: [legacy_copy(p) for _i in range(n_nodes)], lambda: [p.copy() for _i in range(n_nodes)]),
+        ('c.all_nodes', legacy_all_nodes, lambda: list(c.all_nodes())),
+        ('c.all_unique_nodes', legacy_unique_nodes, lambda: list(c.all_unique_nodes())),
+        ('levels', legacy_levels, lambda: list(c.walk())),
+    )
+    for tag, legacy, new in table:
+        t1 = timeit(f"{tag} (legacy)", legacy)
+        t2 = timeit(tag, new)
+        print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+#@+node:ekr.20261019090010.6: ** benchmark: import-throughput
+@benchmark('import-throughput')
+def bench_import_throughput() -> None:
+    """
+    Compare the per-language throughput of the legacy, character-by-character,
+    guide-line scanners with the compiled scanners, both alone and as part of
+    importing a large synthetic file.
+    """
+    import gc
+    from leo.plugins.importers.base_importer import Importer
+    from leo.plugins.importers.c import C_Importer
+    from leo.plugins.importers.javascript import JS_Importer
+    from leo.plugins.importers.python import Python_Importer
+    from leo.unittests.plugins.test_importers import reference_guide_lines
+    n_units = 5_000
+    sources = {
+        '.c': ''.join(
+            f"/* Function {i}.\n   Returns \"{i}\". */\n"
+            f"int f{i}(int a, char *s) {{\n"
+            f"    // A comment with 'quotes'.\n"
+            f"    printf(\"a = %d, s = %s\\n\", a, s);\n"
+            f"    return a + {i};\n}}\n\n"
+            for i in range(n_units)),
+        '.js': ''.join(
+            f"/* Function {i}. */\n"
+            f"function f{i}(a, s) {{\n"
+            f"    // A comment with 'quotes'.\n"
+            f"    var r = s.replace(/[a-z]+\\d/g, 'x{i}');\n"
+            f"    return a + \"{i}\" + r;\n}}\n\n"
+            for i in range(n_units)),
+        '.py': ''.join(
+            f"def f{i}(a, s):\n"
+            f'    """Function {i}.\n\n    Return a string.\n    """\n'
+            f"    # A comment with 'quotes'.\n"
+            f"    return f'{{a}}: {i}' + s + \"\\n\"\n\n"
+            for i in range(n_units)),
+    }
+    importer_classes = {'.c': C_Importer, '.js': JS_Importer, '.py': Python_Importer}
+    c = new_commander()
+    g.app.loadManager.createAllImporterData()
+    make_guide_lines = Importer.make_guide_lines
+
+    def legacy_make_guide_lines(self: Importer, lines: list[str]) -> list[str]:
+        return reference_guide_lines(self, lines)
+
+    def import_file(ext: str, s: str, legacy: bool) -> float:
+        """Import s into a new commander. Return the elapsed time."""
+        c = new_commander()
+        parent = c.rootPosition().insertAfter()
+        parent.h = f"@file bench{ext}"
+        gc.collect()
+        try:
+            if legacy:
+                Importer.make_guide_lines = legacy_make_guide_lines  # type:ignore[method-assign]
+            t1 = time.perf_counter()
+            c.importCommands.createOutline(parent.copy(), ext, s)
+            return time.perf_counter() - t1
+        finally:
+            Importer.make_guide_lines = make_guide_lines  # type:ignore[method-assign]
+
+    print(f"import-throughput: {n_units} functions per language")
+    for ext, s in sources.items():
+        lines = g.splitLines(s)
+        importer = importer_classes[ext](c)
+        print(f"{ext}: {len(lines)} lines")
+        t1 = timeit('guide lines (legacy)', lambda importer=importer, lines=lines: reference_guide_lines(importer, lines))
+        t2 = timeit('guide lines', lambda importer=importer, lines=lines: importer.delete_comments_and_strings(lines))
+        print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+        # Alternate the legacy and new imports: each import leaves garbage behind.
+        times: dict[bool, list[float]] = {True: [], False: []}
+        for _i in range(3):
+            for legacy in (True, False):
+                times[legacy].append(import_file(ext, s, legacy))
+        t1, t2 = min(times[True]), min(times[False])
+        print(f"{'import (legacy)':>40}: {t1:7.3f} sec")
+        print(f"{'import':>40}: {t2:7.3f} sec")
+        print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+        print(f"{'lines/sec (legacy)':>40}: {len(lines) / t1:9.0f}")
+        print(f"{'lines/sec':>40}: {len(lines) / t2:9.0f}")
+#@+node:ekr.20261019090010.18: ** benchmark: recursive-import
+@benchmark('recursive-import')
+def bench_recursive_import() -> None:
+    """
+    Compare recursive imports that check the outline after each file (the
+    legacy code) with recursive imports that check the outline once, both
+    in Leo's process and in worker processes.
+    """
+    from leo.core import leoImport
+    n_dirs, n_files = 10, 30
+    workers = max(2, os.cpu_count() or 1)
+    ic_class = leoImport.LeoImportCommands
+    importFilesCommand = ic_class.importFilesCommand
+
+    def legacy_importFilesCommand(self: leoImport.LeoImportCommands, *args: Any, **kwargs: Any) -> None:
+        kwargs['check'] = True
+        importFilesCommand(self, *args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(n_dirs):
+            sub = os.path.join(directory, 'pkg', f"sub{i}")
+            os.makedirs(sub)
+            for j in range(n_files):
+                with open(os.path.join(sub, f"m{j}.py"), 'w') as f:
+                    f.write('"""Module."""\nimport os\n\n' + ''.join(
+                        f"class C{k}:\n    \"\"\"Class {k}.\"\"\"\n\n"
+                        f"    def f(self, a):\n        return a + 'x'\n\n"
+                        f"    def g(self):\n        pass\n\n"
+                        for k in range(10)))
+
+        def run(legacy: bool, workers: int) -> None:
+            c = new_commander()
+            g.app.loadManager.createAllImporterData()
+            c.mFileName = os.path.join(directory, 'bench.leo')
+            x = leoImport.RecursiveImportController(c,
+                dir_=None, kind='@clean', theTypes=['.py'], verbose=False, workers=workers)
+            try:
+                if legacy:
+                    ic_class.importFilesCommand = legacy_importFilesCommand  # type:ignore[method-assign]
+                x.run(os.path.join(directory, 'pkg'))
+            finally:
+                ic_class.importFilesCommand = importFilesCommand  # type:ignore[method-assign]
+
+        print(f"recursive-import: {n_dirs * n_files} files, {workers} workers")
+        t1 = timeit('check after each file (legacy)', lambda: run(True, 0), repeat=1)
+        t2 = timeit('check once', lambda: run(False, 0), repeat=1)
+        print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+        t3 = timeit('check once, workers', lambda: run(False, workers), repeat=1)
+        print(f"{'speedup':>40}: {t1 / t3:7.2f}")
+#@+node:ekr.20261019090010.38: ** benchmark: write-checks
+@benchmark('write-checks')
+def bench_write_checks() -> None:
+    """
+    Compare the time Leo spends checking Python files after saving them:
+    checking every file in Leo's process (the legacy code), checking only
+    changed contents, and checking in worker processes.
+    """
+    from leo.core import leoWriteChecks
+    n_files = 200
+    workers = max(2, os.cpu_count() or 1)
+    c = new_commander()
+    at = c.atFileCommands
+    at.checkPythonCodeOnWrite = at.runPyFlakesOnWrite = True
+    at.runFlake8OnWrite = at.runPylintOnWrite = False
+    checks = ('syntax', 'pyflakes')
+    files = []
+    last = c.rootPosition()
+    for i in range(n_files):
+        root = last.insertAfter()
+        root.h = f"@file bench_{i}.py"
+        contents = ''.join(
+            f"def f{i}_{k}(a, b):\n    \"\"\"Return a string.\"\"\"\n    return f'{{a}}: {k}' + b\n\n\n"
+            for k in range(200))
+        files.append((root.copy(), root.h[6:], contents))
+        last = root
+
+    def legacy() -> None:
+        for root, fileName, contents in files:
+            leoWriteChecks.check_python_file(fileName, contents, root.h, checks)
+
+    def check(checker: leoWriteChecks.WriteChecker, workers: int) -> None:
+        c.config.set(p=None, kind='int', name='write-check-workers', val=workers)
+        for root, fileName, contents in files:
+            checker.check(c, root, fileName, contents)
+
+    def check_in_workers() -> None:
+        checker = leoWriteChecks.WriteChecker()
+        # Pretend that the idle-time timer is running.
+        # Without a timer, the checker waits for each file.
+        checker.timer = True
+        t1 = time.perf_counter()
+        check(checker, workers)
+        print(f"{'time in Leo (workers)':>40}: {time.perf_counter() - t1:7.3f} sec")
+        checker.wait()
+
+    print(f"write-checks: {n_files} files, {workers} workers")
+    t1 = timeit('check all files (legacy)', legacy, repeat=1)
+    checker = leoWriteChecks.WriteChecker()
+    timeit('check, first save', lambda: check(checker, 0), repeat=1)
+    t2 = timeit('check, unchanged contents', lambda: check(checker, 0), repeat=1)
+    print(f"{'speedup':>40}: {t1 / t2:7.2f}")
+    timeit('check in workers, total', check_in_workers, repeat=1)
+#@+node:ekr.20261018183010.17: ** benchmark: externals
+@benchmark('externals')
+def bench_externals() -> None:
+    """
+    Compare scanning the outline for changed external files with checking
+    the files in the registry of @<file> nodes.
+    """
+    from leo.core.leoApp import IdleTimeManager
+    from leo.core.leoExternalFiles import ExternalFilesController
+    c = new_commander()
+    if not g.app.idleTimeManager:
+        g.app.idleTimeManager = IdleTimeManager()
+    n_files, n_nodes = 200, 250
+    with tempfile.TemporaryDirectory() as directory:
+        make_at_file_trees(c, directory, n_files, n_nodes)
+        efc = ExternalFilesController(c)
+        try:
+
+            def scan_outline() -> None:
+                # The legacy efc.idle_check_commander.
+                for p in c.all_unique_positions():
+                    if p.isAnyAtFileNode():
+                        efc.has_changed(c.fullPath(p))
+
+            print(f"externals: {n_files} external files, {n_files * (n_nodes + 1)} nodes")
+            scan_outline()
+            t1 = timeit('scan outline', scan_outline)
+            # Poll all files in the registry.
+            efc.watcher.failed = True
+            efc.idle_check_commander(c)
+            t2 = timeit('registry', lambda: efc.idle_check_commander(c))
+            print(f"{'speedup':>40}: {t1 / t2:7.1f}")
+            efc.watcher.failed = False
+            efc.idle_check_commander(c)
+            if efc.watcher.since(directory) is None:
+                print('externals: inotify is not available')
+                return
+            t3 = timeit('registry & inotify', lambda: efc.idle_check_commander(c))
+            print(f"{'speedup':>40}: {t1 / t3:7.1f}")
+        finally:
+            efc.shut_down()
+#@+node:ekr.20261018061512.15: ** function: main
+def main() -> None:
+    names = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        func = benchmarks.get(name)
+        if func:
+            func()
+        else:
+            print(f"unknown benchmark: {name!r}. Expected one of {', '.join(benchmarks)}")
+#@-others
+
+if __name__ == '__main__':
+    main()
+#@-leo
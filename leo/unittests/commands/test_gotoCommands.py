@@ -16,6 +16,47 @@ class TestGotoCommands(LeoUnitTest):
     """Unit tests for leo/commands/gotoCommands.py."""
 
     #@+others
+    #@+node:ekr.20261018165530.6: *3* TestGotoCommands.test_line_maps
+    def test_line_maps(self):
+
+        c, root = self.c, self.root_p
+        x = c.gotoCommands
+        root.h = '@file test.py'
+        root.b = '@language python\nbefore\n@others\nafter\n'
+        for i in range(3):
+            child = root.insertAsLastChild()
+            child.h = f"child {i}"
+            child.b = ''.join(f"child {i} line {j}\n" for j in range(3))
+        lines = g.splitLines(x.get_external_file_with_sentinels(root))
+
+        def check() -> None:
+            """Compare the line map with scanning the file."""
+            for n in range(len(lines) + 2):
+                expected = x.scan_sentinel_lines(lines, n, root)
+                self.assertEqual(x.get_line_map(root).find_sentinel_line(n, root), expected, msg=n)
+                expected = x.scan_nonsentinel_lines(lines, n, root)
+                self.assertEqual(x.get_line_map(root).find_nonsentinel_line(n, root), expected, msg=n)
+
+        check()
+        line_map = x.get_line_map(root)
+        self.assertIs(x.get_line_map(root), line_map)
+        p, offset = x.find_file_line(lines.index('child 1 line 2\n') + 1)
+        self.assertEqual((p.h, offset), ('child 1', 3))
+        child = root.lastChild()
+        n = x.node_offset_to_file_line(1, child, root)
+        self.assertEqual(lines[n], 'child 2 line 1\n')
+        # Changing any node under the root invalidates the map.
+        child.b = 'changed\n' + child.b
+        self.assertIsNot(x.get_line_map(root), line_map)
+        lines = g.splitLines(x.get_external_file_with_sentinels(root))
+        check()
+        self.assertEqual(lines[x.node_offset_to_file_line(1, child, root)], 'child 2 line 0\n')
+        # Writing the file replaces the map.
+        line_map = x.get_line_map(root)
+        s = x.get_external_file_with_sentinels(root)
+        x.update_line_map(root, c.atFileCommands.treeHash(root), s)
+        self.assertIsNot(x.line_maps[root.v][1], line_map)
+        self.assertIs(x.get_line_map(root), x.line_maps[root.v][1])
     #@+node:ekr.20230802060444.1: *3* TestGotoCommands.test_show_file_line
     def test_show_file_line(self):
 
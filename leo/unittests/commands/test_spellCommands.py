@@ -18,6 +18,74 @@ class TestSpellCommands(LeoUnitTest):
     """
 
     #@+others
+    #@+node:ekr.20261018163010.8: *3* TestSpellCommands.test_DefaultDict_suggest
+    def test_DefaultDict_suggest(self):
+
+        from leo.commands.spellCommands import DefaultDict
+
+        words = [
+            'spelling', 'spewing', 'selling', 'dwelling', 'spell', 'belling', 'spieling', 'Leo',
+            "don't", 'don', 'dont', 'leo2',
+        ]
+        d = DefaultDict(words)
+
+        def edits2(word: str) -> list[str]:
+            """The legacy suggestions."""
+            known = {z for z in d.edits1(word) if z in d.words}
+            if not known:
+                known = {z for z in d.edits2(word) if z in d.words} - {word}
+            return sorted(known)
+
+        old_db = g.app.db
+        try:
+            g.app.db = {}
+            table = (
+                'speling', 'spelng', 'sepling', 'spellign', 'xpellinx', 'spe', 'eLo', 'xyzzy',
+                # Like edits1, the index inserts and replaces only lower-case letters.
+                'dnt', 'dontt', 'leo', 'lex', 'leo3',
+            )
+            for word in table:
+                self.assertEqual(d.suggest(word), edits2(word), msg=word)
+            self.assertEqual(d.suggest('spelng'), ['spell', 'spelling', 'spewing', 'spieling'])
+            # The index is cached in g.app.db.
+            d2 = DefaultDict(words)
+            index = d2.suggestion_index()
+            self.assertEqual(index.deletes, d.index.deletes)
+            self.assertIs(index.deletes, g.app.db[d.db_key]['deletes'])
+            # Added words update the index.
+            d2.add('spelunking')
+            self.assertEqual(d2.suggest('spelunkin'), ['spelunking'])
+            self.assertEqual(d2.suggest('spelunkng'), ['spelunking'])
+        finally:
+            g.app.db = old_db
+    #@+node:ekr.20261018163010.9: *3* TestSpellCommands.test_SpellTabHandler_check_subtree
+    def test_SpellTabHandler_check_subtree(self):
+
+        from leo.commands.spellCommands import BaseSpellWrapper, DefaultDict, SpellTabHandler
+
+        c, root = self.c, self.root_p
+
+        class TestWrapper(BaseSpellWrapper):
+
+            def __init__(self) -> None:
+                self.d = DefaultDict(['the', 'quick', 'brown', 'fox', 'jumps', 'begin', 'https'])
+
+        handler = SpellTabHandler(c, tabName='Test Spell Tab')
+        handler.spellController = TestWrapper()
+        handler.loaded = True
+        root.b = 'The quikc brown fox\n'
+        child1 = root.insertAsLastChild()
+        child1.b = r'\begin the jmups https://quikc' + '\n'
+        child2 = root.insertAsLastChild()
+        child2.b = 'the quikc fox\n'
+        clone = child2.clone()
+        clone.moveToLastChildOf(child1)
+        result = handler.check_subtree(root)
+        self.assertEqual(sorted(result), ['jmups', 'quikc'])
+        # Clones appear only once.
+        self.assertEqual(result['quikc'], [root, clone])
+        self.assertEqual(result['jmups'], [child1])
+        self.assertEqual(handler.check_subtree(child2), {'quikc': [child2]})
     #@+node:ekr.20230916141635.3: *3* TestSpellCommands.test_SpellTabHandler_find
     def test_SpellTabHandler_find(self):
 
@@ -1,9 +1,17 @@
 #@+leo-ver=5-thin
 #@+node:ekr.20210901170451.1: * @file ../unittests/core/test_leoApp.py
 """Tests of leoApp.py"""
+import glob
+import importlib
 import os
+import shutil
+import sqlite3
 import sys
+import tempfile
 from leo.core import leoGlobals as g
+from leo.core import leoApp
+from leo.core import leoCache
+from leo.core import leoConfig
 from leo.core.leoTest2 import LeoUnitTest
 #@+others
 #@+node:ekr.20210901170531.1: ** class TestApp(LeoUnitTest)
@@ -121,6 +129,99 @@ class TestApp(LeoUnitTest):
         finally:
             sys.argv = old_argv
             sys.stdout = old_stdout
+    #@+node:ekr.20261018180420.6: *3* TestApp.test_LM_read_plugin_dict
+    def test_LM_read_plugin_dict(self):
+        lm = g.app.loadManager
+        plugins_dir = os.path.join(g.app.loadDir, '..', 'plugins')
+        n = 0
+        for kind, dict_name, key in (
+            ('importers', 'importer_dict', 'func'),
+            ('writers', 'writer_dict', 'class'),
+        ):
+            for path in glob.glob(os.path.join(plugins_dir, kind, '*.py')):
+                module_name = os.path.basename(path)[:-3]
+                if module_name == '__init__':
+                    continue
+                d = lm.read_plugin_dict(path, dict_name, key)
+                m = importlib.import_module(f"leo.plugins.{kind}.{module_name}")
+                expected = getattr(m, dict_name, None)
+                if not expected:
+                    self.assertEqual(d, {}, msg=path)
+                    continue
+                n += 1
+                self.assertEqual(d[key], expected[key].__name__, msg=path)
+                self.assertEqual({**d, key: None}, {**expected, key: None}, msg=path)
+        self.assertTrue(n > 25)
+        # Only the function or class may be a name.
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'spam.py')
+            for s, expected in (
+                ("importer_dict = {\n    'func': do_import,\n    'extensions': ['.spam'],\n}\n",
+                    {'func': 'do_import', 'extensions': ['.spam']}),
+                ("importer_dict = {\n    'func': do_import,\n    'extensions': EXTENSIONS,\n}\n", None),
+                ("importer_dict = {\n    'func': 'do_import',\n}\n", None),
+                ("importer_dict = {\n    'extensions': ['.spam'],\n}\n", None),
+            ):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(s)
+                self.assertEqual(lm.read_plugin_dict(path, 'importer_dict', 'func'), expected, msg=s)
+        # Leo imports the modules only when using them.
+        lm.createAllImporterData()
+        entry = g.app.classDispatchDict['.py']
+        self.assertTrue(isinstance(entry, leoApp.LazyEntry))
+        self.assertEqual(entry.__module__, 'leo.plugins.importers.python')
+        from leo.plugins.importers import python
+        self.assertIs(entry.load(), python.do_import)
+        entry = g.app.writersDispatchDict['.md']
+        from leo.plugins.writers import markdown
+        self.assertIs(entry.load(), markdown.MarkdownWriter)
+        self.assertTrue(isinstance(entry(self.c), markdown.MarkdownWriter))
+    #@+node:ekr.20261018173015.6: *3* TestApp.test_LM_settings_cache
+    def test_LM_settings_cache(self):
+        lm = g.app.loadManager
+        cache = leoCache.ExternalFilesCache(sqlite3.connect(':memory:'))
+        old_cacher, old_config, old_trace = g.app.global_cacher, g.app.config, g.app.trace_binding
+        g.app.global_cacher = g.Bunch(files_cache=cache)
+        # --trace-binding disables the cache.
+        g.app.trace_binding = None
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                path = os.path.join(temp_dir, 'leoSettings.leo')
+                shutil.copy(lm.computeLeoSettingsPath(), path)
+                results = []
+                for i in range(2):
+                    g.app.config = config = leoConfig.GlobalConfigManager()
+                    c, (shortcuts_d, settings_d) = lm.readSettingsFile(path, use_cache=True)
+                    results.append((
+                        {key: (z.kind, z.val) for key, z in settings_d.items()},
+                        {key: [bi.stroke for bi in z] for key, z in shortcuts_d.items()},
+                        config.enabledPluginsString,
+                        config.menusList,
+                        list(config.modeCommandsDict),
+                    ))
+                    # The first read parses the file. The second read uses the cache.
+                    self.assertEqual(c is None, i == 1)
+                self.assertEqual((cache.hits, cache.misses), (1, 1))
+                self.assertEqual(results[0], results[1])
+                self.assertTrue(results[0][3])
+                # Changing the file invalidates the entry.
+                with open(path, 'rb') as f:
+                    s = f.read()
+                with open(path, 'wb') as f:
+                    f.write(s.replace(b'@string theme-name = None', b'@string theme-name = xyzzy'))
+                c, (shortcuts_d, settings_d) = lm.readSettingsFile(path, use_cache=True)
+                self.assertTrue(c)
+                self.assertEqual(cache.misses, 2)
+                self.assertEqual(settings_d.get_string_setting('theme-name'), 'xyzzy')
+                # The cache does not change the value of @ifenv nodes.
+                data = cache.get('@settings', path, lm.settingsCacheParams())
+                data['environ']['LEO_TEST_SETTINGS_CACHE'] = 'xyzzy'
+                cache.put('@settings', path, lm.settingsCacheParams(), cache.fingerprint(path), data)
+                c, junk_dicts = lm.readSettingsFile(path, use_cache=True)
+                self.assertTrue(c)
+        finally:
+            g.app.global_cacher, g.app.config = old_cacher, old_config
+            g.app.trace_binding = old_trace
     #@-others
 #@-others
 #@-leo
@@ -2,10 +2,12 @@
 #@+node:ekr.20210901172411.1: * @file ../unittests/core/test_leoAtFile.py
 """Tests of leoAtFile.py"""
 import os
+import sqlite3
 import tempfile
 from leo.core import leoGlobals as g
 from leo.core import leoAtFile
 from leo.core import leoBridge
+from leo.core import leoCache
 from leo.core.leoTest2 import LeoUnitTest
 
 #@+others
@@ -154,6 +156,57 @@ class TestAtFile(LeoUnitTest):
         for expected, s in table:
             result = at.directiveKind4(s, 0)
             self.assertEqual(expected, result, msg=repr(s))
+    #@+node:ekr.20261018090310.13: *3* TestAtFile.test_external_files_cache
+    def test_external_files_cache(self):
+        c = self.c
+        at = c.atFileCommands
+        c.config.set(p=None, kind='bool', name='cache-external-files', val=True)
+        cache = leoCache.ExternalFilesCache(sqlite3.connect(':memory:'))
+        old_cacher = g.app.global_cacher
+        g.app.global_cacher = g.Bunch(files_cache=cache)
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                root = self.settings_p.insertAfter()
+                root.h = f"@file {temp_dir}{os.sep}test_cache.py"
+                root.b = '# root\n@others\n'
+                for i in range(3):
+                    child = root.insertAsLastChild()
+                    child.h = f"node {i}"
+                    child.b = f"a = {i}\n"
+                at.writeOneAtFileNode(root)
+                expected = [(p.h, p.b, p.gnx) for p in root.self_and_subtree()]
+                # The first read fills the cache. Nothing is written until cache.flush.
+                at.read(root)
+                self.assertEqual((cache.hits, cache.misses), (0, 1))
+                count_sql = 'select count(*) from filecache;'
+                self.assertEqual(cache.conn.execute(count_sql).fetchone()[0], 0)
+                cache.flush()
+                self.assertEqual(cache.conn.execute(count_sql).fetchone()[0], 1)
+                # The second read uses the cache.
+                root.v._deleteAllChildren()
+                at.read(root)
+                self.assertEqual((cache.hits, cache.misses), (1, 1))
+                self.assertEqual([(p.h, p.b, p.gnx) for p in root.self_and_subtree()], expected)
+                # Changing the file invalidates the entry.
+                root.firstChild().b = 'a = 42\n'
+                at.writeOneAtFileNode(root)
+                root.firstChild().b = ''
+                at.read(root)
+                self.assertEqual((cache.hits, cache.misses), (1, 2))
+                self.assertEqual(root.firstChild().b, 'a = 42\n')
+                # Changing the params invalidates the entry.
+                self.assertIsNone(cache.get('@file', c.fullPath(root), 'changed params'))
+                # Settings that affect importers change the params of @auto nodes.
+                root.h = f"@auto {temp_dir}{os.sep}test_cache.py"
+                params = at.atAutoCacheParams(root)
+                c.config.set(p=None, kind='bool', name='suppress-import-parsing', val=True)
+                self.assertNotEqual(at.atAutoCacheParams(root), params)
+                # Eviction.
+                self.assertGreater(cache.size(), 0)
+                self.assertEqual(cache.evict(0), 1)
+                self.assertEqual(cache.size(), 0)
+        finally:
+            g.app.global_cacher = old_cacher
     #@+node:ekr.20211106034202.1: *3* TestAtFile.test_findSectionName
     def test_findSectionName(self):
         # Test code per #2303.
@@ -197,6 +250,41 @@ class TestAtFile(LeoUnitTest):
                 self.assertEqual(at.encoding, encoding, msg=repr(s))
         finally:
             at.encoding = 'utf-8'
+    #@+node:ekr.20261018061512.6: *3* TestAtFile.test_readFilesInParallel
+    def test_readFilesInParallel(self):
+        c = self.c
+        at = c.atFileCommands
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Create three @file trees. The last two trees share a clone.
+            roots = []
+            last = self.settings_p
+            for i in range(3):
+                root = last.insertAfter()
+                root.h = f"@file {temp_dir}{os.sep}test_{i}.py"
+                root.b = f"# file {i}\n@others\n"
+                for j in range(3):
+                    child = root.insertAsLastChild()
+                    child.h = f"node {i}.{j}"
+                    child.b = f"a = {i * j}\n"
+                roots.append(root)
+                last = root
+            clone = roots[1].firstChild().clone()
+            clone.moveToLastChildOf(roots[2])
+            for root in roots:
+                at.writeOneAtFileNode(root)
+
+            def outline():
+                return [
+                    (p.h, p.b, p.gnx, p.isCloned())
+                    for root in roots for p in root.self_and_subtree()
+                ]
+
+            expected = outline()
+            for root in roots:
+                root.v._deleteAllChildren()
+            at.readFilesInParallel(roots, workers=3)
+            self.assertEqual(outline(), expected)
+            self.assertEqual(roots[1].firstChild().v, roots[2].lastChild().v)
     #@+node:ekr.20211102110237.1: *3* TestAtFile.test_putBody_adjacent_at_doc_part
     def test_putBody_adjacent_at_doc_part(self):
 
@@ -515,6 +603,31 @@ class TestAtFile(LeoUnitTest):
         finally:
             f.close()
             os.unlink(f.name)
+    #@+node:ekr.20261018101704.2: *3* TestAtFile.test_replaceFile_skips_unchanged_files
+    def test_replaceFile_skips_unchanged_files(self):
+
+        at = self.at
+        encoding = 'utf-8'
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fn = os.path.join(temp_dir, 'test.txt')
+            contents = 'test contents\n'
+            # Create the file.
+            at.replaceFile(contents, encoding, fn, self.root_p)
+            self.assertEqual((at.writtenFiles, at.skippedFiles, at.comparedFiles), (1, 0, 0))
+            # Don't read the unchanged file.
+            val = at.replaceFile(contents, encoding, fn, self.root_p)
+            assert not val, val
+            self.assertEqual((at.writtenFiles, at.skippedFiles, at.comparedFiles), (1, 1, 0))
+            # Compare and write changed contents.
+            val = at.replaceFile('new contents\n', encoding, fn, self.root_p)
+            assert val, val
+            self.assertEqual((at.writtenFiles, at.skippedFiles, at.comparedFiles), (2, 1, 1))
+            # Read and compare the file after another program changes it.
+            with open(fn, 'w') as f:
+                f.write('changed elsewhere\n')
+            val = at.replaceFile('new contents\n', encoding, fn, self.root_p)
+            assert val, val
+            self.assertEqual((at.writtenFiles, at.skippedFiles, at.comparedFiles), (3, 1, 2))
     #@+node:ekr.20210905052021.21: *3* TestAtFile.test_setPathUa
     def test_setPathUa(self):
 
@@ -564,6 +677,39 @@ class TestAtFile(LeoUnitTest):
         # Just test the last line.
         at.sentinels = False
         at.validInAtOthers(p)
+    #@+node:ekr.20261018101704.7: *3* TestAtFile.test_writeOneAtFileNode_skips_unchanged_trees
+    def test_writeOneAtFileNode_skips_unchanged_trees(self):
+
+        at, c = self.at, self.c
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fn = os.path.join(temp_dir, 'test.py')
+            root = c.rootPosition().insertAfter()
+            root.h = f"@file {fn}"
+            root.b = '@others\n'
+            child = root.insertAsLastChild()
+            child.h = 'child'
+            child.b = 'a = 1\n'
+            at.writeOneAtFileNode(root)
+            self.assertEqual((at.writtenFiles, at.skippedFiles), (1, 0))
+            with open(fn) as f:
+                contents = f.read()
+            # Don't regenerate the unchanged tree, but check it as an unchanged file.
+            checked = []
+            old_check = leoAtFile.AtFile.checkPythonCode
+            try:
+                leoAtFile.AtFile.checkPythonCode = (
+                    lambda self, contents, fileName, root: checked.append(contents))
+                at.writeOneAtFileNode(root)
+            finally:
+                leoAtFile.AtFile.checkPythonCode = old_check
+            self.assertEqual((at.writtenFiles, at.skippedFiles, at.unchangedFiles), (1, 1, 1))
+            self.assertEqual(checked, [contents])
+            # Regenerate the changed tree.
+            child.b = 'a = 2\n'
+            at.writeOneAtFileNode(root)
+            self.assertEqual((at.writtenFiles, at.skippedFiles), (2, 1))
+            with open(fn) as f:
+                self.assertTrue('a = 2\n' in f.read())
     #@-others
 #@+node:ekr.20211031085414.1: ** class TestFastAtRead(LeoUnitTest)
 class TestFastAtRead(LeoUnitTest):
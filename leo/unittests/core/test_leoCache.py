@@ -0,0 +1,58 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018141532.5: * @file ../unittests/core/test_leoCache.py
+"""Tests of leoCache.py"""
+
+from leo.core import leoCache
+from leo.core.leoTest2 import LeoUnitTest
+
+#@+others
+#@+node:ekr.20261018141532.6: ** class TestCache(LeoUnitTest)
+class TestCache(LeoUnitTest):
+    """Unit tests for leo/core/leoCache.py."""
+
+    #@+others
+    #@+node:ekr.20261018141532.7: *3* TestCache.test_write_behind
+    def test_write_behind(self):
+        db = leoCache.SqlitePickleShare('unused', write_behind=True)
+        conn = db.conn
+
+        def rows():
+            return sorted(key for key, in conn.execute('select key from cachevalues;'))
+
+        db['a'] = value = [1, 2]
+        db['b'] = 'b'
+        value.append(3)  # Does not change the pending value.
+        del db['b']
+        db['c'] = 'c' * 1000
+        # All changes, including the protocol key, are pending.
+        self.assertEqual(rows(), [])
+        self.assertEqual(db['a'], [1, 2])
+        self.assertEqual(db.get('b', 'default'), 'default')
+        self.assertTrue('c' in db)
+        self.assertFalse('b' in db)
+        self.assertEqual(db.flush(), 4)  # The protocol key, 'a', 'b' and 'c'.
+        self.assertEqual(db.flush(), 0)
+        self.assertEqual(rows(), ['__cache_pickle_protocol__', 'a', 'c'])
+        self.assertEqual(db['a'], [1, 2])
+        self.assertEqual(db['c'], 'c' * 1000)
+        # Deletions are pending until the next flush.
+        del db['a']
+        self.assertFalse('a' in db)
+        self.assertEqual(rows(), ['__cache_pickle_protocol__', 'a', 'c'])
+        # payload_sizes flushes all pending changes.
+        sizes = db.payload_sizes()
+        self.assertEqual([z[0] for z in sizes[:1]], ['c'])
+        self.assertEqual(sorted(z[0] for z in sizes), ['__cache_pickle_protocol__', 'c'])
+        self.assertTrue(all(z[1] > 0 for z in sizes))
+    #@+node:ekr.20261018141532.8: *3* TestCache.test_write_through
+    def test_write_through(self):
+        db = leoCache.SqlitePickleShare('unused')
+        db['a'] = [1, 2]
+        self.assertEqual(db.pending, {})
+        self.assertEqual(db.conn.execute('select count(*) from cachevalues;').fetchone()[0], 2)
+        del db['a']
+        self.assertFalse('a' in db)
+        self.assertEqual(db.flush(), 0)
+    #@-others
+#@-others
+#@-leo
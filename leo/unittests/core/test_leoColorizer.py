@@ -1470,6 +1470,28 @@ class TestColorizer(LeoUnitTest):
                 pass
         ''')
         self.color('html', text)
+    #@+node:ekr.20261018150812.3: *3* TestColorizer.test_leadin_pattern_and_tag_formats
+    def test_leadin_pattern_and_tag_formats(self):
+        c = self.c
+        x = leoColorizer.JEditColorizer(c, None)
+        x.language = 'python'
+        x.enabled = True
+        x.init()
+        x.init_all_state()
+        # The pattern matches exactly the characters that start rules.
+        pattern = x.leadin_pattern()
+        self.assertTrue(pattern is x.leadin_pattern())
+        for ch in '#@ \t"\'<':
+            self.assertTrue(ch in x.rulesDict and pattern.match(ch), repr(ch))
+        self.assertFalse(pattern.match('\u00a4'))
+        # Adding a rule recompiles the pattern.
+        x.rulesDict['\u00a4'] = []
+        self.assertTrue(x.leadin_pattern().match('\u00a4'))
+        # setTag caches formats. Configuring colors clears the cache.
+        x.setTag('keyword1', 'def', 0, 3)
+        self.assertTrue(('python', 'keyword1') in x.tag_formats)
+        x.configure_colors()
+        self.assertEqual(x.tag_formats, {})
     #@+node:ekr.20231229142541.1: *3* TestColorizer.test_match_fstring_helper
     def test_match_fstring_helper(self):
 
@@ -2,6 +2,11 @@
 #@+node:ekr.20210911052754.1: * @file ../unittests/core/test_leoExternalFiles.py
 """Tests of leoExternalFiles.py"""
 
+import os
+import sys
+import tempfile
+import time
+import unittest
 from leo.core import leoGlobals as g
 import leo.core.leoApp as leoApp
 from leo.core.leoTest2 import LeoUnitTest
@@ -29,6 +34,117 @@ class TestExternalFiles(LeoUnitTest):
         efc = g.app.externalFilesController
         for i in range(100):
             efc.on_idle()
+    #@+node:ekr.20261018183010.13: *3* TestExternalFiles.test_registry
+    def test_registry(self):
+        c = self.c
+        efc = g.app.externalFilesController
+        root = self.root_p
+        root.h = 'directory'
+        root.b = '@path spam\n'
+        p1 = root.insertAsLastChild()
+        p1.h = '@file a.py'
+        p2 = root.insertAsLastChild()
+        p2.h = '@clean b.py'
+        registry = efc.get_registry(c)
+        base = os.path.dirname(c.fileName())
+        expected = [
+            ('@file a.py', g.finalize_join(base, 'spam', 'a.py')),
+            ('@clean b.py', g.finalize_join(base, 'spam', 'b.py')),
+        ]
+        self.assertEqual([(p.h, path) for p, path in registry.files()], expected)
+        # Changing a body outside the @<file> trees changes no entries.
+        entries = registry.entries[:]
+        root.next().b = '@path eggs\n'
+        registry.files()
+        self.assertTrue(all(z1 is z2 for z1, z2 in zip(entries, registry.entries)))
+        # Changing an @path directive changes the paths.
+        root.b = '@path eggs\n'
+        self.assertEqual(registry.files()[1][1], g.finalize_join(base, 'eggs', 'b.py'))
+        # Changing headlines and the outline's structure updates the registry.
+        p1.h = 'a.py'
+        p3 = root.insertAsLastChild()
+        p3.h = '@auto c.py'
+        self.assertEqual([p.h for p, path in registry.files()], ['@clean b.py', '@auto c.py'])
+        p2.doDelete()
+        self.assertEqual([p.h for p, path in registry.files()], ['@auto c.py'])
+    #@+node:ekr.20261018183010.14: *3* TestExternalFiles.test_has_changed
+    def test_has_changed(self):
+        efc = g.app.externalFilesController
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spam.py')
+            with open(path, 'w') as f:
+                f.write('spam\n')
+            # Seeing a file for the first time does not read the file.
+            self.assertFalse(efc.has_changed(path))
+            self.assertFalse(path in efc.checksum_d)
+            efc.idle_hash_files()
+            self.assertTrue(path in efc.checksum_d)
+            # Changing only the modification time does not change the file.
+            t = time.time() + 10
+            os.utime(path, (t, t))
+            self.assertFalse(efc.has_changed(path))
+            self.assertFalse(efc.has_changed(path))
+            # Changing the contents does.
+            with open(path, 'w') as f:
+                f.write('eggs\n')
+            os.utime(path, (t + 10, t + 10))
+            self.assertTrue(efc.has_changed(path))
+            with open(path, 'w') as f:
+                f.write('spam and eggs\n')
+            self.assertTrue(efc.has_changed(path))
+            efc.set_time(path)
+            self.assertFalse(efc.has_changed(path))
+            self.assertFalse(efc.has_changed(directory))
+    #@+node:ekr.20261018183010.16: *3* TestExternalFiles.test_idle_check_commander
+    def test_idle_check_commander(self):
+        c = self.c
+        efc = g.app.externalFilesController
+        checked = []
+        efc.has_changed = lambda path: checked.append(path) and False
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                directory = os.path.realpath(directory)
+                path = os.path.join(directory, 'spam.py')
+                with open(path, 'w') as f:
+                    f.write('spam\n')
+                self.root_p.b = f"@path {directory}\n"
+                self.root_p.insertAsLastChild().h = '@file spam.py'
+                efc.idle_check_commander(c)
+                self.assertTrue(path in checked)
+                if efc.watcher.since(directory) is None:
+                    self.skipTest('inotify is not available')
+                # Check unchanged watched files only once more.
+                efc.idle_check_commander(c)
+                checked.clear()
+                efc.idle_check_commander(c)
+                self.assertFalse(path in checked)
+                with open(path, 'w') as f:
+                    f.write('eggs\n')
+                efc.idle_check_commander(c)
+                self.assertTrue(path in checked)
+        finally:
+            efc.shut_down()
+    #@+node:ekr.20261018183010.15: *3* TestExternalFiles.test_watcher
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'requires Linux')
+    def test_watcher(self):
+        watcher = leoExternalFiles.InotifyWatcher()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                directory = os.path.realpath(directory)
+                if not watcher.watch(directory, 1):
+                    self.skipTest('inotify is not available')
+                self.assertEqual(watcher.since(directory), 1)
+                self.assertEqual(watcher.read(), [])
+                path = os.path.join(directory, 'spam.py')
+                with open(path, 'w') as f:
+                    f.write('spam\n')
+                self.assertTrue(path in watcher.read())
+                self.assertEqual(watcher.read(), [])
+            # The watcher stops watching deleted directories.
+            self.assertIsNone(watcher.read())
+            self.assertIsNone(watcher.since(directory))
+        finally:
+            watcher.stop()
     #@-others
 #@-others
 #@-leo
@@ -2,6 +2,10 @@
 #@+node:ekr.20210910065135.1: * @file ../unittests/core/test_leoFileCommands.py
 """Tests of leoFileCommands.py."""
 
+import io
+import sys
+from leo.core import leoGlobals as g
+from leo.core.leoCommands import Commands
 import leo.core.leoFileCommands as leoFileCommands
 from leo.core.leoTest2 import LeoUnitTest
 
@@ -98,6 +102,89 @@ class TestFileCommands(LeoUnitTest):
         d = leoFileCommands.FastRead(c, {}).translate_dict
         s2 = s.translate(d)
         self.assertEqual(s2, 'ab\t\r\nc')
+    #@+node:ekr.20261018114210.8: *3* TestFileCommands.test_fast_readWithIterParse
+    def test_fast_readWithIterParse(self):
+
+        def new_reader():
+            c = Commands(fileName=None, gui=g.app.gui)
+            return leoFileCommands.FastRead(c, c.fileCommands.gnxDict)
+
+        def dump(hidden_v):
+            """Return a list describing all vnodes, without using recursion."""
+            result, stack, seen = [], [hidden_v], set()
+            while stack:
+                v = stack.pop()
+                # Legacy <v> elements get new gnxs.
+                gnx = v.gnx if v.gnx.startswith(('test.', 'hidden')) else 'new gnx'
+                result.append((
+                    gnx, v.h, v.b, getattr(v, 'unknownAttributes', None),
+                    len(v.children), len(v.parents),
+                ))
+                if v.gnx not in seen:
+                    seen.add(v.gnx)
+                    stack.extend(reversed(v.children))
+            return result
+
+        def leo_file(vnodes, tnodes):
+            return (
+                '<?xml version="1.0" encoding="utf-8"?>\n'
+                '<leo_file xmlns:leo="http://leo-editor.github.io/leo-editor/namespaces/leo-python-editor/1.1">\n'
+                '<leo_header file_format="2"/>\n'
+                f"<vnodes>\n{vnodes}</vnodes>\n"
+                f"<tnodes>\n{tnodes}</tnodes>\n"
+                '</leo_file>\n'
+            )
+
+        # An outline containing clones, uA's, control characters and
+        # legacy <v> elements without a 't' attribute (#1581).
+        s = leo_file(
+            vnodes=(
+                '<v t="test.1" str_a="v" str_b="b"><vh>child \u00e9</vh>\n'
+                '<v t="test.2"><vh>grand child</vh></v>\n'
+                '</v>\n'
+                '<v t="test.2"><vh>ignored</vh></v>\n'
+                '<v t="test.3"><vh>no body</vh></v>\n'
+                '<v><vh>legacy 1</vh></v>\n'
+                '<v><vh>legacy 2</vh></v>\n'
+                # A legacy <v> element with exactly one attribute.
+                '<v str_d="d"><vh>legacy 3</vh></v>\n'
+            ),
+            tnodes=(
+                '<t tx="test.1" str_a="t" str_c="c">body \u00e9' + chr(12) + 'x\n</t>\n'
+                '<t tx="test.2">grand child body</t>\n'
+            ),
+        )
+        # Use tiny chunks to test the incremental decoder.
+        for source in (s, s.encode('utf-8'), io.BytesIO(s.encode('utf-8'))):
+            v1, _g_element = new_reader().readWithElementTree(None, s)
+            x2 = new_reader()
+            x2.chunk_size = 7
+            v2 = x2.readWithIterParse(None, source)
+            self.assertEqual(dump(v1), dump(v2))
+        legacy1, legacy2, legacy3 = v2.children[-3:]
+        self.assertNotEqual(legacy1.gnx, legacy2.gnx)
+        self.assertEqual(legacy3.unknownAttributes, {'str_d': 'd'})
+
+        # Deep outlines do not exceed the recursion limit.
+        depth = 2 * sys.getrecursionlimit()
+        s = leo_file(
+            vnodes=''.join(f'<v t="test.{i}"><vh>{i}</vh>' for i in range(depth)) + '</v>' * depth,
+            tnodes='',
+        )
+        v = new_reader().readWithIterParse(None, s)
+        for i in range(depth):
+            v = v.children[0]
+            self.assertEqual(v.h, str(i))
+
+        # A bad file changes no vnodes and restores fc.gnxDict.
+        x3 = new_reader()
+        gnxDict = x3.c.fileCommands.gnxDict
+        old_gnxDict = gnxDict.copy()
+        root = x3.c.rootPosition()
+        s = leo_file(vnodes=f'<v t="{root.gnx}"/><v t="test.1"><vh>child</vh></v>', tnodes='')
+        self.assertIsNone(x3.readWithIterParse(None, s[: s.index('</vnodes>')]))
+        self.assertEqual(gnxDict, old_gnxDict)
+        self.assertEqual(len(root.v.parents), 1)
     #@-others
 #@-others
 #@-leo
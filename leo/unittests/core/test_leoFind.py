@@ -958,6 +958,42 @@ class TestFind(LeoUnitTest):
         for s, expected in table:
             got = x.replace_back_slashes(s)
             self.assertEqual(expected, got, msg=s)
+    #@+node:ekr.20261018152410.15: *4* TestFind.test_search_engine
+    def test_search_engine(self):
+        c, x = self.c, self.x
+        p = c.rootPosition()
+        p.b = '@language python\n@nosearch\ndef nosearch():\n    pass\n'
+        vnodes = list(c.all_unique_nodes())
+        for find_text, ignore_case, pattern_match, whole_word in (
+            ('def', False, False, False),
+            ('DEF', True, False, True),
+            ('bla', False, False, True),
+            (r'^\s*(v\w+)', False, True, False),
+            ('$', False, True, False),
+        ):
+            x.find_text, x.change_text = find_text, '<\\1>'
+            x.ignore_case, x.pattern_match, x.whole_word = ignore_case, pattern_match, whole_word
+            x.search_headline = x.search_body = True
+            # The legacy code.
+            expected_find, expected_change = [], []
+            for v in vnodes:
+                count_h, new_h = x._change_all_search_and_replace(v.h)
+                count_b, new_b = x._change_all_search_and_replace(v.b)
+                if count_h or count_b:
+                    expected_change.append((v, count_h, new_h, count_b, new_b))
+                if '@nosearch' in v.b:
+                    continue
+                head = x.find_all_matches_in_string(v.h)
+                body = x.find_all_matches_in_string(v.b)
+                if head or body:
+                    lines = [x.index_to_line_info(i, v.b) for i in body]
+                    expected_find.append((v, head, body, lines))
+            self.assertTrue(expected_find)
+            for workers in (0, 2):
+                engine = leoFind.SearchEngine(x.search_options(), workers)
+                engine.chunk_size = 3
+                self.assertEqual(list(engine.find_all(vnodes)), expected_find)
+                self.assertEqual(list(engine.change_all(vnodes)), expected_change)
     #@+node:ekr.20210110073117.89: *4* TestFind.test_switch_style
     def test_switch_style(self):
         x = self.x
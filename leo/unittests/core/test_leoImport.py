@@ -4,6 +4,7 @@
 
 import io
 import os
+import tempfile
 from leo.unittests.plugins.test_importers import BaseTestImporter
 from leo.core import leoImport
 from leo.core import leoGlobals as g
@@ -88,6 +89,43 @@ class TestLeoImport(BaseTestImporter):
         # Test redo
         u.redo()
         self.check_outline(target, expected_results)
+    #@+node:ekr.20261019090010.17: *3* TestLeoImport.test_ric_workers
+    def test_ric_workers(self):
+        c = self.c
+        with tempfile.TemporaryDirectory() as dir_:
+            c.mFileName = os.path.join(dir_, 'test.leo')
+            for i, sub in enumerate(('a', 'b', os.path.join('b', 'c'))):
+                os.makedirs(os.path.join(dir_, sub), exist_ok=True)
+                for j in range(3):
+                    with open(os.path.join(dir_, sub, f"m{j}.py"), 'w') as f:
+                        f.write(f"import os\n\nclass C{i}{j}:\n    def f(self):\n        pass\n\n\ndef g():\n    pass\n")
+
+            def outline(p):
+                return [(p2.level(), p2.h, p2.b) for p2 in p.self_and_subtree()]
+
+            results = []
+            for workers in (0, 2):
+                x = leoImport.RecursiveImportController(c,
+                    dir_=None, kind='@clean', theTypes=['.py'], verbose=False, workers=workers)
+                x.run(None)
+                results.append(outline(c.lastTopLevel()))
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(len([z for z in results[0] if z[1].startswith('@@clean')]), 9)
+
+            # Cancel the import after importing four files.
+            seen = []
+
+            def progress(n, n_total, path):
+                seen.append((n, n_total))
+                if n == 4:
+                    x.cancel()
+
+            x = leoImport.RecursiveImportController(c,
+                dir_=None, kind='@clean', progress=progress, theTypes=['.py'], verbose=False, workers=2)
+            x.run(None)
+            self.assertEqual(seen, [(1, 9), (2, 9), (3, 9), (4, 9)])
+            p = c.lastTopLevel()
+            self.assertEqual(len([z for z in p.subtree() if z.h.startswith('@@clean')]), 4)
     #@+node:ekr.20230715004610.1: *3* TestLeoImport.slow_test_ric_run
     def slow_test_ric_run(self):
         c = self.c
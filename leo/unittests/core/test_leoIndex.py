@@ -0,0 +1,121 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018154020.12: * @file ../unittests/core/test_leoIndex.py
+"""Tests of leoIndex.py"""
+
+import fnmatch
+import pickle
+import re
+from leo.core import leoFind
+from leo.core import leoIndex
+from leo.core.leoGui import StringFindTabManager
+from leo.core.leoTest2 import LeoUnitTest
+
+#@+others
+#@+node:ekr.20261018154020.14: ** class TestIndex(LeoUnitTest)
+class TestIndex(LeoUnitTest):
+    """Unit tests for leo/core/leoIndex.py."""
+
+    #@+others
+    #@+node:ekr.20261018154020.15: *3*  TestIndex.setUp & helpers
+    def setUp(self):
+        super().setUp()
+        c = self.c
+        c.config.set(p=None, kind='bool', name='use-outline-index', val=True)
+        self.create_test_outline()
+        self.root_p.b = 'def spam(eggs):\n    return eggs_and_ham + 1\n'
+        for p in self.root_p.children():
+            p.b = f"{p.h}\nSpam_Eggs = 'ham'\n"
+        # The index does not help queries matching most nodes.
+        for i in range(20):
+            p = self.root_p.insertAfter()
+            p.h = f"filler {i}"
+
+    def matches(self, s):
+        """Return the gnxs of all vnodes containing s, ignoring case."""
+        s = s.lower()
+        return {z.gnx for z in self.c.all_unique_nodes() if s in z.h.lower() or s in z.b.lower()}
+    #@+node:ekr.20261018154020.16: *3* TestIndex.test_candidates
+    def test_candidates(self):
+        c = self.c
+        index = leoIndex.get_index(c)
+        self.assertIs(index, c.outlineIndex)
+        self.assertIs(index, leoIndex.get_index(c))
+        table = (
+            'spam', 'SPAM', 'pam', 'eggs_', 'n eggs', 'eggs)', '(eggs):', 'ham + 1',
+            'gs = ', "'ham'", 'child', 'hild 1', 'no such text', 'spam xyzzy',
+        )
+        for s in table:
+            gnxs = index.candidates(s)
+            self.assertTrue(self.matches(s) <= gnxs, msg=s)
+        self.assertEqual(index.candidates('no such text'), set())
+        self.assertEqual(index.candidates('eggs_and_ham'), {self.root_p.gnx})
+        self.assertIsNone(index.candidates(' + '))
+        self.assertIsNone(index.candidates('filler'))
+        # The index sees all changes made with Leo's api.
+        p = self.root_p.firstChild()
+        p.b = 'xyzzy'
+        self.assertEqual(index.candidates('xyzzy'), {p.gnx})
+        self.assertFalse(p.gnx in index.candidates('Spam_Eggs'))
+        # Leo's readers set v._bodyString directly, then change the outline's structure.
+        p2 = p.next()
+        p2.v._bodyString = 'plugh'
+        p2.insertAsLastChild()
+        self.assertEqual(index.candidates('plugh'), {p2.gnx})
+        # The index does not walk an unchanged outline.
+        unique_vnodes = leoIndex.unique_vnodes
+        leoIndex.unique_vnodes = None
+        try:
+            self.assertEqual(index.refresh(), 0)
+            self.assertEqual(index.candidates('plugh'), {p2.gnx})
+        finally:
+            leoIndex.unique_vnodes = unique_vnodes
+        # The index removes deleted vnodes.
+        p3 = self.root_p.insertAsLastChild()
+        p3.b = 'frobozz'
+        self.assertEqual(index.candidates('frobozz'), {p3.gnx})
+        gnx = p3.gnx
+        p3.doDelete()
+        self.assertEqual(index.candidates('frobozz'), set())
+        self.assertFalse(gnx in index.nodes)
+    #@+node:ekr.20261018154020.17: *3* TestIndex.test_glob_candidates
+    def test_glob_candidates(self):
+        index = leoIndex.get_index(self.c)
+        table = ('spam', 'sp*gs', 'def*eggs*ham', 'sp?m', 'e[!x]gs', 'x[]y]z*spam', '*', 'ham*[')
+        for pattern in table:
+            regex = re.compile(fnmatch.translate(f"*{pattern}*"), re.IGNORECASE | re.DOTALL)
+            expected = {z.gnx for z in self.c.all_unique_nodes() if regex.match(z.h) or regex.match(z.b)}
+            gnxs = index.glob_candidates(pattern)
+            if gnxs is not None:
+                self.assertTrue(expected <= gnxs, msg=pattern)
+        self.assertIsNone(index.glob_candidates('*'))
+        self.assertEqual(index.glob_candidates('spam*xyzzy'), set())
+    #@+node:ekr.20261018154020.18: *3* TestIndex.test_save_and_load
+    def test_save_and_load(self):
+        c = self.c
+        c.db = {}
+        index = leoIndex.get_index(c)
+        n = len(list(c.all_unique_nodes()))
+        index.save()
+        # Like c.db, pickle the saved index.
+        c.db = {key: pickle.loads(pickle.dumps(value)) for key, value in c.db.items()}
+        self.assertEqual(leoIndex.OutlineIndex(c).load(), n)
+        self.root_p.b = 'changed'
+        index2 = leoIndex.OutlineIndex(c)
+        self.assertEqual(index2.load(), n - 1)
+        self.assertEqual(index.refresh(), 1)
+        self.assertEqual(index2.postings, index.postings)
+    #@+node:ekr.20261018154020.19: *3* TestIndex.test_find_all
+    def test_find_all(self):
+        c = self.c
+        c.findCommands = x = leoFind.LeoFind(c)
+        x.ftm = StringFindTabManager(c)
+        settings = x.default_settings()
+        settings.find_text = 'spam_eggs'
+        settings.ignore_case = True
+        expected = self.matches('spam_eggs')
+        result = x.do_find_all(settings)
+        self.assertEqual(result['total_matches'], 3)
+        self.assertEqual({z['v'].gnx for z in result['match_dict']}, expected)
+    #@-others
+#@-others
+#@-leo
@@ -351,6 +351,38 @@ class TestNodes(LeoUnitTest):
             for descendant in p.unique_subtree():
                 self.assertTrue(p <= descendant)
             p.moveToThreadNext()
+    #@+node:ekr.20261018183010.21: *4* TestNodes.test_walk
+    def test_walk(self):
+        c = self.c
+
+        def expected(positions):
+            return [(p.v, p.level(), p.childIndex()) for p in positions]
+
+        self.assertEqual(list(c.walk()), expected(c.all_positions()))
+        self.assertEqual(list(c.walk(unique=True)), expected(c.all_unique_positions()))
+        self.assertEqual(list(c.all_nodes()), [p.v for p in c.all_positions()])
+        self.assertEqual(list(c.all_unique_nodes()), [p.v for p in c.all_unique_positions()])
+        for p in c.all_positions():
+            self.assertEqual(list(p.walk()), expected(p.self_and_subtree()))
+            self.assertEqual(list(p.nodes()), [z.v for z in p.self_and_subtree()])
+            seen = set()
+            unique = [z for z in p.self_and_subtree() if not (z.v in seen or seen.add(z.v))]
+            self.assertEqual([v for v, level, n in p.walk(unique=True)], [z.v for z in unique])
+    #@+node:ekr.20261018183010.22: *4* TestNodes.test_p_moveToThreadNext
+    def test_p_moveToThreadNext(self):
+        c = self.c
+        p = c.rootPosition()
+        while p:
+            # Compare with the traversal implied by v.children.
+            p2, after = p.copy(), p.copy().moveToNodeAfterTree()
+            if p.v.children:
+                self.assertEqual(p2.moveToThreadNext(), p.firstChild())
+            else:
+                self.assertEqual(p2.moveToThreadNext(), after)
+            self.assertEqual(after, p.nodeAfterTree())
+            if not after:
+                self.assertEqual(after.stack, [])
+            p.moveToThreadNext()
     #@+node:ekr.20220306072631.1: *3* TestNodes: Outline operations
     #@+node:ekr.20210830095545.42: *4* TestNodes.test_clone_and_move_the_clone_to_the_root
     def test_clone_and_move_the_clone_to_the_root(self):
@@ -1130,6 +1162,65 @@ class TestNodeIndices(LeoUnitTest):
             ni.updateLastIndex(gnx)
             self.assertEqual(ni.lastIndex, new_last)
     #@-others
+#@+node:ekr.20261018143010.4: ** class TestPositionIndex(LeoUnitTest)
+class TestPositionIndex(LeoUnitTest):
+    """Unit tests for PositionIndex class in leo/core/leoNodes.py."""
+
+    def setUp(self):
+        """Create the nodes in the commander."""
+        super().setUp()
+        self.create_test_outline()
+
+    #@+others
+    #@+node:ekr.20261018143010.5: *3* TestPositionIndex.check_index
+    def check_index(self):
+        """Check that the index finds the first position of every node."""
+        c = self.c
+        expected = {}
+        for p in c.all_positions():
+            expected.setdefault(p.gnx, p.copy())
+        for v in c.all_nodes():
+            p = c.positionIndex.find(v.gnx)
+            self.assertEqual(p, expected[v.gnx], msg=v.h)
+            self.assertEqual(p.stack, expected[v.gnx].stack, msg=v.h)
+    #@+node:ekr.20261018143010.6: *3* TestPositionIndex.test_find
+    def test_find(self):
+        c = self.c
+        index = c.positionIndex
+        self.check_index()
+        self.assertIsNone(index.find('no such gnx'))
+        self.assertIsNone(index.find(c.hiddenRootNode.gnx))
+        # The index returns copies.
+        p = index.find(self.root_p.gnx)
+        p.moveToNext()
+        self.assertEqual(index.find(self.root_p.gnx), self.root_p)
+        # Move a clone before its other positions.
+        clone = g.findNodeAnywhere(c, 'child clone a')
+        self.assertTrue(clone.isCloned())
+        clone.moveToRoot()
+        self.check_index()
+        # Clone a node and move the clone.
+        p = g.findNodeAnywhere(c, 'child b')
+        clone = p.clone()
+        clone.moveToFirstChildOf(self.root_p)
+        self.check_index()
+        # Delete a node.
+        p = g.findNodeAnywhere(c, 'child c')
+        gnx = p.gnx
+        p.doDelete()
+        self.assertIsNone(index.find(gnx))
+        self.check_index()
+        # Change children without calling the link methods.
+        self.root_p.v.children.reverse()
+        self.check_index()
+    #@+node:ekr.20261018143010.7: *3* TestPositionIndex.test_find_unique
+    def test_find_unique(self):
+        c = self.c
+        index = c.positionIndex
+        for p in c.all_unique_positions():
+            unique = not any(z.isCloned() for z in p.self_and_parents())
+            self.assertEqual(index.find(p.gnx, unique=True) is not None, unique, msg=p.h)
+    #@-others
 #@-others
 
 #@-leo
@@ -0,0 +1,121 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018140211.12: * @file ../unittests/core/test_leoSnapshot.py
+"""Tests of leoSnapshot.py"""
+
+import os
+import tempfile
+from leo.core import leoGlobals as g
+from leo.core.leoCommands import Commands
+from leo.core import leoFileCommands
+from leo.core import leoSnapshot
+from leo.core.leoTest2 import LeoUnitTest
+
+#@+others
+#@+node:ekr.20261018140211.13: ** class TestSnapshot(LeoUnitTest)
+class TestSnapshot(LeoUnitTest):
+    """Unit tests for leo/core/leoSnapshot.py."""
+
+    #@+others
+    #@+node:ekr.20261018140211.14: *3*  TestSnapshot.setUp & tearDown
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.leo')
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+        super().tearDown()
+    #@+node:ekr.20261018140211.15: *3*  TestSnapshot.helpers
+    def new_reader(self):
+        c = Commands(fileName=None, gui=g.app.gui)
+        return leoFileCommands.FastRead(c, c.fileCommands.gnxDict)
+
+    def dump(self, hidden_v):
+        """Return a list describing all vnodes, without using recursion."""
+        result, stack, seen = [], [hidden_v], set()
+        while stack:
+            v = stack.pop()
+            result.append((
+                v.gnx, v.h, v.b, getattr(v, 'unknownAttributes', None),
+                len(v.children), len(v.parents), v.statusBits,
+            ))
+            if v.gnx not in seen:
+                seen.add(v.gnx)
+                stack.extend(reversed(v.children))
+        return result
+    #@+node:ekr.20261018140211.16: *3* TestSnapshot.test_read_snapshot
+    def test_read_snapshot(self):
+        c = self.c
+        c.config.set(p=None, kind='bool', name='use-outline-snapshots', val=True)
+        # An outline containing clones, uA's, non-ascii and control characters,
+        # and an @file node whose children the .leo file does not contain.
+        self.create_test_outline()
+        root = self.root_p
+        root.v.u = {'test': [1, 2], 'str_a': 'a\tb\nc'}
+        root.b = 'body \u00e9\r\nx\ry' + chr(12) + '\r' + chr(1) + '\n\U0001F600'
+        root.h = 'root \U0001F600' + chr(12)
+        at_file = root.insertAsLastChild()
+        at_file.h = '@file spam.py'
+        at_file.insertAsLastChild().h = 'not in the .leo file'
+        x1 = self.new_reader()
+        self.assertIsNone(x1.readSnapshot(self.path))  # No snapshot.
+        self.assertTrue(c.fileCommands.write_xml_file(self.path))
+        with open(self.path, 'rb') as f:
+            v1 = x1.readWithIterParse(self.path, f.read())
+        x2 = self.new_reader()
+        v2 = x2.readSnapshot(self.path)
+        self.assertEqual(self.dump(v1), self.dump(v2))
+        self.assertEqual(sorted(x2.gnx2vnode), sorted(z.gnx for z in x2.gnx2vnode.values()))
+        # A stat check suffices if the .leo file has not changed.
+        snapshot = leoSnapshot.snapshot_path(self.path)
+        stat = os.stat(self.path)
+        os.utime(snapshot, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        hashlib = leoSnapshot.hashlib
+        leoSnapshot.hashlib = None
+        try:
+            self.assertTrue(self.new_reader().readSnapshot(self.path))
+        finally:
+            leoSnapshot.hashlib = hashlib
+        # Leo hashes the .leo file if its modification time changes.
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+        self.assertTrue(self.new_reader().readSnapshot(self.path))
+        with open(self.path, 'r+b') as f:
+            f.seek(-2, os.SEEK_END)
+            f.write(b'X\n')
+        self.assertIsNone(self.new_reader().readSnapshot(self.path))
+        # The snapshot is stale if the size of the .leo file changes.
+        with open(self.path, 'ab') as f:
+            f.write(b'\n')
+        self.assertIsNone(self.new_reader().readSnapshot(self.path))
+    #@+node:ekr.20261018140211.17: *3* TestSnapshot.test_save_and_open
+    def test_save_and_open(self):
+        c = self.c
+        c.config.set(p=None, kind='bool', name='use-outline-snapshots', val=True)
+        self.create_test_outline()
+        self.root_p.v.u = {'test': [1, 2]}
+        self.assertTrue(c.fileCommands.write_xml_file(self.path))
+        self.assertTrue(os.path.exists(leoSnapshot.snapshot_path(self.path)))
+        # Open the outline from the snapshot.
+        c2 = Commands(fileName=None, gui=g.app.gui)
+        c2.config.set(p=None, kind='bool', name='use-outline-snapshots', val=True)
+        v = c2.fileCommands._getLeoFileByName(self.path, readAtFileNodesFlag=False)
+        self.assertEqual(
+            [(z.gnx, z.h, z.b, z.u) for z in c.all_unique_nodes()],
+            [(z.gnx, z.h, z.b, z.u) for z in c2.all_unique_nodes()],
+        )
+        self.assertEqual(v, c2.hiddenRootNode)
+        # Open the outline from the .leo file if the snapshot is stale.
+        with open(leoSnapshot.snapshot_path(self.path), 'r+b') as f:
+            f.write(b'x')
+        c3 = Commands(fileName=None, gui=g.app.gui)
+        c3.config.set(p=None, kind='bool', name='use-outline-snapshots', val=True)
+        c3.fileCommands._getLeoFileByName(self.path, readAtFileNodesFlag=False)
+        self.assertEqual(
+            [(z.gnx, z.h) for z in c.all_unique_nodes()],
+            [(z.gnx, z.h) for z in c3.all_unique_nodes()],
+        )
+    #@-others
+#@-others
+#@-leo
@@ -0,0 +1,182 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018160512.16: * @file ../unittests/core/test_leoSymbols.py
+"""Tests of leoSymbols.py"""
+
+import pickle
+import textwrap
+from leo.core import leoGlobals as g
+from leo.core import leoFind
+from leo.core import leoSymbols
+from leo.core.leoGui import StringFindTabManager
+from leo.core.leoTest2 import LeoUnitTest
+
+#@+others
+#@+node:ekr.20261018160512.17: ** class TestSymbols(LeoUnitTest)
+class TestSymbols(LeoUnitTest):
+    """Unit tests for leo/core/leoSymbols.py."""
+
+    #@+others
+    #@+node:ekr.20261018160512.18: *3*  TestSymbols.setUp
+    def setUp(self):
+        super().setUp()
+        c = self.c
+        c.config.set(p=None, kind='bool', name='use-symbol-index', val=True)
+        # Create an @file tree containing a class.
+        root = self.root_p
+        root.h = '@file spam.py'
+        root.b = '"""The spam module."""\n@others\n@language python\n'
+        self.class_p = p = root.insertAsLastChild()
+        p.h = 'class Spam'
+        p.b = 'class Spam(Base):\n    """A class."""\n    eggs = 1\n\n    @others\n'
+        self.init_p = p2 = p.insertAsLastChild()
+        p2.h = 'Spam.__init__'
+        p2.b = 'def __init__(self):\n    self.ham = 2\n    self.ham = 3\n'
+        self.fry_p = p2 = p.insertAsLastChild()
+        p2.h = 'Spam.fry'
+        p2.b = 'def fry(self, n):\n    << fry n >>\n    return n\n'
+        p = root.insertAsLastChild()
+        p.h = 'function: spam_helper'
+        p.b = 'def spam_helper():\n    pass\n'
+        # Definitions outside @<file> trees are not indexed.
+        p = root.insertAfter()
+        p.h = 'scratch'
+        p.b = 'def fry():\n    pass\n'
+    #@+node:ekr.20261018160512.19: *3* TestSymbols.test_find_python_symbols
+    def test_find_python_symbols(self):
+        b = textwrap.dedent(
+            """\
+            @cmd('spam')
+            class Outer:
+                x, y = 1, 2
+                class Inner:
+                    ATothers
+                def method(self) -> None:
+                    self.a = 1
+                    s.b = 2
+            LB section >>
+            if True:
+                z: int = 3
+            with open('spam') as f:
+                w1 = 1
+            for i in range(2):
+                w2 = 2
+            else:
+                w3 = 3
+            while False:
+                w4 = 4
+            else:
+                w5 = 5
+            try:
+                w6 = 6
+            except Exception:
+                w7 = 7
+            else:
+                w8 = 8
+            finally:
+                w9 = 9
+            """).replace('AT', '@').replace('LB', '<<')
+        symbols, others_class = leoSymbols.find_python_symbols(b)
+        self.assertEqual(others_class, 'Inner')
+        table = [(name, kind, owner, text) for name, kind, owner, offset, text in symbols]
+        self.assertEqual(table, [
+            ('Outer', 'class', None, 'class Outer'),
+            ('x', 'var', 'Outer', 'x'),
+            ('y', 'var', 'Outer', 'x, y'),
+            ('Inner', 'class', 'Outer', 'class Inner'),
+            ('method', 'def', 'Outer', 'def method'),
+            ('a', 'var', 'Outer', 'self.a'),
+            ('z', 'var', None, 'z'),
+            *((f"w{i}", 'var', None, f"w{i}") for i in range(1, 10)),
+        ])
+        for name, kind, owner, offset, text in symbols:
+            self.assertEqual(b[offset : offset + len(text)], text)
+        # Invalid Python defines no symbols.
+        self.assertIsNone(leoSymbols.find_python_symbols('def (:\n'))
+    #@+node:ekr.20261018160512.20: *3* TestSymbols.test_index
+    def test_index(self):
+        c = self.c
+        index = leoSymbols.get_index(c)
+        self.assertIs(index, c.symbolIndex)
+        self.assertIs(index, leoSymbols.get_index(c))
+        self.assertEqual(index.members('Spam'), ['__init__', 'eggs', 'fry', 'ham'])
+        self.assertEqual(index.class_of(self.class_p.v), 'Spam')
+        self.assertEqual(index.class_of(self.fry_p.v), 'Spam')
+        self.assertIsNone(index.class_of(self.root_p.v))
+        self.assertEqual(index.names_with_prefix('spam'), ['spam_helper'])
+        matches = index.find_def('fry')
+        self.assertEqual([(p.h, s) for i, p, s in matches], [('Spam.fry', 'def fry')])
+        i, p, s = matches[0]
+        self.assertEqual(p.b[i : i + len(s)], s)
+        # Only the first assignment to an ivar in a method defines it.
+        self.assertEqual(len(index.definitions('ham')), 1)
+        self.assertEqual(index.find_def('fry', language='rust'), [])
+        # The index sees all changes made with Leo's api.
+        self.init_p.b = 'def __init__(self):\n    self.bacon = 2\n'
+        self.assertEqual(index.members('Spam'), ['__init__', 'bacon', 'eggs', 'fry'])
+        self.assertEqual(index.refresh(), 0)
+        # The index does not rescan the bodies of an unchanged outline.
+        find = g.findFirstValidAtLanguageDirective
+        g.findFirstValidAtLanguageDirective = None
+        try:
+            self.assertEqual(index.members('Spam'), ['__init__', 'bacon', 'eggs', 'fry'])
+            # Only the changed body.
+            self.init_p.b = 'def __init__(self):\n    self.bacon = 3\n'
+            self.assertEqual(index.refresh(), 1)
+        finally:
+            g.findFirstValidAtLanguageDirective = find
+        # A changed @language directive changes the language of the descendants.
+        self.class_p.b = '@language rust\n' + self.class_p.b
+        self.assertEqual(index.find_def('fry', language='python'), [])
+        self.class_p.b = self.class_p.b[len('@language rust\n') :]
+        self.assertEqual(index.refresh(), 3)
+        # Moving a node changes its class without reparsing it.
+        self.fry_p.moveToLastChildOf(self.root_p)
+        self.assertEqual(index.refresh(), 0)
+        self.assertEqual(index.members('Spam'), ['__init__', 'bacon', 'eggs'])
+        self.assertEqual(len(index.definitions('fry')), 1)
+        self.fry_p.doDelete()
+        self.assertEqual(index.definitions('fry'), [])
+    #@+node:ekr.20261018160512.21: *3* TestSymbols.test_save_and_load
+    def test_save_and_load(self):
+        c = self.c
+        c.db = {}
+        index = leoSymbols.get_index(c)
+        n = len(index.nodes)
+        index.save()
+        # Like c.db, pickle the saved index.
+        c.db = {key: pickle.loads(pickle.dumps(value)) for key, value in c.db.items()}
+        index2 = leoSymbols.SymbolIndex(c)
+        self.assertEqual(index2.load(), n)
+        self.assertEqual(index2.names, index.names)
+        self.assertEqual(index2.classes, index.classes)
+        self.fry_p.b = 'def fry(self):\n    pass\n'
+        self.assertEqual(leoSymbols.SymbolIndex(c).load(), n - 1)
+    #@+node:ekr.20261018160512.22: *3* TestSymbols.test_find_def & test_completions
+    def test_find_def(self):
+        c = self.c
+        c.findCommands = x = leoFind.LeoFind(c)
+        x.ftm = StringFindTabManager(c)
+        matches = x.do_find_def('fry')
+        self.assertEqual([p.h for i, p, s in matches], ['Spam.fry'])
+        # find-def falls back to scanning the outline.
+        c.config.set(p=None, kind='bool', name='use-symbol-index', val=False)
+        matches = x.do_find_def('fry')
+        self.assertEqual(sorted(p.h for i, p, s in matches), ['Spam.fry', 'scratch'])
+
+    def test_completions(self):
+        c = self.c
+        ac = c.k.autoCompleter
+        c.selectPosition(self.fry_p)
+        self.assertEqual(
+            ac.get_completions('self.'),
+            ['self.__init__', 'self.eggs', 'self.fry', 'self.ham'])
+        self.assertTrue('spam_helper' in ac.get_completions('spam_'))
+        # The autocompleter assumes that p is a Position.
+        p = self.root_p.insertAsLastChild()
+        p.h = 'class Position'
+        p.b = 'class Position:\n    def moveToNext(self):\n        pass\n'
+        index = leoSymbols.get_index(c)
+        self.assertEqual(ac.get_symbol_completions(index, 'p.'), ['p.moveToNext'])
+    #@-others
+#@-others
+#@-leo
@@ -38,6 +38,96 @@ class TestUndo(LeoUnitTest):
         c.undoer.undo()
         result = w.getAllText()
         self.assertEqual(result, before, msg='after undo2')
+    #@+node:ekr.20261018151204.3: *3* TestUndo.test_change_tree
+    def test_change_tree(self):
+        c, u = self.c, self.c.undoer
+        self.create_test_outline()
+        root = self.root_p.copy()
+
+        def dump():
+            return [
+                (z.h, z.b, z.isMarked(), getattr(z.v, 'unknownAttributes', None), len(z.v.parents))
+                for z in root.self_and_subtree()
+            ]
+
+        u.clearUndoState()
+        c.selectPosition(root)
+        before = dump()
+        bunch = u.beforeChangeTree(root)
+        # Change headlines, bodies, marks and uA's, then relink nodes.
+        root.b = 'changed root'
+        child = root.firstChild()
+        child.h = 'changed child'
+        child.setMarked()
+        child.v.u = {'test': 1}
+        child.next().doDelete()
+        child.clone().moveToLastChildOf(root)
+        root.insertAsNthChild(1).h = 'new child'
+        c.selectPosition(root.lastChild())
+        u.afterChangeTree('test-change-tree', bunch)
+        after = dump()
+        self.assertNotEqual(before, after)
+        # The bead contains only changes: no copies of the subtree.
+        self.assertFalse(hasattr(u.beads[-1], 'oldPastedTree'))
+        self.assertEqual(sorted(z[1] for z in u.beads[-1].treeChanges), ['body', 'children', 'head', 'marked', 'uA'])
+        for _i in range(3):
+            u.undo()
+            self.assertEqual(dump(), before)
+            self.assertEqual(c.p, root)
+            u.redo()
+            self.assertEqual(dump(), after)
+    #@+node:ekr.20261018151931.7: *3* TestUndo.test_body_diffs
+    def test_body_diffs(self):
+        c, p, u = self.c, self.c.p, self.c.undoer
+        lines = [f"line {i}\n" for i in range(10_000)]
+        p.b = ''.join(lines)
+        c.selectPosition(p)
+        u.clearUndoState()
+        texts = [p.b]
+        for i in range(40):
+            bunch = u.beforeChangeBody(p)
+            lines[i * 100] = f"changed {i}\n"
+            lines[i * 100 + 50] = ''
+            p.b = ''.join(lines)
+            u.afterChangeBody(p, 'test-body-diffs', bunch)
+            texts.append(p.b)
+        # Beads contain only diffs. Keyframes also contain their old text.
+        diffs = [z.bodyDiff for z in u.beads]
+        self.assertTrue(all(z.oldBody is None and z.newBody is None for z in u.beads))
+        self.assertEqual([i for i, z in enumerate(diffs) if z.text is not None], [0, 16, 32])
+        self.assertLess(sum(u.beadSize(z) for z in u.beads), 4 * len(p.b))
+        # Undo and redo all changes.
+        for i in range(40, 0, -1):
+            u.undo()
+            self.assertEqual(p.b, texts[i - 1])
+        for i in range(1, 41):
+            u.redo()
+            self.assertEqual(p.b, texts[i])
+        # Undo rebuilds the text from the keyframe if p.b has changed unexpectedly.
+        p.b = 'unexpected'
+        u.undo()
+        self.assertEqual(p.b, texts[39])
+        p.b = 'unexpected'
+        u.redo()
+        self.assertEqual(p.b, texts[40])
+    #@+node:ekr.20261018151204.4: *3* TestUndo.test_cutStackToSize
+    def test_cutStackToSize(self):
+        c, p, u = self.c, self.c.p, self.c.undoer
+        u.clearUndoState()
+        for i in range(10):
+            bunch = u.beforeChangeBody(p)
+            p.b = f"{i}" * 1000
+            u.afterChangeBody(p, 'test-cut-stack', bunch)
+        self.assertEqual(len(u.beads), 10)
+        self.assertTrue(all(u.beadSize(z) > 1000 for z in u.beads))
+        # Never delete the present bead.
+        self.assertEqual(u.cutStackToSize(0), 9)
+        self.assertEqual((len(u.beads), u.bead), (1, 0))
+        self.assertEqual(u.cutStackToSize(0), 0)
+        u.undo()
+        self.assertEqual(p.b, '8' * 1000)
+        self.assertFalse(u.canUndo())
+        self.assertEqual(c.p, p)
     #@+node:ekr.20210906172626.2: *3* TestUndo.test_addComments
     def test_addComments(self):
         c = self.c
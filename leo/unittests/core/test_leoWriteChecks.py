@@ -0,0 +1,66 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261019090010.33: * @file ../unittests/core/test_leoWriteChecks.py
+"""Tests of leoWriteChecks.py"""
+
+from leo.core import leoWriteChecks
+from leo.core.leoTest2 import LeoUnitTest
+
+#@+others
+#@+node:ekr.20261019090010.34: ** class TestWriteChecks(LeoUnitTest)
+class TestWriteChecks(LeoUnitTest):
+    """Unit tests for leo/core/leoWriteChecks.py."""
+
+    #@+others
+    #@+node:ekr.20261019090010.35: *3* TestWriteChecks.test_check_python_file
+    def test_check_python_file(self):
+        ok, messages = leoWriteChecks.check_python_file('spam.py', 'a = 1\n', '@file spam.py', ('syntax',))
+        self.assertTrue(ok)
+        self.assertEqual(messages, [])
+        contents = 'a = 1\nb = 2\ndef f(:\n    pass\nc = 3\n'
+        ok, messages = leoWriteChecks.check_python_file('spam.py', contents, '@file spam.py', ('syntax',))
+        self.assertFalse(ok)
+        self.assertEqual(messages[0], ('Syntax error in: @file spam.py', 0, 'error'))
+        # Only the offending line links to the file.
+        self.assertEqual([z[1] for z in messages if z[1]], [3])
+        self.assertTrue(messages[-3][0].endswith(':* def f(:'))
+    #@+node:ekr.20261019090010.36: *3* TestWriteChecks.test_check
+    def test_check(self):
+        c = self.c
+        at = c.atFileCommands
+        at.checkPythonCodeOnWrite = True
+        at.runFlake8OnWrite = at.runPyFlakesOnWrite = at.runPylintOnWrite = False
+        c.config.set(p=None, kind='int', name='write-check-workers', val=0)
+        checker = leoWriteChecks.WriteChecker()
+        calls = []
+
+        def check_python_file(*args):
+            calls.append(args)
+            return check_python_file1(*args)
+
+        check_python_file1 = leoWriteChecks.check_python_file
+        leoWriteChecks.check_python_file = check_python_file
+        root = self.root_p
+        root.h = '@file spam.py'
+        fileName = 'spam.py'
+        try:
+            checker.check(c, root, fileName, 'a = 1\n')
+            checker.check(c, root, fileName, 'def f(:\n')
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(len(checker.cache), 2)
+            # Unchanged contents are never checked again.
+            checker.check(c, root, fileName, 'a = 1\n')
+            checker.check(c, root, fileName, 'def f(:\n')
+            self.assertEqual(len(calls), 2)
+        finally:
+            leoWriteChecks.check_python_file = check_python_file1
+        # Check in a worker process. The null gui has no idle-time timer,
+        # so the checker waits for the result.
+        c.config.set(p=None, kind='int', name='write-check-workers', val=2)
+        checker.check(c, root, fileName, 'a = 2\n')
+        self.assertEqual(checker.futures, {})
+        self.assertIsNone(checker.executor)
+        self.assertEqual(len(checker.cache), 3)
+        self.assertEqual(list(checker.cache.values())[-1], (True, []))
+    #@-others
+#@-others
+#@-leo
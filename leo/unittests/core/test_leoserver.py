@@ -151,6 +151,196 @@ class TestLeoServer(LeoUnitTest):
                             print(f"Exception in {tag}: {method_name!r} {e}")  # pragma:no cover
         finally:
             server.close_file({"forced": True})
+    #@+node:ekr.20261018144120.7: *3* TestLeoServer.test_get_structure_delta
+    def test_get_structure_delta(self):
+
+        def apply(nodes, answer):
+            """Apply the answer's ops to nodes, a dict describing the client's outline."""
+            if answer['full']:
+                nodes.clear()
+            for op in answer['ops']:
+                kind, gnx = op['op'], op['gnx']
+                if kind == 'delete':
+                    del nodes[gnx]
+                elif kind == 'children':
+                    nodes[gnx]['children'] = op['children']
+                else:
+                    children = op['children'] if kind == 'insert' else nodes[gnx]['children']
+                    nodes[gnx] = {**op, 'op': None, 'children': children}
+            return answer['version']
+
+        test_dot_leo = g.finalize_join(g.app.loadDir, '..', 'test', 'test.leo')
+        self._request("!open_file", {"log": False, "filename": test_dot_leo})
+        try:
+            c = self.server.c
+            doomed = c.rootPosition().insertAfter()
+            doomed.h = 'doomed'
+            doomed_child = doomed.insertAsLastChild()
+            nodes = {}
+            answer = self._request("!get_structure_delta", {})
+            self.assertTrue(answer['full'])
+            version = apply(nodes, answer)
+            self.assertEqual(len(nodes), len(list(c.all_unique_nodes())) + 1)
+            # No changes.
+            answer = self._request("!get_structure_delta", {"version": version})
+            self.assertEqual((answer['full'], answer['ops'], answer['version']), (False, [], version))
+            # Changing flags does not walk the outline.
+            sync = self.server.outline_syncs[c]
+            sync.relink = sync.scan = None
+            try:
+                c.rootPosition().v.setMarked()
+                answer = self._request("!get_structure_delta", {"version": version})
+            finally:
+                del sync.relink, sync.scan
+            self.assertEqual([(op['op'], op.get('marked')) for op in answer['ops']], [('update', True)])
+            version = apply(nodes, answer)
+            # Change the outline.
+            root = c.rootPosition()
+            child = root.insertAsLastChild()
+            child.h = 'new child'
+            root.h = 'changed headline'
+            clone = root.clone()
+            clone.moveToLastChildOf(child)
+            gnx = doomed.gnx
+            doomed.doDelete()
+            answer = self._request("!get_structure_delta", {"version": version})
+            self.assertFalse(answer['full'])
+            self.assertEqual(
+                {op['op'] for op in answer['ops']},
+                {'children', 'delete', 'insert', 'update'},
+            )
+            version = apply(nodes, answer)
+            self.assertFalse(gnx in nodes)
+            self.assertFalse(doomed_child.gnx in nodes)
+            self.assertEqual(nodes[root.gnx]['headline'], 'changed headline')
+            self.assertTrue(nodes[root.gnx]['cloned'])
+            # The client's outline matches a full resync.
+            full_nodes = {}
+            apply(full_nodes, self._request("!get_structure_delta", {}))
+            self.assertEqual(nodes, full_nodes)
+            # The server resyncs clients with unknown versions.
+            for bad_version in (-1, version + 1, 'xyzzy'):
+                answer = self._request("!get_structure_delta", {"version": bad_version})
+                self.assertTrue(answer['full'])
+        finally:
+            self._request("!close_file", {"forced": True})
+    #@+node:ekr.20261018150105.12: *3* TestLeoServer.test_request_scheduler
+    def test_request_scheduler(self):
+        import asyncio
+
+        class Socket:
+            """A fake websocket."""
+
+            def __init__(self):
+                self.answers = []
+
+            async def send(self, answer):
+                self.answers.append(json.loads(answer))
+
+            async def close(self, code=None, reason=None):
+                self.answers.append({'closed': code})  # pragma: no cover
+
+        test_dot_leo = g.finalize_join(g.app.loadDir, '..', 'test', 'test.leo')
+        scheduler = leoserver.RequestScheduler(self.server, workers=4)
+        socket1, socket2 = Socket(), Socket()
+
+        async def run():
+            for socket, id_, action, param in (
+                (socket1, 1, '!open_file', {"filename": test_dot_leo}),
+                (socket1, 2, '!get_all_gnx', {}),
+                (socket1, 3, '!get_all_gnx', {}),  # Supersedes request 2.
+                (socket2, 3, '!get_all_gnx', {}),  # Another client.
+                (socket1, 4, '!set_headline', {"name": "changed"}),
+                (socket1, 5, '!get_structure', {}),
+                (socket1, 6, '!cancel_request', {"requestId": 5}),
+                (socket1, 7, '!error', {}),
+                (socket1, 8, '!close_file', {"forced": True}),
+            ):
+                await scheduler.submit(socket, {"id": id_, "action": action, "param": param})
+            await scheduler.join()
+
+        try:
+            asyncio.run(run())
+        finally:
+            scheduler.shutdown()
+        answers = {z['id']: z for z in socket1.answers}
+        self.assertEqual(sorted(answers), [1, 2, 3, 4, 5, 6, 7, 8])
+        self.assertEqual(answers[2], {"id": 2, "cancelled": True})
+        self.assertEqual(answers[5], {"id": 5, "cancelled": True})
+        self.assertEqual(answers[6], {"id": 6, "cancelled": True})
+        self.assertTrue(answers[3]['gnx'])
+        self.assertEqual(answers[4]['node']['headline'], 'changed')
+        self.assertTrue('ServerError' in answers[7])
+        # Requests for a commander run in order. Global requests wait for earlier requests.
+        ids = [z['id'] for z in socket1.answers if 'cancelled' not in z]
+        self.assertEqual(ids, [1, 3, 4, 7, 8])
+        self.assertEqual([z['id'] for z in socket2.answers], [3])
+        self.assertEqual(socket2.answers[0]['gnx'], answers[3]['gnx'])
+        self.assertFalse(scheduler.busy())
+        self.assertEqual(scheduler.queues, {})
+    #@+node:ekr.20261019090010.42: *3* TestLeoServer.test_request_scheduler_writer_lock
+    def test_request_scheduler_writer_lock(self):
+        import asyncio
+        import threading
+        import time
+
+        class Commander:
+            """A fake commander."""
+
+        class Socket:
+            """A fake websocket."""
+
+            def __init__(self):
+                self.answers = []
+
+            async def send(self, answer):
+                self.answers.append(json.loads(answer))
+
+        server = self.server
+        commanders = {1: Commander(), 2: Commander()}
+        events = []
+        barrier = threading.Barrier(2, timeout=5)
+
+        def check_c(param):
+            return commanders[param['commanderId']]
+
+        def do_message(d):
+            events.append(('start', d['id']))
+            if d['action'] == '!get_all_gnx':
+                barrier.wait()  # Both reads must run at once.
+            else:
+                time.sleep(0.05)
+            events.append(('end', d['id']))
+            return json.dumps({'id': d['id']})
+
+        scheduler = leoserver.RequestScheduler(server, workers=4)
+        socket = Socket()
+
+        async def run():
+            for id_, action, commanderId in (
+                (1, '!set_headline', 1),
+                (2, '!set_headline', 2),
+                (3, '!get_all_gnx', 1),
+                (4, '!get_all_gnx', 2),
+            ):
+                param = {"commanderId": commanderId}
+                await scheduler.submit(socket, {"id": id_, "action": action, "param": param})
+            await scheduler.join()
+
+        old_c = server.c
+        server.c = None
+        server._check_c, server._do_message = check_c, do_message
+        try:
+            asyncio.run(run())
+        finally:
+            scheduler.shutdown()
+            del server._check_c, server._do_message
+            server.c = old_c
+        self.assertEqual(sorted(z['id'] for z in socket.answers), [1, 2, 3, 4])
+        # The writes for different commanders did not interleave.
+        writes = [z for z in events if z[1] in (1, 2)]
+        self.assertEqual([z[0] for z in writes], ['start', 'end', 'start', 'end'])
+        self.assertEqual(writes[0][1], writes[1][1])
     #@+node:felix.20210621233316.103: *3* TestLeoServer.test_open_and_close
     def test_open_and_close(self):
         # server = self.server
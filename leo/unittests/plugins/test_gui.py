@@ -176,6 +176,75 @@ class TestQtGui(LeoUnitTest):
         # g.trace(wrapper.getAllText())
         wrapper.delete(6, 0)
         # g.trace(wrapper.getAllText())
+    #@+node:ekr.20261018171020.8: *3* TestQtGui.test_incremental_redraw
+    def test_incremental_redraw(self):
+        from leo.core.leoPlugins import CommandChainDispatcher
+        c = self.c
+        tree = c.frame.tree
+        self.assertIsInstance(tree, LeoQtTree)
+        old_visitor = getattr(g, 'visit_tree_item', None)
+        g.visit_tree_item = CommandChainDispatcher()
+        self.addCleanup(setattr, g, 'visit_tree_item', old_visitor)
+        self.create_test_outline()
+        root = self.root_p
+        root.expand()
+        root.firstChild().expand()
+
+        def dump(parent_item=None):
+            """Return a nested list describing the items and check the item dicts."""
+            result = []
+            for item in tree.childItems(parent_item):
+                p = tree.item2position(item)
+                self.assertIs(tree.item2vnode(item), p.v)
+                self.assertIs(tree.position2item(p), item)
+                self.assertTrue(item in tree.vnode2items(p.v))
+                self.assertEqual(item.text(0), p.h)
+                result.append((p.h, item.isExpanded(), dump(item)))
+            return result
+
+        def expected(positions, deep=True):
+            """Return a nested list describing the items that should exist."""
+            result = []
+            for p in positions:
+                expanded = deep and p.hasChildren() and p.isExpanded()
+                children = expected(list(p.children()), deep=expanded) if deep else []
+                result.append((p.h, expanded, children))
+            return result
+
+        def redraw():
+            """Redraw the outline, check the items and return the list of all items."""
+            c.redraw()
+            self.assertEqual(dump(), expected(tree.topPositions()))
+            return [z for aList in tree.vnode2itemsDict.values() for z in aList]
+
+        # Full redraws and incremental redraws draw the same items.
+        redraw()
+        c.config.set(p=None, kind='bool', name='incremental-tree-redraw', val=True)
+        tree.reloadSettings()
+        items1 = redraw()
+        items2 = redraw()
+        self.assertEqual({id(z) for z in items1}, {id(z) for z in items2})
+        # Insert, change and move nodes.
+        root.lastChild().moveToFirstChildOf(root)
+        root.firstChild().h = 'changed'
+        p = root.firstChild().insertAfter()
+        p.h = 'new node'
+        p.setMarked()
+        c.selectPosition(p)
+        items3 = redraw()
+        self.assertEqual(len({id(z) for z in items3} - {id(z) for z in items2}), 1)
+        # Delete, clone and contract nodes.
+        root.firstChild().doDelete()
+        root.firstChild().clone()
+        root.firstChild().contract()
+        c.selectPosition(root.firstChild())
+        redraw()
+        # Hoist and dehoist.
+        c.selectPosition(root.firstChild().next())
+        c.hoist()
+        redraw()
+        c.dehoist()
+        redraw()
     #@-others
 #@+node:ekr.20220911100525.1: ** class TestAPIClasses(LeoUnitTest)
 class TestAPIClasses(LeoUnitTest):
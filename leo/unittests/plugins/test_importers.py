@@ -4,13 +4,15 @@
 import glob
 import importlib
 import os
+import re
 import sys
 import textwrap
+from typing import Optional
 from leo.core import leoGlobals as g
 from leo.core.leoJupytext import JupytextManager
 from leo.core.leoNodes import Position
 from leo.core.leoTest2 import LeoUnitTest
-from leo.plugins.importers.base_importer import Block
+from leo.plugins.importers.base_importer import Block, Importer
 from leo.plugins.importers.java import Java_Importer
 from leo.plugins.importers.python import Python_Importer
 from leo.plugins.importers.c import C_Importer
@@ -19,6 +21,146 @@ import leo.plugins.importers.javascript as javascript
 import leo.plugins.importers.markdown as markdown
 import leo.plugins.importers.otl as otl
 #@+others
+#@+node:ekr.20261019090010.3: ** function: reference_guide_lines
+def reference_guide_lines(importer: Importer, lines: list[str]) -> Optional[list[str]]:
+    """
+    Return the guide lines that the original, character-by-character,
+    versions of i.delete_comments_and_strings would compute.
+
+    Return None if the importer overrides i.delete_comments_and_strings
+    in some other way.
+    """
+    method = type(importer).delete_comments_and_strings
+    if method is Importer.delete_comments_and_strings:
+        return reference_delete_comments_and_strings(importer, lines)
+    if method is javascript.JS_Importer.delete_comments_and_strings:
+        return reference_delete_comments_and_strings(importer, lines, apparent_regexes=True)
+    if method is Python_Importer.delete_comments_and_strings:
+        return reference_python_delete_comments_and_strings(lines)
+    return None
+#@+node:ekr.20261019090010.4: ** function: reference_delete_comments_and_strings
+def reference_delete_comments_and_strings(
+    importer: Importer,
+    lines: list[str],
+    apparent_regexes: bool = False,
+) -> list[str]:
+    """The original Importer and JS_Importer delete_comments_and_strings methods."""
+    string_delims = importer.string_list
+    line_comment, start_comment, end_comment = g.set_delims_from_language(importer.language)
+    target = ''  # The string ending a multi-line comment or string.
+    escape = '\\'
+    result = []
+    for line in lines:
+        result_line, skip_count = [], 0
+        for i, ch in enumerate(line):
+            if ch == '\n':
+                break  # Avoid appending the newline twice.
+            elif skip_count > 0:
+                # Replace the character with a blank.
+                result_line.append(' ')
+                skip_count -= 1
+            elif ch == escape:  # #3620: test for escape before testing for target.
+                assert skip_count == 0
+                result_line.append(' ')
+                skip_count = 1
+            elif target:
+                result_line.append(' ')
+                # Clear the target, but skip any remaining characters of the target.
+                if g.match(line, i, target):
+                    skip_count = max(0, (len(target) - 1))
+                    target = ''
+            elif line_comment and line.startswith(line_comment, i):
+                # Skip the rest of the line. It can't contain significant characters.
+                break
+            elif any(g.match(line, i, z) for z in string_delims):
+                # Allow multi-character string delimiters.
+                result_line.append(' ')
+                for z in string_delims:
+                    if g.match(line, i, z):
+                        target = z
+                        skip_count = max(0, (len(z) - 1))
+                        break
+            elif start_comment and g.match(line, i, start_comment):
+                result_line.append(' ')
+                target = end_comment
+                skip_count = max(0, len(start_comment) - 1)
+            elif apparent_regexes and ch == '/':
+                j = line.find('/', i + 1)
+                if j > -1:
+                    # An *apparent* regular expression.
+                    result_line.append(' ')
+                    skip_count = j - i + 1
+                else:
+                    result_line.append(ch)
+            else:
+                result_line.append(ch)
+
+        # End the line and append it to the result.
+        # Strip trailing whitespace. It can't affect significant characters.
+        end_s = '\n' if line.endswith('\n') else ''
+        result.append(''.join(result_line).rstrip() + end_s)
+    assert len(result) == len(lines)  # A crucial invariant.
+    return result
+#@+node:ekr.20261019090010.5: ** function: reference_python_delete_comments_and_strings
+def reference_python_delete_comments_and_strings(lines: list[str]) -> list[str]:
+    """The original Python_Importer.delete_comments_and_strings method."""
+    string_pat1 = re.compile(r'([fFrR]*)("""|")')
+    string_pat2 = re.compile(r"([fFrR]*)('''|')")
+
+    def skip_string(delim: str, i: int, line: str) -> tuple[str, int]:
+        """
+        Skip the remainder of a string.
+
+        String ends:      return ('', i)
+        String continues: return (delim, len(line))
+        """
+        if delim not in line:
+            return delim, len(line)
+        # Create a pattern so we don't have to create substrings.
+        delim_pat = re.compile(delim)
+        while i < len(line):
+            ch = line[i]
+            if ch == '\\':
+                i += 2
+                continue
+            if delim_pat.match(line, i):
+                return '', i + len(delim)
+            i += 1
+        return delim, i
+
+    delim: str = ''  # The open string delim.
+    result: list[str] = []
+    for line in lines:
+        i, result_line = 0, []
+        while i < len(line):
+            if delim:
+                delim, i = skip_string(delim, i, line)
+                continue
+            ch = line[i]
+            if ch in '#\n':
+                break
+            m = string_pat1.match(line, i) or string_pat2.match(line, i)
+            if m:
+                # Start skipping the string.
+                prefix, delim = m.group(1), m.group(2)
+                i += len(prefix)
+                i += len(delim)
+                if i < len(line):
+                    delim, i = skip_string(delim, i, line)
+            else:
+                result_line.append(ch)
+                i += 1
+
+        # End the line and append it to the result.
+        if line.endswith('\n'):
+            result_line.append('\n')
+        # Finally, strip blank lines.
+        result_line_s = ''.join(result_line)
+        if not result_line_s.strip():
+            result_line_s = '\n'
+        result.append(result_line_s)
+    assert len(result) == len(lines)  # A crucial invariant.
+    return result
 #@+node:ekr.20210904064440.3: ** class BaseTestImporter(LeoUnitTest)
 class BaseTestImporter(LeoUnitTest):
     """The base class for tests of leoImport.py"""
@@ -29,6 +171,18 @@ class BaseTestImporter(LeoUnitTest):
     def setUp(self):
         super().setUp()
         g.app.loadManager.createAllImporterData()
+        # Check all guide lines against the reference implementations.
+        make_guide_lines = Importer.make_guide_lines
+
+        def check_guide_lines(importer: Importer, lines: list[str]) -> list[str]:
+            guide_lines = make_guide_lines(importer, lines)
+            expected = reference_guide_lines(importer, lines)
+            if expected is not None:
+                self.assertEqual(guide_lines, expected)
+            return guide_lines
+
+        Importer.make_guide_lines = check_guide_lines  # type:ignore
+        self.addCleanup(setattr, Importer, 'make_guide_lines', make_guide_lines)
 
     #@+others
     #@+node:ekr.20230526135305.1: *3* BaseTestImporter.check_outline
@@ -198,6 +352,25 @@ class TestImporterClass(LeoUnitTest):
 
         # A short test that the results contain an expected line.
         assert 'def spam_and_eggs' in s, repr(s)
+    #@+node:ekr.20261019090010.7: *3* TestImporterClass.test_scan_guide_lines
+    def test_scan_guide_lines(self):
+
+        c = self.c
+        # Escapes, unterminated strings and comments, apparent regexes, f-strings.
+        lines = g.splitLines(textwrap.dedent(
+            r"""
+            a = "b\"c" + 'd' /* e
+            f */ g(/h/, 'i\
+            j', k / 2)  // l "m
+            n = f'{o}' rb"p\
+            q" # r
+            s = '''t "u
+            v'''; w('x', "y") \
+            """))
+        for importer_class in (C_Importer, Java_Importer, javascript.JS_Importer, Python_Importer):
+            importer = importer_class(c)
+            expected = reference_guide_lines(importer, lines)
+            self.assertEqual(importer.delete_comments_and_strings(lines), expected, msg=importer_class)
     #@-others
 #@+node:ekr.20211108052633.1: ** class TestAtAuto (BaseTestImporter)
 class TestAtAuto(BaseTestImporter):